@@ -33,6 +33,7 @@ create table public.gbp_locations (
   dias_programados jsonb null default '{"dias": []}'::jsonb,
   canonical_id text null,
   empresa_id uuid null,
+  content_hash text null,
   constraint gbp_locations_pkey primary key (id),
   constraint gbp_locations_uq unique (nombre_nora, location_id),
   constraint gbp_locations_api_id_fkey foreign key (api_id) references apis_registradas (id) on delete set null,
@@ -87,3 +88,4 @@ where (empresa_id is null and activa = true);
 comment on table public.gbp_locations is 'Ubicaciones de Google Business Profile vinculadas a empresas';
 comment on column public.gbp_locations.empresa_id is 'ID de la empresa dueña de la ubicación';
 comment on column public.gbp_locations.dias_programados is 'Días de la semana para publicar automáticamente';
+comment on column public.gbp_locations.content_hash is 'SHA-256 del contenido de la API usado para detectar cambios en la sincronización';
@@ -16,7 +16,10 @@ create table public.gbp_publicaciones (
   updated_at timestamp with time zone not null default now(),
   published_at timestamp with time zone null,
   imagen_url text null,
+  meta_post_id text null,
+  summary_hash text null,
   constraint gbp_publicaciones_pkey primary key (id),
+  constraint gbp_publicaciones_meta_post_location_uq unique (meta_post_id, location_name),
   constraint gbp_publicaciones_cta_tipo_check check (
     cta_tipo = any (array['BOOK'::text, 'ORDER'::text, 'LEARN_MORE'::text, 'SIGN_UP'::text, 
                          'CALL'::text, 'BUY'::text, 'GET_OFFER'::text, 'SHOP_NOW'::text])
@@ -50,3 +53,5 @@ comment on table public.gbp_publicaciones is 'Log de publicaciones creadas en Go
 comment on column public.gbp_publicaciones.tipo is 'Tipo de publicación (FROM_FACEBOOK indica que viene de Meta)';
 comment on column public.gbp_publicaciones.estado is 'Estado de la publicación';
 comment on column public.gbp_publicaciones.gbp_post_name is 'Nombre del post retornado por la API de GBP';
+comment on column public.gbp_publicaciones.meta_post_id is 'post_id de Meta que originó la publicación (llave del ledger de idempotencia)';
+comment on column public.gbp_publicaciones.summary_hash is 'SHA-256 del summary enviado a GBP, usado para reconciliar reintentos';
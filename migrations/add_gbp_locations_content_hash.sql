@@ -0,0 +1,7 @@
+-- Agregar hash de contenido a gbp_locations
+-- Permite que la sincronización de ubicaciones escriba solo filas nuevas o modificadas
+
+ALTER TABLE gbp_locations
+ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+COMMENT ON COLUMN gbp_locations.content_hash IS 'SHA-256 del contenido de la API usado para detectar cambios en la sincronización';
@@ -0,0 +1,19 @@
+-- Ledger de idempotencia para publicaciones Facebook → GBP
+-- Una fila por (meta_post_id, location_name): 'pendiente' antes de llamar a la API,
+-- 'publicada' o 'error' después. Permite reconciliar reintentos sin duplicar posts.
+
+ALTER TABLE gbp_publicaciones
+ADD COLUMN IF NOT EXISTS meta_post_id TEXT;
+
+ALTER TABLE gbp_publicaciones
+ADD COLUMN IF NOT EXISTS summary_hash TEXT;
+
+-- Llave única del ledger (las filas históricas con meta_post_id NULL no chocan)
+ALTER TABLE gbp_publicaciones
+DROP CONSTRAINT IF EXISTS gbp_publicaciones_meta_post_location_uq;
+
+ALTER TABLE gbp_publicaciones
+ADD CONSTRAINT gbp_publicaciones_meta_post_location_uq UNIQUE (meta_post_id, location_name);
+
+COMMENT ON COLUMN gbp_publicaciones.meta_post_id IS 'post_id de meta_publicaciones_webhook que originó la publicación';
+COMMENT ON COLUMN gbp_publicaciones.summary_hash IS 'SHA-256 del summary enviado a GBP, usado para reconciliar reintentos';
@@ -0,0 +1,44 @@
+-- Migración: Agregar job de archivo mensual de meta_ads_anuncios_daily
+-- Descripción: Exporta los meses cerrados a Parquet en Supabase Storage y los
+-- borra de la tabla caliente (ver create_meta_ads_daily_archivo.sql)
+
+INSERT INTO public.jobs_config (
+    nombre_job,
+    descripcion,
+    tipo,
+    intervalo_ejecucion,
+    hora_ejecucion,
+    dias_semana,
+    activo,
+    prioridad,
+    timeout_segundos,
+    max_reintentos,
+    notificar_errores,
+    notificar_exito,
+    tags
+) VALUES (
+    'meta_ads.daily.archive',
+    'Archiva en Parquet los meses cerrados de meta_ads_anuncios_daily y los poda de la tabla',
+    'scheduled',
+    'daily',
+    '04:00:00',
+    ARRAY['sunday'],
+    true,
+    20,
+    3600,
+    1,
+    true,
+    false,
+    ARRAY['meta_ads', 'archive', 'parquet']
+)
+ON CONFLICT (nombre_job) DO UPDATE SET
+    descripcion = EXCLUDED.descripcion,
+    intervalo_ejecucion = EXCLUDED.intervalo_ejecucion,
+    hora_ejecucion = EXCLUDED.hora_ejecucion,
+    dias_semana = EXCLUDED.dias_semana,
+    prioridad = EXCLUDED.prioridad,
+    timeout_segundos = EXCLUDED.timeout_segundos,
+    max_reintentos = EXCLUDED.max_reintentos,
+    notificar_errores = EXCLUDED.notificar_errores,
+    notificar_exito = EXCLUDED.notificar_exito,
+    tags = EXCLUDED.tags;
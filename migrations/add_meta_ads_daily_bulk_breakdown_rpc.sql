@@ -0,0 +1,40 @@
+-- RPC para escribir breakdowns demográficos en meta_ads_anuncios_daily en bloque
+-- Recibe arreglos paralelos (ad_id, fecha, valor) y actualiza con un solo UPDATE
+-- en lugar de un UPDATE por anuncio
+
+CREATE OR REPLACE FUNCTION meta_ads_daily_bulk_update_breakdown(
+    p_id_cuenta TEXT,
+    p_campo TEXT,
+    p_ad_ids TEXT[],
+    p_fechas DATE[],
+    p_valores TEXT[]
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    filas INTEGER;
+BEGIN
+    -- El nombre de columna se interpola; solo se aceptan campos demográficos
+    IF p_campo NOT IN ('age', 'gender', 'region', 'country', 'device_platform') THEN
+        RAISE EXCEPTION 'Campo de breakdown no permitido: %', p_campo;
+    END IF;
+
+    EXECUTE format(
+        'UPDATE public.meta_ads_anuncios_daily d
+            SET %1$I = v.valor
+           FROM unnest($2, $3, $4) AS v(ad_id, fecha, valor)
+          WHERE d.id_cuenta_publicitaria = $1
+            AND d.ad_id = v.ad_id
+            AND d.fecha_reporte = v.fecha',
+        p_campo
+    )
+    USING p_id_cuenta, p_ad_ids, p_fechas, p_valores;
+
+    GET DIAGNOSTICS filas = ROW_COUNT;
+    RETURN filas;
+END;
+$$;
+
+COMMENT ON FUNCTION meta_ads_daily_bulk_update_breakdown(TEXT, TEXT, TEXT[], DATE[], TEXT[])
+    IS 'Actualiza age/gender/region/country/device_platform de muchos anuncios en un solo UPDATE';
@@ -0,0 +1,7 @@
+-- Agregar hash de contenido a meta_ads_anuncios_daily
+-- Permite que la sincronización diaria reescriba solo filas nuevas o con métricas modificadas
+
+ALTER TABLE meta_ads_anuncios_daily
+ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+COMMENT ON COLUMN meta_ads_anuncios_daily.content_hash IS 'SHA-256 de la fila transformada (sin fechas de sincronización ni activo) usado para detectar cambios';
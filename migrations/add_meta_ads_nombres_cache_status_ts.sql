@@ -0,0 +1,13 @@
+-- Vigencia separada del status en la caché de nombres de Meta Ads
+-- Los nombres duran NAMES_CACHE_TTL (varios días) desde actualizado_en; el
+-- status dura NAMES_CACHE_STATUS_TTL desde status_actualizado_en y se
+-- refresca sin volver a pedir el nombre
+
+ALTER TABLE public.meta_ads_nombres_cache
+    ADD COLUMN IF NOT EXISTS status_actualizado_en TIMESTAMP WITH TIME ZONE NULL;
+
+UPDATE public.meta_ads_nombres_cache
+   SET status_actualizado_en = actualizado_en
+ WHERE status_actualizado_en IS NULL;
+
+COMMENT ON COLUMN public.meta_ads_nombres_cache.status_actualizado_en IS 'Última vez que se consultó el status en Graph API (vigencia NAMES_CACHE_STATUS_TTL)';
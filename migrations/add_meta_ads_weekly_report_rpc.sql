@@ -0,0 +1,137 @@
+-- Agregados de los reportes semanales calculados en Postgres
+-- En lugar de descargar meta_ads_anuncios_detalle completo por cuenta y sumar
+-- en Python, meta_ads_reporte_semanal_agregados devuelve para una lista de
+-- cuentas y un rango de fechas los totales por cuenta, por plataforma y por
+-- campaña (las mismas métricas que ReportAggregator)
+
+-- Mensajes de una fila según actions: valor del primer action type presente
+-- en el orden de prioridad (mismo orden que ACTION_MESSAGE_PRIORITY)
+CREATE OR REPLACE FUNCTION meta_ads_mensajes_desde_actions(p_actions JSONB)
+RETURNS BIGINT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT COALESCE((
+        SELECT CASE
+                   WHEN a.elem->>'value' ~ '^-?[0-9]+(\.[0-9]+)?$' THEN trunc((a.elem->>'value')::NUMERIC)::BIGINT
+                   ELSE 0
+               END
+        FROM jsonb_array_elements(
+                 CASE WHEN jsonb_typeof(p_actions) = 'array' THEN p_actions ELSE '[]'::JSONB END
+             ) AS a(elem)
+        JOIN unnest(ARRAY[
+                 'onsite_conversion.messaging_conversation_started',
+                 'onsite_conversion.messaging_conversation_started_7d',
+                 'messaging_conversation_started',
+                 'messaging_conversation_started_7d',
+                 'onsite_conversion.total_messaging_connection',
+                 'total_messaging_connection',
+                 'onsite_conversion.messaging_first_reply',
+                 'messaging_first_reply',
+                 'onsite_conversion.total_messaging'
+             ]) WITH ORDINALITY AS p(action_type, orden)
+          ON p.action_type = a.elem->>'action_type'
+        ORDER BY p.orden
+        LIMIT 1
+    ), 0);
+$$;
+
+-- nivel = 'total' (publisher_platform y nombre_campana en NULL), 'plataforma'
+-- (publisher_platform en minúsculas) o 'campana' (nombre_campana)
+CREATE OR REPLACE FUNCTION meta_ads_reporte_semanal_agregados(
+    p_cuentas TEXT[],
+    p_desde DATE,
+    p_hasta DATE
+)
+RETURNS TABLE (
+    nivel TEXT,
+    id_cuenta_publicitaria TEXT,
+    nombre_nora TEXT,
+    publisher_platform TEXT,
+    nombre_campana TEXT,
+    filas BIGINT,
+    impresiones BIGINT,
+    alcance BIGINT,
+    clicks BIGINT,
+    link_clicks BIGINT,
+    gasto NUMERIC,
+    mensajes BIGINT,
+    mensajes_total BIGINT,
+    mensajes_actions BIGINT,
+    interacciones NUMERIC,
+    video_plays BIGINT,
+    reproducciones_video_3s BIGINT,
+    campanas BIGINT,
+    conjuntos BIGINT,
+    anuncios BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH filas AS (
+        SELECT
+            d.id_cuenta_publicitaria,
+            d.nombre_nora,
+            lower(COALESCE(d.publisher_platform, '')) AS plataforma,
+            d.nombre_campana,
+            NULLIF(d.campana_id, '') AS campana_id,
+            NULLIF(d.conjunto_id, '') AS conjunto_id,
+            NULLIF(d.ad_id, '') AS ad_id,
+            COALESCE(d.impresiones, 0) AS impresiones,
+            COALESCE(d.alcance, 0) AS alcance,
+            COALESCE(d.clicks, 0) AS clicks,
+            COALESCE(NULLIF(d.link_clicks, 0), d.inline_link_clicks, 0) AS link_clicks,
+            COALESCE(d.importe_gastado, 0) AS gasto,
+            COALESCE(d.messaging_conversations_started, 0) AS mensajes,
+            COALESCE(d.mensajes_total, 0) AS mensajes_total,
+            meta_ads_mensajes_desde_actions(d.actions::JSONB) AS mensajes_actions,
+            COALESCE(NULLIF(d.page_engagement, 0), d.post_engagement, 0) AS interacciones,
+            COALESCE(d.video_plays, 0) AS video_plays,
+            COALESCE(d.reproducciones_video_3s, 0) AS reproducciones_video_3s
+        FROM public.meta_ads_anuncios_detalle d
+        WHERE d.id_cuenta_publicitaria = ANY(p_cuentas)
+          -- Overlap con el período, igual que get_ads_data_for_period
+          AND d.fecha_fin >= p_desde
+          AND d.fecha_inicio <= p_hasta
+    )
+    SELECT
+        CASE
+            WHEN GROUPING(f.plataforma) = 0 THEN 'plataforma'
+            WHEN GROUPING(f.nombre_campana) = 0 THEN 'campana'
+            ELSE 'total'
+        END AS nivel,
+        f.id_cuenta_publicitaria,
+        f.nombre_nora,
+        f.plataforma,
+        f.nombre_campana,
+        COUNT(*),
+        SUM(f.impresiones)::BIGINT,
+        SUM(f.alcance)::BIGINT,
+        SUM(f.clicks)::BIGINT,
+        SUM(f.link_clicks)::BIGINT,
+        SUM(f.gasto)::NUMERIC,
+        SUM(f.mensajes)::BIGINT,
+        SUM(f.mensajes_total)::BIGINT,
+        SUM(f.mensajes_actions)::BIGINT,
+        SUM(f.interacciones)::NUMERIC,
+        SUM(f.video_plays)::BIGINT,
+        SUM(f.reproducciones_video_3s)::BIGINT,
+        COUNT(DISTINCT f.campana_id),
+        COUNT(DISTINCT f.conjunto_id),
+        COUNT(DISTINCT f.ad_id)
+    FROM filas f
+    GROUP BY GROUPING SETS (
+        (f.id_cuenta_publicitaria, f.nombre_nora),
+        (f.id_cuenta_publicitaria, f.nombre_nora, f.plataforma),
+        (f.id_cuenta_publicitaria, f.nombre_nora, f.nombre_campana)
+    )
+    -- Orden estable para paginar con range()
+    ORDER BY 2, 3, 1, 4 NULLS FIRST, 5 NULLS FIRST;
+$$;
+
+COMMENT ON FUNCTION meta_ads_reporte_semanal_agregados(TEXT[], DATE, DATE)
+    IS 'Totales de reporte semanal por cuenta, plataforma y campaña desde meta_ads_anuncios_detalle';
+
+-- Filtro por cuenta y rango de fechas del RPC
+CREATE INDEX IF NOT EXISTS idx_meta_ads_anuncios_detalle_cuenta_fechas
+    ON public.meta_ads_anuncios_detalle USING btree (id_cuenta_publicitaria, fecha_inicio, fecha_fin);
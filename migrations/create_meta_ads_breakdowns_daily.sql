@@ -0,0 +1,70 @@
+-- Tabla de hechos de breakdowns demográficos de Meta Ads
+-- Una fila por anuncio, día, breakdown (age, gender, region, device_platform) y bucket
+-- con sus métricas; evita que un anuncio con varios buckets quede con un solo valor
+-- en las columnas de texto de meta_ads_anuncios_daily
+
+CREATE TABLE IF NOT EXISTS public.meta_ads_breakdowns_daily (
+    ad_id TEXT NOT NULL,
+    fecha_reporte DATE NOT NULL,
+    breakdown TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    id_cuenta_publicitaria TEXT NOT NULL,
+    nombre_nora TEXT NULL,
+    campana_id TEXT NULL,
+    impressions INTEGER NOT NULL DEFAULT 0,
+    reach INTEGER NOT NULL DEFAULT 0,
+    clicks INTEGER NOT NULL DEFAULT 0,
+    spend NUMERIC NOT NULL DEFAULT 0,
+    messages INTEGER NOT NULL DEFAULT 0,
+    fecha_sincronizacion TIMESTAMP WITHOUT TIME ZONE NULL DEFAULT now(),
+    CONSTRAINT meta_ads_breakdowns_daily_pkey PRIMARY KEY (ad_id, fecha_reporte, breakdown, bucket),
+    CONSTRAINT meta_ads_breakdowns_daily_breakdown_check
+        CHECK (breakdown IN ('age', 'gender', 'region', 'country', 'device_platform'))
+);
+
+-- Reportes por tenant y rango de fechas
+CREATE INDEX IF NOT EXISTS idx_meta_ads_breakdowns_daily_nora
+    ON public.meta_ads_breakdowns_daily USING btree (nombre_nora, breakdown, fecha_reporte);
+
+-- Reportes por cuenta y rango de fechas
+CREATE INDEX IF NOT EXISTS idx_meta_ads_breakdowns_daily_cuenta
+    ON public.meta_ads_breakdowns_daily USING btree (id_cuenta_publicitaria, breakdown, fecha_reporte);
+
+COMMENT ON TABLE public.meta_ads_breakdowns_daily IS 'Métricas diarias por anuncio y bucket demográfico (se llena con sync demográfico)';
+
+-- Resumen de audiencia: métricas agregadas por bucket en un rango
+CREATE OR REPLACE FUNCTION meta_ads_audiencia_resumen(
+    p_breakdown TEXT,
+    p_desde DATE,
+    p_hasta DATE,
+    p_nombre_nora TEXT DEFAULT NULL,
+    p_id_cuenta TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    bucket TEXT,
+    impressions BIGINT,
+    reach BIGINT,
+    clicks BIGINT,
+    spend NUMERIC,
+    messages BIGINT,
+    anuncios BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        b.bucket,
+        SUM(b.impressions)::BIGINT,
+        SUM(b.reach)::BIGINT,
+        SUM(b.clicks)::BIGINT,
+        SUM(b.spend),
+        SUM(b.messages)::BIGINT,
+        COUNT(DISTINCT b.ad_id)
+    FROM public.meta_ads_breakdowns_daily b
+    WHERE b.breakdown = p_breakdown
+      AND b.fecha_reporte BETWEEN p_desde AND p_hasta
+      AND (p_nombre_nora IS NULL OR b.nombre_nora = p_nombre_nora)
+      AND (p_id_cuenta IS NULL OR b.id_cuenta_publicitaria = p_id_cuenta)
+    GROUP BY b.bucket
+    ORDER BY SUM(b.impressions) DESC;
+$$;
@@ -0,0 +1,95 @@
+-- Rollup diario por cuenta y plataforma de meta_ads_anuncios_daily
+-- Una fila por (cuenta, fecha, plataforma) con gasto, impresiones, alcance,
+-- clicks, mensajes y número de anuncios; los reportes leen esta tabla en
+-- lugar de sumar anuncio por anuncio. La sincronización diaria la refresca
+-- por cuenta con meta_ads_refrescar_rollup_cuenta al terminar cada upsert
+
+CREATE TABLE IF NOT EXISTS public.meta_ads_cuentas_daily_rollup (
+    id_cuenta_publicitaria TEXT NOT NULL,
+    fecha_reporte DATE NOT NULL,
+    publisher_platform TEXT NOT NULL,
+    nombre_nora TEXT NULL,
+    spend NUMERIC NOT NULL DEFAULT 0,
+    impressions BIGINT NOT NULL DEFAULT 0,
+    reach BIGINT NOT NULL DEFAULT 0,
+    clicks BIGINT NOT NULL DEFAULT 0,
+    messages BIGINT NOT NULL DEFAULT 0,
+    ads INTEGER NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    CONSTRAINT meta_ads_cuentas_daily_rollup_pkey
+        PRIMARY KEY (id_cuenta_publicitaria, fecha_reporte, publisher_platform)
+);
+
+-- Reportes de todas las cuentas por rango de fechas
+CREATE INDEX IF NOT EXISTS idx_meta_ads_cuentas_daily_rollup_fecha
+    ON public.meta_ads_cuentas_daily_rollup USING btree (fecha_reporte);
+
+COMMENT ON TABLE public.meta_ads_cuentas_daily_rollup IS 'Totales diarios por cuenta y plataforma (filas activas de meta_ads_anuncios_daily)';
+COMMENT ON COLUMN public.meta_ads_cuentas_daily_rollup.messages IS 'Suma de messaging_conversations_started';
+COMMENT ON COLUMN public.meta_ads_cuentas_daily_rollup.ads IS 'Anuncios activos con datos ese día en la plataforma';
+
+-- Recalcula el rollup de una cuenta en las fechas indicadas
+CREATE OR REPLACE FUNCTION meta_ads_refrescar_rollup_cuenta(
+    p_id_cuenta TEXT,
+    p_fechas DATE[]
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    filas INTEGER;
+BEGIN
+    DELETE FROM public.meta_ads_cuentas_daily_rollup
+     WHERE id_cuenta_publicitaria = p_id_cuenta
+       AND fecha_reporte = ANY(p_fechas);
+
+    INSERT INTO public.meta_ads_cuentas_daily_rollup (
+        id_cuenta_publicitaria, fecha_reporte, publisher_platform, nombre_nora,
+        spend, impressions, reach, clicks, messages, ads, actualizado_en
+    )
+    SELECT
+        d.id_cuenta_publicitaria,
+        d.fecha_reporte,
+        d.publisher_platform,
+        MAX(d.nombre_nora),
+        COALESCE(SUM(d.importe_gastado), 0),
+        COALESCE(SUM(d.impresiones), 0),
+        COALESCE(SUM(d.alcance), 0),
+        COALESCE(SUM(d.clicks), 0),
+        COALESCE(SUM(d.messaging_conversations_started), 0),
+        COUNT(DISTINCT d.ad_id),
+        now()
+    FROM public.meta_ads_anuncios_daily d
+    WHERE d.id_cuenta_publicitaria = p_id_cuenta
+      AND d.fecha_reporte = ANY(p_fechas)
+      AND d.activo IS NOT FALSE
+    GROUP BY d.id_cuenta_publicitaria, d.fecha_reporte, d.publisher_platform;
+
+    GET DIAGNOSTICS filas = ROW_COUNT;
+    RETURN filas;
+END;
+$$;
+
+COMMENT ON FUNCTION meta_ads_refrescar_rollup_cuenta(TEXT, DATE[])
+    IS 'Recalcula meta_ads_cuentas_daily_rollup de una cuenta para las fechas dadas';
+
+-- Carga inicial con el histórico existente
+INSERT INTO public.meta_ads_cuentas_daily_rollup (
+    id_cuenta_publicitaria, fecha_reporte, publisher_platform, nombre_nora,
+    spend, impressions, reach, clicks, messages, ads
+)
+SELECT
+    d.id_cuenta_publicitaria,
+    d.fecha_reporte,
+    d.publisher_platform,
+    MAX(d.nombre_nora),
+    COALESCE(SUM(d.importe_gastado), 0),
+    COALESCE(SUM(d.impresiones), 0),
+    COALESCE(SUM(d.alcance), 0),
+    COALESCE(SUM(d.clicks), 0),
+    COALESCE(SUM(d.messaging_conversations_started), 0),
+    COUNT(DISTINCT d.ad_id)
+FROM public.meta_ads_anuncios_daily d
+WHERE d.activo IS NOT FALSE
+GROUP BY d.id_cuenta_publicitaria, d.fecha_reporte, d.publisher_platform
+ON CONFLICT (id_cuenta_publicitaria, fecha_reporte, publisher_platform) DO NOTHING;
@@ -0,0 +1,27 @@
+-- Archivo mensual de meta_ads_anuncios_daily en Parquet (Supabase Storage)
+-- El job meta_ads.daily.archive exporta los meses cerrados a un Parquet por
+-- (mes, cuenta), registra cada archivo aquí y después borra esas filas de la
+-- tabla caliente. Los lectores consultan esta tabla para saber qué meses
+-- deben leerse desde Storage (ver daily_archive.DailyArchiveReader)
+
+CREATE TABLE IF NOT EXISTS public.meta_ads_daily_archivo (
+    mes DATE NOT NULL,
+    id_cuenta_publicitaria TEXT NOT NULL,
+    ruta TEXT NOT NULL,
+    filas INTEGER NOT NULL DEFAULT 0,
+    bytes BIGINT NOT NULL DEFAULT 0,
+    gasto NUMERIC NOT NULL DEFAULT 0,
+    archivado_en TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    podado_en TIMESTAMP WITH TIME ZONE NULL,
+    CONSTRAINT meta_ads_daily_archivo_pkey PRIMARY KEY (mes, id_cuenta_publicitaria),
+    CONSTRAINT meta_ads_daily_archivo_mes_check CHECK (EXTRACT(DAY FROM mes) = 1)
+);
+
+-- Archivos de una cuenta en un rango de meses
+CREATE INDEX IF NOT EXISTS idx_meta_ads_daily_archivo_cuenta_mes
+    ON public.meta_ads_daily_archivo USING btree (id_cuenta_publicitaria, mes);
+
+COMMENT ON TABLE public.meta_ads_daily_archivo IS 'Meses de meta_ads_anuncios_daily exportados a Parquet por cuenta';
+COMMENT ON COLUMN public.meta_ads_daily_archivo.mes IS 'Primer día del mes archivado';
+COMMENT ON COLUMN public.meta_ads_daily_archivo.ruta IS 'Objeto en el bucket de archivo (mes=YYYY-MM/cuenta=<id>.parquet)';
+COMMENT ON COLUMN public.meta_ads_daily_archivo.podado_en IS 'Momento en que las filas se borraron de meta_ads_anuncios_daily (NULL = siguen en la tabla)';
@@ -0,0 +1,21 @@
+-- Caché persistente de nombres y estados de anuncios, conjuntos y campañas de Meta Ads
+-- Cada corrida arranca con los nombres de la corrida anterior y solo pide a
+-- Graph API los que no están o ya vencieron (ver NAMES_CACHE_TTL)
+
+CREATE TABLE IF NOT EXISTS public.meta_ads_nombres_cache (
+    tipo TEXT NOT NULL,
+    object_id TEXT NOT NULL,
+    nombre TEXT NULL,
+    status TEXT NULL,
+    datos JSONB NOT NULL DEFAULT '{}'::jsonb,
+    actualizado_en TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    CONSTRAINT meta_ads_nombres_cache_pkey PRIMARY KEY (tipo, object_id),
+    CONSTRAINT meta_ads_nombres_cache_tipo_check CHECK (tipo IN ('ad', 'adset', 'campaign'))
+);
+
+-- Limpieza de entradas viejas
+CREATE INDEX IF NOT EXISTS idx_meta_ads_nombres_cache_actualizado
+    ON public.meta_ads_nombres_cache USING btree (actualizado_en);
+
+COMMENT ON TABLE public.meta_ads_nombres_cache IS 'Nombres/estados de objetos de Meta Ads cacheados entre corridas de sincronización';
+COMMENT ON COLUMN public.meta_ads_nombres_cache.datos IS 'Payload completo (para anuncios incluye nombres y estados de campaña y conjunto)';
@@ -0,0 +1,169 @@
+"""
+Benchmark de la sincronización demográfica de Meta Ads.
+
+Modo real: sincroniza una cuenta y muestra tiempos de consulta/escritura por
+breakdown (escribe en meta_ads_anuncios_daily).
+
+Modo simulado: genera una cuenta sintética de N anuncios con latencias fijas
+de Graph API y de Supabase, y compara breakdowns en secuencia con UPDATE por
+anuncio contra breakdowns en paralelo con el RPC en bloque.
+
+Uso:
+    python scripts/benchmark_meta_demographics.py --cuenta act_123 --fecha 2026-01-31
+    python scripts/benchmark_meta_demographics.py --simular 2000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+from dotenv import load_dotenv
+
+root_dir = Path(__file__).parent.parent
+load_dotenv(root_dir / '.env')
+sys.path.insert(0, str(root_dir))
+sys.path.insert(0, str(root_dir / 'src'))
+
+from src.automation_hub.integrations.meta_ads.demographic_sync_service import (  # noqa: E402
+    MetaAdsDemographicSyncService,
+)
+
+BREAKDOWNS = ['age', 'gender', 'region', 'device_platform']
+VALORES = {
+    'age': ['18-24', '25-34', '35-44', '45-54'],
+    'gender': ['female', 'male', 'unknown'],
+    'region': ['Sonora', 'Jalisco', 'Nuevo León'],
+    'device_platform': ['mobile_app', 'desktop'],
+}
+
+
+class _SupabaseSimulado:
+    """Cuenta requests y duerme ``latencia`` segundos por cada una."""
+
+    def __init__(self, latencia: float):
+        self.latencia = latencia
+        self.requests = 0
+
+    def _request(self, data=None):
+        self.requests += 1
+        time.sleep(self.latencia)
+        return type('R', (), {'data': data})()
+
+    # Camino anterior: table().update().eq().eq().eq().execute()
+    def table(self, _name):
+        return self
+
+    def update(self, _values):
+        return self
+
+    def eq(self, *_args):
+        return self
+
+    def upsert(self, _rows, on_conflict=None):
+        return self
+
+    def execute(self):
+        return self._request([{}])
+
+    # Camino nuevo: rpc().execute()
+    def rpc(self, _name, params):
+        filas = len(params['p_ad_ids'])
+        return type('Q', (), {'execute': lambda _s: self._request(filas)})()
+
+
+def _insights_simulados(anuncios: int, breakdown: str):
+    valores = VALORES[breakdown]
+    return [{'ad_id': str(i), breakdown: valores[i % len(valores)]} for i in range(anuncios)]
+
+
+def _update_por_anuncio(service, account_id, breakdown_field, valores):
+    """Réplica del camino anterior: un UPDATE por anuncio."""
+    updated = 0
+    for (ad_id, fecha_iso), valor in valores.items():
+        result = service.supabase.table('meta_ads_anuncios_daily') \
+            .update({breakdown_field: valor}) \
+            .eq('ad_id', ad_id) \
+            .eq('fecha_reporte', fecha_iso) \
+            .eq('id_cuenta_publicitaria', account_id) \
+            .execute()
+        updated += len(result.data)
+    return updated
+
+
+def simular(anuncios: int, latencia_graph: float, latencia_db: float) -> None:
+    paginas = max(1, -(-anuncios // 500))
+
+    def _fetch(_self, _account_id, _fecha, breakdown):
+        insights = _insights_simulados(anuncios, breakdown)
+        for i in range(0, len(insights), 500):
+            time.sleep(latencia_graph)
+            yield insights[i:i + 500]
+
+    fecha = date.today() - timedelta(days=1)
+    print(f"🧪 Cuenta simulada: {anuncios} anuncios, {paginas} páginas por breakdown, "
+          f"Graph {latencia_graph * 1000:.0f} ms/página, Supabase {latencia_db * 1000:.0f} ms/request")
+
+    os.environ.setdefault('META_ACCESS_REDACTED_TOKEN', 'simulado')
+    escenarios = [
+        ('Secuencial + UPDATE por anuncio', 1, True),
+        ('Paralelo + RPC en bloque', len(BREAKDOWNS), False),
+    ]
+
+    for nombre, workers, por_anuncio in escenarios:
+        supabase = _SupabaseSimulado(latencia_db)
+        service = MetaAdsDemographicSyncService(supabase_client=supabase)
+        service.BREAKDOWN_WORKERS = workers
+
+        parches = [patch.object(MetaAdsDemographicSyncService, 'iter_demographic_pages', _fetch)]
+        if por_anuncio:
+            parches.append(patch.object(MetaAdsDemographicSyncService, 'write_breakdown_values', _update_por_anuncio))
+
+        for p in parches:
+            p.start()
+        try:
+            inicio = time.perf_counter()
+            service.sync_account_demographics('act_simulada', fecha, BREAKDOWNS)
+            duracion = time.perf_counter() - inicio
+        finally:
+            for p in parches:
+                p.stop()
+
+        print(f"   {nombre:<34} {duracion:7.2f}s  {supabase.requests:>6} requests a Supabase")
+
+
+def real(cuenta: str, fecha: date) -> None:
+    service = MetaAdsDemographicSyncService()
+    result = service.sync_account_demographics(cuenta, fecha, BREAKDOWNS)
+
+    print(f"\n📊 {cuenta} {fecha}: {result.get('segundos')}s en total")
+    print(f"   {'breakdown':<16} {'insights':>9} {'filas':>7} {'consulta':>9} {'escritura':>10}")
+    for breakdown, datos in result['breakdowns'].items():
+        print(
+            f"   {breakdown:<16} {datos.get('insights', 0):>9} {datos.get('updated', 0):>7} "
+            f"{datos.get('fetch_s', 0):>8.2f}s {datos.get('write_s', 0):>9.2f}s"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de sincronización demográfica Meta Ads")
+    parser.add_argument('--cuenta', help="Cuenta real a sincronizar (act_XXXX)")
+    parser.add_argument('--fecha', type=date.fromisoformat, default=date.today() - timedelta(days=1))
+    parser.add_argument('--simular', type=int, metavar='ANUNCIOS', help="Simular una cuenta con N anuncios")
+    parser.add_argument('--latencia-graph', type=float, default=0.8, help="Segundos por página de Graph API")
+    parser.add_argument('--latencia-db', type=float, default=0.02, help="Segundos por request a Supabase")
+    args = parser.parse_args()
+
+    if args.simular:
+        simular(args.simular, args.latencia_graph, args.latencia_db)
+    elif args.cuenta:
+        real(args.cuenta, args.fecha)
+    else:
+        parser.error("Indica --cuenta o --simular")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
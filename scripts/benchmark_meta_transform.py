@@ -0,0 +1,194 @@
+"""
+Micro-benchmark de la transformación de insights de Meta Ads.
+
+Mide filas por segundo de ``MetaAdsDailySyncService.process_insight_to_daily_row``
+con el parser de actions de una pasada y con el parser anterior (cadenas
+if/elif, una pasada para mensajes y otra para engagement, conservado aquí),
+y de la transformación columnar con ``--columnar``, sobre la misma página de
+insights: una capturada de Graph API (``--archivo``, JSON con ``{"data": [...]}``
+o una lista) o una sintética con la forma de las respuestas reales
+(``level=ad``, ``action_breakdowns=action_type``).
+
+Uso:
+    python scripts/benchmark_meta_transform.py
+    python scripts/benchmark_meta_transform.py --archivo reports/insights_page.json --repeticiones 20
+    python scripts/benchmark_meta_transform.py --filas 20000 --columnar
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir / 'src'))
+
+from automation_hub.integrations.meta_ads import columnar_transform, daily_sync_service  # noqa: E402
+from automation_hub.integrations.meta_ads.action_metrics import MSG_TYPES  # noqa: E402
+from automation_hub.integrations.meta_ads.daily_sync_service import (  # noqa: E402
+    MetaAdsDailySyncService,
+    compute_daily_row_hash,
+)
+
+ACTION_TYPES = [
+    'link_click', 'page_engagement', 'post_engagement', 'video_view', 'post_reaction',
+    'onsite_conversion.post_net_like', 'comment', 'post', 'landing_page_view',
+    'omni_landing_page_view', 'like', 'outbound_click',
+    'onsite_conversion.messaging_conversation_started_7d',
+    'onsite_conversion.messaging_first_reply', 'onsite_conversion.total_messaging_connection',
+    'onsite_conversion.post_save', 'offsite_conversion.fb_pixel_lead', 'lead',
+]
+
+
+def pagina_sintetica(filas: int, semilla: int = 7) -> list:
+    """Página de insights con ~12 actions por fila, como las de cuentas de mensajes."""
+    rnd = random.Random(semilla)
+    pagina = []
+    for i in range(filas):
+        actions = [
+            {'action_type': t, 'value': str(rnd.randint(1, 400))}
+            for t in rnd.sample(ACTION_TYPES, 12)
+        ]
+        pagina.append({
+            'ad_id': str(120200000000000 + i),
+            'campaign_id': '1202000001', 'adset_id': '1202000002',
+            'ad_name': f'Anuncio {i}', 'campaign_name': 'Campaña', 'adset_name': 'Conjunto',
+            'date_start': '2026-01-01', 'date_stop': '2026-01-01',
+            'publisher_platform': rnd.choice(['facebook', 'instagram']),
+            'spend': f'{rnd.uniform(1, 500):.2f}', 'impressions': str(rnd.randint(100, 90000)),
+            'reach': str(rnd.randint(100, 60000)), 'clicks': str(rnd.randint(0, 900)),
+            'inline_link_clicks': str(rnd.randint(0, 500)), 'ctr': '1.23', 'cpc': '0.45',
+            'cpm': '35.2', 'frequency': '1.4', 'unique_clicks': str(rnd.randint(0, 800)),
+            'actions': actions,
+            'video_p25_watched_actions': [{'action_type': 'video_view', 'value': '40'}],
+            'video_thruplay_watched_actions': [{'action_type': 'video_view', 'value': '12'}],
+            'cost_per_action_type': [{'action_type': 'link_click', 'value': '0.31'}],
+        })
+    return pagina
+
+
+def derive_messages_anterior(actions: list) -> int:
+    """Conteo de mensajes tal como estaba antes de parse_actions."""
+    total = 0.0
+    for action in (actions or []):
+        action_type = (action.get("action_type") or "").strip()
+        if action_type in MSG_TYPES:
+            try:
+                total += float(action.get("value", 0))
+            except (TypeError, ValueError):
+                pass
+    return int(total)
+
+
+def extract_metrics_anterior(actions: list) -> dict:
+    """Métricas de engagement tal como estaban antes de parse_actions (if/elif)."""
+    metrics = {
+        'link_clicks': 0, 'page_engagement': 0, 'post_engagement': 0, 'video_views': 0,
+        'post_reactions': 0, 'post_likes': 0, 'post_comments': 0, 'post_shares': 0,
+        'landing_page_views': 0, 'page_likes': 0, 'video_plays_3s': 0, 'video_plays_15s': 0,
+        'outbound_clicks': 0,
+    }
+    for action in (actions or []):
+        action_type = (action.get("action_type") or "").strip()
+        try:
+            value = int(float(action.get("value", 0)))
+        except (TypeError, ValueError):
+            value = 0
+
+        if action_type in ['link_click', 'onsite_conversion.link_click']:
+            metrics['link_clicks'] += value
+        elif action_type in ['page_engagement', 'onsite_conversion.page_engagement']:
+            metrics['page_engagement'] += value
+        elif action_type in ['post_engagement', 'onsite_conversion.post_engagement']:
+            metrics['post_engagement'] += value
+        elif action_type in ['video_view', 'onsite_conversion.video_view']:
+            metrics['video_views'] += value
+        elif action_type in ['post_reaction', 'onsite_conversion.post_reaction', 'onsite_conversion.post_net_like']:
+            metrics['post_reactions'] += value
+            if 'like' in action_type.lower():
+                metrics['post_likes'] += value
+        elif action_type in ['comment', 'onsite_conversion.comment']:
+            metrics['post_comments'] += value
+        elif action_type in ['post', 'onsite_conversion.post']:
+            metrics['post_shares'] += value
+        elif action_type in ['landing_page_view', 'omni_landing_page_view', 'onsite_conversion.landing_page_view']:
+            metrics['landing_page_views'] += value
+        elif action_type in ['like', 'page_like', 'onsite_conversion.page_like']:
+            metrics['page_likes'] += value
+        elif action_type in ['outbound_click', 'onsite_conversion.outbound_click']:
+            metrics['outbound_clicks'] += value
+    return metrics
+
+
+def parse_actions_anterior(actions: list) -> dict:
+    """Mismo resultado que parse_actions recorriendo actions dos veces, como antes."""
+    metrics = extract_metrics_anterior(actions)
+    metrics['messages'] = derive_messages_anterior(actions)
+    metrics['first_replies'] = 0
+    return metrics
+
+
+def cargar_pagina(archivo: Path) -> list:
+    contenido = json.loads(archivo.read_text(encoding='utf-8'))
+    return contenido.get('data', []) if isinstance(contenido, dict) else contenido
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Mejor tiempo de ``repeticiones`` ejecuciones."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de process_insight_to_daily_row")
+    parser.add_argument('--archivo', type=Path, help="Página de insights capturada (JSON)")
+    parser.add_argument('--filas', type=int, default=500, help="Filas de la página sintética")
+    parser.add_argument('--repeticiones', type=int, default=10)
+    parser.add_argument('--columnar', action='store_true', help="Comparar con la transformación columnar")
+    args = parser.parse_args()
+
+    pagina = cargar_pagina(args.archivo) if args.archivo else pagina_sintetica(args.filas)
+    os.environ.setdefault('META_ACCESS_REDACTED_TOKEN', 'benchmark')
+    service = MetaAdsDailySyncService(supabase_client=object())
+    fecha = date(2026, 1, 1)
+
+    def por_fila():
+        for insight in pagina:
+            service.process_insight_to_daily_row(insight, 'act_1', fecha, 'nora')
+
+    def por_fila_anterior():
+        actual = daily_sync_service.parse_actions
+        daily_sync_service.parse_actions = parse_actions_anterior
+        try:
+            por_fila()
+        finally:
+            daily_sync_service.parse_actions = actual
+
+    def columnar():
+        for _ in columnar_transform.transform_insights_columnar(
+            service, pagina, 'act_1', fecha, 'nora', hash_fn=compute_daily_row_hash
+        ):
+            pass
+
+    print(f"📊 {len(pagina)} insights × {args.repeticiones} repeticiones")
+    modos = [('fila (anterior)', por_fila_anterior), ('fila por fila', por_fila)]
+    if args.columnar:
+        backend = 'numpy' if columnar_transform.np is not None else 'array'
+        modos.append((f'columnar ({backend})', columnar))
+
+    for nombre, funcion in modos:
+        funcion()  # Calentamiento
+        mejor = medir(funcion, args.repeticiones)
+        print(f"   {nombre:<18} {mejor * 1000:8.1f} ms por página → {len(pagina) / mejor:,.0f} filas/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
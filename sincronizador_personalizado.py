@@ -74,23 +74,18 @@ try:
     )
 except Exception:
     # Local ROBUST defaults - mirrors meta_ads_sync_all.py logic
+    # Convertidores compartidos con las transformaciones de automation_hub
+    # (definidos una vez, no por fila)
+    from automation_hub.integrations.meta_ads.action_metrics import (
+        safe_float as _to_float,
+        safe_int as _to_int,
+    )
+
     def compute_messaging_metrics(insight, sdk_data, actions, spend):
         """
         🔧 Fallback robusto cuando meta_ads_sync_all.py no está disponible.
         Implementa lógica similar con prioridad: SDK > insight > derivado de actions.
         """
-        def _to_int(x):
-            try:
-                return int(float(x) if x is not None else 0)
-            except Exception:
-                return 0
-        
-        def _to_float(x):
-            try:
-                return float(x) if x is not None else None
-            except Exception:
-                return None
-        
         # Initialize output with defaults
         out = {
             "messaging_conversations_started": 0,
@@ -86,6 +86,7 @@ CREATE TABLE public.meta_ads_anuncios_daily (
   fecha_sincronizacion timestamp without time zone NULL,
   fecha_ultima_actualizacion timestamp without time zone NULL,
   activo boolean NULL DEFAULT true,
+  content_hash text NULL,
   post_engagements numeric NULL DEFAULT 0,
   page_likes numeric NULL DEFAULT 0,
   post_likes numeric NULL DEFAULT 0,
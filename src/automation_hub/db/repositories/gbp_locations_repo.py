@@ -2,7 +2,7 @@
 Repositorio para la tabla gbp_locations.
 """
 import logging
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from supabase import Client
 
 logger = logging.getLogger(__name__)
@@ -62,7 +62,7 @@ def get_last_review_sync_times(supabase: Client) -> Dict[str, str]:
             # Traer un rango
             reviews_response = supabase.table("gbp_reviews").select(
                 "location_name, update_time"
-            ).range(start, start + page_size - 1).execute()
+            ).order("location_name").order("review_id").range(start, start + page_size - 1).execute()
 
             data = reviews_response.data or []
 
@@ -94,3 +94,76 @@ def get_last_review_sync_times(supabase: Client) -> Dict[str, str]:
     except Exception as e:
         logger.error(f"Error obteniendo últimas fechas de sync: {e}")
         return {}  # Retorna dict vacío para sincronizar todo
+
+
+def fetch_location_hashes(supabase: Client) -> Dict[str, dict]:
+    """
+    Obtiene en una sola pasada (paginada) el hash de contenido de cada ubicación.
+    
+    Args:
+        supabase: Cliente de Supabase
+        
+    Returns:
+        Dict donde key=location_name y value={id, nombre_nora, activa, content_hash}
+    """
+    page_size = 1000  # límite típico de PostgREST
+    start = 0
+    existentes: Dict[str, dict] = {}
+
+    try:
+        while True:
+            response = supabase.table("gbp_locations").select(
+                "id, location_name, nombre_nora, activa, content_hash"
+            ).order("id").range(start, start + page_size - 1).execute()
+
+            data = response.data or []
+
+            for row in data:
+                location_name = row.get("location_name")
+                if location_name:
+                    existentes[location_name] = row
+
+            if len(data) < page_size:
+                break
+
+            start += page_size
+
+        logger.info(f"Hashes de ubicaciones obtenidos: {len(existentes)}")
+        return existentes
+
+    except Exception as e:
+        logger.error(f"Error obteniendo hashes de ubicaciones: {e}")
+        raise
+
+
+def bulk_upsert_locations(
+    supabase: Client,
+    nuevas: List[dict],
+    cambiadas: List[dict]
+) -> None:
+    """
+    Escribe en bloque las ubicaciones nuevas y las que cambiaron.
+    
+    Las nuevas se insertan en un solo INSERT; las cambiadas traen su ``id``
+    y se escriben con un solo upsert sobre la PK.
+    
+    Args:
+        supabase: Cliente de Supabase
+        nuevas: Filas sin ``id`` a insertar
+        cambiadas: Filas con ``id`` existente a actualizar
+    """
+    try:
+        if nuevas:
+            supabase.table("gbp_locations").insert(nuevas).execute()
+            logger.info(f"Ubicaciones insertadas: {len(nuevas)}")
+
+        if cambiadas:
+            supabase.table("gbp_locations").upsert(
+                cambiadas,
+                on_conflict="id"
+            ).execute()
+            logger.info(f"Ubicaciones actualizadas: {len(cambiadas)}")
+
+    except Exception as e:
+        logger.error(f"Error escribiendo ubicaciones: {e}")
+        raise
@@ -0,0 +1,68 @@
+"""
+Repositorio para la tabla gbp_publicaciones.
+
+La tabla funciona como ledger de idempotencia: cada (meta_post_id,
+location_name) tiene una sola fila que pasa de 'pendiente' (antes de llamar
+a la API) a 'publicada' o 'error' (después).
+"""
+import logging
+from typing import Dict, List, Tuple
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+IN_FILTER_CHUNK_SIZE = 200
+LEDGER_CONFLICT = "meta_post_id,location_name"
+
+
+def fetch_ledger(supabase: Client, meta_post_ids: List[str]) -> Dict[Tuple[str, str], dict]:
+    """
+    Obtiene en bloque las filas del ledger para los posts de Meta dados.
+    
+    Args:
+        supabase: Cliente de Supabase
+        meta_post_ids: IDs de publicaciones de Meta
+        
+    Returns:
+        Dict donde key=(meta_post_id, location_name) y value=fila del ledger
+    """
+    ledger: Dict[Tuple[str, str], dict] = {}
+    ids = [str(i) for i in meta_post_ids if i]
+
+    try:
+        for i in range(0, len(ids), IN_FILTER_CHUNK_SIZE):
+            response = supabase.table("gbp_publicaciones").select(
+                "id, meta_post_id, location_name, estado, gbp_post_name, summary_hash"
+            ).in_("meta_post_id", ids[i:i + IN_FILTER_CHUNK_SIZE]).execute()
+
+            for row in response.data or []:
+                ledger[(row["meta_post_id"], row["location_name"])] = row
+
+        logger.info(f"Ledger de publicaciones GBP: {len(ledger)} filas para {len(ids)} posts")
+        return ledger
+
+    except Exception as e:
+        logger.error(f"Error obteniendo ledger de publicaciones GBP: {e}")
+        raise
+
+
+def upsert_ledger(supabase: Client, rows: List[dict]) -> None:
+    """
+    Inserta o actualiza filas del ledger usando (meta_post_id, location_name).
+    
+    Args:
+        supabase: Cliente de Supabase
+        rows: Filas con meta_post_id y location_name
+    """
+    if not rows:
+        return
+
+    try:
+        supabase.table("gbp_publicaciones").upsert(
+            rows,
+            on_conflict=LEDGER_CONFLICT
+        ).execute()
+
+    except Exception as e:
+        logger.error(f"Error escribiendo ledger de publicaciones GBP: {e}")
+        raise
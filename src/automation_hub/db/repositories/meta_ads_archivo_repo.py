@@ -0,0 +1,58 @@
+"""
+Repositorio para tabla meta_ads_daily_archivo (meses de meta_ads_anuncios_daily archivados en Parquet).
+"""
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_TABLE = "meta_ads_daily_archivo"
+ARCHIVO_ON_CONFLICT = "mes,id_cuenta_publicitaria"
+
+
+def registrar_archivo(supabase, row: Dict[str, Any]) -> None:
+    """Registra (o reemplaza) el Parquet de un (mes, cuenta)."""
+    supabase.table(ARCHIVO_TABLE).upsert(row, on_conflict=ARCHIVO_ON_CONFLICT).execute()
+
+
+def marcar_podado(supabase, mes: date, id_cuenta_publicitaria: str) -> None:
+    """Marca un (mes, cuenta) como borrado de la tabla caliente."""
+    supabase.table(ARCHIVO_TABLE).update(
+        {"podado_en": datetime.utcnow().isoformat()}
+    ).eq("mes", mes.isoformat()).eq("id_cuenta_publicitaria", id_cuenta_publicitaria).execute()
+
+
+def fetch_archivos(
+    supabase,
+    mes_inicio: date,
+    mes_fin: date,
+    id_cuentas: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Archivos registrados entre dos meses (inclusive).
+
+    Returns:
+        Filas con mes, id_cuenta_publicitaria, ruta, filas y podado_en
+    """
+    filas: List[Dict[str, Any]] = []
+    page_size = 1000
+    start = 0
+
+    while True:
+        query = supabase.table(ARCHIVO_TABLE).select(
+            "mes, id_cuenta_publicitaria, ruta, filas, podado_en"
+        ).gte("mes", mes_inicio.isoformat()).lte("mes", mes_fin.isoformat())
+        if id_cuentas:
+            query = query.in_("id_cuenta_publicitaria", list(id_cuentas))
+
+        data = query.order("mes").order("id_cuenta_publicitaria").range(
+            start, start + page_size - 1
+        ).execute().data or []
+        filas.extend(data)
+
+        if len(data) < page_size:
+            break
+        start += page_size
+
+    return filas
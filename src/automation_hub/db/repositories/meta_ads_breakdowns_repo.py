@@ -0,0 +1,69 @@
+"""
+Repositorio para tabla meta_ads_breakdowns_daily (hechos demográficos por bucket).
+"""
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .meta_ads_daily_repo import BREAKDOWN_FIELDS, DEFAULT_UPSERT_CHUNK_SIZE, upsert_rows_chunked
+
+logger = logging.getLogger(__name__)
+
+BREAKDOWNS_TABLE = "meta_ads_breakdowns_daily"
+BREAKDOWNS_ON_CONFLICT = "ad_id,fecha_reporte,breakdown,bucket"
+AUDIENCIA_RPC = "meta_ads_audiencia_resumen"
+
+
+def upsert_breakdowns_daily(
+    supabase,
+    rows: Sequence[Dict[str, Any]],
+    chunk_size: int = DEFAULT_UPSERT_CHUNK_SIZE
+) -> Tuple[int, List[str]]:
+    """
+    Upsert en lotes a meta_ads_breakdowns_daily (llave ad_id, fecha_reporte, breakdown, bucket).
+
+    Returns:
+        Tuple (filas_escritas, errores)
+    """
+    return upsert_rows_chunked(supabase, BREAKDOWNS_TABLE, rows, BREAKDOWNS_ON_CONFLICT, chunk_size)
+
+
+def fetch_resumen_audiencia(
+    supabase,
+    breakdown: str,
+    fecha_inicio: date,
+    fecha_fin: date,
+    nombre_nora: Optional[str] = None,
+    id_cuenta_publicitaria: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Métricas agregadas por bucket de un breakdown en un rango de fechas.
+
+    La agregación se hace en SQL (RPC meta_ads_audiencia_resumen) sobre los
+    índices de la tabla de hechos. Todavía ningún reporte la consume; queda
+    como punto de lectura para el panel/reportes de audiencia.
+
+    Args:
+        supabase: Cliente de Supabase
+        breakdown: age, gender, region, country o device_platform
+        fecha_inicio: Primer día (inclusive)
+        fecha_fin: Último día (inclusive)
+        nombre_nora: Filtro opcional por tenant
+        id_cuenta_publicitaria: Filtro opcional por cuenta
+
+    Returns:
+        Lista de {bucket, impressions, reach, clicks, spend, messages, anuncios},
+        ordenada por impresiones
+    """
+    if breakdown not in BREAKDOWN_FIELDS:
+        raise ValueError(f"Breakdown no soportado: {breakdown}")
+
+    response = supabase.rpc(AUDIENCIA_RPC, {
+        "p_breakdown": breakdown,
+        "p_desde": fecha_inicio.isoformat(),
+        "p_hasta": fecha_fin.isoformat(),
+        "p_nombre_nora": nombre_nora,
+        "p_id_cuenta": id_cuenta_publicitaria,
+    }).execute()
+
+    return response.data or []
@@ -0,0 +1,235 @@
+"""
+Repositorio para tabla meta_ads_anuncios_daily.
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DAILY_TABLE = "meta_ads_anuncios_daily"
+DAILY_ON_CONFLICT = "ad_id,fecha_reporte,publisher_platform"
+DEFAULT_UPSERT_CHUNK_SIZE = 500
+
+
+def _dedupe_por_llave(rows: Sequence[Dict[str, Any]], on_conflict: str) -> List[Dict[str, Any]]:
+    """
+    Deja una sola fila por llave de conflicto (gana la última).
+
+    PostgREST rechaza el lote completo si dos filas del mismo upsert chocan
+    con la misma llave; fila por fila, la última sobrescribía a las anteriores.
+    """
+    columnas = [c.strip() for c in on_conflict.split(",")]
+    por_llave: Dict[Tuple, Dict[str, Any]] = {}
+    for row in rows:
+        por_llave[tuple(row.get(c) for c in columnas)] = row
+    return list(por_llave.values())
+
+
+def _upsert_bisect(
+    supabase,
+    table: str,
+    rows: List[Dict[str, Any]],
+    on_conflict: str,
+    errores: List[str]
+) -> int:
+    """
+    Upsert de un lote; si falla lo parte a la mitad hasta aislar las filas malas.
+
+    Returns:
+        Cantidad de filas escritas
+    """
+    try:
+        supabase.table(table).upsert(rows, on_conflict=on_conflict).execute()
+        return len(rows)
+    except Exception as e:
+        if len(rows) == 1:
+            row = rows[0]
+            errores.append(f"Error guardando ad {row.get('ad_id')} ({row.get('fecha_reporte')}): {e}")
+            return 0
+
+    mitad = len(rows) // 2
+    return (
+        _upsert_bisect(supabase, table, rows[:mitad], on_conflict, errores)
+        + _upsert_bisect(supabase, table, rows[mitad:], on_conflict, errores)
+    )
+
+
+def upsert_rows_chunked(
+    supabase,
+    table: str,
+    rows: Sequence[Dict[str, Any]],
+    on_conflict: str,
+    chunk_size: int = DEFAULT_UPSERT_CHUNK_SIZE
+) -> Tuple[int, List[str]]:
+    """
+    Upsert en lotes de ``chunk_size`` filas.
+
+    Un lote que falla se divide por bisección, así una fila inválida solo
+    descarta esa fila. Registra latencia y throughput de cada lote.
+
+    Args:
+        supabase: Cliente de Supabase
+        table: Tabla destino
+        rows: Filas a escribir
+        on_conflict: Columnas de la llave única
+        chunk_size: Filas por request
+
+    Returns:
+        Tuple (filas_escritas, errores)
+    """
+    rows = _dedupe_por_llave(rows, on_conflict)
+    if not rows:
+        return 0, []
+
+    chunk_size = max(1, chunk_size)
+    total_chunks = (len(rows) + chunk_size - 1) // chunk_size
+    escritas = 0
+    errores: List[str] = []
+
+    for num, start in enumerate(range(0, len(rows), chunk_size), 1):
+        chunk = rows[start:start + chunk_size]
+        inicio = time.perf_counter()
+        ok = _upsert_bisect(supabase, table, chunk, on_conflict, errores)
+        duracion = time.perf_counter() - inicio
+        escritas += ok
+
+        throughput = ok / duracion if duracion > 0 else float(ok)
+        logger.info(
+            f"💾 {table} lote {num}/{total_chunks}: {ok}/{len(chunk)} filas "
+            f"en {duracion * 1000:.0f} ms ({throughput:.0f} filas/s)"
+        )
+
+    return escritas, errores
+
+
+def upsert_anuncios_daily(
+    supabase,
+    rows: Sequence[Dict[str, Any]],
+    chunk_size: int = DEFAULT_UPSERT_CHUNK_SIZE
+) -> Tuple[int, List[str]]:
+    """
+    Upsert en lotes a meta_ads_anuncios_daily (llave ad_id, fecha_reporte, publisher_platform).
+
+    Returns:
+        Tuple (filas_escritas, errores)
+    """
+    return upsert_rows_chunked(supabase, DAILY_TABLE, rows, DAILY_ON_CONFLICT, chunk_size)
+
+
+def fetch_hashes_daily(
+    supabase,
+    id_cuenta_publicitaria: str,
+    fechas: Sequence[str]
+) -> Dict[Tuple[str, str, str], Dict[str, Any]]:
+    """
+    Carga en una consulta el hash y estado de las filas de una cuenta en varias fechas.
+
+    Returns:
+        Dict (ad_id, fecha_reporte, publisher_platform) -> {content_hash, activo}
+    """
+    existentes: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+    if not fechas:
+        return existentes
+
+    page_size = 1000
+    start = 0
+
+    while True:
+        response = supabase.table(DAILY_TABLE).select(
+            "ad_id, fecha_reporte, publisher_platform, content_hash, activo"
+        ).eq("id_cuenta_publicitaria", id_cuenta_publicitaria).in_(
+            "fecha_reporte", list(fechas)
+        ).order("ad_id").order("fecha_reporte").order("publisher_platform").range(start, start + page_size - 1).execute()
+
+        data = response.data or []
+        for row in data:
+            llave = (str(row.get("ad_id")), str(row.get("fecha_reporte")), row.get("publisher_platform"))
+            existentes[llave] = {"content_hash": row.get("content_hash"), "activo": row.get("activo")}
+
+        if len(data) < page_size:
+            break
+        start += page_size
+
+    return existentes
+
+
+def desactivar_filas_daily(
+    supabase,
+    id_cuenta_publicitaria: str,
+    llaves: Sequence[Tuple[str, str, str]],
+    chunk_size: int = 200
+) -> int:
+    """
+    Marca como inactivas filas puntuales (anuncios que ya no vienen en la API).
+
+    Agrupa por (fecha, plataforma) y actualiza por lotes de ad_id.
+
+    Returns:
+        Cantidad de filas marcadas
+    """
+    por_grupo: Dict[Tuple[str, str], List[str]] = {}
+    for ad_id, fecha, plataforma in llaves:
+        por_grupo.setdefault((fecha, plataforma), []).append(ad_id)
+
+    ahora = datetime.utcnow().isoformat()
+    total = 0
+    for (fecha, plataforma), ad_ids in por_grupo.items():
+        for start in range(0, len(ad_ids), chunk_size):
+            lote = ad_ids[start:start + chunk_size]
+            supabase.table(DAILY_TABLE).update(
+                {"activo": False, "fecha_ultima_actualizacion": ahora}
+            ).eq("id_cuenta_publicitaria", id_cuenta_publicitaria).eq(
+                "fecha_reporte", fecha
+            ).eq("publisher_platform", plataforma).in_("ad_id", lote).execute()
+            total += len(lote)
+
+    return total
+
+
+BREAKDOWN_FIELDS = ("age", "gender", "region", "country", "device_platform")
+BULK_BREAKDOWN_RPC = "meta_ads_daily_bulk_update_breakdown"
+DEFAULT_BREAKDOWN_CHUNK_SIZE = 5000
+
+
+def actualizar_breakdown_bulk(
+    supabase,
+    id_cuenta_publicitaria: str,
+    campo: str,
+    valores: Sequence[Tuple[str, str, str]],
+    chunk_size: int = DEFAULT_BREAKDOWN_CHUNK_SIZE
+) -> int:
+    """
+    Actualiza un campo demográfico de muchas filas con un solo UPDATE por lote.
+
+    Llama al RPC meta_ads_daily_bulk_update_breakdown con arreglos paralelos
+    (ad_id, fecha, valor); todas las plataformas del anuncio en esa fecha
+    reciben el valor.
+
+    Args:
+        supabase: Cliente de Supabase
+        id_cuenta_publicitaria: Cuenta dueña de las filas
+        campo: age, gender, region, country o device_platform
+        valores: Tuplas (ad_id, fecha_reporte ISO, valor)
+        chunk_size: Tuplas por llamada al RPC
+
+    Returns:
+        Cantidad de filas actualizadas
+    """
+    if campo not in BREAKDOWN_FIELDS:
+        raise ValueError(f"Campo de breakdown no permitido: {campo}")
+
+    actualizadas = 0
+    for start in range(0, len(valores), max(1, chunk_size)):
+        lote = valores[start:start + chunk_size]
+        response = supabase.rpc(BULK_BREAKDOWN_RPC, {
+            "p_id_cuenta": id_cuenta_publicitaria,
+            "p_campo": campo,
+            "p_ad_ids": [ad_id for ad_id, _, _ in lote],
+            "p_fechas": [fecha for _, fecha, _ in lote],
+            "p_valores": [valor for _, _, valor in lote],
+        }).execute()
+        actualizadas += int(response.data or 0)
+
+    return actualizadas
@@ -0,0 +1,56 @@
+"""
+Repositorio para tabla meta_ads_nombres_cache (caché persistente de nombres de Meta Ads).
+"""
+import logging
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .meta_ads_daily_repo import DEFAULT_UPSERT_CHUNK_SIZE, upsert_rows_chunked
+
+logger = logging.getLogger(__name__)
+
+NOMBRES_TABLE = "meta_ads_nombres_cache"
+NOMBRES_ON_CONFLICT = "tipo,object_id"
+
+
+def fetch_nombres_cache(
+    supabase,
+    tipo: str,
+    object_ids: Sequence[str],
+    chunk_size: int = 200
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Carga entradas de la caché por tipo e IDs.
+
+    Returns:
+        Dict object_id -> {datos, actualizado_en, status_actualizado_en}
+    """
+    encontrados: Dict[str, Dict[str, Any]] = {}
+    ids = list(dict.fromkeys(str(i) for i in object_ids if i))
+
+    for i in range(0, len(ids), chunk_size):
+        response = supabase.table(NOMBRES_TABLE).select(
+            "object_id, datos, actualizado_en, status_actualizado_en"
+        ).eq("tipo", tipo).in_("object_id", ids[i:i + chunk_size]).execute()
+
+        for row in response.data or []:
+            encontrados[str(row["object_id"])] = {
+                "datos": row.get("datos") or {},
+                "actualizado_en": row.get("actualizado_en"),
+                "status_actualizado_en": row.get("status_actualizado_en"),
+            }
+
+    return encontrados
+
+
+def upsert_nombres_cache(
+    supabase,
+    rows: Sequence[Dict[str, Any]],
+    chunk_size: int = DEFAULT_UPSERT_CHUNK_SIZE
+) -> Tuple[int, List[str]]:
+    """
+    Upsert en lotes a meta_ads_nombres_cache (llave tipo, object_id).
+
+    Returns:
+        Tuple (filas_escritas, errores)
+    """
+    return upsert_rows_chunked(supabase, NOMBRES_TABLE, rows, NOMBRES_ON_CONFLICT, chunk_size)
@@ -0,0 +1,57 @@
+"""
+Repositorio para los agregados de reportes semanales (RPC sobre meta_ads_anuncios_detalle).
+"""
+import logging
+from datetime import date
+from typing import Any, Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+AGREGADOS_SEMANALES_RPC = "meta_ads_reporte_semanal_agregados"
+
+
+def fetch_agregados_semanales(
+    supabase,
+    id_cuentas: Sequence[str],
+    fecha_inicio: date,
+    fecha_fin: date,
+    chunk_size: int = 200
+) -> List[Dict[str, Any]]:
+    """
+    Totales de reporte semanal de varias cuentas calculados en Postgres.
+
+    Una llamada al RPC por lote de cuentas (paginada); cada fila trae el
+    nivel ('total', 'plataforma' o 'campana') y las métricas sumadas.
+
+    Args:
+        supabase: Cliente de Supabase
+        id_cuentas: Cuentas publicitarias
+        fecha_inicio: Primer día del período (inclusive)
+        fecha_fin: Último día del período (inclusive)
+        chunk_size: Cuentas por llamada
+
+    Returns:
+        Filas con nivel, id_cuenta_publicitaria, nombre_nora, publisher_platform,
+        nombre_campana y métricas (ver migrations/add_meta_ads_weekly_report_rpc.sql)
+    """
+    cuentas = list(dict.fromkeys(c for c in id_cuentas if c))
+    filas: List[Dict[str, Any]] = []
+    page_size = 1000
+
+    for i in range(0, len(cuentas), chunk_size):
+        lote = cuentas[i:i + chunk_size]
+        start = 0
+        while True:
+            data = supabase.rpc(AGREGADOS_SEMANALES_RPC, {
+                "p_cuentas": lote,
+                "p_desde": fecha_inicio.isoformat(),
+                "p_hasta": fecha_fin.isoformat(),
+            }).range(start, start + page_size - 1).execute().data or []
+            filas.extend(data)
+
+            if len(data) < page_size:
+                break
+            start += page_size
+
+    logger.info(f"Agregados semanales: {len(filas)} filas para {len(cuentas)} cuentas")
+    return filas
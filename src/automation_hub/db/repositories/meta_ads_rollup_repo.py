@@ -0,0 +1,114 @@
+"""
+Repositorio para tabla meta_ads_cuentas_daily_rollup (totales diarios por cuenta y plataforma).
+"""
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLE = "meta_ads_cuentas_daily_rollup"
+REFRESCAR_ROLLUP_RPC = "meta_ads_refrescar_rollup_cuenta"
+
+
+def refrescar_rollup_cuenta(supabase, id_cuenta_publicitaria: str, fechas: Sequence[str]) -> int:
+    """
+    Recalcula en la base el rollup de una cuenta para las fechas indicadas.
+
+    Args:
+        supabase: Cliente de Supabase
+        id_cuenta_publicitaria: Cuenta sincronizada
+        fechas: Fechas ISO a recalcular
+
+    Returns:
+        Filas de rollup escritas (una por fecha y plataforma)
+    """
+    if not fechas:
+        return 0
+
+    response = supabase.rpc(REFRESCAR_ROLLUP_RPC, {
+        "p_id_cuenta": id_cuenta_publicitaria,
+        "p_fechas": sorted(set(fechas)),
+    }).execute()
+    return int(response.data or 0)
+
+
+def fetch_rollup(
+    supabase,
+    fecha_inicio: date,
+    fecha_fin: Optional[date] = None,
+    id_cuentas: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Lee el rollup de un rango de fechas (paginado).
+
+    Args:
+        fecha_inicio: Primer día (inclusive)
+        fecha_fin: Último día (inclusive); por defecto igual a fecha_inicio
+        id_cuentas: Limitar a estas cuentas (opcional)
+
+    Returns:
+        Filas con id_cuenta_publicitaria, fecha_reporte, publisher_platform,
+        spend, impressions, reach, clicks, messages y ads
+    """
+    fecha_fin = fecha_fin or fecha_inicio
+    filas: List[Dict[str, Any]] = []
+    page_size = 1000
+    start = 0
+
+    while True:
+        query = supabase.table(ROLLUP_TABLE).select(
+            "id_cuenta_publicitaria, fecha_reporte, publisher_platform, nombre_nora, "
+            "spend, impressions, reach, clicks, messages, ads"
+        ).gte("fecha_reporte", fecha_inicio.isoformat()).lte("fecha_reporte", fecha_fin.isoformat())
+        if id_cuentas:
+            query = query.in_("id_cuenta_publicitaria", list(id_cuentas))
+
+        data = query.order("id_cuenta_publicitaria").order("fecha_reporte").order(
+            "publisher_platform"
+        ).range(start, start + page_size - 1).execute().data or []
+        filas.extend(data)
+
+        if len(data) < page_size:
+            break
+        start += page_size
+
+    return filas
+
+
+def fetch_conteo_anuncios_por_cuenta(supabase, fecha_reporte: date) -> Dict[str, int]:
+    """
+    Tamaño de cada cuenta en una fecha: suma de anuncios por plataforma del rollup,
+    que equivale a las filas activas guardadas en meta_ads_anuncios_daily.
+
+    Args:
+        supabase: Cliente de Supabase
+        fecha_reporte: Fecha a consultar
+
+    Returns:
+        Dict id_cuenta_publicitaria -> filas
+    """
+    conteo: Dict[str, int] = {}
+    page_size = 1000
+    start = 0
+
+    try:
+        while True:
+            data = supabase.table(ROLLUP_TABLE).select(
+                "id_cuenta_publicitaria, publisher_platform, ads"
+            ).eq("fecha_reporte", fecha_reporte.isoformat()).order(
+                "id_cuenta_publicitaria"
+            ).order("publisher_platform").range(start, start + page_size - 1).execute().data or []
+
+            for row in data:
+                cuenta = row.get("id_cuenta_publicitaria")
+                if cuenta:
+                    conteo[cuenta] = conteo.get(cuenta, 0) + int(row.get("ads") or 0)
+
+            if len(data) < page_size:
+                break
+            start += page_size
+    except Exception as e:
+        logger.warning(f"No se pudo obtener el conteo de anuncios por cuenta: {e}")
+
+    return conteo
@@ -0,0 +1,202 @@
+"""
+Resolución de cuenta GBP (accounts/XXXX) para cada ubicación (locations/YYYY).
+
+Mantiene en memoria un índice ubicación→cuenta con TTL, compartido por todo el
+proceso. Se llena primero desde ``gbp_locations.account_name`` (una consulta) y,
+si una ubicación no aparece, desde la API una sola vez por ventana de TTL.
+
+Lo que se carga desde la API (cuentas y sus ubicaciones) se guarda por
+credencial: las cuentas que ve el token de un tenant nunca se usan para
+resolver las ubicaciones de otro.
+"""
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from automation_hub.integrations.gbp.locations_v1 import list_accounts, list_locations_all_accounts
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 3600
+
+
+def _location_key(location_name: str) -> str:
+    """Normaliza accounts/X/locations/Y o locations/Y a locations/Y."""
+    if "/locations/" in location_name:
+        return "locations/" + location_name.split("/locations/")[-1]
+    return location_name
+
+
+def _credential_key(auth_header: dict) -> str:
+    """Huella del header de autorización (no se guarda el token en claro)."""
+    token = (auth_header or {}).get("Authorization", "")
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+class _ApiIndex:
+    """Cuentas y ubicaciones visibles para una credencial."""
+
+    __slots__ = ("accounts", "location_to_account", "loaded_at")
+
+    def __init__(self):
+        self.accounts: List[str] = []
+        self.location_to_account: Dict[str, str] = {}
+        self.loaded_at: Optional[float] = None
+
+
+class GBPAccountResolver:
+    """Índice ubicación→cuenta de Google Business Profile con TTL."""
+
+    def __init__(self, supabase=None, ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self._supabase = supabase
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._location_to_account: Dict[str, str] = {}
+        self._db_loaded_at: Optional[float] = None
+        self._api: Dict[str, _ApiIndex] = {}
+
+    def _expired(self, loaded_at: Optional[float]) -> bool:
+        return loaded_at is None or (time.monotonic() - loaded_at) > self.ttl_seconds
+
+    def invalidate(self) -> None:
+        """Descarta el índice; la siguiente consulta lo recarga."""
+        with self._lock:
+            self._location_to_account.clear()
+            self._db_loaded_at = None
+            self._api.clear()
+
+    def _load_from_db(self) -> None:
+        """Carga location_name→account_name desde gbp_locations en una consulta paginada."""
+        if self._supabase is None:
+            from automation_hub.db.supabase_client import create_client_from_env
+            self._supabase = create_client_from_env()
+
+        page_size = 1000
+        start = 0
+        cargadas = 0
+
+        while True:
+            response = self._supabase.table("gbp_locations").select(
+                "location_name, account_name"
+            ).order("location_name").range(start, start + page_size - 1).execute()
+
+            data = response.data or []
+            for row in data:
+                location_name = row.get("location_name")
+                account_name = row.get("account_name")
+                if location_name and account_name and account_name.startswith("accounts/"):
+                    self._location_to_account[_location_key(location_name)] = account_name
+                    cargadas += 1
+
+            if len(data) < page_size:
+                break
+            start += page_size
+
+        self._db_loaded_at = time.monotonic()
+        logger.info(f"Índice de cuentas GBP cargado desde BD: {cargadas} ubicaciones")
+
+    def _api_index(self, auth_header: dict) -> _ApiIndex:
+        """
+        Índice de la credencial, cargado desde la API si venció.
+
+        Si la API falla el intento también cuenta para el TTL, así una cuenta
+        caída no se vuelve a consultar en cada búsqueda.
+        """
+        indice = self._api.setdefault(_credential_key(auth_header), _ApiIndex())
+        if not self._expired(indice.loaded_at):
+            return indice
+
+        indice.loaded_at = time.monotonic()
+        try:
+            cuentas = list_accounts(auth_header)
+            ubicaciones_por_cuenta = list_locations_all_accounts(auth_header, cuentas)
+        except Exception as e:
+            logger.warning(f"No se pudieron cargar las cuentas GBP desde la API: {e}")
+            return indice
+
+        indice.accounts = [c["name"] for c in cuentas if c.get("name")]
+        indice.location_to_account = {
+            _location_key(ubicacion["name"]): account_name
+            for account_name, ubicaciones in ubicaciones_por_cuenta.items()
+            for ubicacion in ubicaciones
+            if ubicacion.get("name")
+        }
+        logger.info(
+            f"Índice de cuentas GBP cargado desde API: {len(indice.accounts)} cuentas, "
+            f"{len(indice.location_to_account)} ubicaciones"
+        )
+        return indice
+
+    def get_account_for_location(self, location_name: str, auth_header: dict) -> str:
+        """
+        Obtiene la cuenta dueña de una ubicación.
+
+        Args:
+            location_name: Ubicación en formato locations/YYYY o accounts/XXXX/locations/YYYY
+            auth_header: Header de autorización (solo se usa si hay que consultar la API)
+
+        Returns:
+            Account ID en formato accounts/XXXX
+
+        Raises:
+            ValueError: Si la ubicación no pertenece a ninguna cuenta conocida
+                y la credencial ve más de una cuenta (no se adivina)
+        """
+        if location_name.startswith("accounts/"):
+            return location_name.split("/locations/")[0]
+
+        key = _location_key(location_name)
+
+        with self._lock:
+            if self._expired(self._db_loaded_at):
+                self._location_to_account.clear()
+                try:
+                    self._load_from_db()
+                except Exception as e:
+                    logger.warning(f"No se pudo cargar el índice de cuentas desde BD: {e}")
+                    self._db_loaded_at = time.monotonic()
+
+            account_name = self._location_to_account.get(key)
+            if account_name:
+                return account_name
+
+            indice = self._api_index(auth_header)
+            account_name = indice.location_to_account.get(key)
+            if account_name:
+                return account_name
+
+            # Solo las cuentas de esta credencial: con una sola, la ubicación es suya
+            if len(indice.accounts) == 1:
+                return indice.accounts[0]
+
+        raise ValueError(f"No se encontró la cuenta GBP de la ubicación {location_name}")
+
+    def get_default_account(self, auth_header: dict) -> str:
+        """
+        Obtiene la primera cuenta disponible (compatibilidad con get_account_id).
+
+        Returns:
+            Account ID en formato accounts/XXXX
+        """
+        with self._lock:
+            indice = self._api_index(auth_header)
+            if not indice.accounts:
+                raise ValueError("No se encontraron cuentas GBP")
+
+            return indice.accounts[0]
+
+
+_resolver: Optional[GBPAccountResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_account_resolver() -> GBPAccountResolver:
+    """Devuelve el resolver compartido por el proceso."""
+    global _resolver
+
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = GBPAccountResolver()
+        return _resolver
@@ -0,0 +1,166 @@
+"""
+Servicio único de sincronización de ubicaciones de Google Business Profile.
+
+Compara un hash de contenido de cada ubicación contra el guardado en
+``gbp_locations`` y solo escribe las filas nuevas o que cambiaron.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from automation_hub.integrations.gbp.locations_v1 import list_accounts, list_locations_all_accounts
+from automation_hub.db.repositories.gbp_locations_repo import fetch_location_hashes, bulk_upsert_locations
+
+logger = logging.getLogger(__name__)
+
+
+def compute_location_hash(account_name: str, ubicacion: dict) -> str:
+    """
+    Calcula un hash estable del contenido relevante de una ubicación.
+
+    Args:
+        account_name: Cuenta a la que pertenece la ubicación
+        ubicacion: Ubicación en formato raw de la API
+
+    Returns:
+        Hash SHA-256 en hexadecimal
+    """
+    contenido = json.dumps(
+        {"account_name": account_name, "raw": ubicacion},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def build_location_row(account_name: str, ubicacion: dict) -> dict:
+    """
+    Mapea una ubicación de la API al schema de la tabla gbp_locations.
+
+    Args:
+        account_name: Cuenta a la que pertenece la ubicación
+        ubicacion: Ubicación en formato raw de la API
+
+    Returns:
+        Diccionario con las columnas a escribir (sin id ni nombre_nora)
+    """
+    phone_numbers = ubicacion.get("phoneNumbers", {})
+    primary_phone = phone_numbers.get("primaryPhone", "") if isinstance(phone_numbers, dict) else ""
+
+    return {
+        "location_name": ubicacion.get("name"),
+        "title": ubicacion.get("title", "Sin título"),
+        "account_name": account_name,
+        "phone": primary_phone,
+        "website": ubicacion.get("websiteUri"),
+        "address": ubicacion.get("storefrontAddress", {}),
+        "raw": ubicacion,  # Guardar todo el JSON original
+        "activa": True,
+        "content_hash": compute_location_hash(account_name, ubicacion)
+    }
+
+
+def diff_locations(
+    ubicaciones_por_cuenta: Dict[str, List[Dict]],
+    existentes: Dict[str, dict],
+    nombre_nora: Optional[str] = None
+) -> Tuple[List[dict], List[dict], int]:
+    """
+    Separa las ubicaciones de la API en nuevas, cambiadas y sin cambios.
+
+    Una ubicación existente cuenta como cambiada si su hash difiere o si está
+    marcada como inactiva (la API la sigue listando, así que se reactiva).
+
+    Args:
+        ubicaciones_por_cuenta: Resultado de list_locations_all_accounts
+        existentes: Resultado de fetch_location_hashes
+        nombre_nora: Tenant para ubicaciones nuevas (default: title de la ubicación)
+
+    Returns:
+        Tuple (filas_nuevas, filas_cambiadas, total_sin_cambios)
+    """
+    ahora = datetime.utcnow().isoformat()
+    nuevas: List[dict] = []
+    cambiadas: List[dict] = []
+    sin_cambios = 0
+    vistas = set()
+
+    for account_name, ubicaciones in ubicaciones_por_cuenta.items():
+        for ubicacion in ubicaciones:
+            location_name = ubicacion.get("name")
+            if not location_name or location_name in vistas:
+                continue
+            vistas.add(location_name)
+
+            row = build_location_row(account_name, ubicacion)
+            actual = existentes.get(location_name)
+
+            if actual is None:
+                row["nombre_nora"] = nombre_nora or row["title"]
+                row["created_at"] = ahora
+                row["synced_at"] = ahora
+                row["updated_at"] = ahora
+                nuevas.append(row)
+            elif actual.get("content_hash") != row["content_hash"] or actual.get("activa") is False:
+                row["id"] = actual["id"]
+                row["nombre_nora"] = actual.get("nombre_nora") or nombre_nora or row["title"]
+                row["synced_at"] = ahora
+                row["updated_at"] = ahora
+                cambiadas.append(row)
+            else:
+                sin_cambios += 1
+
+    return nuevas, cambiadas, sin_cambios
+
+
+def sincronizar_ubicaciones(
+    supabase,
+    auth_header: dict,
+    nombre_nora: Optional[str] = None
+) -> dict:
+    """
+    Sincroniza todas las ubicaciones de GBP a la base de datos.
+
+    1. Lista cuentas y, en paralelo por cuenta, sus ubicaciones
+    2. Carga los hashes existentes en una sola consulta
+    3. Escribe en bloque solo las ubicaciones nuevas o modificadas
+
+    Args:
+        supabase: Cliente de Supabase
+        auth_header: Dict con header Authorization
+        nombre_nora: Tenant para ubicaciones nuevas (default: title de la ubicación)
+
+    Returns:
+        Dict con estadísticas (total, nuevas, actualizadas, sin_cambios) y
+        ``ubicaciones_nuevas`` con las filas insertadas para notificar
+    """
+    logger.info("🔄 Iniciando sincronización de ubicaciones GBP...")
+
+    cuentas = list_accounts(auth_header)
+    ubicaciones_por_cuenta = list_locations_all_accounts(auth_header, cuentas)
+    existentes = fetch_location_hashes(supabase)
+
+    nuevas, cambiadas, sin_cambios = diff_locations(ubicaciones_por_cuenta, existentes, nombre_nora)
+    bulk_upsert_locations(supabase, nuevas, cambiadas)
+
+    total = len(nuevas) + len(cambiadas) + sin_cambios
+
+    for row in nuevas:
+        logger.info(f"  ✨ Nueva: {row['title']}")
+
+    logger.info("✅ Sincronización completada:")
+    logger.info(f"  📊 Total procesadas: {total}")
+    logger.info(f"  ✨ Nuevas: {len(nuevas)}")
+    logger.info(f"  🔄 Actualizadas: {len(cambiadas)}")
+    logger.info(f"  ⏸️ Sin cambios: {sin_cambios}")
+
+    return {
+        "total": total,
+        "nuevas": len(nuevas),
+        "actualizadas": len(cambiadas),
+        "sin_cambios": sin_cambios,
+        "ubicaciones_nuevas": nuevas
+    }
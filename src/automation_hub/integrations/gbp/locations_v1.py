@@ -0,0 +1,136 @@
+"""
+Cliente para Google Business Profile Account Management y Business Information API v1.
+"""
+import logging
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ACCOUNTS_URL = "https://mybusinessaccountmanagement.googleapis.com/v1/accounts"
+LOCATIONS_URL = "https://mybusinessbusinessinformation.googleapis.com/v1/{account_name}/locations"
+
+# Campos solicitados a la API (unión de lo que usan los jobs de ubicaciones)
+LOCATIONS_READ_MASK = (
+    "name,title,storefrontAddress,phoneNumbers,websiteUri,regularHours,"
+    "categories,serviceArea,profile,latlng,openInfo,metadata"
+)
+LOCATIONS_PAGE_SIZE = 100  # Máximo permitido por la API
+MAX_ACCOUNT_WORKERS = 4
+
+
+def list_accounts(auth_header: dict) -> List[Dict]:
+    """
+    Lista todas las cuentas de Google Business Profile (con paginación).
+
+    Args:
+        auth_header: Dict con header Authorization
+
+    Returns:
+        Lista de cuentas en formato raw de la API
+    """
+    params: Dict[str, str] = {}
+    accounts: List[Dict] = []
+
+    try:
+        while True:
+            response = requests.get(ACCOUNTS_URL, headers=auth_header, params=params, timeout=30)
+            response.raise_for_status()
+            data = response.json()
+
+            accounts.extend(data.get("accounts", []))
+
+            next_token = data.get("nextPageToken")
+            if not next_token:
+                break
+            params["pageToken"] = next_token
+
+        logger.info(f"📋 Cuentas GBP encontradas: {len(accounts)}")
+        return accounts
+
+    except Exception as e:
+        logger.error(f"❌ Error listando cuentas GBP: {e}")
+        raise
+
+
+def list_locations(account_name: str, auth_header: dict) -> List[Dict]:
+    """
+    Lista todas las ubicaciones de una cuenta usando readMask y paginación.
+
+    Args:
+        account_name: Nombre de la cuenta (formato: accounts/XXXX)
+        auth_header: Dict con header Authorization
+
+    Returns:
+        Lista de ubicaciones en formato raw de la API
+    """
+    url = LOCATIONS_URL.format(account_name=account_name)
+    params = {
+        "readMask": LOCATIONS_READ_MASK,
+        "pageSize": LOCATIONS_PAGE_SIZE
+    }
+    locations: List[Dict] = []
+
+    while True:
+        response = requests.get(url, headers=auth_header, params=params, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+
+        locations.extend(data.get("locations", []))
+
+        next_token = data.get("nextPageToken")
+        if not next_token:
+            break
+        params["pageToken"] = next_token
+
+    return locations
+
+
+def list_locations_all_accounts(
+    auth_header: dict,
+    accounts: Optional[List[Dict]] = None,
+    max_workers: int = MAX_ACCOUNT_WORKERS
+) -> Dict[str, List[Dict]]:
+    """
+    Lista las ubicaciones de todas las cuentas en paralelo (un worker por cuenta).
+
+    Una cuenta que falla se registra en el log y se omite; no detiene al resto.
+
+    Args:
+        auth_header: Dict con header Authorization
+        accounts: Cuentas ya obtenidas (si es None, se consultan a la API)
+        max_workers: Máximo de cuentas consultadas simultáneamente
+
+    Returns:
+        Dict donde key=account_name y value=lista de ubicaciones de la cuenta
+    """
+    if accounts is None:
+        accounts = list_accounts(auth_header)
+
+    account_names = []
+    for cuenta in accounts:
+        account_name = cuenta.get("name")
+        if not account_name:
+            logger.warning(f"⚠️ Cuenta sin nombre, omitiendo: {cuenta}")
+            continue
+        account_names.append(account_name)
+
+    if not account_names:
+        return {}
+
+    resultado: Dict[str, List[Dict]] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(account_names)))) as executor:
+        futures = {
+            name: executor.submit(list_locations, name, auth_header)
+            for name in account_names
+        }
+        for account_name, future in futures.items():
+            try:
+                resultado[account_name] = future.result()
+                logger.info(f"📍 {account_name}: {len(resultado[account_name])} ubicaciones")
+            except Exception as e:
+                logger.error(f"❌ Error listando ubicaciones para {account_name}: {e}")
+
+    return resultado
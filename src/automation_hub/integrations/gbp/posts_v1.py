@@ -1,17 +1,18 @@
 """
 Cliente para Google Business Profile Local Posts API v1.
 """
+import hashlib
 import logging
 import requests
 from typing import Optional
 
+from automation_hub.integrations.gbp.account_resolver import get_account_resolver
+
 logger = logging.getLogger(__name__)
 
-# Variable global para cache del account ID
-_cached_account_id = None
 
 def gbp_media_create_video(
-    account_id: str,
+    account_id: Optional[str],
     location_id: str, 
     video_url: str,
     auth_header: dict
@@ -20,7 +21,8 @@ def gbp_media_create_video(
     Sube un video a la galería de Google Business Profile usando Media.Create.
     
     Args:
-        account_id: ID de la cuenta (formato: accounts/XXXXX)
+        account_id: ID de la cuenta (formato: accounts/XXXXX); si es None se resuelve
+            con el índice ubicación→cuenta compartido
         location_id: ID de la ubicación (formato: locations/YYYY) 
         video_url: URL del video a subir
         auth_header: Header de autorización
@@ -33,10 +35,11 @@ def gbp_media_create_video(
     """
     # Construir el nombre completo de la ubicación si es necesario
     if not location_id.startswith("accounts/"):
-        if location_id.startswith("locations/"):
-            full_location = f"{account_id}/{location_id}"
-        else:
-            full_location = f"{account_id}/locations/{location_id}"
+        if not location_id.startswith("locations/"):
+            location_id = f"locations/{location_id}"
+        if not account_id:
+            account_id = get_account_resolver().get_account_for_location(location_id, auth_header)
+        full_location = f"{account_id}/{location_id}"
     else:
         full_location = location_id
     
@@ -76,6 +79,46 @@ def gbp_media_create_video(
         logger.error(f"❌ Error subiendo video a GBP Media: {e}")
         raise
 
+def gbp_media_get(media_name: str, auth_header: dict) -> dict:
+    """
+    Obtiene un media item de GBP (formato: accounts/*/locations/*/media/*).
+    
+    Args:
+        media_name: Nombre completo del media item
+        auth_header: Header de autorización
+        
+    Returns:
+        Media item en formato raw de la API
+    """
+    url = f"https://mybusiness.googleapis.com/v4/{media_name}"
+    response = requests.get(url, headers=auth_header, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def is_media_processed(media: dict) -> bool:
+    """
+    Indica si GBP ya terminó de procesar un media item.
+    
+    La API v4 no expone un estado explícito: el item está listo cuando
+    ``googleUrl`` (y para videos ``thumbnailUrl``) ya vienen poblados.
+    """
+    if not isinstance(media, dict) or not media.get("googleUrl"):
+        return False
+    if media.get("mediaFormat") == "VIDEO":
+        return bool(media.get("thumbnailUrl"))
+    return True
+
+def compute_summary_hash(summary: str) -> str:
+    """
+    Hash del texto tal como se envía a GBP (recortado a 1500 caracteres).
+    
+    Permite reconocer un localPost ya creado comparando su ``summary``.
+    """
+    texto = (summary or "")[:1500].strip()
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
 def detect_video_content(video_local: Optional[str] = None, imagen_local: Optional[str] = None, imagen_url: Optional[str] = None) -> tuple[bool, str]:
     """
     Detecta si el contenido es video y retorna la URL a usar.
@@ -122,33 +165,19 @@ def get_account_id(auth_header: dict) -> str:
     """
     Obtiene el account ID de Google Business Profile.
     
+    DEPRECATED: Solo devuelve la primera cuenta; para una ubicación concreta
+    usar get_account_resolver().get_account_for_location().
+    
     Args:
         auth_header: Header de autorización
         
     Returns:
         Account ID en formato accounts/XXXXX
     """
-    global _cached_account_id
-    
-    if _cached_account_id:
-        return _cached_account_id
-    
     try:
-        url = "https://mybusinessaccountmanagement.googleapis.com/v1/accounts"
-        response = requests.get(url, headers=auth_header, timeout=30)
-        response.raise_for_status()
-        
-        data = response.json()
-        accounts = data.get("accounts", [])
-        
-        if accounts:
-            # Tomar la primera cuenta disponible
-            _cached_account_id = accounts[0].get("name", "")
-            logger.info(f"Account ID obtenido: {_cached_account_id}")
-            return _cached_account_id
-        else:
-            raise ValueError("No se encontraron cuentas GBP")
-            
+        account_id = get_account_resolver().get_default_account(auth_header)
+        logger.info(f"Account ID obtenido: {account_id}")
+        return account_id
     except Exception as e:
         logger.error(f"Error obteniendo account ID: {e}")
         raise
@@ -157,6 +186,9 @@ def fix_location_format(location_name: str, auth_header: dict) -> str:
     """
     Corrige el formato de location_name si está incompleto.
     
+    La cuenta se obtiene del índice ubicación→cuenta compartido, de modo que
+    cada ubicación queda bajo su propia cuenta aunque haya varias.
+    
     Args:
         location_name: Nombre de ubicación (puede estar incompleto)
         auth_header: Header de autorización
@@ -170,7 +202,7 @@ def fix_location_format(location_name: str, auth_header: dict) -> str:
     
     # Si está en formato incompleto, corregir
     if location_name.startswith("locations/"):
-        account_id = get_account_id(auth_header)
+        account_id = get_account_resolver().get_account_for_location(location_name, auth_header)
         corrected_name = f"{account_id}/{location_name}"
         logger.info(f"Corrigiendo formato: {location_name} -> {corrected_name}")
         return corrected_name
@@ -284,7 +316,7 @@ def create_local_post(
     
     try:
         logger.info(f"📮 Creando localPost en GBP...")
-        response = requests.post(url, headers=auth_header, json=payload)
+        response = requests.post(url, headers=auth_header, json=payload, timeout=60)
         response.raise_for_status()
         
         data = response.json()
@@ -335,7 +367,7 @@ def list_local_posts(location_name: str, auth_header: dict, page_size: int = 50)
             if page_token:
                 params["pageToken"] = page_token
             
-            response = requests.get(url, headers=auth_header, params=params)
+            response = requests.get(url, headers=auth_header, params=params, timeout=30)
             response.raise_for_status()
             
             data = response.json()
@@ -371,7 +403,7 @@ def delete_local_post(post_name: str, auth_header: dict) -> None:
     url = f"{base_url}/{post_name}"
     
     try:
-        response = requests.delete(url, headers=auth_header)
+        response = requests.delete(url, headers=auth_header, timeout=30)
         response.raise_for_status()
         logger.info(f"Post eliminado exitosamente: {post_name}")
     
@@ -0,0 +1,221 @@
+"""
+Pipeline de publicación concurrente de posts en Google Business Profile.
+
+Las imágenes se publican en paralelo en muchas locaciones bajo un limitador
+de escrituras compartido. Los videos se suben a la galería y pasan a una cola
+que consulta el estado de procesamiento del media item con backoff adaptativo,
+en lugar de esperar un tiempo fijo entre videos.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from automation_hub.integrations.gbp.posts_v1 import (
+    create_local_post,
+    detect_video_content,
+    gbp_media_create_video,
+    gbp_media_get,
+    is_media_processed,
+)
+from automation_hub.integrations.gbp.rate_limiter import RateLimiter, DEFAULT_WRITES_PER_MINUTE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PUBLISH_WORKERS = 4
+VIDEO_POLL_INITIAL_SECONDS = 5.0
+VIDEO_POLL_MAX_SECONDS = 60.0
+VIDEO_POLL_BACKOFF = 1.5
+VIDEO_PROCESSING_TIMEOUT_SECONDS = 600.0
+
+
+class VideoProcessingQueue:
+    """
+    Cola de videos subidos a GBP pendientes de procesamiento.
+
+    Cada item se consulta cuando vence su próximo intervalo; si aún no está
+    listo el intervalo crece (backoff) y si la API responde 429 se duplica.
+    """
+
+    def __init__(
+        self,
+        auth_header: dict,
+        poll_initial: float = VIDEO_POLL_INITIAL_SECONDS,
+        poll_max: float = VIDEO_POLL_MAX_SECONDS,
+        backoff: float = VIDEO_POLL_BACKOFF,
+        timeout: float = VIDEO_PROCESSING_TIMEOUT_SECONDS
+    ):
+        self.auth_header = auth_header
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.backoff = backoff
+        self.timeout = timeout
+        self._items: List[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, media: dict, contexto: dict) -> None:
+        """Encola un media item recién creado."""
+        ahora = time.monotonic()
+        with self._lock:
+            self._items.append({
+                "media": media,
+                "contexto": contexto,
+                "creado": ahora,
+                "intervalo": self.poll_initial,
+                "proximo": ahora + self.poll_initial,
+            })
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def seconds_until_next_due(self) -> Optional[float]:
+        """Segundos hasta la próxima consulta pendiente (None si la cola está vacía)."""
+        with self._lock:
+            if not self._items:
+                return None
+            return max(0.0, min(item["proximo"] for item in self._items) - time.monotonic())
+
+    def poll_due(self) -> List[Tuple[dict, dict, bool]]:
+        """
+        Consulta los items vencidos.
+
+        Returns:
+            Lista de (contexto, media, listo) para los items que terminaron de
+            procesarse (listo=True) o excedieron el timeout (listo=False)
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            vencidos = [item for item in self._items if item["proximo"] <= ahora]
+
+        terminados = []
+        for item in vencidos:
+            media_name = item["media"].get("name", "")
+            listo = False
+            try:
+                media = gbp_media_get(media_name, self.auth_header)
+                item["media"] = media
+                listo = is_media_processed(media)
+                item["intervalo"] = min(self.poll_max, item["intervalo"] * self.backoff)
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                factor = 2 if status == 429 else self.backoff
+                item["intervalo"] = min(self.poll_max, item["intervalo"] * factor)
+                logger.warning(f"⚠️ Error consultando estado de {media_name} ({status}), reintentando")
+            except requests.exceptions.RequestException as e:
+                item["intervalo"] = min(self.poll_max, item["intervalo"] * self.backoff)
+                logger.warning(f"⚠️ Error consultando estado de {media_name}: {e}")
+
+            transcurrido = time.monotonic() - item["creado"]
+            if listo or transcurrido >= self.timeout:
+                if listo:
+                    logger.info(f"🎥 Video procesado en {transcurrido:.0f}s: {media_name}")
+                else:
+                    logger.warning(f"⏱️ Video sin procesar tras {transcurrido:.0f}s: {media_name}")
+                terminados.append((item["contexto"], item["media"], listo))
+                with self._lock:
+                    self._items.remove(item)
+            else:
+                item["proximo"] = time.monotonic() + item["intervalo"]
+
+        return terminados
+
+
+class GBPPublisher:
+    """
+    Publica tareas (post → locación) en paralelo respetando la cuota de escritura.
+
+    Cada tarea es un dict con ``location_name`` (accounts/*/locations/*),
+    ``summary`` y opcionalmente ``video_local``, ``imagen_local`` e
+    ``imagen_url``; cualquier otra llave se devuelve intacta en el resultado.
+    """
+
+    def __init__(
+        self,
+        auth_header: dict,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_workers: int = DEFAULT_PUBLISH_WORKERS,
+        video_queue: Optional[VideoProcessingQueue] = None
+    ):
+        self.auth_header = auth_header
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter(DEFAULT_WRITES_PER_MINUTE)
+        self.max_workers = max(1, max_workers)
+        self.video_queue = video_queue if video_queue is not None else VideoProcessingQueue(auth_header)
+        self._resultados: "queue.Queue[dict]" = queue.Queue()
+
+    def _publicar_post(
+        self,
+        tarea: dict,
+        media_url: Optional[str],
+        es_video: bool,
+        video_media: Optional[dict] = None
+    ) -> None:
+        """Crea el localPost (imagen o texto) y encola el resultado."""
+        try:
+            self.rate_limiter.acquire()
+            post = create_local_post(
+                location_name=tarea["location_name"],
+                auth_header=self.auth_header,
+                summary=tarea["summary"],
+                media_url=None if es_video else media_url
+            )
+            if video_media and isinstance(post, dict):
+                post["_video_media_info"] = video_media
+            self._resultados.put({"tarea": tarea, "ok": True, "post": post, "error": None, "es_video": es_video})
+        except Exception as e:
+            self._resultados.put({"tarea": tarea, "ok": False, "post": None, "error": e, "es_video": es_video})
+
+    def _subir_video(self, executor: ThreadPoolExecutor, tarea: dict, video_url: str) -> None:
+        """Sube el video a la galería y lo encola para esperar su procesamiento."""
+        try:
+            self.rate_limiter.acquire()
+            media = gbp_media_create_video(None, tarea["location_name"], video_url, self.auth_header)
+        except Exception as e:
+            logger.error(f"❌ Error subiendo video a galería, se publica solo texto: {e}")
+            executor.submit(self._publicar_post, tarea, None, True)
+            return
+
+        if is_media_processed(media):
+            executor.submit(self._publicar_post, tarea, None, True, media)
+        else:
+            self.video_queue.add(media, tarea)
+
+    def publish(self, tareas: List[dict]) -> Iterator[Dict]:
+        """
+        Publica todas las tareas y devuelve los resultados conforme terminan.
+
+        Yields:
+            Dict con ``tarea``, ``ok``, ``post``, ``error`` y ``es_video``
+        """
+        pendientes = len(tareas)
+        if not pendientes:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for tarea in tareas:
+                es_video, media_url = detect_video_content(
+                    tarea.get("video_local"), tarea.get("imagen_local"), tarea.get("imagen_url")
+                )
+                if es_video and media_url:
+                    executor.submit(self._subir_video, executor, tarea, media_url)
+                else:
+                    executor.submit(self._publicar_post, tarea, media_url or None, False)
+
+            while pendientes > 0:
+                espera = self.video_queue.seconds_until_next_due()
+                espera = 1.0 if espera is None else min(max(espera, 0.05), 1.0)
+                try:
+                    resultado = self._resultados.get(timeout=espera)
+                    pendientes -= 1
+                    yield resultado
+                except queue.Empty:
+                    pass
+
+                for tarea, media, listo in self.video_queue.poll_due():
+                    if not listo:
+                        logger.warning(f"⚠️ Publicando texto sin esperar más al video en {tarea['location_name']}")
+                    executor.submit(self._publicar_post, tarea, None, True, media)
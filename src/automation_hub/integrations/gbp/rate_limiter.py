@@ -0,0 +1,44 @@
+"""
+Limitador de tasa (token bucket) para llamadas de escritura a la API de GBP.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WRITES_PER_MINUTE = 60
+
+
+class RateLimiter:
+    """
+    Token bucket thread-safe.
+
+    ``acquire()`` bloquea hasta que haya un token disponible, de modo que
+    varios workers comparten la misma cuota sin exceder ``rate_per_minute``.
+    """
+
+    def __init__(self, rate_per_minute: float = DEFAULT_WRITES_PER_MINUTE, burst: int = 1):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute debe ser mayor a 0")
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate_per_second)
+        self._last = now
+
+    def acquire(self) -> None:
+        """Espera hasta obtener un token."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.rate_per_second
+            time.sleep(espera)
@@ -8,7 +8,11 @@ from typing import Optional
 logger = logging.getLogger(__name__)
 
 
-def list_all_reviews(parent_location_name: str, auth_header: dict) -> list[dict]:
+def list_all_reviews(
+    parent_location_name: str,
+    auth_header: dict,
+    since_date: Optional[str] = None
+) -> list[dict]:
     """
     Lista todas las reviews de una locación usando GBP API v4.
     Maneja paginación automáticamente.
@@ -16,6 +20,8 @@ def list_all_reviews(parent_location_name: str, auth_header: dict) -> list[dict]
     Args:
         parent_location_name: Nombre completo de la locación (formato: accounts/*/locations/*)
         auth_header: Dict con header Authorization
+        since_date: Fecha ISO de la última sincronización; como las reviews vienen
+            ordenadas por updateTime desc, se deja de paginar al llegar a ella
         
     Returns:
         Lista de reviews en formato raw de la API
@@ -41,7 +47,14 @@ def list_all_reviews(parent_location_name: str, auth_header: dict) -> list[dict]
             
             data = response.json()
             reviews = data.get("reviews", [])
-            all_reviews.extend(reviews)
+            
+            if since_date:
+                recientes = [r for r in reviews if (r.get("updateTime") or "") >= since_date]
+                all_reviews.extend(recientes)
+                if len(recientes) < len(reviews):
+                    break
+            else:
+                all_reviews.extend(reviews)
             
             logger.debug(f"Reviews obtenidas en esta página: {len(reviews)}")
             
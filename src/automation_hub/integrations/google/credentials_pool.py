@@ -0,0 +1,105 @@
+"""
+Pool de credenciales de Google para todos los tenants conectados.
+
+Carga todas las filas de ``google_oauth_tokens`` en una consulta, refresca en
+paralelo los tokens vencidos y resuelve ``gbp_locations.nombre_nora`` → header
+Bearer del tenant, con un bucket de cuota independiente por tenant.
+"""
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from automation_hub.db.supabase_client import create_client_from_env
+from automation_hub.integrations.google.oauth import GoogleCredentialsCache, get_credentials_cache
+from automation_hub.integrations.gbp.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT_WORKERS = 4
+DEFAULT_READS_PER_MINUTE = 300
+
+
+class GoogleCredentialsPool:
+    """Credenciales y cuota por tenant para jobs de GBP multi-tenant."""
+
+    def __init__(
+        self,
+        supabase=None,
+        cache: Optional[GoogleCredentialsCache] = None,
+        default_tenant: Optional[str] = None,
+        rate_per_minute: float = DEFAULT_READS_PER_MINUTE,
+        max_workers: int = DEFAULT_TENANT_WORKERS
+    ):
+        self.supabase = supabase
+        self.cache = cache if cache is not None else get_credentials_cache()
+        self.default_tenant = default_tenant or os.getenv("GOOGLE_OAUTH_TENANT", "aura")
+        self.rate_per_minute = rate_per_minute
+        self.max_workers = max(1, max_workers)
+        self.tenants: List[str] = []
+        self._limiters: Dict[str, RateLimiter] = {}
+
+    def load(self) -> List[str]:
+        """
+        Carga todos los tenants de google_oauth_tokens y refresca sus tokens en paralelo.
+
+        Los tenants cuyo token no se puede refrescar se omiten (sus locaciones
+        usan el tenant por defecto).
+
+        Returns:
+            Lista de tenants con credenciales válidas
+        """
+        if self.supabase is None:
+            self.supabase = create_client_from_env()
+
+        result = self.supabase.table("google_oauth_tokens").select(
+            "tenant, refresh_token, access_token, expires_at"
+        ).eq("provider", "google").execute()
+
+        candidatos = []
+        for row in result.data or []:
+            tenant = row.get("tenant")
+            if not tenant:
+                continue
+            try:
+                self.cache.seed(tenant, row)
+                candidatos.append(tenant)
+            except Exception as e:
+                logger.warning(f"⚠️ Token inválido para tenant '{tenant}': {e}")
+
+        validos: List[str] = []
+        if candidatos:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(candidatos))) as executor:
+                futures = {t: executor.submit(self.cache.get_credentials, t) for t in candidatos}
+                for tenant, future in futures.items():
+                    try:
+                        future.result()
+                        validos.append(tenant)
+                    except Exception as e:
+                        logger.warning(f"⚠️ No se pudo refrescar token de tenant '{tenant}': {e}")
+
+        self.tenants = validos
+        logger.info(f"🔑 Tenants de Google con credenciales: {len(validos)} ({', '.join(validos)})")
+        return validos
+
+    def tenant_for(self, nombre_nora: Optional[str]) -> str:
+        """Tenant cuyas credenciales se usan para un nombre_nora."""
+        if nombre_nora and nombre_nora in self.tenants:
+            return nombre_nora
+        return self.default_tenant
+
+    def header_for(self, tenant: str) -> dict:
+        """Header Authorization del tenant (compartido, se actualiza al refrescar)."""
+        return self.cache.get_header(tenant)
+
+    def limiter_for(self, tenant: str) -> RateLimiter:
+        """Bucket de cuota del tenant."""
+        return self._limiters.setdefault(tenant, RateLimiter(self.rate_per_minute))
+
+    def group_locations(self, locations: List[dict]) -> Dict[str, List[dict]]:
+        """Agrupa locaciones de gbp_locations por el tenant que debe procesarlas."""
+        grupos: Dict[str, List[dict]] = defaultdict(list)
+        for location in locations:
+            grupos[self.tenant_for(location.get("nombre_nora"))].append(location)
+        return dict(grupos)
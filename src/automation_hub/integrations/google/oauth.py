@@ -3,7 +3,8 @@ Manejo de autenticación OAuth2 con Google.
 """
 import logging
 import os
-from typing import Optional
+import threading
+from typing import Dict, Optional
 from datetime import datetime, timezone
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
@@ -11,6 +12,9 @@ from automation_hub.db.supabase_client import create_client_from_env
 
 logger = logging.getLogger(__name__)
 
+# Refrescar el access token este tiempo antes de que expire
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
 
 def _clean(value: Optional[str]) -> Optional[str]:
     """
@@ -35,23 +39,13 @@ def _clean(value: Optional[str]) -> Optional[str]:
     return v if v else None
 
 
-def get_gbp_creds_from_db(tenant: str = "default") -> Credentials:
+def _get_oauth_client_config() -> tuple[str, str]:
     """
-    Obtiene credenciales de GBP desde la tabla google_oauth_tokens en Supabase.
-    
-    Args:
-        tenant: Nombre del tenant (ej: 'aura', 'default')
+    Lee y valida GOOGLE_CLIENT_ID y GOOGLE_CLIENT_SECRET del .env.
     
-    Returns:
-        Credentials de Google con token válido
-        
     Raises:
-        ValueError: Si no se encuentra el token o falla la validación
-        Exception: Si falla el refresh del token
+        ValueError: Si faltan o son inválidos
     """
-    supabase = create_client_from_env()
-    
-    # Leer client_id y client_secret del .env
     client_id = _clean(os.getenv("GOOGLE_CLIENT_ID"))
     client_secret = _clean(os.getenv("GOOGLE_CLIENT_SECRET"))
     
@@ -65,67 +59,251 @@ def get_gbp_creds_from_db(tenant: str = "default") -> Credentials:
     if len(client_secret) < 20:
         raise ValueError("GOOGLE_CLIENT_SECRET parece inválido (longitud insuficiente)")
     
-    # Obtener token desde la base de datos
-    try:
-        result = supabase.table("google_oauth_tokens").select("*").eq(
+    return client_id, client_secret
+
+
+def _credentials_from_row(token_data: dict, client_id: str, client_secret: str) -> Credentials:
+    """
+    Construye Credentials a partir de una fila de google_oauth_tokens.
+    
+    Si la fila trae un access_token con expires_at, se conserva la expiración
+    (naive UTC, como la maneja google-auth) para no refrescar de más.
+    """
+    tenant = token_data.get("tenant")
+    refresh_token = token_data.get("refresh_token")
+    access_token = token_data.get("access_token")
+    expires_at = token_data.get("expires_at")
+    
+    if not refresh_token:
+        raise ValueError(f"refresh_token no encontrado para el tenant '{tenant}'")
+    
+    # Crear credenciales
+    credentials = Credentials(
+        token=access_token,
+        refresh_token=refresh_token,
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id=client_id,
+        client_secret=client_secret
+    )
+    
+    if access_token and expires_at:
+        try:
+            expires_dt = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
+            if expires_dt.tzinfo is None:
+                expires_dt = expires_dt.replace(tzinfo=timezone.utc)
+            credentials.expiry = expires_dt.astimezone(timezone.utc).replace(tzinfo=None)
+        except Exception:
+            credentials.token = None
+    else:
+        credentials.token = None
+    
+    return credentials
+
+
+def _seconds_to_expiry(credentials: Credentials) -> float:
+    """Segundos que le quedan al access token (0 si no hay token o expiración)."""
+    if not credentials.token or not credentials.expiry:
+        return 0.0
+    expiry = credentials.expiry.replace(tzinfo=timezone.utc)
+    return (expiry - datetime.now(timezone.utc)).total_seconds()
+
+
+class GoogleCredentialsCache:
+    """
+    Cache en memoria de credenciales de Google por tenant, compartido por el proceso.
+    
+    - Lee ``google_oauth_tokens`` solo la primera vez por tenant.
+    - Refresca de forma proactiva ``refresh_margin`` segundos antes de
+      ``expires_at`` con un timer en segundo plano.
+    - Los refrescos concurrentes del mismo tenant se coalescen en uno solo
+      (single-flight) con un lock por tenant.
+    - El header Bearer entregado es un dict compartido que se actualiza en
+      sitio al refrescar, así que un job largo nunca queda con token vencido.
+    """
+    
+    def __init__(self, refresh_margin: int = TOKEN_REFRESH_MARGIN_SECONDS, background_refresh: bool = True):
+        self.refresh_margin = refresh_margin
+        self.background_refresh = background_refresh
+        self._credentials: Dict[str, Credentials] = {}
+        self._headers: Dict[str, dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._global_lock = threading.Lock()
+        self._supabase = None
+    
+    def _lock_for(self, tenant: str) -> threading.Lock:
+        with self._global_lock:
+            if tenant not in self._locks:
+                self._locks[tenant] = threading.Lock()
+            return self._locks[tenant]
+    
+    def _get_supabase(self):
+        if self._supabase is None:
+            self._supabase = create_client_from_env()
+        return self._supabase
+    
+    def _is_fresh(self, credentials: Optional[Credentials]) -> bool:
+        return credentials is not None and _seconds_to_expiry(credentials) > self.refresh_margin
+    
+    def _load_from_db(self, tenant: str) -> Credentials:
+        """Lee la fila del tenant en google_oauth_tokens."""
+        client_id, client_secret = _get_oauth_client_config()
+        
+        result = self._get_supabase().table("google_oauth_tokens").select("*").eq(
             "tenant", tenant
         ).eq("provider", "google").execute()
         
         if not result.data:
             raise ValueError(f"No se encontró token de Google OAuth para el tenant '{tenant}' en la base de datos")
         
-        token_data = result.data[0]
-        refresh_token = token_data.get("refresh_token")
-        access_token = token_data.get("access_token")
-        expires_at = token_data.get("expires_at")
+        token_data = dict(result.data[0])
+        token_data.setdefault("tenant", tenant)
+        return _credentials_from_row(token_data, client_id, client_secret)
+    
+    def _refresh_and_store(self, tenant: str, credentials: Credentials) -> None:
+        """Refresca el access token y lo guarda en la base de datos."""
+        logger.info(f"Refrescando token de acceso para tenant '{tenant}'")
+        credentials.refresh(Request())
         
-        if not refresh_token:
-            raise ValueError(f"refresh_token no encontrado para el tenant '{tenant}'")
+        # Actualizar token en la base de datos
+        update_data = {
+            "access_token": credentials.token,
+            "expires_at": credentials.expiry.replace(tzinfo=timezone.utc).isoformat() if credentials.expiry else None,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
         
-        # Crear credenciales
-        credentials = Credentials(
-            token=access_token,
-            refresh_token=refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=client_id,
-            client_secret=client_secret
-        )
+        self._get_supabase().table("google_oauth_tokens").update(update_data).eq(
+            "tenant", tenant
+        ).eq("provider", "google").execute()
         
-        # Verificar si necesita refresh
-        needs_refresh = True
-        if access_token and expires_at:
+        logger.info(f"Token actualizado exitosamente para tenant '{tenant}'")
+    
+    def _publish(self, tenant: str, credentials: Credentials) -> None:
+        """Guarda las credenciales, actualiza el header compartido y agenda el próximo refresh."""
+        self._credentials[tenant] = credentials
+        header = self._headers.setdefault(tenant, {})
+        header["Authorization"] = f"Bearer {credentials.token}"
+        self._schedule(tenant, credentials)
+    
+    def _schedule(self, tenant: str, credentials: Credentials) -> None:
+        if not self.background_refresh:
+            return
+        
+        timer = self._timers.pop(tenant, None)
+        if timer:
+            timer.cancel()
+        
+        delay = max(1.0, _seconds_to_expiry(credentials) - self.refresh_margin)
+        timer = threading.Timer(delay, self._background_refresh, args=(tenant,))
+        timer.daemon = True
+        timer.start()
+        self._timers[tenant] = timer
+    
+    def _background_refresh(self, tenant: str) -> None:
+        with self._lock_for(tenant):
+            credentials = self._credentials.get(tenant)
+            if credentials is None or self._is_fresh(credentials):
+                return
             try:
-                expires_dt = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
-                if expires_dt > datetime.now(timezone.utc):
-                    needs_refresh = False
-                    logger.info(f"Token aún válido para tenant '{tenant}'")
-            except Exception:
-                pass
-        
-        # Refrescar si es necesario
-        if needs_refresh:
-            logger.info(f"Refrescando token de acceso para tenant '{tenant}'")
-            request = Request()
-            credentials.refresh(request)
-            
-            # Actualizar token en la base de datos
-            update_data = {
-                "access_token": credentials.token,
-                "expires_at": datetime.fromtimestamp(credentials.expiry.timestamp(), tz=timezone.utc).isoformat() if credentials.expiry else None,
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }
+                self._refresh_and_store(tenant, credentials)
+                self._publish(tenant, credentials)
+            except Exception as e:
+                # El siguiente get() lo reintenta de forma síncrona
+                logger.warning(f"Refresh proactivo falló para tenant '{tenant}': {e}")
+    
+    def get_credentials(self, tenant: str) -> Credentials:
+        """
+        Obtiene credenciales válidas del tenant (desde memoria si siguen vigentes).
+        
+        Raises:
+            ValueError: Si no se encuentra el token o falla la validación
+            Exception: Si falla el refresh del token
+        """
+        credentials = self._credentials.get(tenant)
+        if self._is_fresh(credentials):
+            return credentials
+        
+        # Single-flight: solo un hilo por tenant lee/refresca, el resto espera y reutiliza
+        with self._lock_for(tenant):
+            credentials = self._credentials.get(tenant)
+            if self._is_fresh(credentials):
+                return credentials
             
-            supabase.table("google_oauth_tokens").update(update_data).eq(
-                "tenant", tenant
-            ).eq("provider", "google").execute()
+            try:
+                if credentials is None:
+                    credentials = self._load_from_db(tenant)
+                
+                if self._is_fresh(credentials):
+                    logger.info(f"Token aún válido para tenant '{tenant}'")
+                else:
+                    self._refresh_and_store(tenant, credentials)
+                
+                self._publish(tenant, credentials)
+                return credentials
             
-            logger.info(f"Token actualizado exitosamente para tenant '{tenant}'")
-        
-        return credentials
+            except Exception as e:
+                logger.error(f"Error obteniendo token de Google OAuth para tenant '{tenant}': {e}")
+                raise
     
-    except Exception as e:
-        logger.error(f"Error obteniendo token de Google OAuth para tenant '{tenant}': {e}")
-        raise
+    def seed(self, tenant: str, token_data: dict) -> None:
+        """
+        Precarga un tenant desde una fila ya leída de google_oauth_tokens
+        (sin consultar la BD ni refrescar). No pisa credenciales ya cacheadas.
+        """
+        with self._lock_for(tenant):
+            if tenant in self._credentials:
+                return
+            client_id, client_secret = _get_oauth_client_config()
+            row = dict(token_data)
+            row.setdefault("tenant", tenant)
+            credentials = _credentials_from_row(row, client_id, client_secret)
+            self._credentials[tenant] = credentials
+            if credentials.token:
+                self._headers.setdefault(tenant, {})["Authorization"] = f"Bearer {credentials.token}"
+    
+    def get_header(self, tenant: str) -> dict:
+        """Header Authorization compartido del tenant (se actualiza en sitio al refrescar)."""
+        self.get_credentials(tenant)
+        return self._headers[tenant]
+    
+    def invalidate(self, tenant: Optional[str] = None) -> None:
+        """Descarta credenciales en memoria (de un tenant o de todos)."""
+        with self._global_lock:
+            tenants = [tenant] if tenant else list(self._credentials)
+        for t in tenants:
+            with self._lock_for(t):
+                self._credentials.pop(t, None)
+                timer = self._timers.pop(t, None)
+                if timer:
+                    timer.cancel()
+
+
+_credentials_cache = GoogleCredentialsCache()
+
+
+def get_credentials_cache() -> GoogleCredentialsCache:
+    """Devuelve el cache de credenciales compartido por el proceso."""
+    return _credentials_cache
+
+
+def get_gbp_creds_from_db(tenant: str = "default") -> Credentials:
+    """
+    Obtiene credenciales de GBP desde la tabla google_oauth_tokens en Supabase.
+    
+    Usa el cache del proceso: la base de datos solo se consulta la primera vez
+    por tenant y el token se refresca antes de expirar.
+    
+    Args:
+        tenant: Nombre del tenant (ej: 'aura', 'default')
+    
+    Returns:
+        Credentials de Google con token válido
+        
+    Raises:
+        ValueError: Si no se encuentra el token o falla la validación
+        Exception: Si falla el refresh del token
+    """
+    return _credentials_cache.get_credentials(tenant)
 
 
 def get_gbp_creds_from_env() -> Credentials:
@@ -149,11 +327,14 @@ def get_bearer_header() -> dict:
     """
     Obtiene header de autorización Bearer listo para usar en requests.
     
+    El dict es compartido y se actualiza en sitio cuando el token se refresca;
+    no debe modificarse.
+    
     Returns:
         Dict con header Authorization
     """
-    creds = get_gbp_creds_from_env()
-    return {"Authorization": f"Bearer {creds.token}"}
+    tenant = os.getenv("GOOGLE_OAUTH_TENANT", "aura")
+    return _credentials_cache.get_header(tenant)
 
 
 def get_bearer_token(client_id: str, client_secret: str, refresh_token: str) -> str:
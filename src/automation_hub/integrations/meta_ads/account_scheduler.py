@@ -0,0 +1,203 @@
+"""
+Planificador concurrente de cuentas de Meta Ads gobernado por los headers de uso.
+
+Meta informa en cada respuesta qué porcentaje de la cuota se ha consumido:
+
+- ``X-Business-Use-Case-Usage``: por business y tipo de caso de uso
+  (call_count, total_cputime, total_time, estimated_time_to_regain_access)
+- ``X-Ad-Account-Usage``: por cuenta (acc_id_util_pct, reset_time_duration)
+
+``MetaUsageGovernor`` convierte esas lecturas en una pausa por cuenta entre
+páginas y en un número de cuentas simultáneas permitido; ``AccountScheduler``
+despacha las cuentas más grandes primero respetando ese límite.
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_TARGET_USAGE_PCT = 75.0
+LOW_USAGE_PCT = 40.0          # Debajo de esto no se frena
+PACE_SECONDS = 1.0            # Pausa entre páginas al llegar al objetivo
+BACKOFF_SECONDS = 30.0        # Pausa adicional al acercarse al 100%
+MAX_BACKOFF_SECONDS = 300.0   # Tope de espera cuando Meta pide recuperar acceso
+
+
+def _as_dict(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+    return value
+
+
+def parse_usage_headers(headers: Optional[Mapping[str, str]]) -> Tuple[float, float]:
+    """
+    Extrae el uso más alto y el tiempo de espera indicado por Meta.
+
+    Args:
+        headers: Headers de la respuesta de Graph API
+
+    Returns:
+        Tuple (uso_pct 0-100, segundos_para_recuperar_acceso)
+    """
+    if not headers:
+        return 0.0, 0.0
+
+    uso = 0.0
+    espera = 0.0
+
+    buc = _as_dict(headers.get("X-Business-Use-Case-Usage") or headers.get("x-business-use-case-usage"))
+    if isinstance(buc, dict):
+        for entradas in buc.values():
+            for entrada in entradas if isinstance(entradas, list) else []:
+                if not isinstance(entrada, dict):
+                    continue
+                for campo in ("call_count", "total_cputime", "total_time"):
+                    try:
+                        uso = max(uso, float(entrada.get(campo) or 0))
+                    except (TypeError, ValueError):
+                        pass
+                try:
+                    espera = max(espera, float(entrada.get("estimated_time_to_regain_access") or 0) * 60)
+                except (TypeError, ValueError):
+                    pass
+
+    cuenta = _as_dict(headers.get("X-Ad-Account-Usage") or headers.get("x-ad-account-usage"))
+    if isinstance(cuenta, dict):
+        try:
+            uso = max(uso, float(cuenta.get("acc_id_util_pct") or 0))
+        except (TypeError, ValueError):
+            pass
+        try:
+            if uso >= 100:
+                espera = max(espera, float(cuenta.get("reset_time_duration") or 0))
+        except (TypeError, ValueError):
+            pass
+
+    return min(uso, 100.0), espera
+
+
+class MetaUsageGovernor:
+    """
+    Estado de uso de la API compartido por todos los workers.
+
+    Guarda la última lectura de cada cuenta en curso; el uso global es el
+    máximo de esas lecturas (el BUC se comparte entre cuentas de un business).
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        target_usage: float = DEFAULT_TARGET_USAGE_PCT
+    ):
+        self.max_workers = max(1, max_workers)
+        self.target_usage = min(max(target_usage, LOW_USAGE_PCT + 1), 99.0)
+        self._lock = threading.Lock()
+        self._uso: Dict[str, float] = {}
+        self._espera_hasta: Dict[str, float] = {}
+
+    def record(self, account_id: str, headers: Optional[Mapping[str, str]]) -> float:
+        """Registra los headers de una respuesta. Devuelve el uso leído."""
+        uso, espera = parse_usage_headers(headers)
+        with self._lock:
+            self._uso[account_id] = uso
+            if espera > 0:
+                self._espera_hasta[account_id] = time.monotonic() + min(espera, MAX_BACKOFF_SECONDS)
+        if uso >= self.target_usage:
+            logger.warning(f"⚠️ Uso de API Meta en {uso:.0f}% para {account_id}")
+        return uso
+
+    def release(self, account_id: str) -> None:
+        """La cuenta terminó; su lectura deja de contar para el uso global."""
+        with self._lock:
+            self._uso.pop(account_id, None)
+            self._espera_hasta.pop(account_id, None)
+
+    def global_usage(self) -> float:
+        with self._lock:
+            return max(self._uso.values(), default=0.0)
+
+    def delay_for(self, account_id: str) -> float:
+        """Segundos que la cuenta debe esperar antes de su siguiente request."""
+        with self._lock:
+            uso = self._uso.get(account_id, 0.0)
+            hasta = self._espera_hasta.get(account_id, 0.0)
+
+        restante = hasta - time.monotonic()
+        if restante > 0:
+            return restante
+        if uso < LOW_USAGE_PCT:
+            return 0.0
+        if uso < self.target_usage:
+            return PACE_SECONDS * (uso - LOW_USAGE_PCT) / (self.target_usage - LOW_USAGE_PCT)
+        return PACE_SECONDS + BACKOFF_SECONDS * (uso - self.target_usage) / (100.0 - self.target_usage)
+
+    def pace(self, account_id: str) -> None:
+        """Espera lo que indique el uso actual de la cuenta."""
+        espera = self.delay_for(account_id)
+        if espera > 0:
+            if espera >= PACE_SECONDS:
+                logger.info(f"⏳ Pausando {espera:.1f}s {account_id} por uso de API")
+            time.sleep(espera)
+
+    def allowed_concurrency(self) -> int:
+        """Cuentas simultáneas permitidas según el uso global."""
+        uso = self.global_usage()
+        if uso < LOW_USAGE_PCT:
+            return self.max_workers
+        if uso >= self.target_usage:
+            return 1
+        fraccion = (self.target_usage - uso) / (self.target_usage - LOW_USAGE_PCT)
+        return max(1, min(self.max_workers, round(1 + (self.max_workers - 1) * fraccion)))
+
+
+class AccountScheduler:
+    """
+    Ejecuta una función por cuenta en paralelo, más grandes primero.
+
+    Despachar primero las cuentas con más filas esperadas (LPT) evita que una
+    cuenta grande arranque al final y alargue la ejecución completa.
+    """
+
+    def __init__(self, governor: MetaUsageGovernor):
+        self.governor = governor
+
+    def run(
+        self,
+        items: Iterable[Dict],
+        worker: Callable[[Dict], Any],
+        size_of: Callable[[Dict], int]
+    ) -> Iterator[Tuple[Dict, Any, Optional[Exception]]]:
+        """
+        Procesa los items y devuelve los resultados conforme terminan.
+
+        Yields:
+            Tuple (item, resultado, excepción)
+        """
+        pendientes: List[Dict] = sorted(items, key=size_of, reverse=True)
+        pendientes.reverse()  # pop() toma el más grande
+        en_curso: Dict[Future, Dict] = {}
+
+        with ThreadPoolExecutor(max_workers=self.governor.max_workers) as executor:
+            while pendientes or en_curso:
+                while pendientes and len(en_curso) < self.governor.allowed_concurrency():
+                    item = pendientes.pop()
+                    en_curso[executor.submit(worker, item)] = item
+
+                if not en_curso:
+                    continue
+
+                terminados, _ = wait(list(en_curso), timeout=1.0, return_when=FIRST_COMPLETED)
+                for future in terminados:
+                    item = en_curso.pop(future)
+                    try:
+                        yield item, future.result(), None
+                    except Exception as e:
+                        yield item, None, e
@@ -3,12 +3,27 @@ Integración con Meta Ads API para obtener información de cuentas publicitarias
 """
 import logging
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlencode
+
+from automation_hub.integrations.meta_ads.graph_batch import GraphBatchClient
+from automation_hub.integrations.meta_ads.token_resolver import (
+    MetaTokenError,
+    META_TOKEN_ERROR_CODES,
+    is_token_error,
+)
 
 logger = logging.getLogger(__name__)
 
 META_ADS_API_BASE = "https://graph.facebook.com/v18.0"
 
+ACCOUNT_INFO_FIELDS = "id,name,account_status,currency,timezone_name,created_time,amount_spent,balance"
+ACTIVE_ADS_FILTER = '[{"field":"effective_status","operator":"IN","value":["ACTIVE"]}]'
+
+
+def _act_id(account_id: str) -> str:
+    return account_id if account_id.startswith("act_") else f"act_{account_id}"
+
 
 def get_ad_account_info(
     account_id: str,
@@ -23,6 +38,9 @@ def get_ad_account_info(
         
     Returns:
         Información de la cuenta o None si hay error
+        
+    Raises:
+        MetaTokenError: Si Meta rechaza el token (para probar con otro)
     """
     # Asegurar que el ID tenga el prefijo act_
     if not account_id.startswith("act_"):
@@ -31,7 +49,7 @@ def get_ad_account_info(
     url = f"{META_ADS_API_BASE}/{account_id}"
     params = {
         "access_token": access_token,
-        "fields": "id,name,account_status,currency,timezone_name,created_time,amount_spent,balance"
+        "fields": ACCOUNT_INFO_FIELDS
     }
     
     try:
@@ -43,6 +61,15 @@ def get_ad_account_info(
         return data
     
     except requests.exceptions.HTTPError as e:
+        try:
+            error_payload = e.response.json()
+        except ValueError:
+            error_payload = None
+        if is_token_error(error_payload):
+            raise MetaTokenError(
+                f"Token rechazado consultando {account_id}: {error_payload['error'].get('message')}",
+                token=access_token
+            ) from e
         if e.response.status_code == 404:
             logger.warning(f"Cuenta {account_id} no encontrada en Meta Ads API")
         else:
@@ -75,7 +102,7 @@ def get_active_ads_count(
     params = {
         "access_token": access_token,
         "fields": "id,status",
-        "filtering": '[{"field":"effective_status","operator":"IN","value":["ACTIVE"]}]',
+        "filtering": ACTIVE_ADS_FILTER,
         "limit": 1000
     }
     
@@ -91,3 +118,58 @@ def get_active_ads_count(
     except Exception as e:
         logger.error(f"Error obteniendo anuncios de {account_id}: {e}")
         return 0
+
+
+def get_accounts_status_batch(
+    account_ids: List[str],
+    access_token: str
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Obtiene info y anuncios activos de varias cuentas con batch requests.
+    
+    Cada cuenta usa dos sub-requests (info y anuncios activos), así que 25
+    cuentas caben en un solo POST a Graph API.
+    
+    Args:
+        account_ids: IDs de cuentas (con o sin prefijo act_)
+        access_token: Token de acceso de Meta
+        
+    Returns:
+        Dict por account_id (como se recibió) con ``info`` (o None),
+        ``ads_activos`` (o None si falló) y ``token_error`` (True si Meta
+        rechazó el token)
+    """
+    client = GraphBatchClient(access_token, META_ADS_API_BASE)
+    sub_requests = []
+    for account_id in account_ids:
+        act_id = _act_id(account_id)
+        sub_requests.append({
+            "method": "GET",
+            "relative_url": f"{act_id}?{urlencode({'fields': ACCOUNT_INFO_FIELDS})}"
+        })
+        sub_requests.append({
+            "method": "GET",
+            "relative_url": f"{act_id}/ads?" + urlencode({
+                "fields": "id,status",
+                "filtering": ACTIVE_ADS_FILTER,
+                "limit": 1000
+            })
+        })
+    
+    resultados = client.execute(sub_requests)
+    
+    por_cuenta: Dict[str, Dict[str, Any]] = {}
+    for i, account_id in enumerate(account_ids):
+        info, ads = resultados[2 * i], resultados[2 * i + 1]
+        token_error = any(r["code"] in META_TOKEN_ERROR_CODES for r in (info, ads))
+        
+        if not info["ok"] and not token_error:
+            logger.warning(f"Batch: no se pudo obtener info de {account_id}: {info['error']}")
+        
+        por_cuenta[account_id] = {
+            "info": info["data"] if info["ok"] else None,
+            "ads_activos": len((ads["data"] or {}).get("data", [])) if ads["ok"] else None,
+            "token_error": token_error
+        }
+    
+    return por_cuenta
@@ -0,0 +1,135 @@
+"""
+Parser de ``actions`` de insights de Meta Ads.
+
+Una tabla action_type → contadores reemplaza las cadenas if/elif: cada
+insight se recorre una sola vez y produce las métricas de engagement y de
+mensajería. Los convertidores ``safe_int``/``safe_float`` son compartidos por
+las transformaciones de filas.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+# Action types que representan mensajes
+MSG_TYPES = frozenset({
+    "onsite_conversion.messaging_conversation_started_7d",
+    "onsite_conversion.messaging_conversation_started",
+    "messaging_conversation_started_7d",
+    "messaging_conversation_started",
+    "onsite_conversion.messaging_first_reply",
+    "messaging_first_reply",
+    "onsite_conversion.total_messaging_connection",
+    "total_messaging_connection",
+})
+
+# Action types que representan primeras respuestas
+FIRST_REPLY_TYPES = frozenset({
+    "messaging_first_reply",
+    "first_reply",
+    "onsite_conversion.messaging_first_reply",
+    "onsite_conversion.messaging_conversation_replied_7d",
+})
+
+ENGAGEMENT_METRICS = (
+    'link_clicks',
+    'page_engagement',
+    'post_engagement',
+    'video_views',
+    'post_reactions',
+    'post_likes',
+    'post_comments',
+    'post_shares',
+    'landing_page_views',
+    'page_likes',
+    'video_plays_3s',
+    'video_plays_15s',
+    'outbound_clicks',
+)
+
+# action_type -> contadores de engagement que suma
+ACTION_METRICS: Dict[str, Tuple[str, ...]] = {
+    'link_click': ('link_clicks',),
+    'onsite_conversion.link_click': ('link_clicks',),
+    'page_engagement': ('page_engagement',),
+    'onsite_conversion.page_engagement': ('page_engagement',),
+    'post_engagement': ('post_engagement',),
+    'onsite_conversion.post_engagement': ('post_engagement',),
+    'video_view': ('video_views',),
+    'onsite_conversion.video_view': ('video_views',),
+    'post_reaction': ('post_reactions',),
+    'onsite_conversion.post_reaction': ('post_reactions',),
+    'onsite_conversion.post_net_like': ('post_reactions', 'post_likes'),
+    'comment': ('post_comments',),
+    'onsite_conversion.comment': ('post_comments',),
+    'post': ('post_shares',),
+    'onsite_conversion.post': ('post_shares',),
+    'landing_page_view': ('landing_page_views',),
+    'omni_landing_page_view': ('landing_page_views',),
+    'onsite_conversion.landing_page_view': ('landing_page_views',),
+    'like': ('page_likes',),
+    'page_like': ('page_likes',),
+    'onsite_conversion.page_like': ('page_likes',),
+    'outbound_click': ('outbound_clicks',),
+    'onsite_conversion.outbound_click': ('outbound_clicks',),
+}
+
+
+def safe_int(value: Any) -> int:
+    """Entero seguro; las listas de actions se suman por ``value``."""
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(float(value))
+        except (ValueError, TypeError):
+            return 0
+    if isinstance(value, list):
+        return sum(int(float(item.get('value', 0))) for item in value if isinstance(item, dict))
+    return 0
+
+
+def safe_float(value: Any) -> Optional[float]:
+    """Float seguro; None si no es convertible."""
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_actions(actions: Optional[List[Dict]]) -> Dict[str, int]:
+    """
+    Recorre ``actions`` una vez y acumula todos los contadores.
+
+    Returns:
+        Dict con ENGAGEMENT_METRICS más ``messages`` (suma de MSG_TYPES) y
+        ``first_replies`` (suma de FIRST_REPLY_TYPES)
+    """
+    metrics = dict.fromkeys(ENGAGEMENT_METRICS, 0)
+    mensajes = 0.0
+    first_replies = 0
+
+    for action in (actions or ()):
+        action_type = (action.get("action_type") or "").strip()
+        claves = ACTION_METRICS.get(action_type)
+        es_mensaje = action_type in MSG_TYPES
+        es_first_reply = action_type in FIRST_REPLY_TYPES
+        if claves is None and not es_mensaje and not es_first_reply:
+            continue
+
+        raw = action.get("value", 0)
+        try:
+            valor = float(raw)
+        except (TypeError, ValueError):
+            continue
+
+        if claves is not None:
+            for clave in claves:
+                metrics[clave] += int(valor)
+        if es_mensaje:
+            mensajes += valor
+        if es_first_reply:
+            first_replies += int(valor)
+
+    metrics['messages'] = int(mensajes)
+    metrics['first_replies'] = first_replies
+    return metrics
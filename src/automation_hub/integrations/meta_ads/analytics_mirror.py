@@ -0,0 +1,380 @@
+"""
+Réplica local de meta_ads_anuncios_daily para los reportes de Meta Ads.
+
+Los jobs de reportes vuelven a descargar de Supabase los mismos meses de
+filas diarias en cada ejecución. La réplica guarda las columnas que usan
+los reportes en un archivo local (DuckDB si está instalado, SQLite de la
+stdlib si no) y se actualiza de forma incremental por
+``fecha_ultima_actualizacion``: cada sincronización solo baja las filas
+escritas o desactivadas desde la marca anterior.
+
+Se activa con META_ANALYTICS_MIRROR_PATH (vacío = desactivada).
+"""
+import logging
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from .daily_archive import DailyArchiveReader
+from .report_aggregator import mensajes_desde_actions
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - depende del entorno
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+DAILY_TABLE = "meta_ads_anuncios_daily"
+DEFAULT_BACKFILL_DAYS = 400
+DEFAULT_OVERLAP_SECONDS = 600
+PAGE_SIZE = 1000
+
+# Columnas replicadas (mensajes_actions se deriva de actions al sincronizar)
+TEXT_COLUMNS = (
+    "ad_id", "id_cuenta_publicitaria", "fecha_reporte", "publisher_platform", "nombre_nora",
+    "campana_id", "conjunto_id", "nombre_anuncio", "nombre_campana", "nombre_conjunto",
+    "fecha_ultima_actualizacion",
+)
+INT_COLUMNS = (
+    "activo", "impresiones", "alcance", "clicks", "link_clicks", "inline_link_clicks",
+    "messaging_conversations_started", "mensajes_total", "video_plays", "reproducciones_video_3s",
+    "mensajes_actions",
+)
+FLOAT_COLUMNS = ("importe_gastado", "page_engagement", "post_engagement")
+COLUMNS = TEXT_COLUMNS + INT_COLUMNS + FLOAT_COLUMNS
+SOURCE_COLUMNS = [c for c in COLUMNS if c != "mensajes_actions"] + ["actions"]
+
+_SCHEMA = (
+    f"CREATE TABLE IF NOT EXISTS {DAILY_TABLE} ("
+    + ", ".join(
+        [f"{c} TEXT" for c in TEXT_COLUMNS]
+        + [f"{c} BIGINT" for c in INT_COLUMNS]
+        + [f"{c} DOUBLE" for c in FLOAT_COLUMNS]
+    )
+    + ", PRIMARY KEY (ad_id, fecha_reporte, publisher_platform))",
+    f"CREATE INDEX IF NOT EXISTS idx_mirror_daily_fecha ON {DAILY_TABLE} (fecha_reporte)",
+    f"CREATE INDEX IF NOT EXISTS idx_mirror_daily_cuenta_fecha ON {DAILY_TABLE} (id_cuenta_publicitaria, fecha_reporte)",
+    "CREATE TABLE IF NOT EXISTS mirror_estado (tabla TEXT PRIMARY KEY, marca TEXT, actualizado_en TEXT)",
+)
+
+# Métricas de reporte (mismos nombres que el RPC meta_ads_reporte_semanal_agregados)
+_REPORT_METRICS = """
+    COUNT(*) AS filas,
+    SUM(impresiones) AS impresiones,
+    SUM(alcance) AS alcance,
+    SUM(clicks) AS clicks,
+    SUM(CASE WHEN COALESCE(link_clicks, 0) <> 0 THEN link_clicks ELSE COALESCE(inline_link_clicks, 0) END) AS link_clicks,
+    SUM(COALESCE(importe_gastado, 0)) AS gasto,
+    SUM(COALESCE(messaging_conversations_started, 0)) AS mensajes,
+    SUM(COALESCE(mensajes_total, 0)) AS mensajes_total,
+    SUM(COALESCE(mensajes_actions, 0)) AS mensajes_actions,
+    SUM(CASE WHEN COALESCE(page_engagement, 0) <> 0 THEN page_engagement ELSE COALESCE(post_engagement, 0) END) AS interacciones,
+    SUM(COALESCE(video_plays, 0)) AS video_plays,
+    SUM(COALESCE(reproducciones_video_3s, 0)) AS reproducciones_video_3s,
+    COUNT(DISTINCT NULLIF(campana_id, '')) AS campanas,
+    COUNT(DISTINCT NULLIF(conjunto_id, '')) AS conjuntos,
+    COUNT(DISTINCT NULLIF(ad_id, '')) AS anuncios
+"""
+
+
+def _parse_marca(marca: str) -> datetime:
+    """Timestamp de Supabase -> datetime UTC sin zona (comparable entre formatos)."""
+    valor = datetime.fromisoformat(marca.replace("Z", "+00:00"))
+    if valor.tzinfo is not None:
+        valor = valor.astimezone(timezone.utc).replace(tzinfo=None)
+    return valor
+
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, bool):
+        return int(value)
+    try:
+        return int(float(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def fila_para_replica(row: Dict[str, Any]) -> tuple:
+    """Fila de Supabase -> tupla en el orden de COLUMNS."""
+    valores = []
+    for columna in TEXT_COLUMNS:
+        valor = row.get(columna)
+        valores.append(None if valor is None else str(valor))
+    for columna in INT_COLUMNS:
+        if columna == "activo":
+            valores.append(0 if row.get("activo") is False else 1)
+        elif columna == "mensajes_actions":
+            valores.append(mensajes_desde_actions(row.get("actions") or []))
+        else:
+            valores.append(_to_int(row.get(columna)))
+    for columna in FLOAT_COLUMNS:
+        valores.append(_to_float(row.get(columna)))
+    return tuple(valores)
+
+
+class AnalyticsMirror:
+    """
+    Réplica local incremental de meta_ads_anuncios_daily.
+
+    Ejemplo:
+        mirror = AnalyticsMirror('data/meta_ads_mirror.db', supabase)
+        mirror.sincronizar()
+        mirror.rollup(date(2026, 1, 5))
+    """
+
+    def __init__(
+        self,
+        path: str,
+        supabase=None,
+        engine: str = "auto",
+        backfill_days: int = DEFAULT_BACKFILL_DAYS,
+        overlap_seconds: int = DEFAULT_OVERLAP_SECONDS
+    ):
+        if engine == "auto":
+            engine = "duckdb" if duckdb is not None else "sqlite"
+        if engine == "duckdb" and duckdb is None:
+            raise ValueError("DuckDB no está instalado (pip install duckdb)")
+        if engine not in ("duckdb", "sqlite"):
+            raise ValueError(f"Motor de réplica no soportado: {engine}")
+
+        self.path = path
+        self.supabase = supabase
+        self.engine = engine
+        self.backfill_days = backfill_days
+        self.overlap_seconds = overlap_seconds
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if engine == "duckdb":
+            self._conn = duckdb.connect(path)
+        else:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+        for sentencia in _SCHEMA:
+            self._conn.execute(sentencia)
+        self._commit()
+
+    def _commit(self) -> None:
+        if self.engine == "sqlite":
+            self._conn.commit()
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            cursor = self._conn.execute(sql, list(params))
+            columnas = [d[0] for d in cursor.description]
+            return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+    # ------------------------------------------------------------------
+    # Sincronización
+    # ------------------------------------------------------------------
+
+    def marca(self) -> Optional[str]:
+        """Mayor fecha_ultima_actualizacion replicada (None si la réplica está vacía)."""
+        filas = self._query("SELECT marca FROM mirror_estado WHERE tabla = ?", (DAILY_TABLE,))
+        return filas[0]["marca"] if filas else None
+
+    def upsert_rows(self, rows: Sequence[Dict[str, Any]]) -> int:
+        """Inserta o reemplaza filas de Supabase en la réplica (llave ad_id, fecha, plataforma)."""
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        sql = f"INSERT OR REPLACE INTO {DAILY_TABLE} ({', '.join(COLUMNS)}) VALUES ({placeholders})"
+        with self._lock:
+            self._conn.executemany(sql, [fila_para_replica(r) for r in rows])
+            self._commit()
+        return len(rows)
+
+    def _guardar_marca(self, marca: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM mirror_estado WHERE tabla = ?", [DAILY_TABLE])
+            self._conn.execute(
+                "INSERT INTO mirror_estado (tabla, marca, actualizado_en) VALUES (?, ?, ?)",
+                [DAILY_TABLE, marca, datetime.utcnow().isoformat()]
+            )
+            self._commit()
+
+    def sincronizar(self, supabase=None) -> Dict[str, Any]:
+        """
+        Baja de Supabase las filas modificadas desde la última marca.
+
+        La primera vez replica los últimos ``backfill_days`` días (incluidos
+        los meses archivados en Parquet). Las
+        siguientes piden ``fecha_ultima_actualizacion >= marca - overlap``
+        (el margen cubre filas escritas mientras corría la sincronización
+        anterior); el upsert por llave hace que repetirlas no duplique nada.
+
+        Returns:
+            Dict con filas replicadas y la marca nueva
+        """
+        supabase = supabase or self.supabase
+        if supabase is None:
+            raise ValueError("La réplica necesita un cliente de Supabase para sincronizar")
+
+        marca_actual = self.marca()
+        query = supabase.table(DAILY_TABLE).select(", ".join(SOURCE_COLUMNS))
+        if marca_actual:
+            desde = _parse_marca(marca_actual) - timedelta(seconds=self.overlap_seconds)
+            query = query.gte("fecha_ultima_actualizacion", desde.isoformat())
+        else:
+            inicio = date.today() - timedelta(days=self.backfill_days)
+            query = query.gte("fecha_reporte", inicio.isoformat())
+            # Meses ya podados de la tabla: desde su Parquet (antes, para que
+            # las filas de la tabla caliente ganen si un mes se re-sincronizó)
+            try:
+                archivadas = DailyArchiveReader(supabase).leer_archivados(
+                    inicio, date.today(), columnas=SOURCE_COLUMNS
+                )
+                self.upsert_rows(archivadas)
+            except Exception as e:
+                logger.warning(f"⚠️ Réplica sin meses archivados: {e}")
+        query = query.order("fecha_ultima_actualizacion").order("ad_id") \
+            .order("fecha_reporte").order("publisher_platform")
+
+        total = 0
+        marca_nueva = marca_actual
+        start = 0
+        while True:
+            data = query.range(start, start + PAGE_SIZE - 1).execute().data or []
+            total += self.upsert_rows(data)
+            for row in data:
+                valor = row.get("fecha_ultima_actualizacion")
+                if valor and (marca_nueva is None or _parse_marca(valor) > _parse_marca(marca_nueva)):
+                    marca_nueva = valor
+
+            if len(data) < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+
+        if marca_nueva and marca_nueva != marca_actual:
+            self._guardar_marca(marca_nueva)
+
+        logger.info(f"🪞 Réplica {self.engine}: {total} filas sincronizadas (marca {marca_nueva})")
+        return {"filas": total, "marca": marca_nueva}
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def rollup(
+        self,
+        fecha_inicio: date,
+        fecha_fin: Optional[date] = None,
+        id_cuentas: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Totales por cuenta, fecha y plataforma (mismas filas que fetch_rollup).
+        """
+        fecha_fin = fecha_fin or fecha_inicio
+        params: List[Any] = [fecha_inicio.isoformat(), fecha_fin.isoformat()]
+        filtro_cuentas = ""
+        if id_cuentas:
+            filtro_cuentas = f"AND id_cuenta_publicitaria IN ({', '.join('?' for _ in id_cuentas)})"
+            params.extend(id_cuentas)
+
+        return self._query(f"""
+            SELECT
+                id_cuenta_publicitaria, fecha_reporte, publisher_platform,
+                MAX(nombre_nora) AS nombre_nora,
+                SUM(COALESCE(importe_gastado, 0)) AS spend,
+                SUM(COALESCE(impresiones, 0)) AS impressions,
+                SUM(COALESCE(alcance, 0)) AS reach,
+                SUM(COALESCE(clicks, 0)) AS clicks,
+                SUM(COALESCE(messaging_conversations_started, 0)) AS messages,
+                COUNT(DISTINCT ad_id) AS ads
+            FROM {DAILY_TABLE}
+            WHERE fecha_reporte BETWEEN ? AND ?
+              AND activo <> 0
+              {filtro_cuentas}
+            GROUP BY id_cuenta_publicitaria, fecha_reporte, publisher_platform
+            ORDER BY id_cuenta_publicitaria, fecha_reporte, publisher_platform
+        """, params)
+
+    def anuncios_del_dia(self, fecha: date) -> List[Dict[str, Any]]:
+        """Anuncios activos de una fecha con sus métricas básicas."""
+        return self._query(f"""
+            SELECT id_cuenta_publicitaria, ad_id, nombre_anuncio, publisher_platform,
+                   impresiones, clicks, alcance, importe_gastado
+            FROM {DAILY_TABLE}
+            WHERE fecha_reporte = ? AND activo <> 0
+        """, (fecha.isoformat(),))
+
+    def agregados_reporte(
+        self,
+        id_cuentas: Sequence[str],
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> List[Dict[str, Any]]:
+        """
+        Agregados de reporte semanal por cuenta, plataforma y campaña.
+
+        Devuelve las mismas filas que el RPC meta_ads_reporte_semanal_agregados
+        (columna ``nivel``), listas para ReportAggregator.from_sql_rows.
+        """
+        if not id_cuentas:
+            return []
+
+        filtro = (
+            f"WHERE id_cuenta_publicitaria IN ({', '.join('?' for _ in id_cuentas)}) "
+            "AND fecha_reporte BETWEEN ? AND ? AND activo <> 0"
+        )
+        params = list(id_cuentas) + [fecha_inicio.isoformat(), fecha_fin.isoformat()]
+        base = f"SELECT *, lower(COALESCE(publisher_platform, '')) AS plataforma FROM {DAILY_TABLE} {filtro}"
+
+        # Sin GROUPING SETS (SQLite no los soporta): una consulta por nivel
+        return self._query(f"""
+            WITH filas AS ({base})
+            SELECT 'total' AS nivel, id_cuenta_publicitaria, nombre_nora,
+                   NULL AS publisher_platform, NULL AS nombre_campana, {_REPORT_METRICS}
+            FROM filas GROUP BY id_cuenta_publicitaria, nombre_nora
+            UNION ALL
+            SELECT 'plataforma', id_cuenta_publicitaria, nombre_nora,
+                   plataforma, NULL, {_REPORT_METRICS}
+            FROM filas GROUP BY id_cuenta_publicitaria, nombre_nora, plataforma
+            UNION ALL
+            SELECT 'campana', id_cuenta_publicitaria, nombre_nora,
+                   NULL, nombre_campana, {_REPORT_METRICS}
+            FROM filas GROUP BY id_cuenta_publicitaria, nombre_nora, nombre_campana
+        """, params)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_shared_mirror: Optional[AnalyticsMirror] = None
+_shared_lock = threading.Lock()
+
+
+def get_analytics_mirror(supabase=None) -> Optional[AnalyticsMirror]:
+    """
+    Réplica compartida del proceso, o None si no está configurada.
+
+    La configuran META_ANALYTICS_MIRROR_PATH (archivo; vacío = desactivada),
+    META_ANALYTICS_MIRROR_ENGINE (auto, duckdb o sqlite) y
+    META_ANALYTICS_MIRROR_DAYS (días de la carga inicial).
+    """
+    global _shared_mirror
+    path = os.getenv('META_ANALYTICS_MIRROR_PATH', '').strip()
+    if not path:
+        return None
+
+    with _shared_lock:
+        if _shared_mirror is None:
+            _shared_mirror = AnalyticsMirror(
+                path,
+                engine=os.getenv('META_ANALYTICS_MIRROR_ENGINE', 'auto') or 'auto',
+                backfill_days=int(os.getenv('META_ANALYTICS_MIRROR_DAYS', str(DEFAULT_BACKFILL_DAYS)) or DEFAULT_BACKFILL_DAYS),
+            )
+        if _shared_mirror.supabase is None and supabase is not None:
+            _shared_mirror.supabase = supabase
+        return _shared_mirror
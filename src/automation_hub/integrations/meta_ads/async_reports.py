@@ -0,0 +1,216 @@
+"""
+Reportes asíncronos de insights de Meta Ads (report runs).
+
+Para cuentas grandes el ``GET /act_X/insights`` síncrono suele exceder el
+tiempo de Meta. En su lugar se crea un report run con ``POST /act_X/insights``
+y se consulta ``async_status`` / ``async_percent_completion`` hasta que
+termina. ``AsyncReportPoller`` consulta todos los report runs en curso del
+proceso con una sola request (``?ids=``), así muchas cuentas pueden esperar
+su reporte en paralelo sin multiplicar las consultas.
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+POLL_INITIAL_SECONDS = 5.0
+POLL_MAX_SECONDS = 30.0
+POLL_BACKOFF = 1.5
+REPORT_TIMEOUT_SECONDS = 1800.0
+MAX_IDS_PER_REQUEST = 50
+
+STATUS_COMPLETED = "Job Completed"
+STATUS_FAILED = {"Job Failed", "Job Skipped"}
+
+
+class AsyncReportError(Exception):
+    """El report run falló, fue omitido por Meta o excedió el tiempo de espera."""
+
+
+class AsyncReportPoller:
+    """
+    Espera compartida de report runs.
+
+    Cada worker llama ``wait(report_run_id)`` y queda bloqueado; un hilo de
+    fondo consulta el estado de todos los ids pendientes juntos, con intervalo
+    creciente mientras ninguno avanza.
+    """
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str,
+        poll_initial: float = POLL_INITIAL_SECONDS,
+        poll_max: float = POLL_MAX_SECONDS,
+        timeout: float = REPORT_TIMEOUT_SECONDS
+    ):
+        self.access_token = access_token
+        self.base_url = base_url
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pendientes: Dict[str, dict] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def start_report(self, account_path: str, params: Dict) -> str:
+        """
+        Crea un report run de insights.
+
+        Args:
+            account_path: act_XXXX
+            params: Mismos parámetros que el GET síncrono
+
+        Returns:
+            report_run_id
+        """
+        url = f"{self.base_url}/{account_path}/insights"
+        response = requests.post(url, data=params, timeout=60)
+        response.raise_for_status()
+        report_run_id = response.json().get("report_run_id")
+        if not report_run_id:
+            raise AsyncReportError(f"Meta no devolvió report_run_id para {account_path}")
+        logger.info(f"📨 Report run {report_run_id} creado para {account_path}")
+        return report_run_id
+
+    def wait(self, report_run_id: str) -> dict:
+        """
+        Bloquea hasta que el report run termine.
+
+        Returns:
+            Último estado del report run
+
+        Raises:
+            AsyncReportError: Si falla, es omitido o excede el timeout
+        """
+        entrada = {
+            "evento": threading.Event(),
+            "inicio": time.monotonic(),
+            "estado": None,
+            "error": None,
+        }
+        with self._lock:
+            self._pendientes[report_run_id] = entrada
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="meta-async-reports", daemon=True)
+                self._thread.start()
+
+        # El hilo de fondo marca el timeout; el margen extra cubre un poller caído
+        if not entrada["evento"].wait(self.timeout + self.poll_max):
+            with self._lock:
+                self._pendientes.pop(report_run_id, None)
+            raise AsyncReportError(f"Report run {report_run_id} sin respuesta del poller tras {self.timeout:.0f}s")
+        if entrada["error"]:
+            raise AsyncReportError(entrada["error"])
+        return entrada["estado"]
+
+    def _consultar(self, ids: List[str]) -> Dict[str, dict]:
+        """Estado de varios report runs en una sola request."""
+        response = requests.get(
+            f"{self.base_url}/",
+            params={
+                "ids": ",".join(ids),
+                "fields": "async_status,async_percent_completion",
+                "access_token": self.access_token,
+            },
+            timeout=30
+        )
+        response.raise_for_status()
+        return response.json() or {}
+
+    def _consultar_por_id(self, lote: List[str]) -> Dict[str, dict]:
+        """
+        Consulta cada id por separado cuando el lote falla; un id inválido
+        (error 4xx de Meta) termina con error sin frenar a los demás.
+        """
+        estados: Dict[str, dict] = {}
+        for report_run_id in lote:
+            try:
+                estados.update(self._consultar([report_run_id]))
+            except requests.exceptions.HTTPError as e:
+                status_code = e.response.status_code if e.response is not None else None
+                if status_code and 400 <= status_code < 500:
+                    self._finalizar(report_run_id, None, f"Report run {report_run_id} rechazado por Meta: {e}")
+                else:
+                    logger.warning(f"⚠️ Error consultando report run {report_run_id}: {e}")
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"⚠️ Error consultando report run {report_run_id}: {e}")
+        return estados
+
+    def _finalizar(self, report_run_id: str, estado: Optional[dict], error: Optional[str]) -> None:
+        with self._lock:
+            entrada = self._pendientes.pop(report_run_id, None)
+        if entrada:
+            entrada["estado"] = estado
+            entrada["error"] = error
+            entrada["evento"].set()
+
+    def _loop(self) -> None:
+        try:
+            self._poll()
+        except Exception as e:
+            logger.error(f"❌ Poller de report runs detenido: {e}")
+            with self._lock:
+                pendientes = list(self._pendientes)
+                self._thread = None
+            for report_run_id in pendientes:
+                self._finalizar(report_run_id, None, f"Poller de report runs detenido: {e}")
+
+    def _poll(self) -> None:
+        intervalo = self.poll_initial
+        while True:
+            time.sleep(intervalo)
+
+            with self._lock:
+                ids = list(self._pendientes)
+            if not ids:
+                with self._lock:
+                    if not self._pendientes:
+                        self._thread = None
+                        return
+                continue
+
+            avance = False
+            for start in range(0, len(ids), MAX_IDS_PER_REQUEST):
+                lote = ids[start:start + MAX_IDS_PER_REQUEST]
+                try:
+                    estados = self._consultar(lote)
+                except requests.exceptions.HTTPError as e:
+                    # Un solo id inválido hace fallar todo el ?ids=; se consulta uno por uno
+                    logger.warning(f"⚠️ Error consultando {len(lote)} report runs, se consultan por separado: {e}")
+                    estados = self._consultar_por_id(lote)
+                except requests.exceptions.RequestException as e:
+                    logger.warning(f"⚠️ Error consultando report runs: {e}")
+                    estados = {}
+
+                for report_run_id in lote:
+                    estado = estados.get(report_run_id) or {}
+                    status = estado.get("async_status")
+                    porcentaje = estado.get("async_percent_completion") or 0
+
+                    with self._lock:
+                        entrada = self._pendientes.get(report_run_id)
+                    if entrada is None:
+                        continue
+
+                    if status == STATUS_COMPLETED and porcentaje >= 100:
+                        avance = True
+                        self._finalizar(report_run_id, estado, None)
+                    elif status in STATUS_FAILED:
+                        avance = True
+                        self._finalizar(report_run_id, estado, f"Report run {report_run_id}: {status}")
+                    elif time.monotonic() - entrada["inicio"] > self.timeout:
+                        self._finalizar(
+                            report_run_id, estado,
+                            f"Report run {report_run_id} sin terminar tras {self.timeout:.0f}s ({porcentaje}%)"
+                        )
+                    else:
+                        if entrada["estado"] and porcentaje > (entrada["estado"].get("async_percent_completion") or 0):
+                            avance = True
+                        entrada["estado"] = estado
+
+            intervalo = self.poll_initial if avance else min(self.poll_max, intervalo * POLL_BACKOFF)
@@ -0,0 +1,304 @@
+"""
+Transformación columnar de páginas de insights de Meta Ads.
+
+Alternativa a ``MetaAdsDailySyncService.process_insight_to_daily_row`` para
+cuentas con decenas de miles de filas: cada lote de insights se convierte en
+columnas (NumPy si está instalado, ``array`` de la stdlib si no), las métricas
+derivadas (fallback de link_clicks, interacciones, mensajes y costo por
+mensaje) se calculan sobre las columnas completas y las filas se arman al
+final. El resultado es idéntico al de la transformación fila por fila salvo
+``fecha_sincronizacion``/``fecha_ultima_actualizacion``, que se toman una vez
+por lote.
+
+Un lote que no se puede convertir (valores que la transformación por fila
+rechaza) se procesa fila por fila para conservar los mismos errores.
+"""
+from array import array
+from datetime import date, datetime
+from itertools import repeat
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .action_metrics import parse_actions, safe_float, safe_int
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+DEFAULT_COLUMNAR_CHUNK = 2000
+_NAN = float("nan")
+
+# Columna destino <- campo del insight, copiados tal cual
+COPY_FIELDS = (
+    ('campana_id', 'campaign_id'),
+    ('conjunto_id', 'adset_id'),
+    ('nombre_anuncio', 'ad_name'),
+    ('nombre_campana', 'campaign_name'),
+    ('nombre_conjunto', 'adset_name'),
+    ('fecha_desde', 'date_start'),
+    ('fecha_hasta', 'date_stop'),
+    ('video_play_actions_data', 'video_play_actions'),
+    ('conversions_data', 'conversions'),
+    ('conversion_values_data', 'conversion_values'),
+    ('cost_per_action_type_data', 'cost_per_action_type'),
+    ('cost_per_conversion_data', 'cost_per_conversion'),
+    ('cost_per_outbound_click_data', 'cost_per_outbound_click'),
+    ('cost_per_unique_outbound_click_data', 'cost_per_unique_outbound_click'),
+)
+
+# Columna destino <- campo del insight, con safe_int
+INT_FIELDS = (
+    ('impresiones', 'impressions'),
+    ('alcance', 'reach'),
+    ('clicks', 'clicks'),
+    ('inline_link_clicks', 'inline_link_clicks'),
+    ('unique_clicks', 'unique_clicks'),
+    ('unique_inline_link_clicks', 'unique_inline_link_clicks'),
+    ('unique_impressions', 'unique_impressions'),
+    ('video_30_sec_watched', 'video_30_sec_watched_actions'),
+    ('video_p25_watched', 'video_p25_watched_actions'),
+    ('video_p50_watched', 'video_p50_watched_actions'),
+    ('video_p75_watched', 'video_p75_watched_actions'),
+    ('video_p100_watched', 'video_p100_watched_actions'),
+    ('estimated_ad_recallers_count', 'estimated_ad_recallers'),
+    ('thruplays_count', 'video_thruplay_watched_actions'),
+)
+
+# Columna destino <- campo del insight, con safe_float
+FLOAT_FIELDS = (
+    ('ctr', 'ctr'),
+    ('cpc', 'cpc'),
+    ('cost_per_1k_impressions', 'cpm'),
+    ('frequency', 'frequency'),
+    ('unique_ctr', 'unique_ctr'),
+    ('outbound_clicks_ctr', 'outbound_clicks_ctr'),
+    ('website_ctr', 'website_ctr'),
+    ('video_avg_time_watched', 'video_avg_time_watched_actions'),
+    ('website_purchase_roas_value', 'website_purchase_roas'),
+    ('purchase_roas_value', 'purchase_roas'),
+    ('cost_per_inline_link_click_value', 'cost_per_inline_link_click'),
+    ('cost_per_unique_click_value', 'cost_per_unique_click'),
+    ('cost_per_unique_inline_link_click_value', 'cost_per_unique_inline_link_click'),
+    ('cost_per_unique_link_click_value', 'cost_per_unique_link_click'),
+    ('inline_link_click_ctr_value', 'inline_link_click_ctr'),
+    ('unique_link_clicks_ctr_value', 'unique_link_clicks_ctr'),
+    ('estimated_ad_recall_rate_value', 'estimated_ad_recall_rate'),
+    ('cost_per_messaging_conversation_started', 'cost_per_messaging_conversation_started'),
+    ('cost_per_thruplay_value', 'cost_per_thruplay'),
+)
+
+# Columna destino <- contador de parse_actions, sin derivar
+ACTION_FIELDS = (
+    ('page_engagement', 'page_engagement'),
+    ('post_engagement', 'post_engagement'),
+    ('post_reactions', 'post_reactions'),
+    ('post_likes', 'post_likes'),
+    ('post_comments', 'post_comments'),
+    ('post_shares', 'post_shares'),
+    ('page_likes', 'page_likes'),
+    ('video_views', 'video_views'),
+    ('reproducciones_video_3s', 'video_plays_3s'),
+    ('landing_page_views', 'landing_page_views'),
+)
+
+
+def _derivadas_numpy(c: Dict[str, list]) -> Dict[str, list]:
+    """Métricas derivadas con NumPy; devuelve listas de tipos nativos."""
+    lc_ins = np.array(c['link_clicks_insight'], dtype=np.int64)
+    lc_act = np.array(c['link_clicks_actions'], dtype=np.int64)
+    ob_ins = np.array(c['outbound_insight'], dtype=np.int64)
+    ob_act = np.array(c['outbound_actions'], dtype=np.int64)
+    page = np.array(c['page_engagement'], dtype=np.int64)
+    post = np.array(c['post_engagement'], dtype=np.int64)
+    mcs = np.array(c['mcs_insight'], dtype=np.int64)
+    derivados = np.array(c['mensajes_actions'], dtype=np.int64)
+    con_actions = np.array(c['con_actions'], dtype=bool)
+    spend = np.array([_NAN if v is None else v for v in c['spend']], dtype=np.float64)
+
+    conversaciones = np.where(mcs > 0, mcs, 0)
+    conversaciones = np.where(con_actions & (derivados > conversaciones), derivados, conversaciones)
+    calculado = (conversaciones > 0) & (spend > 0)
+    costo = spend / np.where(conversaciones > 0, conversaciones, 1)
+
+    return {
+        'link_clicks': np.where((lc_ins == 0) & (lc_act > 0), lc_act, lc_ins).tolist(),
+        'interacciones': (page + post).tolist(),
+        'outbound_clicks': np.where(ob_ins != 0, ob_ins, ob_act).tolist(),
+        'messaging_conversations_started': conversaciones.tolist(),
+        'messages_source': np.where(mcs > 0, 'insight', 'derived').tolist(),
+        'costo_por_mensaje_total': [v if ok else None for v, ok in zip(costo.tolist(), calculado.tolist())],
+        'msg_cost_is_calculated': calculado.tolist(),
+        'sin_spend': ((conversaciones > 0) & np.isnan(spend)).tolist(),
+    }
+
+
+def _derivadas_array(c: Dict[str, list]) -> Dict[str, list]:
+    """Métricas derivadas con ``array`` de la stdlib (sin NumPy)."""
+    lc_ins = array('q', c['link_clicks_insight'])
+    lc_act = array('q', c['link_clicks_actions'])
+    ob_ins = array('q', c['outbound_insight'])
+    ob_act = array('q', c['outbound_actions'])
+    mcs = array('q', c['mcs_insight'])
+    derivados = array('q', c['mensajes_actions'])
+    spend = array('d', [_NAN if v is None else v for v in c['spend']])
+
+    conversaciones = array('q', [m if m > 0 else 0 for m in mcs])
+    conversaciones = array('q', [
+        d if con and d > conv else conv
+        for conv, d, con in zip(conversaciones, derivados, c['con_actions'])
+    ])
+    calculado = [conv > 0 and s > 0 for conv, s in zip(conversaciones, spend)]
+
+    return {
+        'link_clicks': [a if i == 0 and a > 0 else i for i, a in zip(lc_ins, lc_act)],
+        'interacciones': [p + q for p, q in zip(c['page_engagement'], c['post_engagement'])],
+        'outbound_clicks': [i or a for i, a in zip(ob_ins, ob_act)],
+        'messaging_conversations_started': conversaciones.tolist(),
+        'messages_source': ['insight' if m > 0 else 'derived' for m in mcs],
+        'costo_por_mensaje_total': [
+            s / conv if ok else None for s, conv, ok in zip(spend, conversaciones, calculado)
+        ],
+        'msg_cost_is_calculated': calculado,
+        'sin_spend': [conv > 0 and s != s for conv, s in zip(conversaciones, spend)],
+    }
+
+
+def _columnas(insights: Sequence[Dict]) -> Dict[str, list]:
+    """Extrae las columnas de un lote; lanza si algún valor no se puede convertir."""
+    c: Dict[str, list] = {}
+    for destino, campo in COPY_FIELDS:
+        c[destino] = [i.get(campo) for i in insights]
+    for destino, campo in INT_FIELDS:
+        c[destino] = [safe_int(i.get(campo, 0)) for i in insights]
+    for destino, campo in FLOAT_FIELDS:
+        c[destino] = [safe_float(i.get(campo)) for i in insights]
+
+    actions = [i.get('actions', []) for i in insights]
+    parsed = [parse_actions(a) for a in actions]
+    for destino, clave in ACTION_FIELDS:
+        c[destino] = [p[clave] for p in parsed]
+
+    c['ad_id'] = [str(i.get('ad_id') or i.get('id')) for i in insights]
+    c['publisher_platform'] = [i.get('publisher_platform') or 'facebook' for i in insights]
+    c['spend'] = [safe_float(i.get('spend', 0)) for i in insights]
+    c['actions'] = [a if a else None for a in actions]
+    c['con_actions'] = [bool(a) for a in actions]
+    c['link_clicks_insight'] = [safe_int(i.get('link_clicks', 0)) for i in insights]
+    c['link_clicks_actions'] = [p['link_clicks'] for p in parsed]
+    c['outbound_insight'] = [safe_int(i.get('outbound_clicks', 0)) for i in insights]
+    c['outbound_actions'] = [p['outbound_clicks'] for p in parsed]
+    c['mcs_insight'] = [safe_int(i.get('messaging_conversations_started')) for i in insights]
+    c['mensajes_actions'] = [p['messages'] for p in parsed]
+    return c
+
+
+def _filas_de_columnas(
+    c: Dict[str, list],
+    d: Dict[str, list],
+    account_id: str,
+    fecha_reporte: date,
+    nombre_nora: Optional[str]
+) -> List[Dict]:
+    ahora = datetime.utcnow().isoformat()
+    columnas = {
+        'ad_id': c['ad_id'],
+        'id_cuenta_publicitaria': repeat(account_id),
+        'fecha_reporte': repeat(fecha_reporte.isoformat()),
+        'fecha_sincronizacion': repeat(ahora),
+        'fecha_ultima_actualizacion': repeat(ahora),
+        'publisher_platform': c['publisher_platform'],
+        'nombre_nora': repeat(nombre_nora or ''),
+        'activo': repeat(True),
+        'importe_gastado': c['spend'],
+        'link_clicks': d['link_clicks'],
+        'interacciones': d['interacciones'],
+        'outbound_clicks': d['outbound_clicks'],
+        'messaging_conversations_started': d['messaging_conversations_started'],
+        'messaging_first_reply': repeat(0),
+        'mensajes_total': d['messaging_conversations_started'],
+        'cost_per_message': repeat(None),
+        'cost_per_messaging_first_reply': repeat(None),
+        'costo_por_mensaje_total': d['costo_por_mensaje_total'],
+        'msg_cost_is_calculated': d['msg_cost_is_calculated'],
+        'messages_source': d['messages_source'],
+        'actions': c['actions'],
+    }
+    for destino, _ in COPY_FIELDS + INT_FIELDS + FLOAT_FIELDS + ACTION_FIELDS:
+        columnas[destino] = c[destino]
+
+    claves = tuple(columnas)
+    return [dict(zip(claves, valores)) for valores in zip(*columnas.values())]
+
+
+def transform_insights_columnar(
+    service,
+    insights: Sequence[Dict],
+    account_id: str,
+    fecha_reporte: date,
+    nombre_nora: Optional[str] = None,
+    chunk_size: int = DEFAULT_COLUMNAR_CHUNK,
+    hash_fn=None
+) -> Iterator[Tuple[List[Dict], List[str]]]:
+    """
+    Transforma insights en filas de meta_ads_anuncios_daily por lotes.
+
+    Args:
+        service: MetaAdsDailySyncService (para el fallback fila por fila)
+        insights: Insights de la API
+        account_id: ID de la cuenta publicitaria
+        fecha_reporte: Fecha del reporte
+        nombre_nora: Nombre de Nora (tenant)
+        chunk_size: Insights por lote
+        hash_fn: Función de content_hash por fila
+
+    Yields:
+        Tuple (filas, errores) por lote, en el orden de los insights
+    """
+    derivadas = _derivadas_numpy if np is not None else _derivadas_array
+
+    for start in range(0, len(insights), max(1, chunk_size)):
+        lote = [i for i in insights[start:start + chunk_size] if i.get('ad_id') or i.get('id')]
+        if not lote:
+            continue
+
+        try:
+            c = _columnas(lote)
+            d = derivadas(c)
+        except Exception:
+            yield _por_fila(service, lote, account_id, fecha_reporte, nombre_nora)
+            continue
+
+        filas = _filas_de_columnas(c, d, account_id, fecha_reporte, nombre_nora)
+        errores: List[str] = []
+
+        # Con mensajes y spend inválido la transformación por fila falla; se replica
+        if any(d['sin_spend']):
+            for pos in [p for p, malo in enumerate(d['sin_spend']) if malo]:
+                fila, error = _transformar_una(service, lote[pos], account_id, fecha_reporte, nombre_nora)
+                filas[pos] = fila
+                if error:
+                    errores.append(error)
+            filas = [f for f in filas if f]
+
+        if hash_fn is not None:
+            for fila in filas:
+                fila['content_hash'] = hash_fn(fila)
+        yield filas, errores
+
+
+def _transformar_una(service, insight, account_id, fecha_reporte, nombre_nora) -> Tuple[Optional[Dict], Optional[str]]:
+    try:
+        return service.process_insight_to_daily_row(insight, account_id, fecha_reporte, nombre_nora), None
+    except Exception as e:
+        return None, f"Error procesando ad {insight.get('ad_id')}: {str(e)}"
+
+
+def _por_fila(service, lote, account_id, fecha_reporte, nombre_nora) -> Tuple[List[Dict], List[str]]:
+    filas, errores = [], []
+    for insight in lote:
+        fila, error = _transformar_una(service, insight, account_id, fecha_reporte, nombre_nora)
+        if fila:
+            filas.append(fila)
+        if error:
+            errores.append(error)
+    return filas, errores
@@ -0,0 +1,416 @@
+"""
+Archivo en Parquet de meta_ads_anuncios_daily.
+
+La tabla crece (anuncios × plataformas) filas por cuenta y día, cada una con
+varios JSONB (actions, cost_per_action_type_data, conversions_data...), y
+eso vuelve lentos los upserts y las consultas. DailyArchiver exporta los
+meses cerrados a un Parquet comprimido por (mes, cuenta) en Supabase Storage
+(``meta_ads_anuncios_daily/mes=YYYY-MM/cuenta=<id>.parquet``), lo registra
+en meta_ads_daily_archivo y borra esas filas de la tabla caliente.
+
+DailyArchiveReader lee un rango de fechas combinando la tabla caliente y los
+meses archivados, así que los reportes no necesitan saber dónde están las
+filas.
+
+Requiere pyarrow para escribir o leer Parquet; sin pyarrow la tabla caliente
+se sigue pudiendo leer con normalidad.
+"""
+import io
+import json
+import logging
+import os
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from automation_hub.db.repositories.meta_ads_archivo_repo import (
+    fetch_archivos,
+    marcar_podado,
+    registrar_archivo,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende del entorno
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+DAILY_TABLE = "meta_ads_anuncios_daily"
+DEFAULT_ARCHIVE_BUCKET = "meta-ads-archive"
+DEFAULT_HOT_MONTHS = 3
+PAGE_SIZE = 1000
+PARQUET_COMPRESSION = "zstd"
+DAILY_KEY = ("ad_id", "fecha_reporte", "publisher_platform")
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("pyarrow no está instalado (pip install pyarrow); no se puede usar el archivo Parquet")
+
+
+def primer_dia(fecha: date) -> date:
+    return fecha.replace(day=1)
+
+
+def mes_siguiente(mes: date) -> date:
+    return (primer_dia(mes) + timedelta(days=32)).replace(day=1)
+
+
+def meses_entre(fecha_inicio: date, fecha_fin: date) -> List[date]:
+    """Primeros días de los meses que toca el rango (inclusive)."""
+    meses = []
+    mes = primer_dia(fecha_inicio)
+    while mes <= fecha_fin:
+        meses.append(mes)
+        mes = mes_siguiente(mes)
+    return meses
+
+
+def limite_caliente(hoy: date, meses_calientes: int) -> date:
+    """
+    Primer día que se queda en la tabla caliente.
+
+    Se conservan el mes en curso y los ``meses_calientes`` anteriores; todo
+    lo anterior es un mes cerrado archivable.
+    """
+    mes = primer_dia(hoy)
+    for _ in range(meses_calientes):
+        mes = primer_dia(mes - timedelta(days=1))
+    return mes
+
+
+def llave_diaria(fila: Dict[str, Any]) -> Optional[Tuple]:
+    """Llave (ad_id, fecha, plataforma) de una fila; None si le faltan columnas."""
+    if not all(c in fila for c in DAILY_KEY):
+        return None
+    return tuple(str(fila[c])[:10] if c == "fecha_reporte" else fila[c] for c in DAILY_KEY)
+
+
+def ruta_archivo(mes: date, id_cuenta_publicitaria: str) -> str:
+    """Objeto de Storage de un (mes, cuenta), particionado estilo Hive."""
+    return f"{DAILY_TABLE}/mes={mes.strftime('%Y-%m')}/cuenta={id_cuenta_publicitaria}.parquet"
+
+
+def filas_a_parquet(rows: Sequence[Dict[str, Any]]) -> bytes:
+    """
+    Serializa filas de Supabase a Parquet comprimido.
+
+    Las columnas JSONB (listas/dicts) se guardan como texto JSON y se anotan
+    en los metadatos para devolverlas con su forma original al leer.
+    """
+    _require_pyarrow()
+    columnas: Dict[str, None] = {}
+    for row in rows:
+        for columna in row:
+            columnas.setdefault(columna, None)
+
+    json_columns = sorted(
+        c for c in columnas if any(isinstance(r.get(c), (list, dict)) for r in rows)
+    )
+    datos = {}
+    for columna in columnas:
+        valores = [r.get(columna) for r in rows]
+        if columna in json_columns:
+            valores = [None if v is None else json.dumps(v, ensure_ascii=False) for v in valores]
+        datos[columna] = valores
+
+    tabla = pa.table(datos).replace_schema_metadata({"json_columns": json.dumps(json_columns)})
+    buffer = io.BytesIO()
+    pq.write_table(tabla, buffer, compression=PARQUET_COMPRESSION)
+    return buffer.getvalue()
+
+
+def parquet_a_filas(data: bytes, columnas: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Lee un Parquet escrito por filas_a_parquet (opcionalmente solo algunas columnas)."""
+    _require_pyarrow()
+    archivo = pq.ParquetFile(io.BytesIO(data))
+    metadata = archivo.schema_arrow.metadata or {}
+    json_columns = set(json.loads(metadata.get(b"json_columns", b"[]")))
+
+    disponibles = set(archivo.schema_arrow.names)
+    seleccion = [c for c in columnas if c in disponibles] if columnas else None
+    filas = archivo.read(columns=seleccion).to_pylist()
+
+    for columna in json_columns & set(seleccion or disponibles):
+        for fila in filas:
+            if fila.get(columna) is not None:
+                fila[columna] = json.loads(fila[columna])
+    return filas
+
+
+class DailyArchiver:
+    """
+    Exporta meses cerrados de meta_ads_anuncios_daily a Parquet y los poda.
+
+    Ejemplo:
+        DailyArchiver(supabase).archivar_pendientes()
+    """
+
+    def __init__(
+        self,
+        supabase,
+        bucket: Optional[str] = None,
+        meses_calientes: Optional[int] = None,
+        podar: bool = True
+    ):
+        self.supabase = supabase
+        self.bucket = bucket or os.getenv('META_ARCHIVE_BUCKET', DEFAULT_ARCHIVE_BUCKET) or DEFAULT_ARCHIVE_BUCKET
+        if meses_calientes is None:
+            meses_calientes = int(os.getenv('META_ARCHIVE_HOT_MONTHS', str(DEFAULT_HOT_MONTHS)) or DEFAULT_HOT_MONTHS)
+        self.meses_calientes = meses_calientes
+        self.podar = podar
+
+    def mes_mas_antiguo(self) -> Optional[date]:
+        """Mes de la fila más vieja que sigue en la tabla caliente."""
+        data = self.supabase.table(DAILY_TABLE).select("fecha_reporte") \
+            .order("fecha_reporte").limit(1).execute().data or []
+        if not data:
+            return None
+        return primer_dia(date.fromisoformat(str(data[0]["fecha_reporte"])[:10]))
+
+    def meses_pendientes(self, hoy: Optional[date] = None) -> List[date]:
+        """Meses cerrados que todavía tienen filas en la tabla caliente."""
+        limite = limite_caliente(hoy or date.today(), self.meses_calientes)
+        inicio = self.mes_mas_antiguo()
+        if inicio is None or inicio >= limite:
+            return []
+        return meses_entre(inicio, limite - timedelta(days=1))
+
+    def cuentas(self) -> List[str]:
+        """Todas las cuentas registradas (activas o no: sus filas también se archivan)."""
+        data = self.supabase.table('meta_ads_cuentas').select('id_cuenta_publicitaria').execute().data or []
+        return sorted({c['id_cuenta_publicitaria'] for c in data if c.get('id_cuenta_publicitaria')})
+
+    def fetch_filas(self, id_cuenta_publicitaria: str, mes: date) -> List[Dict[str, Any]]:
+        """Todas las filas (activas o no) de una cuenta en un mes."""
+        filas: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            data = self.supabase.table(DAILY_TABLE).select("*") \
+                .eq("id_cuenta_publicitaria", id_cuenta_publicitaria) \
+                .gte("fecha_reporte", mes.isoformat()) \
+                .lt("fecha_reporte", mes_siguiente(mes).isoformat()) \
+                .order("fecha_reporte").order("ad_id").order("publisher_platform") \
+                .range(start, start + PAGE_SIZE - 1).execute().data or []
+            filas.extend(data)
+            if len(data) < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+        return filas
+
+    def archivar_cuenta_mes(self, id_cuenta_publicitaria: str, mes: date) -> Dict[str, Any]:
+        """
+        Exporta, verifica, registra y (si ``podar``) borra un (mes, cuenta).
+
+        Si el (mes, cuenta) ya estaba archivado y podado (una sincronización
+        volvió a escribir días de ese mes), el Parquet existente se combina
+        con las filas calientes por (ad_id, fecha, plataforma) y gana la
+        caliente. El Parquet se vuelve a descargar y se comparan las filas
+        antes de borrar nada. Solo se borran filas con
+        fecha_ultima_actualizacion hasta la última exportada: si una
+        sincronización reescribe el mes mientras tanto, esas filas se quedan
+        para la siguiente corrida.
+        """
+        _require_pyarrow()
+        filas = self.fetch_filas(id_cuenta_publicitaria, mes)
+        if not filas:
+            return {"cuenta": id_cuenta_publicitaria, "mes": mes.isoformat(), "filas": 0, "podadas": False}
+
+        ruta = ruta_archivo(mes, id_cuenta_publicitaria)
+        storage = self.supabase.storage.from_(self.bucket)
+
+        previo = next(iter(fetch_archivos(self.supabase, mes, mes, [id_cuenta_publicitaria])), None)
+        if previo and not previo.get("podado_en"):
+            # Sin podar, la tabla caliente todavía tiene todo el mes
+            previo = None
+        combinadas = filas
+        if previo:
+            por_llave: Dict[Any, Dict[str, Any]] = {}
+            for fila in parquet_a_filas(storage.download(previo["ruta"])) + filas:
+                llave = llave_diaria(fila)
+                por_llave[llave if llave is not None else id(fila)] = fila
+            combinadas = list(por_llave.values())
+            logger.info(
+                f"🗄️ {ruta}: {len(filas)} filas calientes combinadas con {previo.get('filas')} archivadas "
+                f"→ {len(combinadas)}"
+            )
+
+        data = filas_a_parquet(combinadas)
+        storage.upload(
+            path=ruta,
+            file=data,
+            file_options={"content-type": "application/vnd.apache.parquet", "upsert": "true"}
+        )
+
+        verificadas = pq.ParquetFile(io.BytesIO(storage.download(ruta))).metadata.num_rows
+        if verificadas != len(combinadas):
+            raise RuntimeError(f"Parquet incompleto en {ruta}: {verificadas} de {len(combinadas)} filas")
+        if previo and verificadas < int(previo.get("filas") or 0):
+            raise RuntimeError(f"Parquet de {ruta} perdió filas: {verificadas} de {previo.get('filas')} archivadas")
+
+        registrar_archivo(self.supabase, {
+            "mes": mes.isoformat(),
+            "id_cuenta_publicitaria": id_cuenta_publicitaria,
+            "ruta": ruta,
+            "filas": len(combinadas),
+            "bytes": len(data),
+            "gasto": round(sum(float(f.get("importe_gastado") or 0) for f in combinadas), 2),
+            # Un mes ya podado sigue podado: sus filas viejas solo están en el Parquet
+            "podado_en": previo.get("podado_en") if previo else None,
+        })
+
+        podadas = False
+        if self.podar:
+            marca = max(str(f.get("fecha_ultima_actualizacion") or "") for f in filas)
+            query = self.supabase.table(DAILY_TABLE).delete() \
+                .eq("id_cuenta_publicitaria", id_cuenta_publicitaria) \
+                .gte("fecha_reporte", mes.isoformat()) \
+                .lt("fecha_reporte", mes_siguiente(mes).isoformat())
+            if marca:
+                query = query.lte("fecha_ultima_actualizacion", marca)
+            query.execute()
+            marcar_podado(self.supabase, mes, id_cuenta_publicitaria)
+            podadas = True
+
+        logger.info(f"🗄️ {ruta}: {len(combinadas)} filas, {len(data) / 1024:.1f} KB{' (podadas)' if podadas else ''}")
+        return {"cuenta": id_cuenta_publicitaria, "mes": mes.isoformat(), "filas": len(filas), "podadas": podadas}
+
+    def archivar_pendientes(self, hoy: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Archiva todos los meses cerrados que siguen en la tabla caliente.
+
+        Returns:
+            Dict con meses, archivos, filas y errores por (mes, cuenta)
+        """
+        _require_pyarrow()
+        meses = self.meses_pendientes(hoy)
+        resultado: Dict[str, Any] = {"meses": [m.isoformat() for m in meses], "archivos": 0, "filas": 0, "errores": []}
+        if not meses:
+            return resultado
+
+        cuentas = self.cuentas()
+        for mes in meses:
+            for cuenta in cuentas:
+                try:
+                    archivo = self.archivar_cuenta_mes(cuenta, mes)
+                except Exception as e:
+                    logger.error(f"❌ Error archivando {cuenta} {mes:%Y-%m}: {e}")
+                    resultado["errores"].append({"cuenta": cuenta, "mes": mes.isoformat(), "error": str(e)})
+                    continue
+                if archivo["filas"]:
+                    resultado["archivos"] += 1
+                    resultado["filas"] += archivo["filas"]
+        return resultado
+
+
+class DailyArchiveReader:
+    """
+    Lee filas de meta_ads_anuncios_daily de la tabla caliente y del archivo.
+
+    Ejemplo:
+        reader = DailyArchiveReader(supabase)
+        filas = reader.leer(date(2025, 1, 1), date(2025, 3, 31), id_cuentas=['act_1'])
+    """
+
+    def __init__(self, supabase, bucket: Optional[str] = None):
+        self.supabase = supabase
+        self.bucket = bucket or os.getenv('META_ARCHIVE_BUCKET', DEFAULT_ARCHIVE_BUCKET) or DEFAULT_ARCHIVE_BUCKET
+        self._parquets: Dict[str, bytes] = {}
+
+    def archivos(
+        self,
+        fecha_inicio: date,
+        fecha_fin: date,
+        id_cuentas: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """(mes, cuenta) del rango ya podados de la tabla caliente."""
+        registrados = fetch_archivos(self.supabase, primer_dia(fecha_inicio), primer_dia(fecha_fin), id_cuentas)
+        return [a for a in registrados if a.get("podado_en")]
+
+    def _descargar(self, ruta: str) -> bytes:
+        if ruta not in self._parquets:
+            self._parquets[ruta] = self.supabase.storage.from_(self.bucket).download(ruta)
+        return self._parquets[ruta]
+
+    def leer_archivados(
+        self,
+        fecha_inicio: date,
+        fecha_fin: date,
+        id_cuentas: Optional[Sequence[str]] = None,
+        columnas: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Filas del rango que viven solo en Parquet."""
+        archivos = self.archivos(fecha_inicio, fecha_fin, id_cuentas)
+        if not archivos:
+            return []
+        _require_pyarrow()
+
+        desde, hasta = fecha_inicio.isoformat(), fecha_fin.isoformat()
+        lectura = list(columnas) + ["fecha_reporte"] if columnas else None
+        filas: List[Dict[str, Any]] = []
+        for archivo in archivos:
+            for fila in parquet_a_filas(self._descargar(archivo["ruta"]), lectura):
+                if desde <= str(fila.get("fecha_reporte"))[:10] <= hasta:
+                    if columnas and "fecha_reporte" not in columnas:
+                        fila.pop("fecha_reporte", None)
+                    filas.append(fila)
+        return filas
+
+    def leer_calientes(
+        self,
+        fecha_inicio: date,
+        fecha_fin: date,
+        id_cuentas: Optional[Sequence[str]] = None,
+        columnas: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Filas del rango en la tabla caliente (paginado, cuentas por lotes de 200)."""
+        seleccion = ", ".join(columnas) if columnas else "*"
+        lotes: Iterable[Optional[List[str]]] = (
+            [list(id_cuentas[i:i + 200]) for i in range(0, len(id_cuentas), 200)] if id_cuentas else [None]
+        )
+        filas: List[Dict[str, Any]] = []
+        for lote in lotes:
+            start = 0
+            while True:
+                query = self.supabase.table(DAILY_TABLE).select(seleccion) \
+                    .gte("fecha_reporte", fecha_inicio.isoformat()) \
+                    .lte("fecha_reporte", fecha_fin.isoformat())
+                if lote:
+                    query = query.in_("id_cuenta_publicitaria", lote)
+                query = query.order("id_cuenta_publicitaria").order("fecha_reporte") \
+                    .order("ad_id").order("publisher_platform")
+                data = query.range(start, start + PAGE_SIZE - 1).execute().data or []
+                filas.extend(data)
+                if len(data) < PAGE_SIZE:
+                    break
+                start += PAGE_SIZE
+        return filas
+
+    def leer(
+        self,
+        fecha_inicio: date,
+        fecha_fin: date,
+        id_cuentas: Optional[Sequence[str]] = None,
+        columnas: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Filas del rango sin importar si están en la tabla o archivadas.
+
+        Si un mes archivado se volvió a sincronizar, la fila de la tabla
+        caliente gana sobre la del Parquet (misma llave ad_id, fecha, plataforma).
+        Si el archivo no se puede leer se devuelven solo las filas calientes.
+        """
+        calientes = self.leer_calientes(fecha_inicio, fecha_fin, id_cuentas, columnas)
+        try:
+            archivadas = self.leer_archivados(fecha_inicio, fecha_fin, id_cuentas, columnas)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo leer el archivo Parquet, solo filas calientes: {e}")
+            return calientes
+        if not archivadas:
+            return calientes
+
+        vistas = {llave_diaria(f) for f in calientes}
+        vistas.discard(None)
+        return calientes + [f for f in archivadas if llave_diaria(f) is None or llave_diaria(f) not in vistas]
@@ -8,10 +8,122 @@ en lugar de rangos de fechas, usando la tabla meta_ads_anuncios_daily.
 import os
 import json
 import time
+import hashlib
 import requests
 from datetime import datetime, date, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from ...db.supabase_client import create_client_from_env
+from ...db.repositories.meta_ads_daily_repo import (
+    upsert_anuncios_daily,
+    fetch_hashes_daily,
+    desactivar_filas_daily,
+    DEFAULT_UPSERT_CHUNK_SIZE,
+)
+from ...db.repositories.meta_ads_rollup_repo import fetch_conteo_anuncios_por_cuenta, refrescar_rollup_cuenta
+from .async_reports import AsyncReportPoller
+from .action_metrics import MSG_TYPES, parse_actions, safe_float, safe_int
+from .columnar_transform import DEFAULT_COLUMNAR_CHUNK, transform_insights_columnar
+from .pipeline import (
+    BoundedWriter,
+    agrupar_paginas,
+    prefetch,
+    DEFAULT_PREFETCH_PAGES,
+    DEFAULT_WRITE_QUEUE,
+)
+from .account_scheduler import (
+    AccountScheduler,
+    MetaUsageGovernor,
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_TARGET_USAGE_PCT,
+)
+
+# Columnas que cambian en cada sincronización y no forman parte del contenido
+HASH_EXCLUDED_FIELDS = {'fecha_sincronizacion', 'fecha_ultima_actualizacion', 'activo', 'content_hash'}
+
+
+def compute_daily_row_hash(row: Dict) -> str:
+    """
+    Calcula un hash estable del contenido de una fila diaria.
+
+    Args:
+        row: Fila ya transformada para meta_ads_anuncios_daily
+
+    Returns:
+        Hash SHA-256 en hexadecimal
+    """
+    contenido = json.dumps(
+        {k: v for k, v in row.items() if k not in HASH_EXCLUDED_FIELDS},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+class DailyRowDiff:
+    """
+    Diff incremental contra los hashes existentes de una cuenta.
+
+    Permite filtrar las filas lote por lote conforme llegan del pipeline; al
+    final ``desaparecidas`` devuelve las filas activas que la API no reportó.
+    Solo guarda las llaves vistas, no las filas.
+    """
+
+    def __init__(self, existentes: Dict[Tuple[str, str, str], Dict]):
+        self.existentes = existentes
+        self.vistas = set()
+        self.sin_cambios = 0
+
+    def filtrar(self, rows: List[Dict]) -> List[Dict]:
+        """
+        Devuelve las filas a escribir (nuevas, con hash distinto o inactivas).
+
+        Una fila existente cuenta como cambiada si su hash difiere o si está
+        marcada como inactiva (la API la volvió a reportar, así que se reactiva).
+        """
+        cambiadas: List[Dict] = []
+        for row in rows:
+            llave = (row['ad_id'], row['fecha_reporte'], row['publisher_platform'])
+            self.vistas.add(llave)
+            actual = self.existentes.get(llave)
+            if actual and actual.get('content_hash') == row['content_hash'] and actual.get('activo') is not False:
+                self.sin_cambios += 1
+            else:
+                cambiadas.append(row)
+        return cambiadas
+
+    def desaparecidas(self, fechas: Optional[Set[str]] = None) -> List[Tuple[str, str, str]]:
+        """
+        Llaves activas que no se vieron.
+
+        Args:
+            fechas: Limitar a estas fechas ISO (None = todas las existentes)
+        """
+        return [
+            llave for llave, actual in self.existentes.items()
+            if llave not in self.vistas
+            and actual.get('activo') is not False
+            and (fechas is None or llave[1] in fechas)
+        ]
+
+
+def diff_daily_rows(
+    rows: List[Dict],
+    existentes: Dict[Tuple[str, str, str], Dict]
+) -> Tuple[List[Dict], List[Tuple[str, str, str]], int]:
+    """
+    Separa las filas de la API en cambiadas y sin cambios, y detecta las desaparecidas.
+
+    Args:
+        rows: Filas transformadas (con content_hash)
+        existentes: Resultado de fetch_hashes_daily
+
+    Returns:
+        Tuple (filas_a_escribir, llaves_desaparecidas, total_sin_cambios)
+    """
+    diff = DailyRowDiff(existentes)
+    cambiadas = diff.filtrar(rows)
+    return cambiadas, diff.desaparecidas(), diff.sin_cambios
 
 
 class MetaAdsDailySyncService:
@@ -21,14 +133,28 @@ class MetaAdsDailySyncService:
     GRAPH_API_VERSION = os.getenv('META_API_VERSION', 'v23.0')
     BASE_URL = f"https://graph.facebook.com/{GRAPH_API_VERSION}"
     
-    # Cache configuration
-    NAME_CACHE_TTL = int(os.getenv('NAMES_CACHE_TTL', '3600'))
-    _name_cache = {}
-    
     # Debug configuration
     LOG_DEBUG = os.getenv("META_SYNC_DEBUG", "0") == "1"
     LOG_EVERY = int(os.getenv("META_SYNC_LOG_EVERY", "100") or "100")
     
+    # Filas por request de upsert a Supabase
+    UPSERT_CHUNK_SIZE = int(os.getenv("META_SYNC_UPSERT_CHUNK", str(DEFAULT_UPSERT_CHUNK_SIZE)) or DEFAULT_UPSERT_CHUNK_SIZE)
+    
+    # Concurrencia entre cuentas y uso de API objetivo (headers de uso de Meta)
+    MAX_WORKERS = int(os.getenv("META_SYNC_MAX_WORKERS", str(DEFAULT_MAX_WORKERS)) or DEFAULT_MAX_WORKERS)
+    TARGET_USAGE_PCT = float(os.getenv("META_SYNC_TARGET_USAGE", str(DEFAULT_TARGET_USAGE_PCT)) or DEFAULT_TARGET_USAGE_PCT)
+    
+    # Cuentas con al menos estas filas históricas usan reportes asíncronos
+    ASYNC_ROW_THRESHOLD = int(os.getenv("META_SYNC_ASYNC_THRESHOLD", "2000") or "2000")
+    
+    # Páginas con al menos estos insights usan la transformación columnar (0 = desactivada)
+    COLUMNAR_MIN_ROWS = int(os.getenv("META_SYNC_COLUMNAR_MIN_ROWS", "10000") or "0")
+    
+    # Pipeline en streaming: páginas adelantadas y lotes en cola de escritura
+    PREFETCH_PAGES = int(os.getenv("META_SYNC_PREFETCH_PAGES", str(DEFAULT_PREFETCH_PAGES)) or DEFAULT_PREFETCH_PAGES)
+    WRITE_QUEUE = int(os.getenv("META_SYNC_WRITE_QUEUE", str(DEFAULT_WRITE_QUEUE)) or DEFAULT_WRITE_QUEUE)
+    PIPELINE_BATCH_ROWS = DEFAULT_COLUMNAR_CHUNK
+    
     # Fields que funcionan CON breakdowns (publisher_platform + action_type)
     # Probados y verificados: 26 campos adicionales disponibles
     INSIGHT_FIELDS = [
@@ -87,16 +213,7 @@ class MetaAdsDailySyncService:
     ]
     
     # Action types que representan mensajes
-    MSG_TYPES = {
-        "onsite_conversion.messaging_conversation_started_7d",
-        "onsite_conversion.messaging_conversation_started",
-        "messaging_conversation_started_7d",
-        "messaging_conversation_started",
-        "onsite_conversion.messaging_first_reply",
-        "messaging_first_reply",
-        "onsite_conversion.total_messaging_connection",
-        "total_messaging_connection",
-    }
+    MSG_TYPES = MSG_TYPES
     
     def __init__(self, supabase_client=None):
         """Initialize service with Supabase client"""
@@ -104,6 +221,8 @@ class MetaAdsDailySyncService:
         self.access_token = os.getenv('META_ACCESS_REDACTED_TOKEN')
         if not self.access_token:
             raise ValueError("META_ACCESS_REDACTED_TOKEN environment variable is required")
+        self.usage_governor = MetaUsageGovernor(self.MAX_WORKERS, self.TARGET_USAGE_PCT)
+        self.report_poller = AsyncReportPoller(self.access_token, self.BASE_URL)
     
     @staticmethod
     def clean_surrogates(text: str) -> str:
@@ -142,141 +261,162 @@ class MetaAdsDailySyncService:
         result = query.execute()
         return result.data or []
     
-    def paginate_insights(self, url: str, params: Optional[Dict] = None, timeout: int = 30) -> List[Dict]:
+    def iter_insight_pages(
+        self,
+        url: str,
+        params: Optional[Dict] = None,
+        timeout: int = 30,
+        account_id: Optional[str] = None
+    ) -> Iterator[List[Dict]]:
         """
-        Pagina a través de todas las páginas de insights de Meta API
+        Genera las páginas de insights de Meta API conforme llegan.
+        
+        Entre páginas espera lo que indiquen los headers de uso de Meta
+        (sin pausa con uso bajo, más larga al acercarse al límite).
+        Los errores se propagan al llamador.
         """
-        all_insights = []
+        usage_key = account_id or url
         current_url = url
         current_params = params
         page_num = 1
+        total = 0
         
         while True:
-            try:
-                self._debug(f"📊 Obteniendo página {page_num} de insights...")
-                response = requests.get(current_url, params=current_params, timeout=timeout)
-                response.raise_for_status()
-                
-                data = response.json()
-                page_insights = data.get('data', [])
-                all_insights.extend(page_insights)
-                
-                print(f"   ✅ Página {page_num}: {len(page_insights)} insights (Total: {len(all_insights)})")
-                
-                # Verificar si hay siguiente página
-                next_url = (data.get('paging') or {}).get('next')
-                if not next_url:
-                    break
-                
-                # Para siguientes páginas, usar la URL completa
-                current_url = next_url
-                current_params = None  # URL next ya incluye parámetros
-                page_num += 1
-                
-                # Backoff para evitar rate limits
-                time.sleep(0.4)
-                
-            except Exception as e:
-                print(f"❌ Error en paginación: {self.clean_surrogates(str(e))}")
+            self._debug(f"📊 Obteniendo página {page_num} de insights...")
+            self.usage_governor.pace(usage_key)
+            response = requests.get(current_url, params=current_params, timeout=timeout)
+            self.usage_governor.record(usage_key, response.headers)
+            response.raise_for_status()
+            
+            data = response.json()
+            page_insights = data.get('data', [])
+            total += len(page_insights)
+            
+            print(f"   ✅ Página {page_num}: {len(page_insights)} insights (Total: {total})")
+            yield page_insights
+            
+            # Verificar si hay siguiente página
+            next_url = (data.get('paging') or {}).get('next')
+            if not next_url:
                 break
+            
+            # Para siguientes páginas, usar la URL completa
+            current_url = next_url
+            current_params = None  # URL next ya incluye parámetros
+            page_num += 1
+    
+    def paginate_insights(
+        self,
+        url: str,
+        params: Optional[Dict] = None,
+        timeout: int = 30,
+        account_id: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Pagina a través de todas las páginas de insights de Meta API
+        
+        Ante un error devuelve lo obtenido hasta ese momento.
+        """
+        all_insights = []
+        try:
+            for page_insights in self.iter_insight_pages(url, params, timeout, account_id):
+                all_insights.extend(page_insights)
+        except Exception as e:
+            print(f"❌ Error en paginación: {self.clean_surrogates(str(e))}")
         
         return all_insights
     
+    def iter_insights_async(self, base_account_id: str, params: Dict) -> Iterator[List[Dict]]:
+        """
+        Genera las páginas de insights de un report run asíncrono.
+        
+        Crea el reporte, espera a que termine (la espera se comparte con las
+        demás cuentas en curso) y recorre sus páginas de resultados.
+        
+        Raises:
+            AsyncReportError: Si el reporte falla o no termina a tiempo
+        """
+        account_path = f"act_{base_account_id}"
+        report_params = {k: v for k, v in params.items() if k != 'limit'}
+        
+        self.usage_governor.pace(base_account_id)
+        report_run_id = self.report_poller.start_report(account_path, report_params)
+        print(f"⏳ Esperando reporte asíncrono {report_run_id} de {account_path}")
+        self.report_poller.wait(report_run_id)
+        
+        results_url = f"{self.BASE_URL}/{report_run_id}/insights"
+        results_params = {'access_token': self.access_token, 'limit': params.get('limit', 500)}
+        yield from self.iter_insight_pages(
+            results_url, results_params, timeout=60, account_id=base_account_id
+        )
+    
+    def fetch_insights_async(self, base_account_id: str, params: Dict) -> List[Dict]:
+        """Obtiene todos los insights de un report run asíncrono (ver iter_insights_async)."""
+        return [insight for page in self.iter_insights_async(base_account_id, params) for insight in page]
+    
+    def iter_insights(
+        self,
+        base_account_id: str,
+        params: Dict,
+        expected_rows: Optional[int] = None
+    ) -> Iterator[List[Dict]]:
+        """
+        Genera páginas de insights eligiendo modo síncrono o asíncrono.
+        
+        Las cuentas cuyo histórico supera ASYNC_ROW_THRESHOLD filas van directo
+        a reporte asíncrono; las demás usan el GET síncrono y, si falla (timeout
+        o "reduce the amount of data") antes de la primera página, se reintentan
+        en modo asíncrono. Un fallo a media paginación se propaga: las páginas
+        ya entregadas no se pueden repetir.
+        """
+        if expected_rows is not None and expected_rows >= self.ASYNC_ROW_THRESHOLD:
+            print(f"📨 Cuenta grande ({expected_rows} filas históricas): usando reporte asíncrono")
+            yield from self.iter_insights_async(base_account_id, params)
+            return
+        
+        url = f"{self.BASE_URL}/act_{base_account_id}/insights"
+        paginas = self.iter_insight_pages(url, params, account_id=base_account_id)
+        try:
+            primera = next(paginas, None)
+        except Exception as e:
+            print(f"⚠️ Insights síncronos fallaron ({self.clean_surrogates(str(e))}), reintentando asíncrono")
+            yield from self.iter_insights_async(base_account_id, params)
+            return
+        
+        if primera is not None:
+            yield primera
+            yield from paginas
+    
+    def fetch_insights(
+        self,
+        base_account_id: str,
+        params: Dict,
+        expected_rows: Optional[int] = None
+    ) -> List[Dict]:
+        """Obtiene todos los insights de la cuenta (ver iter_insights)."""
+        return [insight for page in self.iter_insights(base_account_id, params, expected_rows) for insight in page]
+    
     def derive_messages_from_actions(self, actions: List[Dict]) -> int:
         """Deriva total de mensajes desde actions cuando no viene messaging_conversations_started"""
-        total = 0.0
-        for action in (actions or []):
-            action_type = (action.get("action_type") or "").strip()
-            if action_type in self.MSG_TYPES:
-                try:
-                    total += float(action.get("value", 0))
-                except (TypeError, ValueError):
-                    pass
-        return int(total)
+        return parse_actions(actions)['messages']
     
     def extract_all_metrics_from_actions(self, actions: List[Dict]) -> Dict:
-        """Extrae TODAS las métricas posibles desde el array de actions"""
-        metrics = {
-            'link_clicks': 0,
-            'page_engagement': 0,
-            'post_engagement': 0,
-            'video_views': 0,
-            'post_reactions': 0,
-            'post_likes': 0,
-            'post_comments': 0,
-            'post_shares': 0,
-            'landing_page_views': 0,
-            'page_likes': 0,
-            'video_plays_3s': 0,
-            'video_plays_15s': 0,
-            'outbound_clicks': 0,
-        }
-        
-        for action in (actions or []):
-            action_type = (action.get("action_type") or "").strip()
-            try:
-                value = int(float(action.get("value", 0)))
-            except (TypeError, ValueError):
-                value = 0
-            
-            # Link clicks
-            if action_type in ['link_click', 'onsite_conversion.link_click']:
-                metrics['link_clicks'] += value
-            
-            # Page engagement
-            elif action_type in ['page_engagement', 'onsite_conversion.page_engagement']:
-                metrics['page_engagement'] += value
-            
-            # Post engagement
-            elif action_type in ['post_engagement', 'onsite_conversion.post_engagement']:
-                metrics['post_engagement'] += value
-            
-            # Video views
-            elif action_type in ['video_view', 'onsite_conversion.video_view']:
-                metrics['video_views'] += value
-            
-            # Post reactions
-            elif action_type in ['post_reaction', 'onsite_conversion.post_reaction', 'onsite_conversion.post_net_like']:
-                metrics['post_reactions'] += value
-                if 'like' in action_type.lower():
-                    metrics['post_likes'] += value
-            
-            # Comments
-            elif action_type in ['comment', 'onsite_conversion.comment']:
-                metrics['post_comments'] += value
-            
-            # Shares
-            elif action_type in ['post', 'onsite_conversion.post']:
-                metrics['post_shares'] += value
-            
-            # Landing page views
-            elif action_type in ['landing_page_view', 'omni_landing_page_view', 'onsite_conversion.landing_page_view']:
-                metrics['landing_page_views'] += value
-            
-            # Page likes
-            elif action_type in ['like', 'page_like', 'onsite_conversion.page_like']:
-                metrics['page_likes'] += value
-            
-            # Outbound clicks
-            elif action_type in ['outbound_click', 'onsite_conversion.outbound_click']:
-                metrics['outbound_clicks'] += value
-        
-        return metrics
+        """Extrae TODAS las métricas posibles desde el array de actions (una sola pasada)"""
+        return parse_actions(actions)
     
-    def compute_messaging_metrics(self, insight: Dict, sdk_data: Optional[Dict], actions: List[Dict], spend: float) -> Dict:
-        """Unifica KPIs de mensajería con prioridad: SDK > insight > derivado de actions"""
-        def _to_int(x):
-            try:
-                return int(float(x) if x is not None else 0)
-            except Exception:
-                return 0
-        
-        def _to_float(x):
-            try:
-                return float(x) if x is not None else None
-            except Exception:
-                return None
+    def compute_messaging_metrics(
+        self,
+        insight: Dict,
+        sdk_data: Optional[Dict],
+        actions: List[Dict],
+        spend: float,
+        action_metrics: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Unifica KPIs de mensajería con prioridad: SDK > insight > derivado de actions
         
+        ``action_metrics`` (resultado de parse_actions) evita recorrer actions otra vez.
+        """
         out = {
             "messaging_conversations_started": 0,
             "messaging_first_reply": 0,
@@ -291,18 +431,20 @@ class MetaAdsDailySyncService:
         
         # 1) Insight directo (oficial de Meta)
         if insight:
-            mcs = _to_int(insight.get("messaging_conversations_started"))
+            mcs = safe_int(insight.get("messaging_conversations_started"))
             if mcs > 0:
                 out["messaging_conversations_started"] = mcs
                 out["messages_source"] = "insight"
             
-            cpmcs = _to_float(insight.get("cost_per_messaging_conversation_started"))
+            cpmcs = safe_float(insight.get("cost_per_messaging_conversation_started"))
             if cpmcs is not None:
                 out["cost_per_messaging_conversation_started"] = cpmcs
         
         # 2) Derivado de actions (fallback)
         if actions:
-            derived_messages = self.derive_messages_from_actions(actions)
+            if action_metrics is None:
+                action_metrics = parse_actions(actions)
+            derived_messages = action_metrics['messages']
             if derived_messages > out["messaging_conversations_started"]:
                 out["messaging_conversations_started"] = derived_messages
                 if out["messages_source"] == "derived":
@@ -345,34 +487,14 @@ class MetaAdsDailySyncService:
         # Platform
         platform = insight.get('publisher_platform') or 'facebook'
         
-        # Helper para convertir a int seguro
-        def safe_int(value):
-            if value is None:
-                return 0
-            if isinstance(value, (int, float)):
-                return int(value)
-            if isinstance(value, str):
-                try:
-                    return int(float(value))
-                except (ValueError, TypeError):
-                    return 0
-            if isinstance(value, list):
-                return sum(int(float(item.get('value', 0))) for item in value if isinstance(item, dict))
-            return 0
-        
-        # Helper para convertir a float seguro
-        def safe_float(value):
-            try:
-                return float(value) if value is not None else None
-            except (TypeError, ValueError):
-                return None
-        
-        # Procesar messaging metrics
+        # Extraer TODAS las métricas desde actions (una sola pasada)
         actions = insight.get('actions', [])
-        messaging_metrics = self.compute_messaging_metrics(insight, None, actions, safe_float(insight.get('spend', 0)))
+        action_metrics = parse_actions(actions)
         
-        # Extraer TODAS las métricas desde actions
-        action_metrics = self.extract_all_metrics_from_actions(actions)
+        # Procesar messaging metrics
+        messaging_metrics = self.compute_messaging_metrics(
+            insight, None, actions, safe_float(insight.get('spend', 0)), action_metrics
+        )
         
         # Calcular link_clicks: preferir de actions si no viene en insight
         link_clicks_value = safe_int(insight.get('link_clicks', 0))
@@ -506,13 +628,170 @@ class MetaAdsDailySyncService:
             'actions': actions if actions else None
         }
         
+        data['content_hash'] = compute_daily_row_hash(data)
         return data
     
+    def transform_insights(
+        self,
+        insights: List[Dict],
+        account_id: str,
+        fecha_reporte: date,
+        nombre_nora: Optional[str] = None,
+        columnar: Optional[bool] = None
+    ) -> Tuple[List[Dict], List[str]]:
+        """
+        Convierte insights en filas de meta_ads_anuncios_daily.
+        
+        Con COLUMNAR_MIN_ROWS insights o más usa la transformación columnar
+        (mismo resultado, menos CPU por fila); si no, process_insight_to_daily_row.
+        ``columnar`` fuerza la decisión (el pipeline la toma con el tamaño de
+        la cuenta, no del lote).
+        
+        Returns:
+            Tuple (filas, errores)
+        """
+        rows: List[Dict] = []
+        errors: List[str] = []
+        
+        if columnar is None:
+            columnar = bool(self.COLUMNAR_MIN_ROWS) and len(insights) >= self.COLUMNAR_MIN_ROWS
+        
+        if columnar:
+            lotes = transform_insights_columnar(
+                self, insights, account_id, fecha_reporte, nombre_nora,
+                chunk_size=DEFAULT_COLUMNAR_CHUNK, hash_fn=compute_daily_row_hash
+            )
+            for filas, errores in lotes:
+                rows.extend(filas)
+                errors.extend(errores)
+                print(f"   Procesando {len(rows)}/{len(insights)} (columnar)...")
+            for error_msg in errors:
+                self._debug(error_msg)
+            return rows, errors
+        
+        for idx, insight in enumerate(insights):
+            if (idx + 1) % self.LOG_EVERY == 0:
+                print(f"   Procesando {idx + 1}/{len(insights)}...")
+            
+            try:
+                row = self.process_insight_to_daily_row(
+                    insight, account_id, fecha_reporte, nombre_nora
+                )
+                
+                if row:
+                    rows.append(row)
+                
+            except Exception as e:
+                error_msg = f"Error procesando ad {insight.get('ad_id')}: {str(e)}"
+                errors.append(error_msg)
+                self._debug(error_msg)
+        
+        return rows, errors
+    
+    def guardar_insights_stream(
+        self,
+        account_id: str,
+        base_account_id: str,
+        params: Dict,
+        fechas: List[str],
+        nombre_nora: Optional[str] = None,
+        expected_rows: Optional[int] = None,
+        fecha_fija: Optional[date] = None
+    ) -> Dict:
+        """
+        Descarga, transforma y escribe insights en streaming.
+        
+        Las páginas llegan por ``prefetch`` (la siguiente se pide mientras se
+        procesa la actual), se agrupan en lotes de PIPELINE_BATCH_ROWS insights,
+        se transforman y solo las filas cuyo content_hash cambió pasan al
+        BoundedWriter. En memoria quedan los hashes existentes y las llaves
+        vistas, no los insights de toda la cuenta. Al terminar se desactivan
+        las filas que la API dejó de reportar, solo en días que sí llegaron, y
+        se recalcula meta_ads_cuentas_daily_rollup de esos días.
+        
+        Args:
+            account_id: ID de la cuenta publicitaria
+            base_account_id: ID sin prefijo act_
+            params: Parámetros de la consulta de insights
+            fechas: Fechas ISO que cubre la sincronización
+            nombre_nora: Nombre de Nora (tenant)
+            expected_rows: Filas esperadas en total (modo asíncrono y columnar)
+            fecha_fija: Fecha de todas las filas; si es None se reparte por date_start
+            
+        Returns:
+            Dict con insights, escritas, sin_cambios, desactivadas, rollup, dias y errors
+        """
+        diff = DailyRowDiff(fetch_hashes_daily(self.supabase, account_id, fechas))
+        columnar = None
+        if expected_rows is not None and self.COLUMNAR_MIN_ROWS:
+            columnar = expected_rows >= self.COLUMNAR_MIN_ROWS
+        
+        total_insights = 0
+        errors: List[str] = []
+        filas_por_dia: Dict[str, int] = {}
+        
+        writer = BoundedWriter(
+            lambda rows: upsert_anuncios_daily(self.supabase, rows, self.UPSERT_CHUNK_SIZE),
+            self.WRITE_QUEUE
+        )
+        with writer:
+            paginas = prefetch(self.iter_insights(base_account_id, params, expected_rows), self.PREFETCH_PAGES)
+            for lote in agrupar_paginas(paginas, self.PIPELINE_BATCH_ROWS):
+                total_insights += len(lote)
+                
+                por_dia: Dict[str, List[Dict]] = {}
+                if fecha_fija is not None:
+                    por_dia[fecha_fija.isoformat()] = lote
+                else:
+                    for insight in lote:
+                        dia = insight.get('date_start')
+                        if dia:
+                            por_dia.setdefault(dia, []).append(insight)
+                
+                for dia, insights in sorted(por_dia.items()):
+                    filas, errores = self.transform_insights(
+                        insights, account_id, date.fromisoformat(dia), nombre_nora, columnar=columnar
+                    )
+                    errors.extend(errores if fecha_fija is not None else (f"{e} ({dia})" for e in errores))
+                    if filas:
+                        filas_por_dia[dia] = filas_por_dia.get(dia, 0) + len(filas)
+                    writer.submit(diff.filtrar(filas))
+            
+            escritas, upsert_errors = writer.close()
+        
+        errors.extend(upsert_errors)
+        for error_msg in upsert_errors:
+            self._debug(error_msg)
+        
+        desaparecidas = diff.desaparecidas(set(filas_por_dia)) if filas_por_dia else []
+        desactivadas = desactivar_filas_daily(self.supabase, account_id, desaparecidas) if desaparecidas else 0
+        
+        # Totales por cuenta/día/plataforma para los reportes
+        rollup = 0
+        if filas_por_dia:
+            try:
+                rollup = refrescar_rollup_cuenta(self.supabase, account_id, list(filas_por_dia))
+            except Exception as e:
+                error_msg = f"Error refrescando rollup de {account_id}: {str(e)}"
+                print(f"⚠️ {error_msg}")
+                errors.append(error_msg)
+        
+        return {
+            'insights': total_insights,
+            'escritas': escritas,
+            'sin_cambios': diff.sin_cambios,
+            'desactivadas': desactivadas,
+            'rollup': rollup,
+            'dias': filas_por_dia,
+            'errors': errors
+        }
+    
     def sync_account_daily(
         self,
         account_id: str,
         fecha_reporte: date,
-        nombre_nora: Optional[str] = None
+        nombre_nora: Optional[str] = None,
+        expected_rows: Optional[int] = None
     ) -> Dict:
         """
         Sincroniza insights diarios de una cuenta de Meta Ads
@@ -521,6 +800,7 @@ class MetaAdsDailySyncService:
             account_id: ID de la cuenta publicitaria
             fecha_reporte: Fecha específica a sincronizar
             nombre_nora: Nombre de Nora (tenant)
+            expected_rows: Filas históricas de la cuenta (elige modo síncrono/asíncrono)
             
         Returns:
             Dict con resultados de la sincronización
@@ -530,8 +810,7 @@ class MetaAdsDailySyncService:
         # Normalizar account ID
         base_account_id = self.normalize_account_id(account_id)
         
-        # Construir URL y parámetros EXACTAMENTE COMO NORA
-        url = f"{self.BASE_URL}/act_{base_account_id}/insights"
+        # Construir parámetros EXACTAMENTE COMO NORA
         params = {
             'access_token': self.access_token,
             'level': 'ad',
@@ -548,60 +827,33 @@ class MetaAdsDailySyncService:
         print(f"📊 Obteniendo insights para fecha: {fecha_reporte}")
         
         try:
-            # Obtener insights (paginado)
-            all_insights = self.paginate_insights(url, params)
+            # Obtener, transformar y guardar insights en streaming
+            inicio = time.perf_counter()
+            stream = self.guardar_insights_stream(
+                account_id, base_account_id, params, [fecha_reporte.isoformat()],
+                nombre_nora, expected_rows, fecha_fija=fecha_reporte
+            )
             
-            if not all_insights:
+            if not stream['insights']:
                 print(f"ℹ️ No se encontraron insights para cuenta {account_id} en fecha {fecha_reporte}")
                 return {'ok': True, 'processed': 0, 'account_id': account_id, 'fecha': fecha_reporte.isoformat()}
             
-            print(f"📊 Total insights obtenidos: {len(all_insights)}")
-            
-            # Marcar registros existentes como inactivos para esta fecha
-            fecha_sync = datetime.utcnow().isoformat()
-            self.supabase.table('meta_ads_anuncios_daily') \
-                .update({'activo': False, 'fecha_ultima_actualizacion': fecha_sync}) \
-                .eq('id_cuenta_publicitaria', account_id) \
-                .eq('fecha_reporte', fecha_reporte.isoformat()) \
-                .execute()
+            processed = stream['escritas']
+            sin_cambios = stream['sin_cambios']
+            desactivadas = stream['desactivadas']
+            duracion = time.perf_counter() - inicio
+            print(f"📊 Total insights obtenidos: {stream['insights']}")
+            print(f"💾 {processed} filas escritas, {sin_cambios} sin cambios, {desactivadas} desactivadas en {duracion:.1f}s")
             
-            # Procesar y upsert cada insight
-            processed = 0
-            errors = []
-            
-            for idx, insight in enumerate(all_insights):
-                if (idx + 1) % self.LOG_EVERY == 0:
-                    print(f"   Procesando {idx + 1}/{len(all_insights)}...")
-                
-                try:
-                    row = self.process_insight_to_daily_row(
-                        insight, account_id, fecha_reporte, nombre_nora
-                    )
-                    
-                    if not row:
-                        continue
-                    
-                    # Upsert a base de datos diaria
-                    self.supabase.table('meta_ads_anuncios_daily') \
-                        .upsert(
-                            row,
-                            on_conflict='ad_id,fecha_reporte,publisher_platform'
-                        ) \
-                        .execute()
-                    
-                    processed += 1
-                    
-                except Exception as e:
-                    error_msg = f"Error procesando ad {insight.get('ad_id')}: {str(e)}"
-                    errors.append(error_msg)
-                    self._debug(error_msg)
-            
-            print(f"✅ Sincronización diaria completa: {processed} anuncios procesados")
+            print(f"✅ Sincronización diaria completa: {processed + sin_cambios} anuncios procesados")
             
             return {
                 'ok': True,
-                'processed': processed,
-                'errors': errors,
+                'processed': processed + sin_cambios,
+                'escritas': processed,
+                'sin_cambios': sin_cambios,
+                'desactivadas': desactivadas,
+                'errors': stream['errors'],
                 'account_id': account_id,
                 'fecha': fecha_reporte.isoformat()
             }
@@ -611,6 +863,95 @@ class MetaAdsDailySyncService:
             print(f"❌ {error_msg}")
             return {'ok': False, 'error': error_msg, 'account_id': account_id, 'fecha': fecha_reporte.isoformat()}
     
+    def sync_account_range(
+        self,
+        account_id: str,
+        fecha_inicio: date,
+        fecha_fin: date,
+        nombre_nora: Optional[str] = None,
+        expected_rows: Optional[int] = None
+    ) -> Dict:
+        """
+        Sincroniza un rango de días de una cuenta con una sola consulta.
+        
+        Pide ``time_range={since, until}`` con ``time_increment=1`` (una fila por
+        anuncio, plataforma y día), reparte las filas por ``date_start`` y las
+        guarda en streaming con upserts en lote. Equivale a llamar sync_account_daily por
+        cada día del rango.
+        
+        Args:
+            account_id: ID de la cuenta publicitaria
+            fecha_inicio: Primer día del rango (inclusive)
+            fecha_fin: Último día del rango (inclusive)
+            nombre_nora: Nombre de Nora (tenant)
+            expected_rows: Filas esperadas por día (elige modo síncrono/asíncrono)
+            
+        Returns:
+            Dict con resultados, incluyendo ``dias`` (filas por fecha)
+        """
+        dias_rango = (fecha_fin - fecha_inicio).days + 1
+        resultado_base = {
+            'account_id': account_id,
+            'fecha_inicio': fecha_inicio.isoformat(),
+            'fecha_fin': fecha_fin.isoformat()
+        }
+        if dias_rango < 1:
+            return {**resultado_base, 'ok': False, 'error': 'Rango de fechas vacío'}
+        
+        print(f"🔄 Sincronizando cuenta {self.clean_surrogates(str(account_id))}: {fecha_inicio} → {fecha_fin} ({dias_rango} días)")
+        
+        base_account_id = self.normalize_account_id(account_id)
+        params = {
+            'access_token': self.access_token,
+            'level': 'ad',
+            'breakdowns': 'publisher_platform',
+            'action_breakdowns': 'action_type',
+            'time_range': json.dumps({
+                'since': fecha_inicio.strftime('%Y-%m-%d'),
+                'until': fecha_fin.strftime('%Y-%m-%d')
+            }),
+            'time_increment': 1,
+            'fields': ','.join(self.INSIGHT_FIELDS),
+            'limit': 500,
+        }
+        
+        try:
+            esperadas = expected_rows * dias_rango if expected_rows is not None else None
+            fechas = [(fecha_inicio + timedelta(days=i)).isoformat() for i in range(dias_rango)]
+            stream = self.guardar_insights_stream(
+                account_id, base_account_id, params, fechas, nombre_nora, esperadas
+            )
+            filas_por_dia = stream['dias']
+            
+            print(f"📊 Total insights obtenidos: {stream['insights']} en {len(filas_por_dia)} días")
+            
+            if not filas_por_dia:
+                return {**resultado_base, 'ok': True, 'processed': 0, 'dias': {}, 'errors': stream['errors']}
+            
+            processed = stream['escritas']
+            sin_cambios = stream['sin_cambios']
+            desactivadas = stream['desactivadas']
+            print(
+                f"✅ Rango sincronizado: {processed} filas escritas, {sin_cambios} sin cambios, "
+                f"{desactivadas} desactivadas en {len(filas_por_dia)} días"
+            )
+            
+            return {
+                **resultado_base,
+                'ok': True,
+                'processed': processed + sin_cambios,
+                'escritas': processed,
+                'sin_cambios': sin_cambios,
+                'desactivadas': desactivadas,
+                'dias': filas_por_dia,
+                'errors': stream['errors']
+            }
+            
+        except Exception as e:
+            error_msg = f"Error sincronizando cuenta {account_id} entre {fecha_inicio} y {fecha_fin}: {str(e)}"
+            print(f"❌ {error_msg}")
+            return {**resultado_base, 'ok': False, 'error': error_msg}
+    
     def sync_all_accounts_daily(
         self,
         fecha_reporte: date,
@@ -650,44 +991,54 @@ class MetaAdsDailySyncService:
             'fecha_reporte': fecha_reporte.isoformat()
         }
         
-        # Procesar cada cuenta
-        for cuenta in accounts:
-            cuenta_id = cuenta['id_cuenta_publicitaria']
-            nombre_cliente = self.clean_surrogates(cuenta.get('nombre_cliente', 'Cliente desconocido'))
-            
+        # Tamaño esperado de cada cuenta: filas guardadas el día anterior
+        tamanos = fetch_conteo_anuncios_por_cuenta(self.supabase, fecha_reporte - timedelta(days=1))
+        
+        def _sync_cuenta(cuenta: Dict) -> Dict:
+            base_id = self.normalize_account_id(cuenta['id_cuenta_publicitaria'])
             try:
-                print(f"\n============================================================")
-                print(f"📊 Procesando: {nombre_cliente}")
-                print(f"============================================================")
-                
-                result = self.sync_account_daily(
-                    account_id=cuenta_id,
+                return self.sync_account_daily(
+                    account_id=cuenta['id_cuenta_publicitaria'],
                     fecha_reporte=fecha_reporte,
-                    nombre_nora=cuenta.get('nombre_nora')
+                    nombre_nora=cuenta.get('nombre_nora'),
+                    expected_rows=tamanos.get(cuenta['id_cuenta_publicitaria'])
                 )
-                
-                if result.get('ok'):
-                    resultados['cuentas_exitosas'] += 1
-                    print(f"✅ Exitosa: {nombre_cliente}")
-                else:
-                    error_info = {
-                        'cuenta_id': cuenta_id,
-                        'nombre_cliente': nombre_cliente,
-                        'error': result.get('error', 'Error desconocido')
-                    }
-                    resultados['errores'].append(f"Falló cuenta {cuenta_id} ({nombre_cliente})")
-                    resultados['cuentas_con_errores'].append(error_info)
-                    print(f"❌ Falló: {nombre_cliente}")
-                
-            except Exception as e:
+            finally:
+                self.usage_governor.release(base_id)
+        
+        scheduler = AccountScheduler(self.usage_governor)
+        ejecucion = scheduler.run(
+            accounts,
+            _sync_cuenta,
+            size_of=lambda c: tamanos.get(c['id_cuenta_publicitaria'], 0)
+        )
+        
+        # Procesar cuentas en paralelo (más grandes primero)
+        for cuenta, result, error in ejecucion:
+            cuenta_id = cuenta['id_cuenta_publicitaria']
+            nombre_cliente = self.clean_surrogates(cuenta.get('nombre_cliente', 'Cliente desconocido'))
+            
+            if error is not None:
+                error_info = {
+                    'cuenta_id': cuenta_id,
+                    'nombre_cliente': nombre_cliente,
+                    'error': str(error)
+                }
+                resultados['errores'].append(f"Error en cuenta {cuenta_id} ({nombre_cliente}): {str(error)}")
+                resultados['cuentas_con_errores'].append(error_info)
+                print(f"💥 Error en {nombre_cliente}: {self.clean_surrogates(str(error))}")
+            elif result.get('ok'):
+                resultados['cuentas_exitosas'] += 1
+                print(f"✅ Exitosa: {nombre_cliente} ({result.get('processed', 0)} filas)")
+            else:
                 error_info = {
                     'cuenta_id': cuenta_id,
                     'nombre_cliente': nombre_cliente,
-                    'error': str(e)
+                    'error': result.get('error', 'Error desconocido')
                 }
-                resultados['errores'].append(f"Error en cuenta {cuenta_id} ({nombre_cliente}): {str(e)}")
+                resultados['errores'].append(f"Falló cuenta {cuenta_id} ({nombre_cliente})")
                 resultados['cuentas_con_errores'].append(error_info)
-                print(f"💥 Error en {nombre_cliente}: {self.clean_surrogates(str(e))}")
+                print(f"❌ Falló: {nombre_cliente}")
             
             resultados['cuentas_procesadas'] += 1
         
@@ -1,16 +1,23 @@
 """
 Servicio para sincronizar datos demográficos y geográficos de Meta Ads.
 Este servicio actualiza registros existentes en meta_ads_anuncios_daily
-agregando información de age, gender, region, country, device_platform.
+agregando información de age, gender, region, country, device_platform, y
+guarda las métricas de cada bucket en meta_ads_breakdowns_daily.
 """
 import os
 import json
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 import requests
 
 from src.automation_hub.db.supabase_client import create_client_from_env
+from src.automation_hub.db.repositories.meta_ads_daily_repo import actualizar_breakdown_bulk
+from src.automation_hub.db.repositories.meta_ads_breakdowns_repo import upsert_breakdowns_daily
+from src.automation_hub.integrations.meta_ads.daily_sync_service import MetaAdsDailySyncService
+from src.automation_hub.integrations.meta_ads.pipeline import BoundedWriter, prefetch
 
 logger = logging.getLogger(__name__)
 
@@ -26,14 +33,25 @@ class MetaAdsDemographicSyncService:
     BASE_URL = "https://graph.facebook.com/v23.0"
     LOG_EVERY = 50
     
-    # Campos básicos SIN actions (incompatible con breakdowns demográficos)
+    # Breakdowns consultados en paralelo por cuenta
+    BREAKDOWN_WORKERS = int(os.getenv('META_DEMOGRAPHICS_WORKERS', '4'))
+    
+    # Campos básicos; actions solo para contar mensajes (sin action_breakdowns,
+    # que es lo incompatible con breakdowns demográficos)
     INSIGHT_FIELDS = [
         "date_start", "date_stop", "account_id", "campaign_id", "adset_id", "ad_id",
         "ad_name", "adset_name", "campaign_name",
         "impressions", "reach", "clicks", "spend",
-        "cpm", "cpc", "ctr", "frequency"
+        "cpm", "cpc", "ctr", "frequency", "actions"
     ]
     
+    # Mismos action types de mensajes que la sincronización diaria
+    MSG_TYPES = MetaAdsDailySyncService.MSG_TYPES
+    
+    # Mismo pipeline en streaming que la sincronización diaria
+    PREFETCH_PAGES = MetaAdsDailySyncService.PREFETCH_PAGES
+    WRITE_QUEUE = MetaAdsDailySyncService.WRITE_QUEUE
+    
     def __init__(self, supabase_client=None):
         """Initialize service with Supabase client"""
         self.supabase = supabase_client or create_client_from_env()
@@ -46,22 +64,22 @@ class MetaAdsDemographicSyncService:
         """Normaliza ID de cuenta removiendo prefijo 'act_' si existe"""
         return account_id.replace('act_', '') if account_id else account_id
     
-    def get_demographic_insights(
+    def iter_demographic_pages(
         self,
         account_id: str,
         fecha: date,
         breakdown: str
-    ) -> List[Dict]:
+    ) -> Iterator[List[Dict]]:
         """
-        Obtiene insights con un breakdown demográfico específico.
+        Genera las páginas de insights con un breakdown demográfico específico.
         
         Args:
             account_id: ID de la cuenta
             fecha: Fecha a sincronizar
             breakdown: age, gender, region, country, device_platform, impression_device
             
-        Returns:
-            Lista de insights
+        Raises:
+            requests.HTTPError: Si alguna página falla
         """
         base_account_id = self.normalize_account_id(account_id)
         url = f"{self.BASE_URL}/act_{base_account_id}/insights"
@@ -79,30 +97,97 @@ class MetaAdsDemographicSyncService:
             'limit': 500,
         }
         
-        all_insights = []
-        
-        try:
-            while url:
-                response = requests.get(url, params=params, timeout=60)
-                response.raise_for_status()
-                data = response.json()
-                
-                insights = data.get('data', [])
-                all_insights.extend(insights)
-                
-                # Paginación
-                url = data.get('paging', {}).get('next')
-                params = {}  # Los params ya están en la URL next
-                
-                if len(all_insights) % self.LOG_EVERY == 0:
-                    logger.info(f"   Obtenidos {len(all_insights)} insights con breakdown {breakdown}")
+        total = 0
+        while url:
+            response = requests.get(url, params=params, timeout=60)
+            response.raise_for_status()
+            data = response.json()
+            
+            insights = data.get('data', [])
+            total += len(insights)
+            yield insights
             
-            return all_insights
+            # Paginación
+            url = data.get('paging', {}).get('next')
+            params = {}  # Los params ya están en la URL next
             
+            if total % self.LOG_EVERY == 0:
+                logger.info(f"   Obtenidos {total} insights con breakdown {breakdown}")
+    
+    def get_demographic_insights(
+        self,
+        account_id: str,
+        fecha: date,
+        breakdown: str
+    ) -> List[Dict]:
+        """
+        Obtiene todos los insights con un breakdown demográfico específico.
+        
+        Returns:
+            Lista de insights (vacía si falla alguna página)
+        """
+        try:
+            return [
+                insight
+                for page in self.iter_demographic_pages(account_id, fecha, breakdown)
+                for insight in page
+            ]
         except Exception as e:
             logger.error(f"Error obteniendo insights demográficos: {e}")
             return []
     
+    @staticmethod
+    def collect_breakdown_values(
+        fecha: date,
+        breakdown_field: str,
+        insights: List[Dict],
+        valores: Optional[Dict[tuple, str]] = None
+    ) -> Dict[tuple, str]:
+        """
+        Acumula un valor de breakdown por (ad_id, fecha).
+        
+        Si el anuncio trae varios buckets, gana el último. Permite ir
+        acumulando página por página pasando el mismo ``valores``.
+        """
+        if valores is None:
+            valores = {}
+        for insight in insights:
+            ad_id = insight.get('ad_id')
+            breakdown_value = insight.get(breakdown_field)
+            
+            if not ad_id or not breakdown_value:
+                continue
+            
+            valores[(str(ad_id), fecha.isoformat())] = breakdown_value
+        return valores
+    
+    def write_breakdown_values(
+        self,
+        account_id: str,
+        breakdown_field: str,
+        valores: Dict[tuple, str]
+    ) -> int:
+        """
+        Escribe los valores acumulados con un solo UPDATE en bloque.
+        
+        Returns:
+            Cantidad de registros actualizados
+        """
+        if not valores:
+            return 0
+        
+        try:
+            # Actualizar TODOS los registros (todas las plataformas) de cada ad_id en un solo UPDATE
+            return actualizar_breakdown_bulk(
+                self.supabase,
+                account_id,
+                breakdown_field,
+                [(ad_id, fecha_iso, valor) for (ad_id, fecha_iso), valor in valores.items()]
+            )
+        except Exception as e:
+            logger.error(f"Error actualizando {breakdown_field} para {len(valores)} anuncios: {e}")
+            return 0
+    
     def update_demographic_data(
         self,
         account_id: str,
@@ -122,52 +207,156 @@ class MetaAdsDemographicSyncService:
         Returns:
             Cantidad de registros actualizados
         """
-        updated = 0
-        errors = []
+        valores = self.collect_breakdown_values(fecha, breakdown_field, insights)
+        return self.write_breakdown_values(account_id, breakdown_field, valores)
+    
+    def build_breakdown_rows(
+        self,
+        account_id: str,
+        fecha: date,
+        breakdown: str,
+        insights: List[Dict],
+        nombre_nora: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Convierte insights con breakdown en filas de meta_ads_breakdowns_daily.
+        
+        Returns:
+            Una fila por (ad_id, bucket) con sus métricas
+        """
+        def _int(value) -> int:
+            try:
+                return int(float(value or 0))
+            except (TypeError, ValueError):
+                return 0
         
+        def _float(value) -> float:
+            try:
+                return float(value or 0)
+            except (TypeError, ValueError):
+                return 0.0
+        
+        rows = []
         for insight in insights:
             ad_id = insight.get('ad_id')
-            breakdown_value = insight.get(breakdown_field)
-            
-            if not ad_id or not breakdown_value:
+            bucket = insight.get(breakdown)
+            if not ad_id or not bucket:
                 continue
             
+            mensajes = sum(
+                _float(action.get('value'))
+                for action in (insight.get('actions') or [])
+                if (action.get('action_type') or '').strip() in self.MSG_TYPES
+            )
+            
+            rows.append({
+                'ad_id': str(ad_id),
+                'fecha_reporte': fecha.isoformat(),
+                'breakdown': breakdown,
+                'bucket': str(bucket),
+                'id_cuenta_publicitaria': account_id,
+                'nombre_nora': nombre_nora,
+                'campana_id': insight.get('campaign_id'),
+                'impressions': _int(insight.get('impressions')),
+                'reach': _int(insight.get('reach')),
+                'clicks': _int(insight.get('clicks')),
+                'spend': _float(insight.get('spend')),
+                'messages': int(mensajes),
+                'fecha_sincronizacion': datetime.utcnow().isoformat(),
+            })
+        return rows
+    
+    def sync_breakdown(
+        self,
+        account_id: str,
+        fecha: date,
+        breakdown: str,
+        nombre_nora: Optional[str] = None
+    ) -> Dict:
+        """
+        Obtiene y guarda un breakdown de una cuenta en streaming.
+        
+        Las filas por bucket de cada página se escriben en
+        meta_ads_breakdowns_daily mientras se pide la siguiente; de cada
+        página solo se conserva el valor por anuncio, que al final se escribe
+        en la columna de meta_ads_anuncios_daily con un UPDATE en bloque.
+        
+        Returns:
+            Dict con insights, updated, buckets y tiempos de consulta/escritura
+        """
+        inicio = time.perf_counter()
+        total = 0
+        valores: Dict[tuple, str] = {}
+        error = None
+        
+        with BoundedWriter(
+            lambda filas: upsert_breakdowns_daily(self.supabase, filas),
+            self.WRITE_QUEUE,
+            nombre=f"meta-breakdowns-{breakdown}"
+        ) as writer:
             try:
-                # Actualizar TODOS los registros (todas las plataformas) de este ad_id en esta fecha
-                result = self.supabase.table('meta_ads_anuncios_daily') \
-                    .update({breakdown_field: breakdown_value}) \
-                    .eq('ad_id', str(ad_id)) \
-                    .eq('fecha_reporte', fecha.isoformat()) \
-                    .eq('id_cuenta_publicitaria', account_id) \
-                    .execute()
-                
-                if result.data:
-                    updated += len(result.data)
-                    
+                for pagina in prefetch(self.iter_demographic_pages(account_id, fecha, breakdown), self.PREFETCH_PAGES):
+                    total += len(pagina)
+                    self.collect_breakdown_values(fecha, breakdown, pagina, valores)
+                    writer.submit(self.build_breakdown_rows(account_id, fecha, breakdown, pagina, nombre_nora))
             except Exception as e:
-                error_msg = f"Error actualizando {breakdown_field} para ad {ad_id}: {e}"
-                logger.error(error_msg)
-                errors.append(error_msg)
+                logger.error(f"Error obteniendo insights demográficos: {e}")
+                error = str(e)
+            fetch_s = time.perf_counter() - inicio
+            
+            inicio = time.perf_counter()
+            buckets, errores = writer.close()
+        
+        for error_msg in errores:
+            logger.error(error_msg)
+        
+        if not total:
+            logger.info(f"   ℹ️ No hay datos para {breakdown}")
+            resultado = {'insights': 0, 'updated': 0, 'buckets': 0, 'fetch_s': round(fetch_s, 2), 'write_s': 0.0}
+            if error:
+                resultado['error'] = error
+            return resultado
+        
+        logger.info(f"   ✅ Obtenidos {total} insights para {breakdown} en {fetch_s:.1f}s")
+        
+        updated = self.write_breakdown_values(account_id, breakdown, valores)
+        write_s = time.perf_counter() - inicio
         
-        if errors:
-            logger.warning(f"Errores actualizando {breakdown_field}: {len(errors)}")
+        logger.info(
+            f"   ✅ Actualizados {updated} registros con {breakdown} "
+            f"y {buckets} filas por bucket en {write_s:.2f}s"
+        )
         
-        return updated
+        resultado = {
+            'insights': total,
+            'updated': updated,
+            'buckets': buckets,
+            'fetch_s': round(fetch_s, 2),
+            'write_s': round(write_s, 2)
+        }
+        if error:
+            resultado['error'] = error
+        return resultado
     
     def sync_account_demographics(
         self,
         account_id: str,
         fecha: date,
-        breakdowns: Optional[List[str]] = None
+        breakdowns: Optional[List[str]] = None,
+        nombre_nora: Optional[str] = None
     ) -> Dict:
         """
         Sincroniza datos demográficos para una cuenta.
         
+        Cada breakdown se consulta en un hilo propio y se escribe con un
+        UPDATE en bloque.
+        
         Args:
             account_id: ID de cuenta publicitaria
             fecha: Fecha a sincronizar
             breakdowns: Lista de breakdowns a sincronizar 
                        (por defecto: age, gender, region, device_platform)
+            nombre_nora: Tenant de la cuenta (para meta_ads_breakdowns_daily)
             
         Returns:
             Dict con resultados de la sincronización
@@ -184,28 +373,25 @@ class MetaAdsDemographicSyncService:
             'breakdowns': {}
         }
         
-        for breakdown in breakdowns:
-            logger.info(f"   📊 Procesando breakdown: {breakdown}")
-            
-            # Obtener insights
-            insights = self.get_demographic_insights(account_id, fecha, breakdown)
-            
-            if not insights:
-                logger.info(f"   ℹ️ No hay datos para {breakdown}")
-                results['breakdowns'][breakdown] = {'insights': 0, 'updated': 0}
-                continue
-            
-            logger.info(f"   ✅ Obtenidos {len(insights)} insights para {breakdown}")
-            
-            # Actualizar registros
-            updated = self.update_demographic_data(account_id, fecha, breakdown, insights)
-            
-            logger.info(f"   ✅ Actualizados {updated} registros con {breakdown}")
-            
-            results['breakdowns'][breakdown] = {
-                'insights': len(insights),
-                'updated': updated
+        inicio = time.perf_counter()
+        workers = max(1, min(self.BREAKDOWN_WORKERS, len(breakdowns)))
+        
+        # Los breakdowns son consultas independientes; se piden en paralelo
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.sync_breakdown, account_id, fecha, breakdown, nombre_nora): breakdown
+                for breakdown in breakdowns
             }
+            for future in as_completed(futures):
+                breakdown = futures[future]
+                try:
+                    results['breakdowns'][breakdown] = future.result()
+                except Exception as e:
+                    logger.error(f"   ❌ Error en breakdown {breakdown}: {e}")
+                    results['breakdowns'][breakdown] = {'insights': 0, 'updated': 0, 'error': str(e)}
+        
+        results['segundos'] = round(time.perf_counter() - inicio, 2)
+        logger.info(f"   ⏱️ Demográficos de {account_id} en {results['segundos']}s")
         
         return results
 
@@ -236,7 +422,7 @@ def sync_all_accounts_demographics(
     # Obtener cuentas activas
     supabase = create_client_from_env()
     response = supabase.table('meta_ads_cuentas') \
-        .select('id_cuenta_publicitaria') \
+        .select('id_cuenta_publicitaria, nombre_nora') \
         .eq('activo', True) \
         .eq('estado_actual', 'ACTIVE') \
         .execute()
@@ -251,7 +437,9 @@ def sync_all_accounts_demographics(
         account_id = cuenta['id_cuenta_publicitaria']
         
         try:
-            result = service.sync_account_demographics(account_id, fecha, breakdowns)
+            result = service.sync_account_demographics(
+                account_id, fecha, breakdowns, nombre_nora=cuenta.get('nombre_nora')
+            )
             resultados.append(result)
             
         except Exception as e:
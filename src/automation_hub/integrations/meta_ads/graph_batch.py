@@ -0,0 +1,166 @@
+"""
+Cliente de batch requests de Graph API.
+
+Graph API acepta hasta 50 sub-requests en un solo ``POST /?batch=[...]``; cada
+una devuelve su propio código y cuerpo, así que un error (anuncio borrado,
+permiso faltante) solo afecta a su sub-request.
+
+``GraphMicroBatcher`` permite seguir llamando una API por ID: las llamadas que
+llegan dentro de una ventana corta (desde uno o varios hilos) se agrupan en
+un mismo batch.
+"""
+import json
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+GRAPH_BASE_URL = "https://graph.facebook.com/v21.0"
+MAX_BATCH_SIZE = 50
+DEFAULT_WINDOW_SECONDS = 0.05
+
+
+def _resultado(ok: bool, data: Any = None, error: Optional[str] = None, code: Optional[int] = None) -> Dict:
+    return {"ok": ok, "data": data, "error": error, "code": code}
+
+
+def _parse_sub_response(sub: Optional[Dict]) -> Dict:
+    """Convierte una sub-respuesta del batch en {ok, data, error, code}."""
+    if sub is None:
+        # Meta devuelve null cuando la sub-request no alcanzó a ejecutarse
+        return _resultado(False, error="Sub-request sin respuesta (timeout del batch)")
+
+    status = sub.get("code")
+    try:
+        body = json.loads(sub.get("body") or "null")
+    except ValueError:
+        body = sub.get("body")
+
+    if status == 200:
+        return _resultado(True, data=body, code=status)
+
+    error = body.get("error") if isinstance(body, dict) else None
+    if isinstance(error, dict):
+        return _resultado(False, data=body, error=error.get("message"), code=error.get("code", status))
+    return _resultado(False, data=body, error=f"HTTP {status}", code=status)
+
+
+class GraphBatchClient:
+    """Ejecuta sub-requests de Graph API en lotes de hasta 50."""
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str = GRAPH_BASE_URL,
+        max_batch: int = MAX_BATCH_SIZE,
+        timeout: int = 60
+    ):
+        self.access_token = access_token
+        self.base_url = base_url.rstrip("/")
+        self.max_batch = max(1, min(max_batch, MAX_BATCH_SIZE))
+        self.timeout = timeout
+
+    def execute(self, sub_requests: List[Dict]) -> List[Dict]:
+        """
+        Ejecuta sub-requests ``{"method": "GET", "relative_url": "..."}``.
+
+        Returns:
+            Un dict {ok, data, error, code} por sub-request, en el mismo orden.
+            Si falla el POST completo, todas las sub-requests de ese lote
+            quedan con ok=False.
+        """
+        resultados: List[Dict] = []
+
+        for start in range(0, len(sub_requests), self.max_batch):
+            lote = sub_requests[start:start + self.max_batch]
+            try:
+                response = requests.post(
+                    f"{self.base_url}/",
+                    data={
+                        "access_token": self.access_token,
+                        "batch": json.dumps(lote),
+                        "include_headers": "false",
+                    },
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+                respuestas = response.json()
+            except Exception as e:
+                logger.error(f"❌ Error ejecutando batch de {len(lote)} requests: {e}")
+                resultados.extend(_resultado(False, error=str(e)) for _ in lote)
+                continue
+
+            for i in range(len(lote)):
+                sub = respuestas[i] if isinstance(respuestas, list) and i < len(respuestas) else None
+                resultados.append(_parse_sub_response(sub))
+
+        return resultados
+
+    def get_many(self, relative_urls: List[str]) -> List[Dict]:
+        """Atajo para varios GET."""
+        return self.execute([{"method": "GET", "relative_url": url} for url in relative_urls])
+
+
+class GraphMicroBatcher:
+    """
+    Agrupa GETs individuales en batches.
+
+    La primera llamada abre una ventana de ``window_seconds``; todo lo que
+    llega antes de que cierre (o hasta juntar 50) viaja en el mismo batch.
+    """
+
+    def __init__(self, client: GraphBatchClient, window_seconds: float = DEFAULT_WINDOW_SECONDS):
+        self.client = client
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._pendientes: List[Tuple[str, Future]] = []
+        self._timer: Optional[threading.Timer] = None
+
+    def submit(self, relative_url: str) -> Future:
+        """Encola un GET y devuelve un Future con {ok, data, error, code}."""
+        future: Future = Future()
+        lleno = False
+        with self._lock:
+            self._pendientes.append((relative_url, future))
+            if len(self._pendientes) >= self.client.max_batch:
+                lleno = True
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if lleno:
+            self.flush()
+        return future
+
+    def get(self, relative_url: str) -> Dict:
+        """GET individual; se agrupa con las demás llamadas de la ventana."""
+        return self.submit(relative_url).result()
+
+    def flush(self) -> None:
+        """Envía lo pendiente sin esperar a que cierre la ventana."""
+        with self._lock:
+            lote = self._pendientes[:self.client.max_batch]
+            self._pendientes = self._pendientes[self.client.max_batch:]
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = None
+            if self._pendientes:
+                self._timer = threading.Timer(self.window_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if not lote:
+            return
+
+        try:
+            resultados = self.client.get_many([url for url, _ in lote])
+        except Exception as e:
+            resultados = [_resultado(False, error=str(e)) for _ in lote]
+
+        for (_, future), resultado in zip(lote, resultados):
+            future.set_result(resultado)
@@ -0,0 +1,262 @@
+"""
+Caché de nombres y estados de objetos de Meta Ads (anuncios, conjuntos, campañas).
+
+Una sola caché por proceso (``get_name_cache``) con expulsión LRU por número
+de entradas y TTL. Se respalda en la tabla meta_ads_nombres_cache de
+Supabase: los misses en memoria se buscan primero ahí y lo que se pide a
+Graph API se guarda, así cada corrida diaria arranca con los nombres de la
+anterior y solo consulta los que faltan o vencieron.
+
+Nombres y status vencen por separado: los nombres casi no cambian y duran
+varios días; el status dura menos de un día y se refresca con una consulta
+solo de status (``status_vencido`` / ``actualizar_status``) sin tirar el
+nombre.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ...db.repositories.meta_ads_nombres_repo import fetch_nombres_cache, upsert_nombres_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 50000
+DEFAULT_TTL = 7 * 24 * 3600
+# Menos de un día: cada corrida diaria debe ver el status fresco
+DEFAULT_STATUS_TTL = 20 * 3600
+STATUS_KEYS = ('status', 'campaign_status', 'adset_status')
+
+TIPOS = ('ad', 'adset', 'campaign')
+
+
+def _epoch(valor: Optional[str]) -> float:
+    """Timestamp ISO de Supabase a epoch (0 si no se puede leer)."""
+    if not valor:
+        return 0.0
+    try:
+        fecha = datetime.fromisoformat(str(valor).replace('Z', '+00:00'))
+    except ValueError:
+        return 0.0
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return fecha.timestamp()
+
+
+class NameCache:
+    """
+    Caché LRU + TTL de payloads de nombres por (tipo, object_id).
+
+    Args:
+        supabase: Cliente de Supabase para persistir (None = solo memoria)
+        max_entries: Entradas máximas en memoria; se expulsan las menos usadas
+        ttl: Segundos de vigencia de los nombres (en memoria y persistidos)
+        status_ttl: Segundos de vigencia del status dentro del payload
+    """
+
+    def __init__(
+        self,
+        supabase=None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: int = DEFAULT_TTL,
+        status_ttl: int = DEFAULT_STATUS_TTL
+    ):
+        self.supabase = supabase
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.status_ttl = status_ttl
+        # (tipo, object_id) -> (expira, expira_status, payload)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _guardar(self, llave: Tuple[str, str], expira: float, expira_status: float, payload: Dict) -> None:
+        self._entries[llave] = (expira, expira_status, payload)
+        self._entries.move_to_end(llave)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, object_ids: Iterable[str], tipo: str = 'ad') -> Dict[str, Dict]:
+        """
+        Busca varios objetos: primero en memoria, luego en Supabase.
+
+        Returns:
+            Dict object_id -> payload (nombres vigentes; el status puede haber
+            vencido, ver ``status_vencido``)
+        """
+        ahora = time.time()
+        encontrados: Dict[str, Dict] = {}
+        faltantes = []
+
+        with self._lock:
+            for object_id in dict.fromkeys(str(i) for i in object_ids if i):
+                llave = (tipo, object_id)
+                entrada = self._entries.get(llave)
+                if entrada and entrada[0] > ahora:
+                    self._entries.move_to_end(llave)
+                    encontrados[object_id] = entrada[2]
+                else:
+                    if entrada:
+                        del self._entries[llave]
+                    faltantes.append(object_id)
+
+        if faltantes and self.supabase is not None:
+            try:
+                persistidos = fetch_nombres_cache(self.supabase, tipo, faltantes)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo leer la caché de nombres: {e}")
+                persistidos = {}
+
+            with self._lock:
+                for object_id, fila in persistidos.items():
+                    expira = _epoch(fila.get('actualizado_en')) + self.ttl
+                    if expira > ahora:
+                        status_en = fila.get('status_actualizado_en') or fila.get('actualizado_en')
+                        self._guardar((tipo, object_id), expira, _epoch(status_en) + self.status_ttl, fila['datos'])
+                        encontrados[object_id] = fila['datos']
+
+        with self._lock:
+            self.hits += len(encontrados)
+            self.misses += sum(1 for object_id in faltantes if object_id not in encontrados)
+        return encontrados
+
+    def status_vencido(self, object_ids: Iterable[str], tipo: str = 'ad') -> List[str]:
+        """IDs en memoria con nombres vigentes pero status vencido (llamar después de get_many)."""
+        ahora = time.time()
+        vencidos = []
+        with self._lock:
+            for object_id in dict.fromkeys(str(i) for i in object_ids if i):
+                entrada = self._entries.get((tipo, object_id))
+                if entrada and entrada[0] > ahora >= entrada[1]:
+                    vencidos.append(object_id)
+        return vencidos
+
+    def actualizar_status(self, statuses: Dict[str, Dict], tipo: str = 'ad') -> None:
+        """
+        Refresca solo el status de entradas existentes (el nombre se conserva).
+
+        Args:
+            statuses: object_id -> llaves de STATUS_KEYS con su valor nuevo
+        """
+        if not statuses:
+            return
+
+        ahora = time.time()
+        actualizados: Dict[str, Dict] = {}
+        with self._lock:
+            for object_id, status in statuses.items():
+                llave = (tipo, str(object_id))
+                entrada = self._entries.get(llave)
+                if entrada is None:
+                    continue
+                payload = dict(entrada[2])
+                payload.update({k: v for k, v in status.items() if k in STATUS_KEYS})
+                self._guardar(llave, entrada[0], ahora + self.status_ttl, payload)
+                actualizados[str(object_id)] = payload
+
+        if not actualizados or self.supabase is None:
+            return
+
+        status_en = datetime.now(timezone.utc).isoformat()
+        rows = [
+            {
+                'tipo': tipo,
+                'object_id': object_id,
+                'status': payload.get('status') or payload.get(f'{tipo}_status'),
+                'datos': payload,
+                'status_actualizado_en': status_en,
+            }
+            for object_id, payload in actualizados.items()
+        ]
+        try:
+            _, errores = upsert_nombres_cache(self.supabase, rows)
+            for error_msg in errores:
+                logger.warning(error_msg)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo guardar el status en la caché de nombres: {e}")
+
+    def get(self, object_id: str, tipo: str = 'ad') -> Optional[Dict]:
+        """Payload vigente de un objeto o None."""
+        return self.get_many([object_id], tipo).get(str(object_id))
+
+    def put_many(self, payloads: Dict[str, Dict], tipo: str = 'ad', persistir: bool = True) -> None:
+        """
+        Guarda payloads en memoria y (si hay Supabase) en meta_ads_nombres_cache.
+
+        Los payloads pueden traer ``name``/``status`` o ``{tipo}_name``/``{tipo}_status``.
+        """
+        if not payloads:
+            return
+
+        ahora = time.time()
+        with self._lock:
+            for object_id, payload in payloads.items():
+                self._guardar((tipo, str(object_id)), ahora + self.ttl, ahora + self.status_ttl, payload)
+
+        if not persistir or self.supabase is None:
+            return
+
+        actualizado_en = datetime.now(timezone.utc).isoformat()
+        rows = [
+            {
+                'tipo': tipo,
+                'object_id': str(object_id),
+                'nombre': payload.get('name') or payload.get(f'{tipo}_name'),
+                'status': payload.get('status') or payload.get(f'{tipo}_status'),
+                'datos': payload,
+                'actualizado_en': actualizado_en,
+                'status_actualizado_en': actualizado_en,
+            }
+            for object_id, payload in payloads.items()
+        ]
+        try:
+            _, errores = upsert_nombres_cache(self.supabase, rows)
+            for error_msg in errores:
+                logger.warning(error_msg)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo guardar la caché de nombres: {e}")
+
+    def put(self, object_id: str, payload: Dict, tipo: str = 'ad') -> None:
+        """Guarda el payload de un objeto."""
+        self.put_many({str(object_id): payload}, tipo)
+
+    def clear(self) -> None:
+        """Vacía la caché en memoria (la persistida no se toca)."""
+        with self._lock:
+            self._entries.clear()
+
+
+_shared_cache: Optional[NameCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_name_cache(supabase=None) -> NameCache:
+    """
+    Caché compartida del proceso.
+
+    La configuran NAMES_CACHE_TTL, NAMES_CACHE_STATUS_TTL,
+    META_NAMES_CACHE_MAX_ENTRIES y META_NAMES_CACHE_PERSIST (0 = solo memoria). El primer cliente de
+    Supabase que llegue se usa para persistir.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = NameCache(
+                max_entries=int(os.getenv('META_NAMES_CACHE_MAX_ENTRIES', str(DEFAULT_MAX_ENTRIES)) or DEFAULT_MAX_ENTRIES),
+                ttl=int(os.getenv('NAMES_CACHE_TTL', str(DEFAULT_TTL)) or DEFAULT_TTL),
+                status_ttl=int(os.getenv('NAMES_CACHE_STATUS_TTL', str(DEFAULT_STATUS_TTL)) or DEFAULT_STATUS_TTL),
+            )
+        if (
+            _shared_cache.supabase is None
+            and supabase is not None
+            and os.getenv('META_NAMES_CACHE_PERSIST', '1') == '1'
+        ):
+            _shared_cache.supabase = supabase
+        return _shared_cache
@@ -0,0 +1,149 @@
+"""
+Pipeline en streaming para insights de Meta Ads: fetch → transform → write.
+
+Las páginas se piden en un hilo con hasta N páginas adelantadas
+(``prefetch``) y las filas transformadas se escriben en otro hilo detrás de
+una cola acotada (``BoundedWriter``). Cada etapa se bloquea cuando la
+siguiente va atrasada, así la memoria queda acotada por el tamaño de las
+colas y no por el tamaño de la cuenta, y la escritura se traslapa con la
+descarga de la página siguiente.
+"""
+import logging
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PREFETCH_PAGES = 2
+DEFAULT_WRITE_QUEUE = 2
+
+_FIN = object()
+
+
+def prefetch(iterable: Iterable, depth: int = DEFAULT_PREFETCH_PAGES) -> Iterator:
+    """
+    Consume ``iterable`` en un hilo aparte con hasta ``depth`` elementos adelantados.
+
+    Las excepciones del productor se relanzan en el consumidor. Si el
+    consumidor deja de iterar, el productor se detiene en el siguiente elemento.
+    """
+    cola: queue.Queue = queue.Queue(maxsize=max(1, depth))
+    detener = threading.Event()
+
+    def _poner(elemento) -> bool:
+        while not detener.is_set():
+            try:
+                cola.put(elemento, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _producir() -> None:
+        iterador = iter(iterable)
+        try:
+            for item in iterador:
+                if not _poner((item, None)):
+                    break
+            else:
+                _poner((_FIN, None))
+        except BaseException as e:
+            _poner((_FIN, e))
+        finally:
+            cerrar = getattr(iterador, "close", None)
+            if cerrar is not None:
+                cerrar()
+
+    hilo = threading.Thread(target=_producir, name="meta-insights-prefetch", daemon=True)
+    hilo.start()
+
+    try:
+        while True:
+            item, error = cola.get()
+            if item is _FIN:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        detener.set()
+
+
+def agrupar_paginas(paginas: Iterable[List[Dict]], min_filas: int) -> Iterator[List[Dict]]:
+    """Junta páginas consecutivas hasta tener al menos ``min_filas`` insights por lote."""
+    lote: List[Dict] = []
+    for pagina in paginas:
+        lote.extend(pagina)
+        if len(lote) >= min_filas:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class BoundedWriter:
+    """
+    Escribe lotes de filas en un hilo aparte.
+
+    ``submit`` se bloquea cuando ya hay ``maxsize`` lotes esperando, lo que
+    frena la descarga si la base de datos va más lenta que Meta.
+    """
+
+    def __init__(
+        self,
+        write_fn: Callable[[List[Dict[str, Any]]], Tuple[int, List[str]]],
+        maxsize: int = DEFAULT_WRITE_QUEUE,
+        nombre: str = "meta-insights-writer"
+    ):
+        self._write_fn = write_fn
+        self._cola: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+        self._fallo: Optional[BaseException] = None
+        self.escritas = 0
+        self.errores: List[str] = []
+        self._hilo = threading.Thread(target=self._loop, name=nombre, daemon=True)
+        self._hilo.start()
+
+    def _loop(self) -> None:
+        while True:
+            rows = self._cola.get()
+            if rows is _FIN:
+                return
+            if self._fallo is not None:
+                continue
+            try:
+                escritas, errores = self._write_fn(rows)
+                self.escritas += escritas
+                self.errores.extend(errores)
+            except BaseException as e:
+                logger.error(f"❌ Error escribiendo lote de {len(rows)} filas: {e}")
+                self._fallo = e
+
+    def submit(self, rows: List[Dict[str, Any]]) -> None:
+        """Encola un lote (se bloquea si la cola está llena)."""
+        if self._fallo is not None:
+            raise self._fallo
+        if rows:
+            self._cola.put(rows)
+
+    def close(self) -> Tuple[int, List[str]]:
+        """
+        Espera a que se escriba todo lo encolado.
+
+        Returns:
+            Tuple (filas_escritas, errores)
+        """
+        if self._hilo.is_alive():
+            self._cola.put(_FIN)
+            self._hilo.join()
+        if self._fallo is not None:
+            raise self._fallo
+        return self.escritas, self.errores
+
+    def __enter__(self) -> "BoundedWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._hilo.is_alive():
+            self._cola.put(_FIN)
+            self._hilo.join()
@@ -0,0 +1,242 @@
+"""
+Agregador de una sola pasada para reportes de Meta Ads.
+
+Recorre las filas de anuncios una vez y acumula todas las métricas del
+reporte semanal a la vez: totales, por plataforma, por campaña y por
+conjunto. Reemplaza los ``sum()`` por métrica y las copias filtradas por
+plataforma de MetaAdsReportsService.
+
+También puede armarse con los agregados que calcula Postgres
+(RPC meta_ads_reporte_semanal_agregados) sin descargar las filas.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Prioridad de action types para derivar mensajes cuando
+# messaging_conversations_started viene en 0 (se toma el primero presente)
+ACTION_MESSAGE_PRIORITY = (
+    "onsite_conversion.messaging_conversation_started",
+    "onsite_conversion.messaging_conversation_started_7d",
+    "messaging_conversation_started",
+    "messaging_conversation_started_7d",
+    "onsite_conversion.total_messaging_connection",
+    "total_messaging_connection",
+    "onsite_conversion.messaging_first_reply",
+    "messaging_first_reply",
+    "onsite_conversion.total_messaging",
+)
+
+
+def _i(row: Dict, key: str) -> int:
+    return int(row.get(key, 0) or 0)
+
+
+def _f(row: Dict, key: str) -> float:
+    return float(row.get(key, 0) or 0)
+
+
+def mensajes_desde_actions(actions: Any) -> int:
+    """Mensajes de una fila según ``actions`` (primer action type de la prioridad)."""
+    if not isinstance(actions, list):
+        return 0
+
+    valores: Dict[str, float] = {}
+    for action in actions:
+        action_type = (action or {}).get("action_type")
+        value = (action or {}).get("value")
+        if not action_type:
+            continue
+        try:
+            valores[action_type] = float(value) if value is not None else 0.0
+        except Exception:
+            try:
+                valores[action_type] = float(str(value))
+            except Exception:
+                valores[action_type] = 0.0
+
+    for action_type in ACTION_MESSAGE_PRIORITY:
+        if action_type in valores:
+            return int(valores[action_type])
+    return 0
+
+
+class MetricBucket:
+    """Métricas acumuladas de un grupo de filas (total, plataforma, campaña o conjunto)."""
+
+    __slots__ = (
+        'filas', 'impresiones', 'alcance', 'clicks', 'link_clicks', 'gasto',
+        'mensajes', 'mensajes_total', 'mensajes_actions', 'interacciones',
+        'video_plays', 'reproducciones_video_3s',
+        'campana_ids', 'conjunto_ids', 'ad_ids', 'conteos',
+    )
+
+    def __init__(self):
+        self.filas = 0
+        self.impresiones = 0
+        self.alcance = 0
+        self.clicks = 0
+        self.link_clicks = 0
+        self.gasto = 0.0
+        self.mensajes = 0
+        self.mensajes_total = 0
+        self.mensajes_actions = 0
+        self.interacciones = 0.0
+        self.video_plays = 0
+        self.reproducciones_video_3s = 0
+        self.campana_ids: Set[str] = set()
+        self.conjunto_ids: Set[str] = set()
+        self.ad_ids: Set[str] = set()
+        # (campañas, conjuntos, anuncios) ya contados en SQL; None = usar los sets
+        self.conteos: Optional[Tuple[int, int, int]] = None
+
+    @classmethod
+    def from_sql(cls, fila: Dict[str, Any]) -> "MetricBucket":
+        """Bucket a partir de una fila del RPC de agregados semanales."""
+        bucket = cls()
+        bucket.filas = _i(fila, "filas")
+        for campo in (
+            'impresiones', 'alcance', 'clicks', 'link_clicks', 'mensajes', 'mensajes_total',
+            'mensajes_actions', 'video_plays', 'reproducciones_video_3s',
+        ):
+            setattr(bucket, campo, _i(fila, campo))
+        bucket.gasto = _f(fila, "gasto")
+        bucket.interacciones = _f(fila, "interacciones")
+        bucket.conteos = (_i(fila, "campanas"), _i(fila, "conjuntos"), _i(fila, "anuncios"))
+        return bucket
+
+    @property
+    def num_campanas(self) -> int:
+        return self.conteos[0] if self.conteos else len(self.campana_ids)
+
+    @property
+    def num_conjuntos(self) -> int:
+        return self.conteos[1] if self.conteos else len(self.conjunto_ids)
+
+    @property
+    def num_anuncios(self) -> int:
+        return self.conteos[2] if self.conteos else len(self.ad_ids)
+
+    def add(self, row: Dict, valores: Dict[str, Any]) -> None:
+        """Suma una fila ya convertida (``valores`` se calcula una vez por fila)."""
+        self.filas += 1
+        self.impresiones += valores['impresiones']
+        self.alcance += valores['alcance']
+        self.clicks += valores['clicks']
+        self.link_clicks += valores['link_clicks']
+        self.gasto += valores['gasto']
+        self.mensajes += valores['mensajes']
+        self.mensajes_total += valores['mensajes_total']
+        self.mensajes_actions += valores['mensajes_actions']
+        self.interacciones += valores['interacciones']
+        self.video_plays += valores['video_plays']
+        self.reproducciones_video_3s += valores['reproducciones_video_3s']
+        if row.get("campana_id"):
+            self.campana_ids.add(row["campana_id"])
+        if row.get("conjunto_id"):
+            self.conjunto_ids.add(row["conjunto_id"])
+        if row.get("ad_id"):
+            self.ad_ids.add(row["ad_id"])
+
+
+class ReportAggregator:
+    """
+    Acumula filas de anuncios en una pasada.
+
+    Ejemplo:
+        agregado = ReportAggregator.from_rows(anuncios)
+        agregado.total.gasto, agregado.platform('facebook').clicks
+    """
+
+    def __init__(self):
+        self.total = MetricBucket()
+        self.plataformas: Dict[str, MetricBucket] = {}
+        self.campanas: Dict[Optional[str], MetricBucket] = {}
+        self.conjuntos: Dict[Optional[str], MetricBucket] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict]) -> "ReportAggregator":
+        agregado = cls()
+        agregado.add_all(rows)
+        return agregado
+
+    @classmethod
+    def from_sql_rows(cls, filas: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, Optional[str]], "ReportAggregator"]:
+        """
+        Agrupa las filas del RPC de agregados semanales por (cuenta, nombre_nora).
+
+        El RPC no agrupa por conjunto, así que ``conjuntos`` queda vacío.
+        """
+        agregados: Dict[Tuple[str, Optional[str]], ReportAggregator] = {}
+        for fila in filas:
+            llave = (fila.get("id_cuenta_publicitaria"), fila.get("nombre_nora"))
+            agregado = agregados.get(llave)
+            if agregado is None:
+                agregado = agregados[llave] = cls()
+
+            bucket = MetricBucket.from_sql(fila)
+            nivel = fila.get("nivel")
+            if nivel == "total":
+                agregado.total = bucket
+            elif nivel == "plataforma":
+                agregado.plataformas[fila.get("publisher_platform") or ""] = bucket
+            elif nivel == "campana":
+                agregado.campanas[fila.get("nombre_campana")] = bucket
+        return agregados
+
+    def add_all(self, rows: Iterable[Dict]) -> "ReportAggregator":
+        for row in rows:
+            self.add(row)
+        return self
+
+    def add(self, row: Dict) -> None:
+        """Convierte la fila una vez y la suma a todos sus grupos."""
+        valores = {
+            'impresiones': _i(row, "impresiones"),
+            'alcance': _i(row, "alcance"),
+            'clicks': _i(row, "clicks"),
+            'link_clicks': _i(row, "link_clicks") or _i(row, "inline_link_clicks"),
+            'gasto': _f(row, "importe_gastado"),
+            'mensajes': _i(row, "messaging_conversations_started"),
+            'mensajes_total': _i(row, "mensajes_total"),
+            'mensajes_actions': mensajes_desde_actions(row.get("actions") or []),
+            'interacciones': (
+                _f(row, "page_engagement") or
+                _f(row, "post_engagement") or
+                _f(row, "post_engagements")
+            ),
+            'video_plays': _i(row, "video_plays"),
+            'reproducciones_video_3s': _i(row, "reproducciones_video_3s"),
+        }
+
+        plataforma = (row.get("publisher_platform") or "").lower()
+        campana = row.get("nombre_campana", "Sin nombre")
+        conjunto = row.get("nombre_conjunto", "Sin nombre")
+
+        self.total.add(row, valores)
+        for grupos, llave in (
+            (self.plataformas, plataforma),
+            (self.campanas, campana),
+            (self.conjuntos, conjunto),
+        ):
+            bucket = grupos.get(llave)
+            if bucket is None:
+                bucket = grupos[llave] = MetricBucket()
+            bucket.add(row, valores)
+
+    def platform(self, nombre: str) -> MetricBucket:
+        """Bucket de una plataforma (vacío si no hubo filas)."""
+        return self.plataformas.get(nombre) or MetricBucket()
+
+    def campaign_summary(self) -> List[Dict[str, Any]]:
+        """Resumen por campaña (nombre, anuncios, gasto, impresiones, clicks, mensajes, interacciones)."""
+        return [
+            {
+                'campana': campana,
+                'anuncios': bucket.filas,
+                'gasto_total': bucket.gasto,
+                'impresiones': bucket.impresiones,
+                'clicks': bucket.clicks,
+                'mensajes': bucket.mensajes_total,
+                'interacciones': bucket.interacciones,
+            }
+            for campana, bucket in self.campanas.items()
+        ]
@@ -17,11 +17,15 @@ Características:
 import os
 import uuid
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, date, timedelta, timezone
 from typing import Dict, List, Optional, Any
 from dotenv import load_dotenv
 
 from automation_hub.db.supabase_client import create_client_from_env
+from automation_hub.db.repositories.meta_ads_reportes_repo import fetch_agregados_semanales
+from automation_hub.integrations.meta_ads.analytics_mirror import get_analytics_mirror
+from automation_hub.integrations.meta_ads.report_aggregator import ReportAggregator
 
 # Load environment variables
 load_dotenv()
@@ -30,9 +34,28 @@ load_dotenv()
 class MetaAdsReportsService:
     """Servicio para generar reportes semanales agregados de Meta Ads"""
     
+    # Cuentas calculadas en paralelo en generate_weekly_reports
+    REPORT_WORKERS = int(os.getenv('META_REPORTS_WORKERS', '4') or '4')
+    
+    # Sumar en Postgres (RPC meta_ads_reporte_semanal_agregados) en lugar de
+    # descargar meta_ads_anuncios_detalle por cuenta
+    AGGREGATE_IN_SQL = os.getenv('META_REPORTS_SQL_AGGREGATES', '0') == '1'
+    
+    # Calcular los reportes desde la réplica local de meta_ads_anuncios_daily
+    # en lugar de meta_ads_anuncios_detalle (requiere META_ANALYTICS_MIRROR_PATH)
+    USE_MIRROR = os.getenv('META_REPORTS_USE_MIRROR', '0') == '1'
+    
     def __init__(self, supabase_client=None):
         """Initialize service with Supabase client"""
         self.supabase = supabase_client or create_client_from_env()
+        # Réplica local de meta_ads_anuncios_daily (None si no está activada o no abre)
+        self.mirror = None
+        if self.USE_MIRROR:
+            try:
+                self.mirror = get_analytics_mirror(self.supabase)
+            except Exception as e:
+                print(f"⚠️ No se pudo abrir la réplica local, se usa Supabase: {e}")
+        self._mirror_sincronizada = False
     
     @staticmethod
     def clean_surrogates(text: str) -> str:
@@ -130,55 +153,51 @@ class MetaAdsReportsService:
             "empresa_nombre": empresa_nombre
         }
     
-    def analyze_campaign_performance(self, anuncios: List[Dict]) -> tuple[Dict, Dict]:
+    def get_empresas_nombres(self, empresa_ids: List[Optional[str]]) -> Optional[Dict[str, str]]:
+        """
+        Nombres de varias empresas en una consulta por lote
+        
+        Returns:
+            Dict empresa_id -> nombre_empresa, o None si la consulta falla
+        """
+        ids = list(dict.fromkeys(e for e in empresa_ids if e))
+        nombres = {}
+        try:
+            for i in range(0, len(ids), 200):
+                response = self.supabase.table("cliente_empresas") \
+                    .select("id, nombre_empresa") \
+                    .in_("id", ids[i:i + 200]) \
+                    .execute()
+                for fila in response.data or []:
+                    nombres[fila["id"]] = fila.get("nombre_empresa")
+        except Exception as e:
+            print(f"⚠️ Error obteniendo nombres de empresas: {e}")
+            return None
+        return nombres
+    
+    def analyze_campaign_performance(
+        self,
+        anuncios: List[Dict],
+        agregado: Optional[ReportAggregator] = None
+    ) -> tuple[Dict, Dict]:
         """
         Analiza rendimiento de campañas y genera insights
         
         Args:
             anuncios: Lista de anuncios
+            agregado: Agregación ya calculada de ``anuncios`` (evita otra pasada)
             
         Returns:
             Tupla con (tipos_mensajes, objetivos_campanas)
         """
+        if agregado is None:
+            agregado = ReportAggregator.from_rows(anuncios)
+        
         tipos_mensajes = {}
         objetivos_campana = {}
-        campanas_performance = {}
-        
-        def _i(x, k): return int(x.get(k, 0) or 0)
-        def _f(x, k): return float(x.get(k, 0) or 0)
-        
-        # Analizar por campaña
-        for anuncio in anuncios:
-            campana_nombre = anuncio.get("nombre_campana", "Sin nombre")
-            
-            if campana_nombre not in campanas_performance:
-                campanas_performance[campana_nombre] = {
-                    'anuncios': 0,
-                    'gasto_total': 0,
-                    'impresiones': 0,
-                    'clicks': 0,
-                    'mensajes': 0,
-                    'interacciones': 0
-                }
-            
-            # Acumular métricas por campaña
-            perf = campanas_performance[campana_nombre]
-            perf['anuncios'] += 1
-            perf['gasto_total'] += _f(anuncio, "importe_gastado")
-            perf['impresiones'] += _f(anuncio, "impresiones")
-            perf['clicks'] += _f(anuncio, "clicks")
-            perf['mensajes'] += _f(anuncio, "mensajes_total")
-            
-            # Calcular interacciones (varios campos posibles)
-            interacciones = (
-                _f(anuncio, "page_engagement") or
-                _f(anuncio, "post_engagement") or
-                _f(anuncio, "post_engagements")
-            )
-            perf['interacciones'] += interacciones
         
         # Clasificar campañas por rendimiento
-        for campana, data in campanas_performance.items():
+        for data in agregado.campaign_summary():
             if data['mensajes'] > 50:
                 categoria = "ALTA_CONVERSACIÓN"
             elif data['clicks'] > 1000:
@@ -193,16 +212,14 @@ class MetaAdsReportsService:
             objetivos_campana[categoria] = objetivos_campana.get(categoria, 0) + data['anuncios']
         
         # Calcular métricas totales y costos
-        total_mensajes = sum(_i(a, "mensajes_total") for a in anuncios)
-        total_clicks = sum(_i(a, "clicks") for a in anuncios)
-        total_spend = sum(_f(a, "importe_gastado") for a in anuncios)
-        total_imp = sum(_i(a, "impresiones") for a in anuncios)
-        total_interacciones = sum(
-            _f(a, "page_engagement") or _f(a, "post_engagement") or _f(a, "post_engagements")
-            for a in anuncios
-        )
-        total_link_clicks = sum(_i(a, "link_clicks") or _i(a, "inline_link_clicks") for a in anuncios)
-        total_video_views = sum(_i(a, "video_plays") for a in anuncios)
+        total = agregado.total
+        total_mensajes = total.mensajes_total
+        total_clicks = total.clicks
+        total_spend = total.gasto
+        total_imp = total.impresiones
+        total_interacciones = total.interacciones
+        total_link_clicks = total.link_clicks
+        total_video_views = total.video_plays
         
         # Análisis de tipos de mensajes con costos
         if total_mensajes > 0:
@@ -291,63 +308,28 @@ class MetaAdsReportsService:
         
         return insights
     
-    def derive_messages_from_actions(self, anuncios: List[Dict]) -> Dict[str, int]:
+    def derive_messages_from_actions(
+        self,
+        anuncios: List[Dict],
+        agregado: Optional[ReportAggregator] = None
+    ) -> Dict[str, int]:
         """
         Deriva mensajes desde actions cuando el campo messaging_conversations_started es 0
         
         Args:
             anuncios: Lista de anuncios
+            agregado: Agregación ya calculada de ``anuncios`` (evita otra pasada)
             
         Returns:
             Dict con totals, facebook y instagram messages
         """
-        def _msgs_from_actions(rows):
-            total = 0
-            for r in rows:
-                acts = r.get("actions") or []
-                if not isinstance(acts, list):
-                    continue
-                
-                # Normalizar a dict {action_type -> float}
-                adict = {}
-                for a in acts:
-                    k = (a or {}).get("action_type")
-                    v = (a or {}).get("value")
-                    if not k:
-                        continue
-                    try:
-                        adict[k] = float(v) if v is not None else 0.0
-                    except Exception:
-                        try:
-                            adict[k] = float(str(v))
-                        except Exception:
-                            adict[k] = 0.0
-                
-                # Prioridad de action types
-                for key in (
-                    "onsite_conversion.messaging_conversation_started",
-                    "onsite_conversion.messaging_conversation_started_7d",
-                    "messaging_conversation_started",
-                    "messaging_conversation_started_7d",
-                    "onsite_conversion.total_messaging_connection",
-                    "total_messaging_connection",
-                    "onsite_conversion.messaging_first_reply",
-                    "messaging_first_reply",
-                    "onsite_conversion.total_messaging",
-                ):
-                    if key in adict:
-                        total += int(adict[key])
-                        break
-            
-            return total
-        
-        fb_anuncios = [a for a in anuncios if (a.get("publisher_platform") or "").lower() == "facebook"]
-        ig_anuncios = [a for a in anuncios if (a.get("publisher_platform") or "").lower() == "instagram"]
+        if agregado is None:
+            agregado = ReportAggregator.from_rows(anuncios)
         
         return {
-            "total": _msgs_from_actions(anuncios),
-            "facebook": _msgs_from_actions(fb_anuncios),
-            "instagram": _msgs_from_actions(ig_anuncios)
+            "total": agregado.total.mensajes_actions,
+            "facebook": agregado.platform("facebook").mensajes_actions,
+            "instagram": agregado.platform("instagram").mensajes_actions
         }
     
     def archive_existing_report(
@@ -356,17 +338,22 @@ class MetaAdsReportsService:
         cuenta_id: str,
         fecha_inicio: str,
         fecha_fin: str,
-        nombre_nora: str
+        nombre_nora: str,
+        excluir_token: Optional[str] = None
     ) -> None:
         """
         Archiva reporte activo previo si existe (soft delete)
         
+        Se llama después de insertar el reporte nuevo, así una falla del
+        insert no deja la cuenta sin reporte activo.
+        
         Args:
             empresa_id: ID de la empresa
             cuenta_id: ID de la cuenta publicitaria
             fecha_inicio: Fecha de inicio
             fecha_fin: Fecha de fin
             nombre_nora: Nombre de Nora (tenant)
+            excluir_token: public_token del reporte recién insertado (no se archiva)
         """
         try:
             query = self.supabase.table("meta_ads_reportes_semanales") \
@@ -381,7 +368,10 @@ class MetaAdsReportsService:
                 query = query.eq("empresa_id", empresa_id)
             
             response = query.execute()
-            existing_reports = response.data or []
+            existing_reports = [
+                r for r in (response.data or [])
+                if not excluir_token or r.get("public_token") != excluir_token
+            ]
             
             if existing_reports:
                 for report in existing_reports:
@@ -398,24 +388,99 @@ class MetaAdsReportsService:
         except Exception as e:
             print(f"⚠️ Error archivando reportes previos: {e}")
     
-    def generate_report_for_account(
+    def get_aggregate_for_period(
         self,
-        nombre_nora: str,
         cuenta_id: str,
         fecha_inicio: str,
+        fecha_fin: str,
+        nombre_nora: str
+    ) -> ReportAggregator:
+        """
+        Agrega las métricas del período de una cuenta
+        
+        Con la réplica local o AGGREGATE_IN_SQL las sumas se hacen en SQL;
+        si no (o si la consulta SQL falla), se descargan los anuncios y se
+        agregan en una pasada.
+        
+        Returns:
+            ReportAggregator (vacío si no hay anuncios en el período)
+        """
+        if self.AGGREGATE_IN_SQL or self.mirror is not None:
+            try:
+                agregados = self.get_aggregates_for_accounts([cuenta_id], fecha_inicio, fecha_fin)
+                return agregados.get((cuenta_id, nombre_nora)) or ReportAggregator()
+            except Exception as e:
+                print(f"⚠️ Error obteniendo agregados SQL de {cuenta_id}, se agregan los anuncios: {e}")
+        
+        anuncios = self.get_ads_data_for_period(cuenta_id, fecha_inicio, fecha_fin, nombre_nora)
+        return ReportAggregator.from_rows(anuncios)
+    
+    def get_aggregates_for_accounts(
+        self,
+        cuenta_ids: List[str],
+        fecha_inicio: str,
         fecha_fin: str
+    ) -> Dict[tuple, ReportAggregator]:
+        """
+        Agregados del período de varias cuentas calculados en SQL
+        
+        Con la réplica local activada se consultan sus filas diarias
+        (sincronizada una vez por servicio). Si la réplica falla se desactiva
+        para el resto del servicio y se usa el RPC de Postgres (solo con
+        AGGREGATE_IN_SQL; si no, el error sube y se agregan los anuncios).
+        
+        Args:
+            cuenta_ids: Cuentas publicitarias
+            fecha_inicio: Fecha de inicio (YYYY-MM-DD)
+            fecha_fin: Fecha de fin (YYYY-MM-DD)
+            
+        Returns:
+            Dict (id_cuenta_publicitaria, nombre_nora) -> ReportAggregator
+        """
+        desde, hasta = date.fromisoformat(fecha_inicio), date.fromisoformat(fecha_fin)
+        if self.mirror is not None:
+            try:
+                if not self._mirror_sincronizada:
+                    self.mirror.sincronizar(self.supabase)
+                    self._mirror_sincronizada = True
+                filas = self.mirror.agregados_reporte(cuenta_ids, desde, hasta)
+                print(f"[DEBUG] Agregados réplica {self.mirror.engine}: {len(filas)} filas para {len(cuenta_ids)} cuentas")
+                return ReportAggregator.from_sql_rows(filas)
+            except Exception as e:
+                print(f"⚠️ Réplica local no disponible, se desactiva: {e}")
+                self.mirror = None
+                if not self.AGGREGATE_IN_SQL:
+                    raise
+        
+        filas = fetch_agregados_semanales(self.supabase, cuenta_ids, desde, hasta)
+        print(f"[DEBUG] Agregados SQL: {len(filas)} filas para {len(cuenta_ids)} cuentas")
+        return ReportAggregator.from_sql_rows(filas)
+    
+    def build_report_for_account(
+        self,
+        nombre_nora: str,
+        cuenta_id: str,
+        fecha_inicio: str,
+        fecha_fin: str,
+        agregado: Optional[ReportAggregator] = None,
+        empresa_info: Optional[Dict[str, Any]] = None
     ) -> Dict:
         """
-        Genera reporte agregado semanal para una cuenta
+        Calcula el reporte agregado semanal de una cuenta sin insertarlo
+        
+        Las métricas salen de una sola pasada sobre los anuncios
+        (ReportAggregator) o de los agregados SQL.
         
         Args:
             nombre_nora: Nombre de Nora (tenant)
             cuenta_id: ID de la cuenta publicitaria
             fecha_inicio: Fecha de inicio (YYYY-MM-DD)
             fecha_fin: Fecha de fin (YYYY-MM-DD)
+            agregado: Métricas ya agregadas (se consultan si no se pasan)
+            empresa_info: empresa_id y empresa_nombre ya resueltos (opcional)
             
         Returns:
-            Dict con resultado de la generación
+            Dict con ok, reporte (fila para meta_ads_reportes_semanales) y resumen
         """
         print(f"\n{'='*60}")
         print(f"📊 Generando reporte para cuenta: {cuenta_id}")
@@ -423,33 +488,28 @@ class MetaAdsReportsService:
         print(f"{'='*60}")
         
         # Obtener info de empresa
-        empresa_info = self.get_empresa_info(cuenta_id, nombre_nora)
+        if empresa_info is None:
+            empresa_info = self.get_empresa_info(cuenta_id, nombre_nora)
         empresa_id = empresa_info["empresa_id"]
         empresa_nombre = empresa_info["empresa_nombre"]
         
-        # Obtener datos de anuncios
-        anuncios = self.get_ads_data_for_period(cuenta_id, fecha_inicio, fecha_fin, nombre_nora)
+        # Totales, por plataforma y por campaña
+        if agregado is None:
+            agregado = self.get_aggregate_for_period(cuenta_id, fecha_inicio, fecha_fin, nombre_nora)
         
-        if not anuncios:
+        if not agregado.total.filas:
             return {
                 "ok": False,
                 "msg": f"Sin datos de anuncios en el rango. Cuenta: {cuenta_id}, Rango: {fecha_inicio}-{fecha_fin}"
             }
         
-        # Separar por plataforma
-        fb = [a for a in anuncios if (a.get("publisher_platform") or "").lower() == "facebook"]
-        ig = [a for a in anuncios if (a.get("publisher_platform") or "").lower() == "instagram"]
-        
-        def _i(x, k): return int(x.get(k, 0) or 0)
-        def _f(x, k): return float(x.get(k, 0) or 0)
-        
-        # Calcular métricas totales
-        total_imp = sum(_i(a, "impresiones") for a in anuncios)
-        total_clicks = sum(_i(a, "clicks") for a in anuncios)
-        total_spend = sum(_f(a, "importe_gastado") for a in anuncios)
+        total = agregado.total
+        fb = agregado.platform("facebook")
+        ig = agregado.platform("instagram")
+        total_spend = total.gasto
         
         # Analizar rendimiento de campañas
-        tipos_mensajes, objetivos_campana = self.analyze_campaign_performance(anuncios)
+        tipos_mensajes, objetivos_campana = self.analyze_campaign_performance([], agregado)
         
         # Construir reporte base
         reporte = {
@@ -463,39 +523,36 @@ class MetaAdsReportsService:
             "created_at": datetime.now(timezone.utc).isoformat(),
             
             # Totales de entidades
-            "total_campañas": len({a.get("campana_id") for a in anuncios if a.get("campana_id")}),
+            "total_campañas": total.num_campanas,
             "importe_gastado_campañas": total_spend,
-            "total_conjuntos": len({a.get("conjunto_id") for a in anuncios if a.get("conjunto_id")}),
+            "total_conjuntos": total.num_conjuntos,
             "importe_gastado_conjuntos": total_spend,
-            "total_anuncios": len({a.get("ad_id") for a in anuncios if a.get("ad_id")}),
+            "total_anuncios": total.num_anuncios,
             "importe_gastado_anuncios": total_spend,
             
             # Métricas generales
-            "impresiones": total_imp,
-            "alcance": sum(_i(a, "alcance") for a in anuncios),
-            "clicks": total_clicks,
-            "link_clicks": sum(_i(a, "link_clicks") or _i(a, "inline_link_clicks") for a in anuncios),
-            "mensajes": sum(_i(a, "messaging_conversations_started") for a in anuncios),
-            "interacciones": sum(
-                _i(a, "page_engagement") or _i(a, "post_engagement") or _i(a, "post_engagements")
-                for a in anuncios
-            ),
-            "video_plays": sum(_i(a, "video_plays") for a in anuncios),
-            "reproducciones_video_3s": sum(_i(a, "reproducciones_video_3s") for a in anuncios),
+            "impresiones": total.impresiones,
+            "alcance": total.alcance,
+            "clicks": total.clicks,
+            "link_clicks": total.link_clicks,
+            "mensajes": total.mensajes,
+            "interacciones": int(total.interacciones),
+            "video_plays": total.video_plays,
+            "reproducciones_video_3s": total.reproducciones_video_3s,
             
             # Breakdown Facebook
-            "facebook_impresiones": sum(_i(a, "impresiones") for a in fb),
-            "facebook_alcance": sum(_i(a, "alcance") for a in fb),
-            "facebook_clicks": sum(_i(a, "clicks") for a in fb),
-            "facebook_mensajes": sum(_i(a, "messaging_conversations_started") for a in fb),
-            "facebook_importe_gastado": sum(_f(a, "importe_gastado") for a in fb),
+            "facebook_impresiones": fb.impresiones,
+            "facebook_alcance": fb.alcance,
+            "facebook_clicks": fb.clicks,
+            "facebook_mensajes": fb.mensajes,
+            "facebook_importe_gastado": fb.gasto,
             
             # Breakdown Instagram
-            "instagram_impresiones": sum(_i(a, "impresiones") for a in ig),
-            "instagram_alcance": sum(_i(a, "alcance") for a in ig),
-            "instagram_clicks": sum(_i(a, "clicks") for a in ig),
-            "instagram_mensajes": sum(_i(a, "messaging_conversations_started") for a in ig),
-            "instagram_importe_gastado": sum(_f(a, "importe_gastado") for a in ig),
+            "instagram_impresiones": ig.impresiones,
+            "instagram_alcance": ig.alcance,
+            "instagram_clicks": ig.clicks,
+            "instagram_mensajes": ig.mensajes,
+            "instagram_importe_gastado": ig.gasto,
             
             # Análisis JSON
             "tipos_mensajes_json": tipos_mensajes,
@@ -505,7 +562,7 @@ class MetaAdsReportsService:
         # Fallback: derivar mensajes desde actions si es necesario
         if reporte.get("mensajes", 0) == 0:
             try:
-                derived_msgs = self.derive_messages_from_actions(anuncios)
+                derived_msgs = self.derive_messages_from_actions([], agregado)
                 reporte["mensajes"] = derived_msgs["total"]
                 reporte["facebook_mensajes"] = derived_msgs["facebook"]
                 reporte["instagram_mensajes"] = derived_msgs["instagram"]
@@ -521,21 +578,59 @@ class MetaAdsReportsService:
             print(f"⚠️ Error generando insights: {e}")
             reporte["insights_json"] = {}
         
-        # Archivar reporte previo si existe
-        self.archive_existing_report(empresa_id, cuenta_id, fecha_inicio, fecha_fin, nombre_nora)
-        
         # Generar public token único
         reporte["public_token"] = str(uuid.uuid4())
         
+        return {
+            "ok": True,
+            "reporte": reporte,
+            "resumen": {
+                "empresa_id": empresa_id,
+                "cuenta": cuenta_id,
+                "fecha_inicio": fecha_inicio,
+                "fecha_fin": fecha_fin,
+                "public_token": reporte["public_token"],
+                "total_anuncios": total.filas,
+                "gasto_total": total_spend,
+                "mensajes": reporte["mensajes"]
+            }
+        }
+    
+    def generate_report_for_account(
+        self,
+        nombre_nora: str,
+        cuenta_id: str,
+        fecha_inicio: str,
+        fecha_fin: str
+    ) -> Dict:
+        """
+        Genera reporte agregado semanal para una cuenta
+        
+        Args:
+            nombre_nora: Nombre de Nora (tenant)
+            cuenta_id: ID de la cuenta publicitaria
+            fecha_inicio: Fecha de inicio (YYYY-MM-DD)
+            fecha_fin: Fecha de fin (YYYY-MM-DD)
+            
+        Returns:
+            Dict con resultado de la generación
+        """
+        construido = self.build_report_for_account(nombre_nora, cuenta_id, fecha_inicio, fecha_fin)
+        if not construido.get("ok"):
+            return construido
+        
+        reporte = construido["reporte"]
+        resumen = construido["resumen"]
+        
         # Insertar reporte
         try:
             print(f"[DEBUG] Insertando reporte...")
-            print(f"  - Empresa ID: {empresa_id}")
+            print(f"  - Empresa ID: {reporte['empresa_id']}")
             print(f"  - Cuenta: {cuenta_id}")
             print(f"  - Período: {fecha_inicio} → {fecha_fin}")
-            print(f"  - Total anuncios: {len(anuncios)}")
+            print(f"  - Total anuncios: {resumen['total_anuncios']}")
             print(f"  - Mensajes: {reporte['mensajes']}")
-            print(f"  - Gasto: ${total_spend:.2f}")
+            print(f"  - Gasto: ${resumen['gasto_total']:.2f}")
             
             result = self.supabase.table("meta_ads_reportes_semanales") \
                 .insert(reporte) \
@@ -547,25 +642,48 @@ class MetaAdsReportsService:
             else:
                 print(f"✅ Reporte insertado (sin ID de retorno)")
             
-            return {
-                "ok": True,
-                "reporte": {
-                    "empresa_id": empresa_id,
-                    "cuenta": cuenta_id,
-                    "fecha_inicio": fecha_inicio,
-                    "fecha_fin": fecha_fin,
-                    "public_token": reporte["public_token"],
-                    "total_anuncios": len(anuncios),
-                    "gasto_total": total_spend,
-                    "mensajes": reporte["mensajes"]
-                }
-            }
+            # Archivar reporte previo si existe (ya con el nuevo insertado)
+            self.archive_existing_report(
+                reporte["empresa_id"], cuenta_id, fecha_inicio, fecha_fin, nombre_nora,
+                excluir_token=reporte.get("public_token")
+            )
+            
+            return {"ok": True, "reporte": resumen}
             
         except Exception as e:
             error_msg = f"Error insertando reporte: {e}"
             print(f"❌ {error_msg}")
             return {"ok": False, "error": error_msg}
     
+    def insert_reports_bulk(self, reportes: List[Dict]) -> List[Optional[str]]:
+        """
+        Inserta varios reportes con un solo INSERT
+        
+        Si el INSERT en bloque falla, se reintenta reporte por reporte para
+        que uno inválido no descarte a los demás.
+        
+        Returns:
+            Lista paralela a ``reportes`` con None (insertado) o el error
+        """
+        if not reportes:
+            return []
+        
+        try:
+            self.supabase.table("meta_ads_reportes_semanales").insert(reportes).execute()
+            print(f"✅ {len(reportes)} reportes insertados en bloque")
+            return [None] * len(reportes)
+        except Exception as e:
+            print(f"⚠️ Insert en bloque falló ({e}), insertando uno por uno")
+        
+        errores: List[Optional[str]] = []
+        for reporte in reportes:
+            try:
+                self.supabase.table("meta_ads_reportes_semanales").insert(reporte).execute()
+                errores.append(None)
+            except Exception as e:
+                errores.append(f"Error insertando reporte: {e}")
+        return errores
+    
     def generate_weekly_reports(
         self,
         nombre_nora: Optional[str] = None,
@@ -602,7 +720,7 @@ class MetaAdsReportsService:
         # Obtener cuentas activas
         try:
             query = self.supabase.table('meta_ads_cuentas') \
-                .select('id_cuenta_publicitaria, nombre_cliente, nombre_nora, estado_actual')
+                .select('id_cuenta_publicitaria, nombre_cliente, nombre_nora, estado_actual, empresa_id')
             
             if nombre_nora:
                 query = query.eq('nombre_nora', nombre_nora)
@@ -631,39 +749,94 @@ class MetaAdsReportsService:
             'total_mensajes': 0
         }
         
-        for cuenta in cuentas:
-            cuenta_id = cuenta['id_cuenta_publicitaria']
-            nombre_cliente = self.clean_surrogates(cuenta.get('nombre_cliente', 'Cliente desconocido'))
-            nora = cuenta.get('nombre_nora')
-            
+        # Modo SQL/réplica: los agregados de todas las cuentas salen de unas pocas consultas
+        agregados = None
+        if self.AGGREGATE_IN_SQL or self.mirror is not None:
             try:
-                result = self.generate_report_for_account(
-                    nombre_nora=nora,
-                    cuenta_id=cuenta_id,
-                    fecha_inicio=fecha_inicio,
-                    fecha_fin=fecha_fin
+                agregados = self.get_aggregates_for_accounts(
+                    [c['id_cuenta_publicitaria'] for c in cuentas], fecha_inicio, fecha_fin
                 )
+            except Exception as e:
+                print(f"⚠️ Error obteniendo agregados SQL, se consulta cuenta por cuenta: {e}")
+        empresas = self.get_empresas_nombres([c.get('empresa_id') for c in cuentas]) if agregados is not None else None
+        
+        def _preparar(cuenta: Dict) -> Dict:
+            """Calcula el reporte de una cuenta (sin insertar)."""
+            if agregados is not None:
+                llave = (cuenta['id_cuenta_publicitaria'], cuenta.get('nombre_nora'))
+                agregado = agregados.get(llave) or ReportAggregator()
+            else:
+                # Sin agregados (modo Python o falló la consulta SQL): una pasada sobre los anuncios
+                agregado = ReportAggregator.from_rows(self.get_ads_data_for_period(
+                    cuenta['id_cuenta_publicitaria'], fecha_inicio, fecha_fin, cuenta.get('nombre_nora')
+                ))
+            empresa_info = None
+            if empresas is not None:
+                empresa_info = {
+                    "empresa_id": cuenta.get('empresa_id'),
+                    "empresa_nombre": empresas.get(cuenta.get('empresa_id'))
+                }
+            
+            return self.build_report_for_account(
+                nombre_nora=cuenta.get('nombre_nora'),
+                cuenta_id=cuenta['id_cuenta_publicitaria'],
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                agregado=agregado,
+                empresa_info=empresa_info
+            )
+        
+        # Las cuentas se calculan en paralelo; los reportes se insertan juntos al final
+        preparados = []
+        workers = max(1, min(self.REPORT_WORKERS, len(cuentas)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_preparar, cuenta): cuenta for cuenta in cuentas}
+            for future in as_completed(futures):
+                cuenta = futures[future]
+                cuenta_id = cuenta['id_cuenta_publicitaria']
+                nombre_cliente = self.clean_surrogates(cuenta.get('nombre_cliente', 'Cliente desconocido'))
+                results['cuentas_procesadas'] += 1
+                
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'ok': False, 'error': str(e)}
                 
                 if result.get('ok'):
-                    results['reportes_exitosos'] += 1
-                    report_data = result.get('reporte', {})
-                    results['total_gasto'] += report_data.get('gasto_total', 0)
-                    results['total_mensajes'] += report_data.get('mensajes', 0)
+                    preparados.append((cuenta_id, nombre_cliente, result))
                 else:
                     results['reportes_con_errores'].append({
                         'cuenta': nombre_cliente,
                         'cuenta_id': cuenta_id,
                         'error': result.get('msg') or result.get('error')
                     })
-                
-            except Exception as e:
+        
+        errores_insert = self.insert_reports_bulk([r['reporte'] for _, _, r in preparados])
+        insertados = []
+        for (cuenta_id, nombre_cliente, result), error in zip(preparados, errores_insert):
+            if error:
                 results['reportes_con_errores'].append({
                     'cuenta': nombre_cliente,
                     'cuenta_id': cuenta_id,
-                    'error': str(e)
+                    'error': error
                 })
-            
-            results['cuentas_procesadas'] += 1
+                continue
+            insertados.append(result['reporte'])
+            results['reportes_exitosos'] += 1
+            results['total_gasto'] += result['resumen'].get('gasto_total', 0)
+            results['total_mensajes'] += result['resumen'].get('mensajes', 0)
+        
+        # Solo con el reporte nuevo ya insertado se archiva el previo de la cuenta
+        def _archivar(reporte: Dict) -> None:
+            self.archive_existing_report(
+                reporte.get('empresa_id'), reporte.get('id_cuenta_publicitaria'),
+                fecha_inicio, fecha_fin, reporte.get('nombre_nora'),
+                excluir_token=reporte.get('public_token')
+            )
+        
+        if insertados:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.REPORT_WORKERS, len(insertados)))) as executor:
+                list(executor.map(_archivar, insertados))
         
         # Resumen final
         print(f"\\n{'='*80}")
@@ -17,10 +17,16 @@ import json
 import time
 import requests
 from datetime import datetime, date, timedelta
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, Iterator, List, Optional, Any, Union
 from dotenv import load_dotenv
 
 from ...db.supabase_client import create_client_from_env
+from ...db.repositories.meta_ads_daily_repo import upsert_anuncios_daily, DEFAULT_UPSERT_CHUNK_SIZE
+from ...db.repositories.meta_ads_rollup_repo import refrescar_rollup_cuenta
+from .graph_batch import GraphBatchClient, GraphMicroBatcher
+from .action_metrics import MSG_TYPES, parse_actions, safe_float, safe_int
+from .name_cache import get_name_cache
+from .pipeline import BoundedWriter, prefetch, DEFAULT_PREFETCH_PAGES, DEFAULT_WRITE_QUEUE
 
 # Load environment variables
 load_dotenv()
@@ -33,14 +39,17 @@ class MetaAdsSyncService:
     GRAPH_API_VERSION = os.getenv('META_API_VERSION', 'v23.0')
     BASE_URL = f"https://graph.facebook.com/{GRAPH_API_VERSION}"
     
-    # Cache configuration
-    NAME_CACHE_TTL = int(os.getenv('NAMES_CACHE_TTL', '3600'))
-    _name_cache = {}
-    
     # Debug configuration
     LOG_DEBUG = os.getenv("META_SYNC_DEBUG", "0") == "1"
     LOG_EVERY = int(os.getenv("META_SYNC_LOG_EVERY", "100") or "100")
     
+    # Filas por request de upsert a Supabase
+    UPSERT_CHUNK_SIZE = int(os.getenv("META_SYNC_UPSERT_CHUNK", str(DEFAULT_UPSERT_CHUNK_SIZE)) or DEFAULT_UPSERT_CHUNK_SIZE)
+    
+    # Pipeline en streaming: páginas adelantadas y lotes en cola de escritura
+    PREFETCH_PAGES = int(os.getenv("META_SYNC_PREFETCH_PAGES", str(DEFAULT_PREFETCH_PAGES)) or DEFAULT_PREFETCH_PAGES)
+    WRITE_QUEUE = int(os.getenv("META_SYNC_WRITE_QUEUE", str(DEFAULT_WRITE_QUEUE)) or DEFAULT_WRITE_QUEUE)
+    
     # Fields básicos probados que funcionan
     INSIGHT_FIELDS = [
         # Identificadores y fechas básicos
@@ -52,16 +61,7 @@ class MetaAdsSyncService:
     ]
     
     # Action types que representan mensajes
-    MSG_TYPES = {
-        "onsite_conversion.messaging_conversation_started_7d",
-        "onsite_conversion.messaging_conversation_started",
-        "messaging_conversation_started_7d",
-        "messaging_conversation_started",
-        "onsite_conversion.messaging_first_reply",
-        "messaging_first_reply",
-        "onsite_conversion.total_messaging_connection",
-        "total_messaging_connection",
-    }
+    MSG_TYPES = MSG_TYPES
     
     def __init__(self, supabase_client=None):
         """Initialize service with Supabase client"""
@@ -69,6 +69,9 @@ class MetaAdsSyncService:
         self.access_token = os.getenv('META_ACCESS_REDACTED_TOKEN')
         if not self.access_token:
             raise ValueError("META_ACCESS_REDACTED_TOKEN environment variable is required")
+        self.graph_batch = GraphBatchClient(self.access_token, self.BASE_URL)
+        self.name_batcher = GraphMicroBatcher(self.graph_batch)
+        self.name_cache = get_name_cache(self.supabase)
     
     @staticmethod
     def clean_surrogates(text: str) -> str:
@@ -112,22 +115,22 @@ class MetaAdsSyncService:
         response = query.execute()
         return response.data or []
     
-    def paginate_insights(self, url: str, params: Optional[Dict] = None, timeout: int = 30) -> List[Dict]:
+    def iter_insight_pages(self, url: str, params: Optional[Dict] = None, timeout: int = 30) -> Iterator[List[Dict]]:
         """
-        Pagina a través de todas las páginas de insights de Meta API
+        Genera las páginas de insights de Meta API conforme llegan
         
         Args:
             url: URL inicial de la API
             params: Parámetros de la petición (opcional para siguientes páginas)
             timeout: Timeout de la petición en segundos
             
-        Returns:
-            Lista de todos los insights obtenidos
+        Yields:
+            Lista de insights de cada página; ante un error se detiene
         """
-        all_insights = []
         current_url = url
         current_params = params
         page_num = 1
+        total = 0
         
         while True:
             try:
@@ -137,32 +140,145 @@ class MetaAdsSyncService:
                 
                 data = response.json()
                 page_insights = data.get('data', [])
-                all_insights.extend(page_insights)
-                
-                print(f"   ✅ Página {page_num}: {len(page_insights)} insights (Total: {len(all_insights)})")
-                
-                # Verificar si hay siguiente página
-                next_url = (data.get('paging') or {}).get('next')
-                if not next_url:
-                    break
+                total += len(page_insights)
                 
-                # Para siguientes páginas, usar la URL completa
-                current_url = next_url
-                current_params = None  # URL next ya incluye parámetros
-                page_num += 1
-                
-                # Backoff para evitar rate limits
-                time.sleep(0.4)
+                print(f"   ✅ Página {page_num}: {len(page_insights)} insights (Total: {total})")
                 
             except Exception as e:
                 print(f"❌ Error en paginación: {self.clean_surrogates(str(e))}")
-                break
+                return
+            
+            yield page_insights
+            
+            # Verificar si hay siguiente página
+            next_url = (data.get('paging') or {}).get('next')
+            if not next_url:
+                return
+            
+            # Para siguientes páginas, usar la URL completa
+            current_url = next_url
+            current_params = None  # URL next ya incluye parámetros
+            page_num += 1
+            
+            # Backoff para evitar rate limits
+            time.sleep(0.4)
+    
+    def paginate_insights(self, url: str, params: Optional[Dict] = None, timeout: int = 30) -> List[Dict]:
+        """
+        Pagina a través de todas las páginas de insights de Meta API
+        
+        Returns:
+            Lista de todos los insights obtenidos
+        """
+        return [insight for page in self.iter_insight_pages(url, params, timeout) for insight in page]
+    
+    AD_NAMES_FIELDS = 'name,status,campaign{id,name,status},adset{id,name,status}'
+    AD_STATUS_FIELDS = 'status,campaign{status},adset{status}'
+    
+    @staticmethod
+    def _names_payload(data: Optional[Dict]) -> Dict[str, Optional[str]]:
+        """Mapea la respuesta de GET /{ad_id} a los nombres que se guardan"""
+        data = data or {}
+        campaign = data.get('campaign') or {}
+        adset = data.get('adset') or {}
+        return {
+            "campaign_name": campaign.get('name'),
+            "campaign_status": campaign.get('status'),
+            "adset_name": adset.get('name'),
+            "adset_status": adset.get('status'),
+            "ad_name": data.get('name'),
+            "status": data.get('status')
+        }
+    
+    @staticmethod
+    def _status_payload(data: Optional[Dict]) -> Dict[str, Optional[str]]:
+        """Mapea la respuesta de GET /{ad_id}?fields=AD_STATUS_FIELDS a los status que se guardan"""
+        data = data or {}
+        return {
+            "status": data.get('status'),
+            "campaign_status": (data.get('campaign') or {}).get('status'),
+            "adset_status": (data.get('adset') or {}).get('status'),
+        }
+    
+    def _cache_names(self, datos_por_ad: Dict[str, Dict]) -> Dict[str, Dict]:
+        """
+        Guarda en la caché compartida los nombres de anuncios recién pedidos a Graph
+        (el payload del anuncio ya incluye los de su campaña y conjunto).
+        
+        Returns:
+            Dict ad_id -> payload
+        """
+        payloads = {ad_id: self._names_payload(data) for ad_id, data in datos_por_ad.items()}
+        self.name_cache.put_many(payloads, 'ad')
+        return payloads
+    
+    def refresh_ad_statuses(self, ad_ids: List[str]) -> int:
+        """
+        Refresca el status de anuncios cuyo nombre sigue vigente en caché
+        (batch requests solo con los campos de status).
         
-        return all_insights
+        Returns:
+            Cantidad de anuncios con status actualizado
+        """
+        if not ad_ids:
+            return 0
+        
+        resultados = self.graph_batch.get_many(
+            [f"{ad_id}?fields={self.AD_STATUS_FIELDS}" for ad_id in ad_ids]
+        )
+        statuses = {}
+        for ad_id, resultado in zip(ad_ids, resultados):
+            if resultado['ok']:
+                statuses[ad_id] = self._status_payload(resultado['data'])
+            else:
+                self._debug(f"⚠️ Meta API error {resultado['code']} for ad {ad_id}: {resultado['error']}")
+        self.name_cache.actualizar_status(statuses, 'ad')
+        return len(statuses)
+    
+    def prefetch_ad_names(self, ad_ids: List[str]) -> int:
+        """
+        Carga en caché los nombres de varios anuncios con batch requests
+        (50 anuncios por request en lugar de uno por anuncio).
+        
+        Los que ya están en la caché compartida (memoria o meta_ads_nombres_cache)
+        no se piden a Graph API; si solo venció su status, se pide solo el status.
+        
+        Returns:
+            Cantidad de anuncios agregados a la caché
+        """
+        ids = list(dict.fromkeys(str(a) for a in ad_ids if a))
+        en_cache = self.name_cache.get_many(ids, 'ad')
+        faltantes = [ad_id for ad_id in ids if ad_id not in en_cache]
+        
+        vencidos = self.name_cache.status_vencido(en_cache, 'ad')
+        if vencidos:
+            refrescados = self.refresh_ad_statuses(vencidos)
+            print(f"🏷️ Status refrescado: {refrescados}/{len(vencidos)} anuncios con nombre en caché")
+        
+        if not faltantes:
+            return 0
+        
+        resultados = self.graph_batch.get_many(
+            [f"{ad_id}?fields={self.AD_NAMES_FIELDS}" for ad_id in faltantes]
+        )
+        
+        datos_por_ad = {}
+        for ad_id, resultado in zip(faltantes, resultados):
+            if resultado['ok']:
+                datos_por_ad[ad_id] = resultado['data']
+            else:
+                self._debug(f"⚠️ Meta API error {resultado['code']} for ad {ad_id}: {resultado['error']}")
+        self._cache_names(datos_por_ad)
+        
+        print(f"🏷️ Nombres precargados: {len(datos_por_ad)}/{len(faltantes)} anuncios ({len(en_cache)} ya en caché)")
+        return len(datos_por_ad)
     
     def get_ad_names_cached(self, ad_id: str) -> Dict[str, Optional[str]]:
         """
-        Obtiene nombres de campaña/adset con caché TTL
+        Obtiene nombres de campaña/adset con la caché compartida (LRU + TTL)
+        
+        Los cache miss se agrupan en batch requests con los de otras llamadas
+        que lleguen en la misma ventana.
         
         Args:
             ad_id: ID del anuncio
@@ -174,41 +290,28 @@ class MetaAdsSyncService:
             return {"campaign_name": None, "adset_name": None, "ad_name": None, "status": None}
         
         # Check cache
-        now_ts = time.time()
-        if ad_id in self._name_cache:
-            expires, payload = self._name_cache[ad_id]
-            if expires > now_ts:
-                self._debug(f"✨ Cache hit para ad {ad_id}")
-                return payload
-        
-        # Cache miss: fetch from API
+        payload = self.name_cache.get(ad_id, 'ad')
+        if payload is not None:
+            self._debug(f"✨ Cache hit para ad {ad_id}")
+            if self.name_cache.status_vencido([ad_id], 'ad'):
+                try:
+                    resultado = self.name_batcher.get(f"{ad_id}?fields={self.AD_STATUS_FIELDS}")
+                    if resultado['ok']:
+                        self.name_cache.actualizar_status(
+                            {str(ad_id): self._status_payload(resultado['data'])}, 'ad'
+                        )
+                        payload = self.name_cache.get(ad_id, 'ad') or payload
+                except Exception as e:
+                    self._debug(f"⚠️ Error refrescando status del ad {ad_id}: {e}")
+            return payload
+        
+        # Cache miss: fetch from API (micro-batch)
         try:
-            url = f"{self.BASE_URL}/{ad_id}"
-            params = {
-                'access_token': self.access_token,
-                'fields': 'name,status,campaign{name,status},adset{name,status}'
-            }
-            
-            response = requests.get(url, params=params, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                campaign = data.get('campaign', {})
-                adset = data.get('adset', {})
-                
-                payload = {
-                    "campaign_name": campaign.get('name'),
-                    "campaign_status": campaign.get('status'),
-                    "adset_name": adset.get('name'),
-                    "adset_status": adset.get('status'),
-                    "ad_name": data.get('name'),
-                    "status": data.get('status')
-                }
-                
-                # Save to cache
-                self._name_cache[ad_id] = (now_ts + self.NAME_CACHE_TTL, payload)
-                return payload
+            resultado = self.name_batcher.get(f"{ad_id}?fields={self.AD_NAMES_FIELDS}")
+            if resultado['ok']:
+                return self._cache_names({ad_id: resultado['data']})[ad_id]
             else:
-                self._debug(f"⚠️ Meta API error {response.status_code} for ad {ad_id}")
+                self._debug(f"⚠️ Meta API error {resultado['code']} for ad {ad_id}: {resultado['error']}")
         except Exception as e:
             self._debug(f"⚠️ Error fetching names for ad {ad_id}: {e}")
         
@@ -225,22 +328,15 @@ class MetaAdsSyncService:
         Returns:
             Total de mensajes derivados
         """
-        total = 0.0
-        for action in (actions or []):
-            action_type = (action.get("action_type") or "").strip()
-            if action_type in self.MSG_TYPES:
-                try:
-                    total += float(action.get("value", 0))
-                except (TypeError, ValueError):
-                    pass
-        return int(total)
+        return parse_actions(actions)['messages']
     
     def compute_messaging_metrics(
         self,
         insight: Dict,
         sdk_data: Optional[Dict],
         actions: List[Dict],
-        spend: float
+        spend: float,
+        action_metrics: Optional[Dict] = None
     ) -> Dict:
         """
         Unifica KPIs de mensajería con prioridad: SDK > insight > derivado de actions
@@ -250,22 +346,11 @@ class MetaAdsSyncService:
             sdk_data: Datos del SDK (opcional)
             actions: Lista de actions
             spend: Importe gastado
+            action_metrics: Resultado de parse_actions, si ya se calculó
             
         Returns:
             Dict con métricas de messaging unificadas
         """
-        def _to_int(x):
-            try:
-                return int(float(x) if x is not None else 0)
-            except Exception:
-                return 0
-        
-        def _to_float(x):
-            try:
-                return float(x) if x is not None else None
-            except Exception:
-                return None
-        
         out = {
             "messaging_conversations_started": 0,
             "messaging_first_reply": 0,
@@ -280,48 +365,39 @@ class MetaAdsSyncService:
         
         # 1) SDK primero (prioridad más alta)
         if sdk_data:
-            ms = _to_int(sdk_data.get("messages_started"))
-            fr = _to_int(sdk_data.get("first_replies"))
+            ms = safe_int(sdk_data.get("messages_started"))
+            fr = safe_int(sdk_data.get("first_replies"))
             out["messaging_conversations_started"] = max(out["messaging_conversations_started"], ms)
             out["messaging_first_reply"] = max(out["messaging_first_reply"], fr)
-            out["cost_per_message"] = _to_float(
+            out["cost_per_message"] = safe_float(
                 sdk_data.get("cost_per_message") or sdk_data.get("cost_per_1_message")
             )
-            cfr = _to_float(sdk_data.get("cost_per_messaging_first_reply"))
+            cfr = safe_float(sdk_data.get("cost_per_messaging_first_reply"))
             if cfr is not None:
                 out["cost_per_messaging_first_reply"] = cfr
             out["messages_source"] = "sdk"
         
         # 2) Insight directo (oficial de Meta)
         if insight:
-            mcs = _to_int(insight.get("messaging_conversations_started"))
+            mcs = safe_int(insight.get("messaging_conversations_started"))
             if mcs > out["messaging_conversations_started"]:
                 out["messaging_conversations_started"] = mcs
                 out["messages_source"] = "insight"
             
-            cpmcs = _to_float(insight.get("cost_per_messaging_conversation_started"))
+            cpmcs = safe_float(insight.get("cost_per_messaging_conversation_started"))
             if cpmcs is not None:
                 out["cost_per_messaging_conversation_started"] = cpmcs
         
         # 3) Derivado de actions (fallback)
         if actions:
-            derived_messages = self.derive_messages_from_actions(actions)
+            if action_metrics is None:
+                action_metrics = parse_actions(actions)
+            derived_messages = action_metrics['messages']
             if derived_messages > out["messaging_conversations_started"] and out["messages_source"] == "derived":
                 out["messaging_conversations_started"] = derived_messages
             
-            # Procesar first replies
-            first = 0
-            FIRST_REPLY_ACTIONS = {
-                "messaging_first_reply", "first_reply",
-                "onsite_conversion.messaging_first_reply",
-                "onsite_conversion.messaging_conversation_replied_7d"
-            }
-            for a in actions:
-                if a.get("action_type") in FIRST_REPLY_ACTIONS:
-                    try:
-                        first += int(float(a.get("value", 0)))
-                    except (TypeError, ValueError):
-                        pass
+            # First replies (mismo recorrido de actions)
+            first = action_metrics['first_replies']
             
             if first > out["messaging_first_reply"] and out["messages_source"] == "derived":
                 out["messaging_first_reply"] = first
@@ -330,7 +406,7 @@ class MetaAdsSyncService:
         out["mensajes_total"] = (out["messaging_conversations_started"] or 0) + (out["messaging_first_reply"] or 0)
         
         if (out["mensajes_total"] or 0) > 0:
-            c = _to_float(spend)
+            c = safe_float(spend)
             if c is not None and c > 0:
                 out["costo_por_mensaje_total"] = c / out["mensajes_total"]
                 out["msg_cost_is_calculated"] = True
@@ -375,21 +451,6 @@ class MetaAdsSyncService:
         actions = insight.get('actions', [])
         metrics = self.compute_messaging_metrics(insight, None, actions, spend)
         
-        # Helper para convertir a int seguro
-        def safe_int(value):
-            if isinstance(value, (int, float)):
-                return int(value)
-            if isinstance(value, list):
-                return sum(int(float(item.get('value', 0))) for item in value if isinstance(item, dict))
-            return 0
-        
-        # Helper para convertir a float seguro
-        def safe_float(value):
-            try:
-                return float(value) if value is not None else None
-            except (TypeError, ValueError):
-                return None
-        
         # Construir row de datos
         data = {
             # Identificadores
@@ -524,53 +585,73 @@ class MetaAdsSyncService:
         print(f"📊 Obteniendo insights entre {fecha_inicio} y {fecha_fin}")
         
         try:
-            # Obtener insights (paginado)
-            all_insights = self.paginate_insights(url, params)
-            
-            if not all_insights:
-                print(f"ℹ️ No se encontraron insights para cuenta {account_id}")
-                return {'ok': True, 'processed': 0, 'account_id': account_id}
-            
-            print(f"📊 Total insights obtenidos: {len(all_insights)}")
-            
-            # Marcar registros existentes como inactivos
-            fecha_sync = datetime.utcnow().isoformat()
-            self.supabase.table('meta_ads_anuncios_daily') \
-                .update({'activo': False, 'fecha_ultima_actualizacion': fecha_sync}) \
-                .eq('id_cuenta_publicitaria', account_id) \
-                .eq('fecha_reporte', fecha_inicio.isoformat()) \
-                .execute()
-            
-            # Procesar y upsert cada insight
-            processed = 0
+            # Obtener, transformar y guardar insights página por página
+            total_insights = 0
+            total_rows = 0
             errors = []
+            inicio_upsert = time.perf_counter()
             
-            for idx, insight in enumerate(all_insights):
-                if (idx + 1) % self.LOG_EVERY == 0:
-                    print(f"   Procesando {idx + 1}/{len(all_insights)}...")
-                
-                try:
-                    row = self.process_insight_to_db_row(
-                        insight, account_id, fecha_inicio, fecha_fin, nombre_nora
-                    )
-                    
-                    if not row:
+            writer = BoundedWriter(
+                lambda rows: upsert_anuncios_daily(self.supabase, rows, self.UPSERT_CHUNK_SIZE),
+                self.WRITE_QUEUE
+            )
+            with writer:
+                for page_insights in prefetch(self.iter_insight_pages(url, params), self.PREFETCH_PAGES):
+                    if not page_insights:
                         continue
                     
-                    # Upsert a base de datos
-                    self.supabase.table('meta_ads_anuncios_daily') \
-                        .upsert(
-                            row,
-                            on_conflict='ad_id,fecha_reporte,publisher_platform'
-                        ) \
-                        .execute()
+                    if not total_insights:
+                        # Marcar registros existentes como inactivos (antes de la primera escritura)
+                        fecha_sync = datetime.utcnow().isoformat()
+                        self.supabase.table('meta_ads_anuncios_daily') \
+                            .update({'activo': False, 'fecha_ultima_actualizacion': fecha_sync}) \
+                            .eq('id_cuenta_publicitaria', account_id) \
+                            .eq('fecha_reporte', fecha_inicio.isoformat()) \
+                            .execute()
+                    total_insights += len(page_insights)
                     
-                    processed += 1
+                    # Precargar nombres de los anuncios de la página en batch
+                    self.prefetch_ad_names([i.get('ad_id') or i.get('id') for i in page_insights])
                     
-                except Exception as e:
-                    error_msg = f"Error procesando ad {insight.get('ad_id')}: {str(e)}"
-                    errors.append(error_msg)
-                    self._debug(error_msg)
+                    rows = []
+                    for insight in page_insights:
+                        try:
+                            row = self.process_insight_to_db_row(
+                                insight, account_id, fecha_inicio, fecha_fin, nombre_nora
+                            )
+                            
+                            if row:
+                                rows.append(row)
+                            
+                        except Exception as e:
+                            error_msg = f"Error procesando ad {insight.get('ad_id')}: {str(e)}"
+                            errors.append(error_msg)
+                            self._debug(error_msg)
+                    
+                    total_rows += len(rows)
+                    print(f"   Procesando {total_insights} insights...")
+                    writer.submit(rows)
+                
+                processed, upsert_errors = writer.close()
+            
+            if not total_insights:
+                print(f"ℹ️ No se encontraron insights para cuenta {account_id}")
+                return {'ok': True, 'processed': 0, 'account_id': account_id}
+            
+            print(f"📊 Total insights obtenidos: {total_insights}")
+            errors.extend(upsert_errors)
+            for error_msg in upsert_errors:
+                self._debug(error_msg)
+            duracion = time.perf_counter() - inicio_upsert
+            print(f"💾 {processed}/{total_rows} filas guardadas en {duracion:.1f}s")
+            
+            # Totales por cuenta/día/plataforma para los reportes
+            try:
+                refrescar_rollup_cuenta(self.supabase, account_id, [fecha_inicio.isoformat()])
+            except Exception as e:
+                error_msg = f"Error refrescando rollup de {account_id}: {str(e)}"
+                print(f"⚠️ {error_msg}")
+                errors.append(error_msg)
             
             print(f"✅ Sincronización completa: {processed} anuncios procesados")
             
@@ -2,9 +2,20 @@
 
 from __future__ import annotations
 
+import logging
 import os
+import threading
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKEN_TYPE_RANK = {"system": 0, "user": 1, "page": 2}
+
+# Códigos de error de Graph API que indican token inválido, expirado o revocado
+META_TOKEN_ERROR_CODES = {102, 190}
+
+META_TOKENS_COLUMNS = "id, nombre_nora, token, subject_type, subject_id, status, expires_at, updated_at, issued_at"
 
 
 def _parse_dt(value: Optional[str]) -> Optional[datetime]:
@@ -16,6 +27,43 @@ def _parse_dt(value: Optional[str]) -> Optional[datetime]:
         return None
 
 
+def _rank_token_rows(rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Descarta tokens vacíos o expirados y ordena el resto por preferencia.
+
+    Orden: tipo (system > user > page), luego el que expira antes y el más antiguo.
+    """
+    now_utc = datetime.utcnow().replace(tzinfo=None)
+    valid_rows: List[Dict[str, Any]] = []
+
+    for row in rows:
+        token = (row.get("token") or "").strip()
+        if not token:
+            continue
+
+        expires_at = _parse_dt(row.get("expires_at"))
+        if expires_at is not None and expires_at.replace(tzinfo=None) <= now_utc:
+            continue
+
+        valid_rows.append(row)
+
+    def _sort_key(row: Dict[str, Any]) -> Tuple[int, datetime, datetime]:
+        rank = TOKEN_TYPE_RANK.get((row.get("subject_type") or "").lower(), 99)
+        expires = _parse_dt(row.get("expires_at"))
+        updated = _parse_dt(row.get("updated_at")) or _parse_dt(row.get("issued_at")) or datetime.min
+        expires_weight = expires.replace(tzinfo=None) if expires else datetime.max
+        updated_weight = updated.replace(tzinfo=None)
+        return (rank, expires_weight, updated_weight)
+
+    return sorted(valid_rows, key=_sort_key)
+
+
+def _token_source(nombre_nora: str, row: Dict[str, Any]) -> str:
+    subject_type = row.get("subject_type") or "unknown"
+    subject_id = row.get("subject_id") or "unknown"
+    return f"meta_tokens:{nombre_nora}:{subject_type}:{subject_id}"
+
+
 def token_from_env() -> Tuple[Optional[str], Optional[str]]:
     """Fallback legacy por variables de entorno."""
     candidates = [
@@ -57,37 +105,12 @@ def token_from_meta_tokens(supabase: Any, nombre_nora: Optional[str]) -> Tuple[O
     if not rows:
         return None, None
 
-    now_utc = datetime.utcnow().replace(tzinfo=None)
-    type_rank = {"system": 0, "user": 1, "page": 2}
-    valid_rows: List[Dict[str, Any]] = []
-
-    for row in rows:
-        token = (row.get("token") or "").strip()
-        if not token:
-            continue
-
-        expires_at = _parse_dt(row.get("expires_at"))
-        if expires_at is not None and expires_at.replace(tzinfo=None) <= now_utc:
-            continue
-
-        valid_rows.append(row)
-
-    if not valid_rows:
+    ranked = _rank_token_rows(rows)
+    if not ranked:
         return None, None
 
-    def _sort_key(row: Dict[str, Any]) -> Tuple[int, datetime, datetime]:
-        rank = type_rank.get((row.get("subject_type") or "").lower(), 99)
-        expires = _parse_dt(row.get("expires_at"))
-        updated = _parse_dt(row.get("updated_at")) or _parse_dt(row.get("issued_at")) or datetime.min
-        expires_weight = expires.replace(tzinfo=None) if expires else datetime.max
-        updated_weight = updated.replace(tzinfo=None)
-        return (rank, expires_weight, updated_weight)
-
-    chosen = sorted(valid_rows, key=_sort_key, reverse=False)[0]
-    subject_type = chosen.get("subject_type") or "unknown"
-    subject_id = chosen.get("subject_id") or "unknown"
-    source = f"meta_tokens:{nombre_nora}:{subject_type}:{subject_id}"
-    return chosen.get("token"), source
+    chosen = ranked[0]
+    return chosen.get("token"), _token_source(nombre_nora, chosen)
 
 
 def resolve_meta_token(
@@ -120,3 +143,141 @@ def resolve_meta_token(
         return token_from_env()
 
     return None, None
+
+
+class MetaTokenError(Exception):
+    """Meta rechazó el token usado (expirado, revocado o sin permisos)."""
+
+    def __init__(self, message: str, token: Optional[str] = None):
+        super().__init__(message)
+        self.token = token
+
+
+def is_token_error(payload: Any) -> bool:
+    """Indica si una respuesta de error de Graph API corresponde a un token inválido."""
+    if not isinstance(payload, dict):
+        return False
+    error = payload.get("error")
+    if not isinstance(error, dict):
+        return False
+    return error.get("code") in META_TOKEN_ERROR_CODES
+
+
+class MetaTokenStore:
+    """
+    Índice en memoria de los tokens activos de meta_tokens.
+
+    Carga todas las filas una sola vez por ejecución, ordena los candidatos de
+    cada Nora (system > user > page) y responde cada búsqueda sin ir a BD. Los
+    tokens que Meta rechaza se invalidan y las búsquedas siguientes los saltan.
+    """
+
+    def __init__(self, supabase: Any):
+        self.supabase = supabase
+        self._por_nora: Dict[str, List[Dict[str, Any]]] = {}
+        self._invalidos: Set[str] = set()
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def load(self) -> int:
+        """
+        Carga (o recarga) todos los tokens activos y no expirados.
+
+        Returns:
+            Cantidad de tokens válidos indexados
+        """
+        rows: List[Dict[str, Any]] = []
+        page_size = 1000
+        start = 0
+
+        try:
+            while True:
+                result = (
+                    self.supabase.table("meta_tokens")
+                    .select(META_TOKENS_COLUMNS)
+                    .eq("provider", "meta")
+                    .eq("status", "active")
+                    .not_.is_("token", "null")
+                    .order("id")
+                    .range(start, start + page_size - 1)
+                    .execute()
+                )
+                data = result.data or []
+                rows.extend(data)
+                if len(data) < page_size:
+                    break
+                start += page_size
+        except Exception as e:
+            logger.warning(f"No se pudieron cargar tokens de meta_tokens: {e}")
+
+        agrupadas: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            nora = row.get("nombre_nora")
+            if nora:
+                agrupadas.setdefault(nora, []).append(row)
+
+        indice = {nora: _rank_token_rows(filas) for nora, filas in agrupadas.items()}
+        indice = {nora: filas for nora, filas in indice.items() if filas}
+
+        with self._lock:
+            self._por_nora = indice
+            self._loaded = True
+
+        total = sum(len(filas) for filas in indice.values())
+        logger.info(f"Tokens Meta cargados: {total} para {len(indice)} Noras")
+        return total
+
+    def noras(self) -> List[str]:
+        """Noras con al menos un token utilizable."""
+        with self._lock:
+            return [
+                nora for nora, filas in self._por_nora.items()
+                if any(fila["token"] not in self._invalidos for fila in filas)
+            ]
+
+    def token_for(self, nombre_nora: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """Mejor token vigente de una Nora (sin fallbacks)."""
+        if not nombre_nora:
+            return None, None
+        if not self._loaded:
+            self.load()
+
+        with self._lock:
+            for row in self._por_nora.get(nombre_nora, []):
+                if row["token"] not in self._invalidos:
+                    return row["token"], _token_source(nombre_nora, row)
+        return None, None
+
+    def resolve(
+        self,
+        nombre_nora: Optional[str],
+        fallback_noras: Optional[Sequence[str]] = None,
+        allow_env_fallback: bool = True,
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Equivalente a resolve_meta_token, resuelto contra el índice en memoria."""
+        candidates: List[str] = []
+        if nombre_nora:
+            candidates.append(nombre_nora)
+        for nora in fallback_noras or []:
+            if nora and nora not in candidates:
+                candidates.append(nora)
+
+        for nora in candidates:
+            token, source = self.token_for(nora)
+            if token:
+                return token, source
+
+        if allow_env_fallback:
+            token, source = token_from_env()
+            if token and token not in self._invalidos:
+                return token, source
+
+        return None, None
+
+    def invalidate(self, token: Optional[str]) -> None:
+        """Marca un token como inválido para el resto de la ejecución."""
+        if not token:
+            return
+        with self._lock:
+            self._invalidos.add(token)
+        logger.warning("Token Meta invalidado tras error de autenticación")
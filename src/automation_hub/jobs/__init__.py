@@ -13,6 +13,7 @@ __all__ = [
     'calendar_daily_summary',
     'meta_ads_daily_sync',
     'meta_ads_weekly_report',
+    'meta_ads_daily_archive',
     'meta_to_gbp_daily',
     'api_health_check'
 ]
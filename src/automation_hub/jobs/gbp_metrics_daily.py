@@ -4,9 +4,15 @@ También sincroniza ubicaciones (nuevas, actualizadas o eliminadas).
 """
 import logging
 import os
-import requests
 from datetime import date, timedelta, datetime
-from automation_hub.integrations.google.oauth import get_bearer_header
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from automation_hub.integrations.google.credentials_pool import (
+    GoogleCredentialsPool,
+    DEFAULT_READS_PER_MINUTE,
+    DEFAULT_TENANT_WORKERS,
+)
+from automation_hub.integrations.gbp.locations_sync_service import sincronizar_ubicaciones
 from automation_hub.integrations.gbp.performance_v1 import fetch_multi_daily_metrics, parse_metrics_to_rows
 from automation_hub.db.supabase_client import create_client_from_env
 from automation_hub.db.repositories.gbp_locations_repo import fetch_active_locations
@@ -17,9 +23,11 @@ from automation_hub.integrations.telegram.notifier import notificar_alerta_teleg
 logger = logging.getLogger(__name__)
 
 JOB_NAME = "gbp.metrics.daily"
+TENANT_WORKERS = int(os.getenv("GBP_TENANT_WORKERS", str(DEFAULT_TENANT_WORKERS)))
+READS_PER_MINUTE = float(os.getenv("GBP_READS_PER_MINUTE", str(DEFAULT_READS_PER_MINUTE)))
 
 
-def sincronizar_ubicaciones_gbp(auth_header: dict, supabase, nombre_nora: str) -> dict:
+def sincronizar_ubicaciones_gbp(auth_header: dict, supabase, nombre_nora: Optional[str]) -> dict:
     """
     Sincroniza ubicaciones de GBP desde la API a la base de datos.
     Envía notificación por Telegram cuando detecta nuevas ubicaciones.
@@ -36,95 +44,35 @@ def sincronizar_ubicaciones_gbp(auth_header: dict, supabase, nombre_nora: str) -
         'errores': 0
     }
     
-    # Preparar notifier de Telegram
-    telegram = TelegramNotifier(bot_nombre="Bot de Notificaciones")
-    
     try:
-        # 1. Listar cuentas GBP
-        url = "https://mybusinessaccountmanagement.googleapis.com/v1/accounts"
-        response = requests.get(url, headers=auth_header, timeout=30)
-        response.raise_for_status()
-        cuentas = response.json().get("accounts", [])
-        
-        logger.info(f"  Cuentas GBP encontradas: {len(cuentas)}")
+        resultado = sincronizar_ubicaciones(supabase, auth_header, nombre_nora)
+    except Exception as e:
+        logger.error(f"Error sincronizando ubicaciones: {e}", exc_info=True)
+        stats['errores'] += 1
+        return stats
+    
+    stats['nuevas'] = resultado['nuevas']
+    stats['actualizadas'] = resultado['actualizadas']
+    stats['total'] = resultado['total']
+    
+    # 🔔 NOTIFICACIÓN TELEGRAM - Nuevas ubicaciones detectadas
+    if resultado['ubicaciones_nuevas']:
+        telegram = TelegramNotifier(bot_nombre="Bot de Notificaciones")
         
-        # 2. Para cada cuenta, listar ubicaciones
-        for cuenta in cuentas:
-            account_name = cuenta.get("name", "")
-            
-            # Listar ubicaciones de la cuenta
-            url_locs = f"https://mybusinessbusinessinformation.googleapis.com/v1/{account_name}/locations"
-            params = {"readMask": "name,title,storefrontAddress,websiteUri,phoneNumbers,categories,latlng,openInfo,metadata,serviceArea,profile"}
-            
-            while url_locs:
-                resp = requests.get(url_locs, headers=auth_header, params=params, timeout=30)
-                resp.raise_for_status()
-                data = resp.json()
-                
-                all_locations.extend(data.get("locations", []))
-                
-                next_token = data.get("nextPageToken")
-                if next_token:
-                    params["pageToken"] = next_token
-                else:
-                    url_locs = None
-            
-            stats['total'] += len(all_locations)
+        for row in resultado['ubicaciones_nuevas']:
+            title = row.get("title", "Sin título")
+            address = row.get("address") or {}
+            address_str = ", ".join(filter(None, [
+                address.get("addressLines", [""])[0] if address.get("addressLines") else "",
+                address.get("locality"),
+                address.get("administrativeArea"),
+                address.get("postalCode")
+            ]))
+            phone = row.get("phone")
+            website = row.get("website")
             
-            # 3. Sincronizar cada ubicación
-            for loc in all_locations:
-                try:
-                    location_name = loc.get("name", "")
-                    if not location_name:
-                        continue
-                    
-                    # Extraer datos
-                    title = loc.get("title", "Sin título")
-                    address = loc.get("storefrontAddress", {})
-                    address_str = ", ".join(filter(None, [
-                        address.get("addressLines", [""])[0] if address.get("addressLines") else "",
-                        address.get("locality"),
-                        address.get("administrativeArea"),
-                        address.get("postalCode")
-                    ]))
-                    
-                    phone = loc.get("phoneNumbers", {}).get("primaryPhone", "")
-                    website = loc.get("websiteUri", "")
-                    
-                    ubicacion_data = {
-                        "location_name": location_name,
-                        "account_name": account_name,
-                        "title": title,
-                        "address": address_str or None,
-                        "phone": phone or None,
-                        "website_url": website or None,
-                        "nombre_nora": nombre_nora,
-                        "activa": True,
-                        "updated_at": datetime.utcnow().isoformat()
-                    }
-                    
-                    # Verificar si existe
-                    existing = supabase.table("gbp_locations").select("id").eq(
-                        "location_name", location_name
-                    ).execute()
-                    
-                    if existing.data and len(existing.data) > 0:
-                        # Actualizar
-                        supabase.table("gbp_locations").update(ubicacion_data).eq(
-                            "location_name", location_name
-                        ).execute()
-                        stats['actualizadas'] += 1
-                        logger.debug(f"  ✓ Actualizada: {title}")
-                    else:
-                        # Insertar nueva
-                        ubicacion_data["created_at"] = datetime.utcnow().isoformat()
-                        supabase.table("gbp_locations").insert(ubicacion_data).execute()
-                        stats['nuevas'] += 1
-                        logger.info(f"  ✅ Nueva ubicación: {title}")
-                        
-                        # 🔔 NOTIFICACIÓN TELEGRAM - Nueva ubicación detectada
-                        try:
-                            mensaje_nueva = f"""🆕 **Nueva ubicación de Google Business Profile detectada**
+            try:
+                mensaje_nueva = f"""🆕 **Nueva ubicación de Google Business Profile detectada**
 
 📍 **{title}**
 🏢 Dirección: {address_str if address_str else 'N/A'}
@@ -133,22 +81,88 @@ def sincronizar_ubicaciones_gbp(auth_header: dict, supabase, nombre_nora: str) -
 
 ✅ Sincronizada automáticamente
 ⏰ {datetime.now().strftime('%d/%m/%Y %H:%M')}"""
-                            
-                            telegram.enviar_mensaje(mensaje_nueva)
-                            logger.info(f"  📱 Notificación enviada para nueva ubicación: {title}")
-                        except Exception as e:
-                            logger.warning(f"  ⚠️ Error enviando notificación de nueva ubicación: {e}")
                 
-                except Exception as e:
-                    logger.error(f"  Error con ubicación {loc.get('name')}: {e}")
-                    stats['errores'] += 1
+                telegram.enviar_mensaje(mensaje_nueva)
+                logger.info(f"  📱 Notificación enviada para nueva ubicación: {title}")
+            except Exception as e:
+                logger.warning(f"  ⚠️ Error enviando notificación de nueva ubicación: {e}")
+    
+    logger.info(f"✅ Ubicaciones sincronizadas - Total: {stats['total']}, Nuevas: {stats['nuevas']}, Actualizadas: {stats['actualizadas']}")
+    
+    return stats
+
+
+def procesar_locacion(
+    supabase,
+    location: dict,
+    auth_header: dict,
+    metrics: List[str],
+    start_date: date,
+    end_date: date
+) -> int:
+    """Descarga y guarda las métricas de una locación. Devuelve filas guardadas."""
+    location_name = location.get("location_name")  # Ya es locations/{id}
+    nombre_nora_loc = location.get("nombre_nora") or "Sistema"
+    api_id = location.get("api_id")  # Puede ser None si no existe
+    
+    if not location_name:
+        logger.warning(f"Locación sin location_name: {location}")
+        return 0
+    
+    try:
+        logger.info(f"Procesando métricas para: {location_name}")
+        
+        # Descargar métricas
+        time_series = fetch_multi_daily_metrics(
+            location_name, auth_header, metrics, start_date, end_date
+        )
+        
+        if not time_series:
+            logger.info(f"No hay métricas para {location_name}")
+            return 0
+        
+        # Parsear a formato de BD
+        metrics_rows = parse_metrics_to_rows(
+            time_series, nombre_nora_loc, api_id, location_name
+        )
         
-        logger.info(f"✅ Ubicaciones sincronizadas - Total: {stats['total']}, Nuevas: {stats['nuevas']}, Actualizadas: {stats['actualizadas']}")
+        if not metrics_rows:
+            return 0
         
+        # Insertar en BD
+        upsert_metrics_daily(supabase, metrics_rows)
+        logger.info(f"Métricas procesadas para {location_name}: {len(metrics_rows)}")
+        return len(metrics_rows)
+    
     except Exception as e:
-        logger.error(f"Error sincronizando ubicaciones: {e}", exc_info=True)
+        # 404 es normal (locación sin acceso a Performance API)
+        if "404" in str(e):
+            logger.warning(f"Locación {location_name} sin acceso a Performance API (404)")
+        else:
+            logger.error(f"Error procesando {location_name}: {e}", exc_info=True)
+        return 0
+
+
+def procesar_tenant(
+    supabase,
+    pool: GoogleCredentialsPool,
+    tenant: str,
+    locations: List[dict],
+    metrics: List[str],
+    start_date: date,
+    end_date: date
+) -> int:
+    """Procesa las locaciones de un tenant con su header y su bucket de cuota."""
+    auth_header = pool.header_for(tenant)
+    limiter = pool.limiter_for(tenant)
+    total = 0
     
-    return stats
+    logger.info(f"🔑 Tenant '{tenant}': {len(locations)} locaciones")
+    for location in locations:
+        limiter.acquire()
+        total += procesar_locacion(supabase, location, auth_header, metrics, start_date, end_date)
+    
+    return total
 
 
 def run(ctx=None):
@@ -156,9 +170,9 @@ def run(ctx=None):
     Ejecuta el job de sincronización de métricas diarias.
     
     1. Sincroniza ubicaciones de GBP (nuevas, actualizadas)
-    2. Obtiene token de acceso de Google
-    3. Lee locaciones activas de Supabase
-    4. Para cada locación con location_id válido, descarga métricas
+    2. Carga credenciales de Google de todos los tenants (google_oauth_tokens)
+    3. Lee locaciones activas de Supabase y las agrupa por tenant (nombre_nora)
+    4. Procesa los tenants en paralelo, cada uno con su token y su cuota
     5. Inserta/actualiza métricas en BD
     """
     logger.info(f"Iniciando job: {JOB_NAME}")
@@ -178,13 +192,18 @@ def run(ctx=None):
     logger.info(f"Métricas a obtener: {metrics}")
     logger.info(f"Rango de fechas: {start_date} a {end_date}")
     
-    # Obtener header de autorización (valida OAuth internamente)
-    logger.info("Obteniendo credenciales de Google OAuth")
-    auth_header = get_bearer_header()
-    
     # Crear cliente Supabase (valida variables internamente)
     supabase = create_client_from_env()
     
+    # Cargar credenciales de todos los tenants conectados (refresco en paralelo)
+    logger.info("Obteniendo credenciales de Google OAuth de todos los tenants")
+    pool = GoogleCredentialsPool(supabase, rate_per_minute=READS_PER_MINUTE, max_workers=TENANT_WORKERS)
+    pool.load()
+    
+    # Sincronizar ubicaciones antes de leer las activas (cuenta del tenant por defecto)
+    auth_header = pool.header_for(pool.default_tenant)
+    ubicaciones_stats = sincronizar_ubicaciones_gbp(auth_header, supabase, nombre_nora)
+    
     # Obtener locaciones activas
     logger.info("Obteniendo locaciones activas")
     locations = fetch_active_locations(supabase, nombre_nora)
@@ -193,48 +212,23 @@ def run(ctx=None):
         logger.warning("No se encontraron locaciones activas")
         return
     
-    # Procesar cada locación
-    total_metrics = 0
+    # Procesar tenants en paralelo, cada uno con sus credenciales y su cuota
+    grupos = pool.group_locations(locations)
+    logger.info(f"Procesando {len(locations)} locaciones en {len(grupos)} tenants")
     
-    for location in locations:
-        location_name = location.get("location_name")  # Ya es locations/{id}
-        nombre_nora_loc = location.get("nombre_nora") or "Sistema"
-        api_id = location.get("api_id")  # Puede ser None si no existe
-        
-        if not location_name:
-            logger.warning(f"Locación sin location_name: {location}")
-            continue
-        
-        try:
-            logger.info(f"Procesando métricas para: {location_name}")
-            
-            # Descargar métricas
-            time_series = fetch_multi_daily_metrics(
-                location_name, auth_header, metrics, start_date, end_date
-            )
-            
-            if not time_series:
-                logger.info(f"No hay métricas para {location_name}")
-                continue
-            
-            # Parsear a formato de BD
-            metrics_rows = parse_metrics_to_rows(
-                time_series, nombre_nora_loc, api_id, location_name
+    total_metrics = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(TENANT_WORKERS, len(grupos)))) as executor:
+        futures = {
+            tenant: executor.submit(
+                procesar_tenant, supabase, pool, tenant, locs, metrics, start_date, end_date
             )
-            
-            if metrics_rows:
-                # Insertar en BD
-                upsert_metrics_daily(supabase, metrics_rows)
-                total_metrics += len(metrics_rows)
-                logger.info(f"Métricas procesadas para {location_name}: {len(metrics_rows)}")
-        
-        except Exception as e:
-            # 404 es normal (locación sin acceso a Performance API)
-            if "404" in str(e):
-                logger.warning(f"Locación {location_name} sin acceso a Performance API (404)")
-            else:
-                logger.error(f"Error procesando {location_name}: {e}", exc_info=True)
-            continue
+            for tenant, locs in grupos.items()
+        }
+        for tenant, future in futures.items():
+            try:
+                total_metrics += future.result()
+            except Exception as e:
+                logger.error(f"Error procesando tenant '{tenant}': {e}", exc_info=True)
     
     logger.info(f"Job {JOB_NAME} completado. Total métricas: {total_metrics}")
     
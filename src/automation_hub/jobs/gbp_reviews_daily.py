@@ -3,8 +3,13 @@ Job para sincronizar reviews diarias de Google Business Profile.
 """
 import logging
 import os
-from typing import Any
-from automation_hub.integrations.google.oauth import get_bearer_header
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from automation_hub.integrations.google.credentials_pool import (
+    GoogleCredentialsPool,
+    DEFAULT_READS_PER_MINUTE,
+    DEFAULT_TENANT_WORKERS,
+)
 from automation_hub.integrations.gbp.reviews_v4 import list_all_reviews, map_review_to_row
 from automation_hub.db.supabase_client import create_client_from_env
 from automation_hub.db.repositories.gbp_locations_repo import fetch_active_locations, get_last_review_sync_times
@@ -16,15 +21,177 @@ from automation_hub.config.settings import load_settings
 logger = logging.getLogger(__name__)
 
 JOB_NAME = "gbp.reviews.daily"
+TENANT_WORKERS = int(os.getenv("GBP_TENANT_WORKERS", str(DEFAULT_TENANT_WORKERS)))
+READS_PER_MINUTE = float(os.getenv("GBP_READS_PER_MINUTE", str(DEFAULT_READS_PER_MINUTE)))
+
+
+def procesar_locacion(
+    supabase,
+    location: dict,
+    auth_header: dict,
+    last_sync_times: Dict[str, str]
+) -> Optional[dict]:
+    """
+    Descarga y guarda las reviews de una locación.
+    
+    Returns:
+        Dict con nuevas, replies, malas y detalle de reviews malas, o None si
+        la locación no se pudo procesar
+    """
+    account_name = location.get("account_name")
+    location_name = location.get("location_name")
+    nombre_nora_loc = location.get("nombre_nora") or "Sistema"
+    api_id = location.get("api_id")  # Puede ser None si no existe
+    location_title = location.get("title")
+    if not location_title and isinstance(location_name, str):
+        parts = location_name.split("/")
+        location_title = parts[-1] if parts else location_name
+    elif not location_title:
+        location_title = "Ubicación"
+    
+    if not account_name or not location_name:
+        logger.warning(f"Locación sin account_name o location_name: {location}")
+        return None
+    
+    # Construir parent path completo: accounts/{account_id}/locations/{location_id}
+    parent_location_name = f"{account_name}/{location_name}"
+    
+    # Obtener fecha de última sincronización para esta ubicación
+    since_date = last_sync_times.get(parent_location_name)
+    
+    resultado = {
+        "location_title": location_title,
+        "nombre_nora": nombre_nora_loc,
+        "nuevas": 0,
+        "replies": 0,
+        "malas": 0,
+        "reviews_malas_detalle": []
+    }
+    
+    try:
+        if since_date:
+            logger.info(f"Procesando reviews para {parent_location_name} desde {since_date}")
+        else:
+            logger.info(f"Procesando reviews para {parent_location_name} (primera sincronización)")
+        
+        # Descargar reviews (solo las nuevas si tenemos fecha)
+        reviews_raw = list_all_reviews(parent_location_name, auth_header, since_date)
+        
+        if not reviews_raw:
+            logger.info(f"No hay reviews para {parent_location_name}")
+            return resultado
+        
+        # Mapear reviews a formato de BD
+        reviews_mapped = [
+            map_review_to_row(review, nombre_nora_loc or "", api_id, parent_location_name)
+            for review in reviews_raw
+        ]
+        
+        # Verificar cuáles son nuevas y cuáles tienen replies nuevos
+        nuevas_reviews = []
+        reviews_con_reply_nuevo = []
+        
+        for review_data in reviews_mapped:
+            # Buscar si ya existe en BD
+            existing = supabase.table("gbp_reviews").select("review_id, reply_comment").eq(
+                "location_name", parent_location_name
+            ).eq("review_id", review_data["review_id"]).execute()
+            
+            if not existing.data:
+                # Review nueva
+                nuevas_reviews.append(review_data)
+                
+                # Verificar si es mala reseña (1-2 estrellas) y guardar detalles
+                star_rating = review_data.get("star_rating")
+                if star_rating and star_rating <= 2:
+                    resultado["malas"] += 1
+                    
+                    # Guardar información detallada de la review mala
+                    location_id = parent_location_name.split('/')[-1]  # Extraer location ID
+                    review_mala = {
+                        "ubicacion": location_title,
+                        "ubicacion_nora": nombre_nora_loc,
+                        "rating": star_rating,
+                        "autor": review_data.get("reviewer_display_name", "Anónimo"),
+                        "texto": review_data.get("comment", "Sin comentario")[:150] + "..." if len(review_data.get("comment", "")) > 150 else review_data.get("comment", "Sin comentario"),
+                        "fecha": review_data.get("create_time", ""),
+                        "review_id": review_data.get("review_id"),
+                        "location_api_path": parent_location_name,
+                        "link_contestar": f"https://business.google.com/dashboard/l/{location_id}",
+                        "link_reviews": f"https://business.google.com/dashboard/l/{location_id}/reviews"
+                    }
+                    resultado["reviews_malas_detalle"].append(review_mala)
+            else:
+                # Review existente - solo actualizar si hay reply nuevo
+                existing_row = existing.data[0] if isinstance(existing.data, list) and existing.data else {}
+                old_reply = existing_row.get("reply_comment") if isinstance(existing_row, dict) else None
+                new_reply = review_data.get("reply_comment")
+                
+                if new_reply and new_reply != old_reply:
+                    reviews_con_reply_nuevo.append(review_data)
+        
+        # Insertar reviews nuevas
+        if nuevas_reviews:
+            supabase.table("gbp_reviews").insert(nuevas_reviews).execute()
+            resultado["nuevas"] = len(nuevas_reviews)
+            logger.info(f"✨ {len(nuevas_reviews)} reviews NUEVAS en {location_title}")
+            
+            if resultado["malas"] > 0:
+                logger.warning(f"⚠️ {resultado['malas']} reviews MALAS (1-2 estrellas) en {location_title}")
+        else:
+            resultado["malas"] = 0
+            resultado["reviews_malas_detalle"] = []
+        
+        # Actualizar reviews con reply nuevo
+        if reviews_con_reply_nuevo:
+            for review_data in reviews_con_reply_nuevo:
+                supabase.table("gbp_reviews").update(review_data).eq(
+                    "location_name", parent_location_name
+                ).eq("review_id", review_data["review_id"]).execute()
+            
+            resultado["replies"] = len(reviews_con_reply_nuevo)
+            logger.info(f"💬 {len(reviews_con_reply_nuevo)} respuestas NUEVAS en {location_title}")
+        
+        return resultado
+    
+    except Exception as e:
+        # 404 es normal (locación sin acceso a Reviews API v4)
+        if "404" in str(e):
+            logger.warning(f"Locación {parent_location_name} sin acceso a Reviews API (404)")
+        else:
+            logger.error(f"Error procesando {parent_location_name}: {e}", exc_info=True)
+        return None
+
+
+def procesar_tenant(
+    supabase,
+    pool: GoogleCredentialsPool,
+    tenant: str,
+    locations: List[dict],
+    last_sync_times: Dict[str, str]
+) -> List[dict]:
+    """Procesa las locaciones de un tenant con su header y su bucket de cuota."""
+    auth_header = pool.header_for(tenant)
+    limiter = pool.limiter_for(tenant)
+    resultados = []
+    
+    logger.info(f"🔑 Tenant '{tenant}': {len(locations)} locaciones")
+    for location in locations:
+        limiter.acquire()
+        resultado = procesar_locacion(supabase, location, auth_header, last_sync_times)
+        if resultado:
+            resultados.append(resultado)
+    
+    return resultados
 
 
 def run(ctx=None):
     """
     Ejecuta el job de sincronización de reviews diarias.
     
-    1. Obtiene token de acceso de Google
-    2. Lee locaciones activas de Supabase
-    3. Para cada locación, descarga reviews
+    1. Carga credenciales de Google de todos los tenants (google_oauth_tokens)
+    2. Lee locaciones activas de Supabase y las agrupa por tenant (nombre_nora)
+    3. Procesa los tenants en paralelo, cada uno con su token y su cuota
     4. Inserta/actualiza reviews en BD
     """
     logger.info(f"Iniciando job: {JOB_NAME}")
@@ -32,13 +199,14 @@ def run(ctx=None):
     # Cargar configuración desde env vars
     nombre_nora = os.getenv("GBP_NOMBRE_NORA")  # Opcional
     
-    # Obtener header de autorización (valida OAuth internamente)
-    logger.info("Obteniendo credenciales de Google OAuth")
-    auth_header = get_bearer_header()
-    
     # Crear cliente Supabase (valida variables internamente)
     supabase = create_client_from_env()
     
+    # Cargar credenciales de todos los tenants conectados (refresco en paralelo)
+    logger.info("Obteniendo credenciales de Google OAuth de todos los tenants")
+    pool = GoogleCredentialsPool(supabase, rate_per_minute=READS_PER_MINUTE, max_workers=TENANT_WORKERS)
+    pool.load()
+    
     # Obtener locaciones activas
     logger.info("Obteniendo locaciones activas")
     locations = fetch_active_locations(supabase, nombre_nora)
@@ -52,7 +220,22 @@ def run(ctx=None):
     last_sync_times = get_last_review_sync_times(supabase)
     logger.info(f"Fechas de sincronización obtenidas para {len(last_sync_times)} ubicaciones")
     
-    # Procesar cada locación
+    # Procesar tenants en paralelo, cada uno con sus credenciales y su cuota
+    grupos = pool.group_locations(locations)
+    logger.info(f"Procesando {len(locations)} locaciones en {len(grupos)} tenants")
+    
+    resultados: List[dict] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(TENANT_WORKERS, len(grupos)))) as executor:
+        futures = {
+            tenant: executor.submit(procesar_tenant, supabase, pool, tenant, locs, last_sync_times)
+            for tenant, locs in grupos.items()
+        }
+        for tenant, future in futures.items():
+            try:
+                resultados.extend(future.result())
+            except Exception as e:
+                logger.error(f"Error procesando tenant '{tenant}': {e}", exc_info=True)
+    
     total_nuevas = 0
     total_replies = 0
     locaciones_con_nuevas = []
@@ -61,134 +244,34 @@ def run(ctx=None):
     locaciones_con_malas = []
     reviews_malas_detalle = []  # Para almacenar info detallada de reviews malas
     
-    for location in locations:
-        account_name = location.get("account_name")
-        location_name = location.get("location_name")
-        nombre_nora_loc = location.get("nombre_nora") or "Sistema"
-        api_id = location.get("api_id")  # Puede ser None si no existe
-        location_title = location.get("title")
-        if not location_title and isinstance(location_name, str):
-            parts = location_name.split("/")
-            location_title = parts[-1] if parts else location_name
-        elif not location_title:
-            location_title = "Ubicación"
-        
-        if not account_name or not location_name:
-            logger.warning(f"Locación sin account_name o location_name: {location}")
-            continue
+    for resultado in resultados:
+        location_title = resultado["location_title"]
+        nombre_nora_loc = resultado["nombre_nora"]
         
-        # Construir parent path completo: accounts/{account_id}/locations/{location_id}
-        parent_location_name = f"{account_name}/{location_name}"
+        if resultado["nuevas"]:
+            total_nuevas += resultado["nuevas"]
+            locaciones_con_nuevas.append({
+                "nombre": location_title,
+                "cantidad": resultado["nuevas"],
+                "nora": nombre_nora_loc
+            })
         
-        # Obtener fecha de última sincronización para esta ubicación
-        since_date = last_sync_times.get(parent_location_name)
+        if resultado["malas"]:
+            total_malas_nuevas += resultado["malas"]
+            locaciones_con_malas.append({
+                "nombre": location_title,
+                "cantidad": resultado["malas"],
+                "nora": nombre_nora_loc
+            })
+            reviews_malas_detalle.extend(resultado["reviews_malas_detalle"])
         
-        try:
-            if since_date:
-                logger.info(f"Procesando reviews para {parent_location_name} desde {since_date}")
-            else:
-                logger.info(f"Procesando reviews para {parent_location_name} (primera sincronización)")
-            
-            # Descargar reviews (solo las nuevas si tenemos fecha)
-            reviews_raw = list_all_reviews(parent_location_name, auth_header, since_date)
-            
-            if not reviews_raw:
-                logger.info(f"No hay reviews para {parent_location_name}")
-                continue
-            
-            # Mapear reviews a formato de BD
-            reviews_mapped = [
-                map_review_to_row(review, nombre_nora_loc or "", api_id, parent_location_name)
-                for review in reviews_raw
-            ]
-            
-            # Verificar cuáles son nuevas y cuáles tienen replies nuevos
-            nuevas_reviews = []
-            reviews_con_reply_nuevo = []
-            malas_nuevas_locacion = 0
-            
-            for review_data in reviews_mapped:
-                # Buscar si ya existe en BD
-                existing = supabase.table("gbp_reviews").select("review_id, reply_comment").eq(
-                    "location_name", parent_location_name
-                ).eq("review_id", review_data["review_id"]).execute()
-                
-                if not existing.data:
-                    # Review nueva
-                    nuevas_reviews.append(review_data)
-                    
-                    # Verificar si es mala reseña (1-2 estrellas) y guardar detalles
-                    star_rating = review_data.get("star_rating")
-                    if star_rating and star_rating <= 2:
-                        malas_nuevas_locacion += 1
-                        
-                        # Guardar información detallada de la review mala
-                        location_id = parent_location_name.split('/')[-1]  # Extraer location ID
-                        review_mala = {
-                            "ubicacion": location_title,
-                            "ubicacion_nora": nombre_nora_loc,
-                            "rating": star_rating,
-                            "autor": review_data.get("reviewer_display_name", "Anónimo"),
-                            "texto": review_data.get("comment", "Sin comentario")[:150] + "..." if len(review_data.get("comment", "")) > 150 else review_data.get("comment", "Sin comentario"),
-                            "fecha": review_data.get("create_time", ""),
-                            "review_id": review_data.get("review_id"),
-                            "location_api_path": parent_location_name,
-                            "link_contestar": f"https://business.google.com/dashboard/l/{location_id}",
-                            "link_reviews": f"https://business.google.com/dashboard/l/{location_id}/reviews"
-                        }
-                        reviews_malas_detalle.append(review_mala)
-                else:
-                    # Review existente - solo actualizar si hay reply nuevo
-                    existing_row = existing.data[0] if isinstance(existing.data, list) and existing.data else {}
-                    old_reply = existing_row.get("reply_comment") if isinstance(existing_row, dict) else None
-                    new_reply = review_data.get("reply_comment")
-                    
-                    if new_reply and new_reply != old_reply:
-                        reviews_con_reply_nuevo.append(review_data)
-            
-            # Insertar reviews nuevas
-            if nuevas_reviews:
-                supabase.table("gbp_reviews").insert(nuevas_reviews).execute()
-                total_nuevas += len(nuevas_reviews)
-                locaciones_con_nuevas.append({
-                    "nombre": location_title,
-                    "cantidad": len(nuevas_reviews),
-                    "nora": nombre_nora_loc
-                })
-                logger.info(f"✨ {len(nuevas_reviews)} reviews NUEVAS en {location_title}")
-                
-                # Contar malas reviews nuevas
-                if malas_nuevas_locacion > 0:
-                    total_malas_nuevas += malas_nuevas_locacion
-                    locaciones_con_malas.append({
-                        "nombre": location_title,
-                        "cantidad": malas_nuevas_locacion,
-                        "nora": nombre_nora_loc
-                    })
-                    logger.warning(f"⚠️ {malas_nuevas_locacion} reviews MALAS (1-2 estrellas) en {location_title}")
-            
-            # Actualizar reviews con reply nuevo
-            if reviews_con_reply_nuevo:
-                for review_data in reviews_con_reply_nuevo:
-                    supabase.table("gbp_reviews").update(review_data).eq(
-                        "location_name", parent_location_name
-                    ).eq("review_id", review_data["review_id"]).execute()
-                
-                total_replies += len(reviews_con_reply_nuevo)
-                locaciones_con_replies.append({
-                    "nombre": location_title,
-                    "cantidad": len(reviews_con_reply_nuevo),
-                    "nora": nombre_nora_loc
-                })
-                logger.info(f"💬 {len(reviews_con_reply_nuevo)} respuestas NUEVAS en {location_title}")
-        
-        except Exception as e:
-            # 404 es normal (locación sin acceso a Reviews API v4)
-            if "404" in str(e):
-                logger.warning(f"Locación {parent_location_name} sin acceso a Reviews API (404)")
-            else:
-                logger.error(f"Error procesando {parent_location_name}: {e}", exc_info=True)
-            continue
+        if resultado["replies"]:
+            total_replies += resultado["replies"]
+            locaciones_con_replies.append({
+                "nombre": location_title,
+                "cantidad": resultado["replies"],
+                "nora": nombre_nora_loc
+            })
     
     logger.info(f"Job {JOB_NAME} completado. Nuevas: {total_nuevas}, Replies: {total_replies}, Malas nuevas: {total_malas_nuevas}")
     
@@ -14,6 +14,8 @@ from datetime import date, timedelta
 from typing import Dict, List, Sequence, Tuple, cast
 from automation_hub.integrations.meta_ads.daily_sync_service import MetaAdsDailySyncService
 from automation_hub.db.supabase_client import create_client_from_env
+from automation_hub.integrations.meta_ads.analytics_mirror import get_analytics_mirror
+from automation_hub.integrations.meta_ads.daily_archive import DailyArchiveReader
 from automation_hub.integrations.telegram.notifier import TelegramNotifier
 
 logger = logging.getLogger(__name__)
@@ -95,24 +97,28 @@ def obtener_anuncios_sincronizados(fecha: date, supabase) -> List[dict]:
     """
     Obtiene todos los anuncios sincronizados para una fecha.
     
+    Con réplica local configurada se consulta en proceso; si no, se lee la
+    tabla y, si la fecha ya se archivó, su Parquet.
+    
     Returns:
         Lista de anuncios con sus métricas
     """
-    response = supabase.table('meta_ads_anuncios_daily') \
-        .select('''
-            id_cuenta_publicitaria,
-            ad_id,
-            nombre_anuncio,
-            publisher_platform,
-            impresiones,
-            clicks,
-            alcance,
-            importe_gastado
-        ''') \
-        .eq('fecha_reporte', str(fecha)) \
-        .execute()
-    
-    return response.data or []
+    try:
+        mirror = get_analytics_mirror(supabase)
+        if mirror is not None:
+            mirror.sincronizar()
+            return mirror.anuncios_del_dia(fecha)
+    except Exception as e:
+        logger.warning(f"⚠️ Réplica local no disponible, se usa Supabase: {e}")
+    
+    # Lector de tabla caliente + meses archivados en Parquet
+    return DailyArchiveReader(supabase).leer(
+        fecha, fecha,
+        columnas=[
+            'id_cuenta_publicitaria', 'ad_id', 'nombre_anuncio', 'publisher_platform',
+            'impresiones', 'clicks', 'alcance', 'importe_gastado'
+        ]
+    )
 
 
 def agrupar_por_cuenta(anuncios: List[dict]) -> Dict[str, List[dict]]:
@@ -283,6 +289,14 @@ def run(ctx=None):
     
     logger.info(f"Sincronización completada: {total_anuncios} anuncios, {errores} errores")
     
+    # Llevar el delta del día a la réplica local (si está configurada)
+    try:
+        mirror = get_analytics_mirror(supabase)
+        if mirror is not None:
+            mirror.sincronizar()
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo sincronizar la réplica local: {e}")
+    
     # Enviar notificación simple
     logger.info("Enviando notificación de confirmación...")
     
@@ -11,7 +11,7 @@ from automation_hub.db.repositories.meta_ads_cuentas_repo import (
     marcar_error_cuenta
 )
 from automation_hub.db.repositories.alertas_repo import crear_alerta
-from automation_hub.integrations.meta_ads.token_resolver import resolve_meta_token
+from automation_hub.integrations.meta_ads.token_resolver import MetaTokenStore
 
 logger = logging.getLogger(__name__)
 
@@ -100,6 +100,10 @@ def run(ctx=None):
     # Crear cliente Supabase
     supabase = create_client_from_env()
     
+    # Cargar todos los tokens de meta_tokens una sola vez
+    token_store = MetaTokenStore(supabase)
+    token_store.load()
+    
     # Obtener cuentas activas
     logger.info("Obteniendo cuentas publicitarias activas")
     cuentas = fetch_cuentas_activas(supabase, nombre_nora)
@@ -132,8 +136,7 @@ def run(ctx=None):
         try:
             logger.info(f"Procesando cuenta: {nombre}")
 
-            access_token, token_source = resolve_meta_token(
-                supabase,
+            access_token, token_source = token_store.resolve(
                 nombre_nora_cuenta,
                 fallback_noras=["Sistema"],
                 allow_env_fallback=True,
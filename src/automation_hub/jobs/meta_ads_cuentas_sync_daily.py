@@ -14,9 +14,10 @@ from automation_hub.db.repositories.meta_ads_cuentas_repo import (
 )
 from automation_hub.integrations.meta_ads.accounts import (
     get_ad_account_info,
-    get_active_ads_count
+    get_active_ads_count,
+    get_accounts_status_batch
 )
-from automation_hub.integrations.meta_ads.token_resolver import resolve_meta_token
+from automation_hub.integrations.meta_ads.token_resolver import MetaTokenStore, MetaTokenError
 from automation_hub.db.repositories.alertas_repo import crear_alerta
 from automation_hub.integrations.telegram.notifier import notificar_alerta_telegram, TelegramNotifier
 from automation_hub.config.settings import load_settings
@@ -193,6 +194,49 @@ def sincronizar_paginas_facebook(access_token: str, supabase) -> dict:
     return stats
 
 
+def precargar_estado_cuentas(cuentas: list, token_store: MetaTokenStore) -> dict:
+    """
+    Obtiene info y anuncios activos de todas las cuentas con batch requests.
+    
+    Las cuentas se agrupan por el token que les corresponde; cada grupo viaja
+    en lotes de 25 cuentas por request. Los tokens rechazados se invalidan y
+    esas cuentas se resuelven después por el camino individual.
+    
+    Returns:
+        Dict id_cuenta_publicitaria -> {token, info, ads_activos}
+    """
+    por_token: dict = {}
+    for cuenta in cuentas:
+        id_cuenta = cuenta.get("id_cuenta_publicitaria")
+        if not id_cuenta or not cuenta.get("id"):
+            continue
+        token, _ = token_store.resolve(
+            cuenta.get("nombre_nora") or "Sistema",
+            fallback_noras=["Sistema"],
+            allow_env_fallback=True,
+        )
+        if token:
+            por_token.setdefault(token, []).append(id_cuenta)
+    
+    precargadas = {}
+    for token, ids in por_token.items():
+        try:
+            resultados = get_accounts_status_batch(ids, token)
+        except Exception as e:
+            logger.warning(f"No se pudo precargar el estado de {len(ids)} cuentas en batch: {e}")
+            continue
+        
+        if any(r["token_error"] for r in resultados.values()):
+            token_store.invalidate(token)
+        
+        for id_cuenta, resultado in resultados.items():
+            if not resultado["token_error"]:
+                precargadas[id_cuenta] = {"token": token, **resultado}
+    
+    logger.info(f"Estado precargado en batch para {len(precargadas)}/{len(cuentas)} cuentas")
+    return precargadas
+
+
 def run(ctx=None):
     """
     Ejecuta el job de sincronización de cuentas publicitarias y páginas de Facebook.
@@ -217,9 +261,12 @@ def run(ctx=None):
     # Crear cliente Supabase
     supabase = create_client_from_env()
 
+    # Cargar todos los tokens de meta_tokens una sola vez
+    token_store = MetaTokenStore(supabase)
+    token_store.load()
+
     # Resolver token para sincronización de páginas (best-effort)
-    token_paginas, source_paginas = resolve_meta_token(
-        supabase,
+    token_paginas, source_paginas = token_store.resolve(
         nombre_nora,
         fallback_noras=["Sistema"],
         allow_env_fallback=True,
@@ -259,6 +306,9 @@ def run(ctx=None):
         "alertas_creadas": []
     }
     
+    # Precargar info y anuncios activos en batch, agrupando cuentas por token
+    precargadas = precargar_estado_cuentas(cuentas, token_store)
+    
     # Procesar cada cuenta
     for cuenta in cuentas:
         id_cuenta_publicitaria = cuenta.get("id_cuenta_publicitaria")
@@ -275,13 +325,36 @@ def run(ctx=None):
         try:
             logger.info(f"Sincronizando cuenta: {nombre_cuenta} ({id_cuenta_publicitaria})")
 
-            # Resolver token por Nora (tabla meta_tokens -> fallback env)
-            access_token, token_source = resolve_meta_token(
-                supabase,
+            # Resolver token por Nora (índice de meta_tokens -> fallback env)
+            access_token, token_source = token_store.resolve(
                 nombre_nora_cuenta,
                 fallback_noras=["Sistema"],
                 allow_env_fallback=True,
             )
+            
+            # Obtener info de Meta Ads API (precargada en batch o individual);
+            # si Meta rechaza el token se invalida y se intenta con el siguiente
+            account_info = None
+            ads_activos = None
+            precargada = precargadas.get(id_cuenta_publicitaria)
+            if precargada and precargada["token"] == access_token and precargada["info"]:
+                account_info = precargada["info"]
+                ads_activos = precargada["ads_activos"]
+            
+            if not account_info:
+                while access_token:
+                    try:
+                        account_info = get_ad_account_info(id_cuenta_publicitaria, access_token)
+                        break
+                    except MetaTokenError as e:
+                        logger.warning(f"Token {token_source} rechazado: {e}")
+                        token_store.invalidate(access_token)
+                        access_token, token_source = token_store.resolve(
+                            nombre_nora_cuenta,
+                            fallback_noras=["Sistema"],
+                            allow_env_fallback=True,
+                        )
+            
             if not access_token:
                 msg = f"No hay token activo de Meta para nombre_nora='{nombre_nora_cuenta}'"
                 logger.error(msg)
@@ -295,9 +368,6 @@ def run(ctx=None):
                 continue
             logger.debug(f"Token Meta resuelto desde: {token_source}")
             
-            # Obtener info de Meta Ads API
-            account_info = get_ad_account_info(id_cuenta_publicitaria, access_token)
-            
             if not account_info:
                 # Error al obtener info
                 registrar_error_cuenta(
@@ -312,8 +382,9 @@ def run(ctx=None):
             # Extraer estado actual
             account_status = account_info.get("account_status", 0)
             
-            # Obtener cantidad de anuncios activos
-            ads_activos = get_active_ads_count(id_cuenta_publicitaria, access_token)
+            # Obtener cantidad de anuncios activos (si no vino en el batch)
+            if ads_activos is None:
+                ads_activos = get_active_ads_count(id_cuenta_publicitaria, access_token)
             
             # Actualizar en BD
             actualizar_estado_cuenta(
@@ -0,0 +1,60 @@
+"""
+Job para archivar en Parquet los meses cerrados de meta_ads_anuncios_daily.
+
+Exporta cada (mes, cuenta) a Supabase Storage, lo registra en
+meta_ads_daily_archivo y lo borra de la tabla caliente. Se conservan el mes
+en curso y META_ARCHIVE_HOT_MONTHS meses anteriores.
+"""
+import logging
+from datetime import date
+from typing import Optional
+
+from automation_hub.db.supabase_client import create_client_from_env
+from automation_hub.integrations.meta_ads.daily_archive import DailyArchiver
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "meta_ads.daily.archive"
+
+
+def run(ctx=None, hoy: Optional[date] = None):
+    """
+    Ejecuta el archivo mensual de meta_ads_anuncios_daily.
+    """
+    logger.info(f"Iniciando job: {JOB_NAME}")
+
+    supabase = create_client_from_env()
+    archiver = DailyArchiver(supabase)
+
+    try:
+        resultado = archiver.archivar_pendientes(hoy)
+    except RuntimeError as e:
+        # Sin pyarrow no se puede escribir Parquet
+        logger.error(f"❌ {e}")
+        return {'ok': False, 'error': str(e)}
+
+    logger.info(
+        f"🗄️ Meses: {len(resultado['meses'])}, archivos: {resultado['archivos']}, "
+        f"filas: {resultado['filas']}, errores: {len(resultado['errores'])}"
+    )
+    logger.info(f"Job completado: {JOB_NAME}")
+
+    return {'ok': not resultado['errores'], **resultado}
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+    from dotenv import load_dotenv
+
+    # Setup para ejecución directa
+    root_dir = Path(__file__).parent.parent.parent.parent
+    sys.path.insert(0, str(root_dir / 'src'))
+    load_dotenv(root_dir / '.env')
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    run()
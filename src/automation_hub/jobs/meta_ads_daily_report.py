@@ -1,13 +1,17 @@
 """
 Job para analizar anuncios de Meta Ads y enviar reporte diario por Telegram.
 
-Este job NO sincroniza datos, solo analiza lo que ya está en la BD.
+Este job NO sincroniza datos, solo analiza lo que ya está en la BD
+(meta_ads_cuentas_daily_rollup, que mantiene la sincronización diaria, o la
+réplica local si META_ANALYTICS_MIRROR_PATH está configurada).
 """
 import logging
 import os
 from datetime import date, timedelta
 from typing import Dict, List, Tuple
 from automation_hub.db.supabase_client import create_client_from_env
+from automation_hub.db.repositories.meta_ads_rollup_repo import fetch_rollup
+from automation_hub.integrations.meta_ads.analytics_mirror import get_analytics_mirror
 from automation_hub.integrations.telegram.notifier import TelegramNotifier
 
 logger = logging.getLogger(__name__)
@@ -106,39 +110,37 @@ def run(ctx=None):
     cuentas = cuentas_response.data or []
     logger.info(f"Cuentas activas: {len(cuentas)}")
     
-    # 2. Obtener anuncios del día
-    logger.info("Obteniendo anuncios sincronizados...")
-    anuncios_response = supabase.table('meta_ads_anuncios_daily') \
-        .select('''
-            id_cuenta_publicitaria,
-            ad_id,
-            nombre_anuncio,
-            publisher_platform,
-            impresiones,
-            clicks,
-            alcance,
-            importe_gastado
-        ''') \
-        .eq('fecha_reporte', str(fecha)) \
-        .execute()
-    
-    anuncios = anuncios_response.data or []
-    logger.info(f"Anuncios encontrados: {len(anuncios)}")
-    
-    if len(anuncios) == 0:
+    # 2. Obtener totales del día por cuenta (rollup, no anuncio por anuncio);
+    #    con réplica local se calculan en proceso tras bajar solo el delta
+    logger.info("Obteniendo rollup diario por cuenta...")
+    rollup = None
+    try:
+        mirror = get_analytics_mirror(supabase)
+        if mirror is not None:
+            mirror.sincronizar()
+            rollup = mirror.rollup(fecha)
+    except Exception as e:
+        logger.warning(f"⚠️ Réplica local no disponible, se usa Supabase: {e}")
+    if rollup is None:
+        rollup = fetch_rollup(supabase, fecha)
+    
+    # 3. Sumar plataformas por cuenta: filas (anuncio × plataforma) y gasto
+    anuncios_por_cuenta: Dict[str, int] = {}
+    gasto_por_cuenta: Dict[str, float] = {}
+    for fila in rollup:
+        cuenta_id = fila['id_cuenta_publicitaria']
+        anuncios_por_cuenta[cuenta_id] = anuncios_por_cuenta.get(cuenta_id, 0) + int(fila.get('ads') or 0)
+        gasto_por_cuenta[cuenta_id] = gasto_por_cuenta.get(cuenta_id, 0.0) + float(fila.get('spend') or 0)
+    
+    total_anuncios = sum(anuncios_por_cuenta.values())
+    logger.info(f"Anuncios encontrados: {total_anuncios} en {len(anuncios_por_cuenta)} cuentas")
+    
+    if total_anuncios == 0:
         mensaje = f"⚠️ No hay datos de Meta Ads para {fecha.strftime('%d/%m/%Y')}"
         telegram.enviar_mensaje(mensaje)
         logger.warning("No hay datos para analizar")
         return {'ok': True, 'mensaje': 'Sin datos'}
     
-    # 3. Agrupar anuncios por cuenta
-    anuncios_por_cuenta = {}
-    for anuncio in anuncios:
-        cuenta_id = anuncio['id_cuenta_publicitaria']
-        if cuenta_id not in anuncios_por_cuenta:
-            anuncios_por_cuenta[cuenta_id] = []
-        anuncios_por_cuenta[cuenta_id].append(anuncio)
-    
     # 3b. Crear resumen por empresa
     resumen_por_empresa = {}
     for cuenta in cuentas:
@@ -152,16 +154,11 @@ def run(ctx=None):
                 # Usar nombre_cuenta (nombre real de Meta Ads) como fallback
                 nombre = cuenta.get('nombre_cuenta') or f"Cuenta {cuenta_id}"
             
-            # Sumar anuncios y gasto de esta cuenta
-            ads = anuncios_por_cuenta[cuenta_id]
-            num_anuncios = len(ads)
-            gasto_total = sum(float(ad.get('importe_gastado', 0) or 0) for ad in ads)
-            
             if nombre not in resumen_por_empresa:
                 resumen_por_empresa[nombre] = {'anuncios': 0, 'gasto': 0}
             
-            resumen_por_empresa[nombre]['anuncios'] += num_anuncios
-            resumen_por_empresa[nombre]['gasto'] += gasto_total
+            resumen_por_empresa[nombre]['anuncios'] += anuncios_por_cuenta[cuenta_id]
+            resumen_por_empresa[nombre]['gasto'] += gasto_por_cuenta[cuenta_id]
     
     # 4. Detectar cuentas sin anuncios
     cuentas_sin_anuncios = []
@@ -179,8 +176,8 @@ def run(ctx=None):
     
     # 5. Detectar cuentas con solo 1 anuncio
     cuentas_un_anuncio = []
-    for cuenta_id, ads in anuncios_por_cuenta.items():
-        if len(ads) == 1:
+    for cuenta_id, num_anuncios in anuncios_por_cuenta.items():
+        if num_anuncios == 1:
             # Buscar nombre de la cuenta
             cuenta = next((c for c in cuentas if c['id_cuenta_publicitaria'] == cuenta_id), None)
             if cuenta:
@@ -204,7 +201,7 @@ def run(ctx=None):
     
     # Resumen general
     mensaje += f"✅ Cuentas activas: {len(cuentas)}\n"
-    mensaje += f"📢 Total anuncios: {len(anuncios)}\n\n"
+    mensaje += f"📢 Total anuncios: {total_anuncios}\n\n"
     
     # Resumen por empresa
     if resumen_por_empresa:
@@ -275,7 +272,7 @@ def run(ctx=None):
     return {
         'ok': True,
         'total_cuentas': len(cuentas),
-        'total_anuncios': len(anuncios),
+        'total_anuncios': total_anuncios,
         'cuentas_sin_anuncios': len(cuentas_sin_anuncios),
         'cuentas_un_anuncio': len(cuentas_un_anuncio),
         'mensaje_enviado': enviado
@@ -19,7 +19,8 @@ def run(fecha: Optional[date] = None) -> dict:
     Job que sincroniza datos demográficos de Meta Ads.
     
     Este job actualiza los registros existentes en meta_ads_anuncios_daily
-    agregando información de age, gender, region, device_platform.
+    agregando información de age, gender, region, device_platform, y guarda
+    las métricas por bucket en meta_ads_breakdowns_daily.
     
     Debe ejecutarse DESPUÉS del job meta_ads_cuentas_sync_daily.
     
@@ -2,24 +2,31 @@
 Job para publicar posts de Facebook a Google Business Profile.
 """
 import logging
-import time
+import os
+from collections import defaultdict
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 import requests
 
 from automation_hub.integrations.google.oauth import get_bearer_header
-from automation_hub.integrations.gbp.posts_v1 import create_local_post
+from automation_hub.integrations.gbp.posts_v1 import compute_summary_hash, list_local_posts
+from automation_hub.integrations.gbp.publisher import GBPPublisher, DEFAULT_PUBLISH_WORKERS
+from automation_hub.integrations.gbp.rate_limiter import RateLimiter, DEFAULT_WRITES_PER_MINUTE
 from automation_hub.db.supabase_client import create_client_from_env
 from automation_hub.db.repositories.alertas_repo import crear_alerta
+from automation_hub.db.repositories.gbp_publicaciones_repo import fetch_ledger, upsert_ledger
 from automation_hub.integrations.telegram.notifier import TelegramNotifier
 from automation_hub.config.settings import load_settings, Settings
 
 logger = logging.getLogger(__name__)
 
 JOB_NAME = "meta_to_gbp_daily"
-MAX_VIDEOS_PER_RUN = 10  # Máximo videos por ejecución
-VIDEO_DELAY_SECONDS = 120  # 2 minutos de delay entre videos
+# Máximo de publicaciones con video por ejecución (0 = sin límite; la cuota la controla el limitador)
+MAX_VIDEOS_PER_RUN = int(os.getenv("GBP_MAX_VIDEOS_PER_RUN", "0"))
+PUBLISH_WORKERS = int(os.getenv("GBP_PUBLISH_WORKERS", str(DEFAULT_PUBLISH_WORKERS)))
+WRITES_PER_MINUTE = float(os.getenv("GBP_WRITES_PER_MINUTE", str(DEFAULT_WRITES_PER_MINUTE)))
+IN_FILTER_CHUNK_SIZE = 200  # Máximo de ids por filtro in_() (límite de longitud de URL)
 DEFAULT_WHATSAPP_URL = "http://192.168.68.68:3000/send-alert"
 DEFAULT_WHATSAPP_ALERT_PHONE = "5216629360887"
 
@@ -106,18 +113,454 @@ def es_url_valida_para_gbp(url: str) -> bool:
     return False
 
 
+def normalizar_publicacion(pub: dict) -> Optional[dict]:
+    """
+    Extrae mensaje y media válidos de una publicación de meta_publicaciones_webhook.
+    
+    Solo conserva URLs de Supabase Storage. Devuelve None si la publicación
+    no tiene un mensaje válido.
+    """
+    post_id = pub.get("post_id")
+    
+    # Convertir valores JSON a tipos esperados (str o None)
+    mensaje_raw = pub.get("mensaje")
+    mensaje = str(mensaje_raw) if mensaje_raw and isinstance(mensaje_raw, (str, int, float)) else None
+    
+    imagen_url_raw = pub.get("imagen_url")
+    imagen_url = str(imagen_url_raw) if imagen_url_raw and isinstance(imagen_url_raw, str) else None
+    
+    # Rechazar imagen_url si NO es de Supabase Storage (puede tener tokens, redirects, etc.)
+    if imagen_url and not es_url_valida_para_gbp(imagen_url):
+        logger.debug(f"❌ Imagen_url rechazada (no es Supabase): {imagen_url[:60]}...")
+        imagen_url = None
+    
+    imagen_local_raw = pub.get("imagen_local")
+    imagen_local = str(imagen_local_raw) if imagen_local_raw and isinstance(imagen_local_raw, str) else None
+    
+    # Rechazar imagen_local si NO es de Supabase Storage
+    if imagen_local and 'supabase.co/storage/v1/object/public' not in imagen_local:
+        logger.debug(f"❌ Imagen_local rechazada (no es Supabase): {imagen_local[:60]}...")
+        imagen_local = None
+    
+    video_local_raw = pub.get("video_local")
+    video_local = str(video_local_raw) if video_local_raw and isinstance(video_local_raw, str) else None
+    
+    # Rechazar video_local si NO es de Supabase Storage
+    if video_local and 'supabase.co/storage/v1/object/public' not in video_local:
+        logger.debug(f"❌ Video_local rechazado (no es Supabase): {video_local[:60]}...")
+        video_local = None
+    
+    # Validar que haya mensaje válido
+    if not mensaje or not isinstance(mensaje, str) or not mensaje.strip():
+        logger.warning(f"Publicación {post_id} sin mensaje válido, omitiendo")
+        return None
+    
+    return {
+        "pub": pub,
+        "post_id": post_id,
+        "mensaje": mensaje,
+        "imagen_url": imagen_url,
+        "imagen_local": imagen_local,
+        "video_local": video_local,
+        "es_video": bool(video_local and video_local.strip()),
+    }
+
+
+def _chunks(items: list, size: int = IN_FILTER_CHUNK_SIZE):
+    """Divide una lista en bloques para filtros in_() de PostgREST."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def cargar_paginas(supabase, page_ids: List[str]) -> Dict[str, dict]:
+    """Carga en bloque las páginas de Facebook referenciadas. Retorna page_id → fila."""
+    paginas: Dict[str, dict] = {}
+    for bloque in _chunks(page_ids):
+        response = supabase.table("facebook_paginas")\
+            .select("page_id, empresa_id, publicar_en_gbp")\
+            .in_("page_id", bloque)\
+            .execute()
+        for row in response.data or []:
+            if isinstance(row, dict) and row.get("page_id") is not None:
+                paginas.setdefault(str(row["page_id"]), row)
+    return paginas
+
+
+def cargar_locaciones_por_empresa(supabase, empresa_ids: List[str]) -> Dict[str, List[dict]]:
+    """Carga en bloque las locaciones activas de las empresas. Retorna empresa_id → locaciones."""
+    locaciones: Dict[str, List[dict]] = defaultdict(list)
+    for bloque in _chunks(empresa_ids):
+        response = supabase.table("gbp_locations")\
+            .select("empresa_id, account_name, location_name, location_id, nombre_nora, title, store_code")\
+            .in_("empresa_id", bloque)\
+            .eq("activa", True)\
+            .execute()
+        for row in response.data or []:
+            if isinstance(row, dict) and row.get("empresa_id"):
+                locaciones[str(row["empresa_id"])].append(row)
+    return locaciones
+
+
+def planificar_publicaciones(supabase, publicaciones: List[dict]) -> Tuple[List[dict], List]:
+    """
+    Fase de planeación: resuelve en memoria publicación → locaciones.
+    
+    Hace solo dos consultas (páginas y locaciones activas) para todas las
+    publicaciones pendientes.
+    
+    Returns:
+        Tuple (plan, ids_omitidos). Cada elemento del plan es el resultado de
+        normalizar_publicacion() más la llave "locaciones". ids_omitidos son
+        publicaciones que nunca se publicarán (sin página, publicar_en_gbp=False
+        o sin locaciones activas) y deben marcarse como publicada_gbp.
+    """
+    candidatas = []
+    for pub in publicaciones:
+        # Validar que pub sea un diccionario válido
+        if not isinstance(pub, dict):
+            logger.warning(f"Publicación inválida (no es dict): {type(pub)} - {pub}")
+            continue
+        item = normalizar_publicacion(pub)
+        if item:
+            candidatas.append(item)
+    
+    page_ids = sorted({str(item["pub"].get("page_id")) for item in candidatas if item["pub"].get("page_id") is not None})
+    paginas = cargar_paginas(supabase, page_ids) if page_ids else {}
+    
+    empresa_ids = sorted({
+        str(p["empresa_id"]) for p in paginas.values()
+        if p.get("empresa_id") and p.get("publicar_en_gbp", False)
+    })
+    locaciones_por_empresa = cargar_locaciones_por_empresa(supabase, empresa_ids) if empresa_ids else {}
+    
+    plan: List[dict] = []
+    ids_omitidos: List = []
+    
+    for item in candidatas:
+        pub = item["pub"]
+        page_id = pub.get("page_id")
+        pagina = paginas.get(str(page_id))
+        
+        if not pagina:
+            logger.warning(f"No se encontró empresa_id para page_id: {page_id}")
+            ids_omitidos.append(pub["id"])
+            continue
+        
+        if not pagina.get("publicar_en_gbp", False):
+            logger.info(f"Página {page_id} tiene publicar_en_gbp=False, omitiendo")
+            ids_omitidos.append(pub["id"])
+            continue
+        
+        empresa_id = pagina.get("empresa_id")
+        locaciones = locaciones_por_empresa.get(str(empresa_id), []) if empresa_id else []
+        
+        if not locaciones:
+            logger.warning(f"No se encontraron locaciones activas para empresa_id: {empresa_id}")
+            ids_omitidos.append(pub["id"])
+            continue
+        
+        item["empresa_id"] = empresa_id
+        item["locaciones"] = locaciones
+        plan.append(item)
+    
+    logger.info(
+        f"📋 Plan: {len(plan)} publicaciones → "
+        f"{sum(len(item['locaciones']) for item in plan)} posts; {len(ids_omitidos)} omitidas"
+    )
+    return plan, ids_omitidos
+
+
+def marcar_publicadas_gbp(supabase, ids: List) -> None:
+    """Marca publicada_gbp=True en bloque para los ids dados."""
+    for bloque in _chunks(list(ids)):
+        supabase.table("meta_publicaciones_webhook").update({"publicada_gbp": True}).in_("id", bloque).execute()
+
+
+def construir_tareas(item: dict) -> List[dict]:
+    """
+    Convierte un elemento del plan en tareas de publicación (una por locación).
+    
+    Cada tarea lleva lo que GBPPublisher necesita más el contexto que usa el
+    job para registrar el resultado.
+    """
+    tareas = []
+    vistas = set()
+    for loc in item["locaciones"]:
+        if not isinstance(loc, dict):
+            logger.warning(f"Locación inválida (no es dict): {loc}")
+            continue
+        
+        account_name = loc.get("account_name")
+        location_name = loc.get("location_name")
+        location_id = loc.get("location_id")
+        nombre_nora = loc.get("nombre_nora", "Sistema")
+        title = loc.get("title", "")
+        store_code = loc.get("store_code", "")
+        
+        if not isinstance(nombre_nora, str):
+            nombre_nora = "Sistema"
+        
+        if not location_name or not isinstance(location_name, str):
+            logger.warning(f"Locación sin location_name válido: {loc}")
+            continue
+        
+        # Construir el nombre completo usando el helper (evita duplicación)
+        full_location_name = build_full_location_name(
+            str(account_name) if account_name else None,
+            str(location_name) if location_name else None,
+            str(location_id) if location_id else None,
+        )
+        
+        if not full_location_name:
+            logger.warning(f"No se pudo construir full_location_name para: {loc}")
+            continue
+        
+        # Una sola tarea por locación (llave del ledger)
+        if full_location_name in vistas:
+            continue
+        vistas.add(full_location_name)
+        
+        # LOG para validar que no hay duplicación
+        logger.info(f"📍 account_name={account_name} | location_name={location_name} | full={full_location_name}")
+        
+        tareas.append({
+            "location_name": full_location_name,
+            "summary": item["mensaje"],
+            "video_local": item["video_local"],
+            "imagen_local": item["imagen_local"],
+            "imagen_url": item["imagen_url"],
+            # Contexto para registrar el resultado
+            "pub_id": item["pub"]["id"],
+            "post_id": item["post_id"],
+            "meta_post_id": str(item["post_id"] if item["post_id"] is not None else item["pub"]["id"]),
+            "summary_hash": compute_summary_hash(item["mensaje"]),
+            "location_name_db": location_name,
+            "nombre_nora": nombre_nora,
+            # Nombre a mostrar (prioridad: title > store_code > nombre_nora)
+            "nombre_display": title if title else (store_code if store_code else nombre_nora),
+            "media_usado": item["video_local"] or item["imagen_local"] or item["imagen_url"],
+        })
+    return tareas
+
+
+def _fila_ledger(tarea: dict, estado: str) -> dict:
+    """Fila base del ledger gbp_publicaciones para una tarea."""
+    return {
+        "meta_post_id": tarea["meta_post_id"],
+        "location_name": tarea["location_name"],
+        "nombre_nora": tarea["nombre_nora"],
+        "tipo": "FROM_FACEBOOK",
+        "estado": estado,
+        "contenido": tarea["summary"],
+        "summary_hash": tarea["summary_hash"],
+        "imagen_url": tarea["media_usado"],
+    }
+
+
+def reconciliar_con_ledger(
+    supabase,
+    auth_header: dict,
+    tareas: List[dict]
+) -> Tuple[List[dict], List[dict], List[dict]]:
+    """
+    Cruza las tareas con el ledger para no volver a publicar lo que ya llegó a GBP.
+    
+    - 'publicada': ya existe, no se publica.
+    - 'pendiente': una corrida anterior se cortó a media llamada. Se listan los
+      localPosts una sola vez por locación y se busca el summary_hash; si
+      aparece se marca publicada, si no se vuelve a publicar.
+    - 'error' (rechazo 4xx u otro fallo antes de llamar a GBP) o sin fila:
+      se publica. Los timeouts y errores de conexión quedan en 'pendiente'.
+    
+    Returns:
+        Tuple (por_publicar, ya_publicadas, diferidas). Las diferidas son
+        tareas cuya locación no se pudo listar; se reintentan en la próxima
+        corrida para no arriesgar duplicados.
+    """
+    ledger = fetch_ledger(supabase, sorted({t["meta_post_id"] for t in tareas}))
+    
+    por_publicar: List[dict] = []
+    ya_publicadas: List[dict] = []
+    diferidas: List[dict] = []
+    dudosas: Dict[str, List[dict]] = defaultdict(list)
+    
+    for tarea in tareas:
+        fila = ledger.get((tarea["meta_post_id"], tarea["location_name"]))
+        estado = fila.get("estado") if fila else None
+        
+        if estado == "publicada":
+            ya_publicadas.append(tarea)
+        elif estado == "pendiente":
+            dudosas[tarea["location_name"]].append(tarea)
+        else:
+            por_publicar.append(tarea)
+    
+    reconciliadas: List[dict] = []
+    for location_name, tareas_loc in dudosas.items():
+        try:
+            posts = list_local_posts(location_name, auth_header)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo listar {location_name} para reconciliar, se reintenta después: {e}")
+            diferidas.extend(tareas_loc)
+            continue
+        
+        existentes = {
+            compute_summary_hash(post.get("summary", "")): post.get("name")
+            for post in posts if isinstance(post, dict)
+        }
+        
+        for tarea in tareas_loc:
+            gbp_post_name = existentes.get(tarea["summary_hash"])
+            if gbp_post_name:
+                logger.info(f"♻️ Post {tarea['post_id']} ya existía en {location_name}: {gbp_post_name}")
+                fila = _fila_ledger(tarea, "publicada")
+                fila["gbp_post_name"] = gbp_post_name
+                fila["published_at"] = datetime.utcnow().isoformat()
+                reconciliadas.append(fila)
+                ya_publicadas.append(tarea)
+            else:
+                por_publicar.append(tarea)
+    
+    upsert_ledger(supabase, reconciliadas)
+    
+    logger.info(
+        f"📒 Ledger: {len(por_publicar)} por publicar, {len(ya_publicadas)} ya publicadas "
+        f"({len(reconciliadas)} reconciliadas), {len(diferidas)} diferidas"
+    )
+    return por_publicar, ya_publicadas, diferidas
+
+
+def registrar_exito(supabase, settings: Settings, tarea: dict, gbp_post: dict) -> None:
+    """Registra un post exitoso en gbp_publicaciones y notifica por Telegram/WhatsApp."""
+    mensaje = tarea["summary"]
+    media_usado = tarea["media_usado"]
+    nombre_display = tarea["nombre_display"]
+    post_id = tarea["post_id"]
+    
+    # Registrar en el ledger gbp_publicaciones
+    gbp_post_name = "N/A"
+    if isinstance(gbp_post, dict):
+        gbp_post_name = gbp_post.get("name", "N/A")
+    fila = _fila_ledger(tarea, "publicada")
+    fila["gbp_post_name"] = gbp_post_name
+    fila["error_mensaje"] = None
+    fila["published_at"] = datetime.utcnow().isoformat()
+    upsert_ledger(supabase, [fila])
+    
+    # 🔔 NOTIFICACIÓN TELEGRAM - Publicación exitosa
+    try:
+        telegram = TelegramNotifier(bot_nombre="Bot de Notificaciones")
+        mensaje_corto = mensaje[:50] + "..." if len(mensaje) > 50 else mensaje
+        
+        # Detectar tipo de contenido para emoji
+        contenido_icon = "📝"  # Default
+        if media_usado:
+            if tarea["video_local"]:
+                contenido_icon = "🎥"  # Video
+            elif any(ext in media_usado.lower() for ext in ['.mp4', '.mov', '.m4v', '.avi', '.webm']):
+                contenido_icon = "🎥"  # Video
+            else:
+                contenido_icon = "🖼️"  # Imagen
+        
+        # Mensaje de notificación claro y útil
+        mensaje_notif = f"""✅ Publicación exitosa en tu ubicación de Google Maps
+
+📍 **{nombre_display}**
+📝 "{mensaje_corto}"
+{contenido_icon} Contenido multimedia incluido
+⏰ {datetime.now().strftime('%H:%M')}"""
+        
+        # Intentar enviar con imagen si está disponible y es imagen (no video)
+        if media_usado and contenido_icon == "🖼️":
+            try:
+                # Enviar imagen con caption
+                telegram.enviar_imagen(media_usado, mensaje_notif)
+                logger.info(f"📱🖼️ Notificación con imagen enviada para {post_id} en {nombre_display}")
+            except:
+                # Si falla enviar imagen, enviar solo texto
+                telegram.enviar_mensaje(mensaje_notif)
+                logger.info(f"📱 Notificación (solo texto) enviada para {post_id} en {nombre_display}")
+        else:
+            telegram.enviar_mensaje(mensaje_notif)
+            logger.info(f"📱 Notificación enviada para {post_id} en {nombre_display} ({contenido_icon})")
+        
+        # 📱 TAMBIÉN ENVIAR POR WHATSAPP
+        whatsapp_phone = settings.whatsapp.alert_phone or DEFAULT_WHATSAPP_ALERT_PHONE
+        if whatsapp_phone:
+            enviar_alerta_whatsapp(
+                phone=whatsapp_phone,
+                title=f"Google Maps - {nombre_display}",
+                message=mensaje_notif,
+                settings=settings,
+            )
+    except Exception as e:
+        logger.warning(f"⚠️ Error enviando notificación: {e}")
+
+
+def es_fallo_ambiguo(error: Exception) -> bool:
+    """
+    True si no se sabe si el post llegó a GBP: timeouts, errores de conexión
+    y cualquier error de requests que no sea una respuesta 4xx (un 5xx puede
+    llegar después de que Google ya creó el post).
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        return not (status and 400 <= status < 500)
+    return isinstance(error, requests.exceptions.RequestException)
+
+
+def registrar_error(supabase, tarea: dict, error: Exception) -> None:
+    """
+    Registra un post fallido y desactiva la locación si el 404 es confirmado.
+    
+    Los fallos ambiguos dejan la fila en 'pendiente' para que la siguiente
+    corrida reconcilie contra los localPosts antes de volver a publicar.
+    """
+    error_msg = str(error)
+    full_location_name = tarea["location_name"]
+    location_name = tarea["location_name_db"]
+    logger.error(f"Error publicando en {full_location_name}: {error_msg}")
+    
+    # Solo marcar como inactiva si:
+    # 1. El error es 404 Not Found
+    # 2. El location_name ya es formato completo (accounts/.../locations/...)
+    # 3. El full_location_name coincide con location_name (no fue construido)
+    # Esto evita desactivar por errores de construcción del path
+    if "404" in error_msg and "Not Found" in error_msg:
+        es_formato_completo = (
+            isinstance(location_name, str) and 
+            location_name.startswith("accounts/") and 
+            "/locations/" in location_name
+        )
+        
+        if es_formato_completo and full_location_name == location_name:
+            logger.warning(f"⚠️  Ubicación {full_location_name} no existe en GBP (404 confirmado), marcando como inactiva")
+            supabase.table("gbp_locations").update({"activa": False}).eq("location_name", location_name).execute()
+        else:
+            logger.warning(f"⚠️  Error 404 en {full_location_name}, pero no se marca inactiva (posible error de construcción)")
+            logger.warning(f"   location_name={location_name} | full={full_location_name} | formato_completo={es_formato_completo}")
+    
+    # Registrar error en el ledger gbp_publicaciones
+    fila = _fila_ledger(tarea, "pendiente" if es_fallo_ambiguo(error) else "error")
+    fila["error_mensaje"] = error_msg[:500]
+    fila["updated_at"] = datetime.utcnow().isoformat()
+    upsert_ledger(supabase, [fila])
+
+
 def run(ctx=None):
     """
     Ejecuta el job de publicación de posts de Facebook a GBP.
     
     1. Obtiene token de acceso de Google
     2. Lee publicaciones pendientes de meta_publicaciones_webhook
-    3. Para cada publicación:
-       - Obtiene empresa_id desde facebook_paginas
-       - Obtiene locaciones activas de esa empresa
-       - Publica en cada locación de GBP
-       - Registra en gbp_publicaciones
-       - Marca como procesada
+    3. Planea en bloque (páginas y locaciones en dos consultas) y marca
+       las publicaciones que no aplican con un solo update
+    4. Publica en paralelo en todas las locaciones (GBPPublisher, con
+       limitador de escrituras y cola de procesamiento de videos)
+    5. Usa gbp_publicaciones como ledger (meta_post_id, location_name):
+       reserva 'pendiente' antes de cada llamada, guarda 'publicada'/'error'
+       después y reconcilia en bloque los 'pendiente' de corridas cortadas
+    6. Marca la publicación como procesada cuando terminan todas sus locaciones
     """
     logger.info(f"Iniciando job: {JOB_NAME}")
     settings = load_settings()
@@ -148,293 +591,108 @@ def run(ctx=None):
     
     logger.info(f"Publicaciones pendientes recientes para GBP: {len(publicaciones)}")
     
+    # FASE DE PLANEACIÓN - dos consultas en bloque para todas las publicaciones
+    plan, ids_omitidos = planificar_publicaciones(supabase, publicaciones)
+    
+    if ids_omitidos:
+        # Marcar como publicada_gbp=True para no volver a intentar
+        marcar_publicadas_gbp(supabase, ids_omitidos)
+    
     # Estadísticas
     total_procesadas = 0
     total_publicaciones_gbp = 0
-    videos_procesados = 0  # Contador de videos
-    imagenes_procesadas = 0  # Contador de imágenes
+    videos_procesados = 0  # Contador de posts con video
+    imagenes_procesadas = 0  # Contador de posts con imagen/texto
     errores = 0
     
-    # LOOP PRINCIPAL - Procesar cada publicación
-    for pub in publicaciones:
-        # Validar que pub sea un diccionario válido
-        if not isinstance(pub, dict):
-            logger.warning(f"Publicación inválida (no es dict): {type(pub)} - {pub}")
+    # Armar tareas (publicación → locación); el límite de videos es opcional
+    tareas: List[dict] = []
+    tareas_por_pub: Dict = {}
+    videos_en_plan = 0
+    
+    for item in plan:
+        if item["es_video"] and MAX_VIDEOS_PER_RUN and videos_en_plan >= MAX_VIDEOS_PER_RUN:
+            logger.info(f"🎥 LÍMITE DE VIDEOS ALCANZADO ({MAX_VIDEOS_PER_RUN}). Post {item['post_id']} (video) será procesado en la próxima ejecución.")
             continue
         
-        page_id = pub.get("page_id")
-        post_id = pub.get("post_id")
-        
-        # Convertir valores JSON a tipos esperados (str o None)
-        mensaje_raw = pub.get("mensaje")
-        mensaje = str(mensaje_raw) if mensaje_raw and isinstance(mensaje_raw, (str, int, float)) else None
-        
-        imagen_url_raw = pub.get("imagen_url")
-        imagen_url = str(imagen_url_raw) if imagen_url_raw and isinstance(imagen_url_raw, str) else None
-        
-        # Rechazar imagen_url si NO es de Supabase Storage (puede tener tokens, redirects, etc.)
-        if imagen_url and not es_url_valida_para_gbp(imagen_url):
-            logger.debug(f"❌ Imagen_url rechazada (no es Supabase): {imagen_url[:60]}...")
-            imagen_url = None
-        
-        imagen_local_raw = pub.get("imagen_local")
-        imagen_local = str(imagen_local_raw) if imagen_local_raw and isinstance(imagen_local_raw, str) else None
-        
-        # Rechazar imagen_local si NO es de Supabase Storage
-        if imagen_local and 'supabase.co/storage/v1/object/public' not in imagen_local:
-            logger.debug(f"❌ Imagen_local rechazada (no es Supabase): {imagen_local[:60]}...")
-            imagen_local = None
-        
-        video_local_raw = pub.get("video_local")
-        video_local = str(video_local_raw) if video_local_raw and isinstance(video_local_raw, str) else None
-        
-        # Rechazar video_local si NO es de Supabase Storage
-        if video_local and 'supabase.co/storage/v1/object/public' not in video_local:
-            logger.debug(f"❌ Video_local rechazado (no es Supabase): {video_local[:60]}...")
-            video_local = None
-        
-        # Validar que haya mensaje válido
-        if not mensaje or not isinstance(mensaje, str) or not mensaje.strip():
-            logger.warning(f"Publicación {post_id} sin mensaje válido, omitiendo")
+        tareas_item = construir_tareas(item)
+        if not tareas_item:
+            # Sin locaciones válidas: marcar para no volver a intentar
+            marcar_publicadas_gbp(supabase, [item["pub"]["id"]])
             continue
         
-        # CONTROL DE LÍMITE DE VIDEOS - verificar ANTES de procesar
-        es_video_post = bool(video_local and isinstance(video_local, str) and video_local.strip())
-        
-        if es_video_post and videos_procesados >= MAX_VIDEOS_PER_RUN:
-            logger.info(f"🎥 LÍMITE DE VIDEOS ALCANZADO ({MAX_VIDEOS_PER_RUN}). Post {post_id} (video) será procesado en la próxima ejecución.")
-            continue  # Saltar este video
+        if item["es_video"]:
+            videos_en_plan += 1
+        tareas.extend(tareas_item)
+        tareas_por_pub[item["pub"]["id"]] = len(tareas_item)
+    
+    # Ledger de idempotencia: no volver a publicar lo que ya llegó a GBP
+    tareas, ya_publicadas, diferidas = reconciliar_con_ledger(supabase, auth_header, tareas)
+    pubs_diferidas = {t["pub_id"] for t in diferidas}
+    
+    for tarea in ya_publicadas + diferidas:
+        tareas_por_pub[tarea["pub_id"]] -= 1
+    
+    # Publicaciones cuyas locaciones ya estaban todas publicadas
+    pubs_completas = [
+        pub_id for pub_id, restantes in tareas_por_pub.items()
+        if restantes == 0 and pub_id not in pubs_diferidas
+    ]
+    if pubs_completas:
+        marcar_publicadas_gbp(supabase, pubs_completas)
+        total_procesadas += len(pubs_completas)
+    
+    # Reservar en el ledger ANTES de llamar a la API
+    upsert_ledger(supabase, [_fila_ledger(t, "pendiente") for t in tareas])
+    
+    logger.info(f"🚀 Publicando {len(tareas)} posts ({PUBLISH_WORKERS} workers, {WRITES_PER_MINUTE} escrituras/min)")
+    
+    publisher = GBPPublisher(
+        auth_header,
+        rate_limiter=RateLimiter(WRITES_PER_MINUTE),
+        max_workers=PUBLISH_WORKERS,
+    )
+    
+    # Los resultados llegan conforme terminan; cada publicación se marca en
+    # cuanto terminan todas sus locaciones
+    for resultado in publisher.publish(tareas):
+        tarea = resultado["tarea"]
         
         try:
-            # Obtener empresa_id y verificar si debe publicarse en GBP
-            logger.info(f"Buscando empresa para page_id: {page_id}")
-            pagina_response = supabase.table("facebook_paginas").select("empresa_id, publicar_en_gbp").eq("page_id", page_id).execute()
-            
-            if not pagina_response.data:
-                logger.warning(f"No se encontró empresa_id para page_id: {page_id}")
-                # Marcar como publicada_gbp=True para no volver a intentar
-                supabase.table("meta_publicaciones_webhook").update({"publicada_gbp": True}).eq("id", pub["id"]).execute()
-                continue
-            
-            pagina_data = pagina_response.data[0]
-            if not isinstance(pagina_data, dict):
-                logger.warning(f"Datos de página inválidos: {pagina_data}")
-                continue
-                
-            empresa_id = pagina_data.get("empresa_id")
-            publicar_en_gbp = pagina_data.get("publicar_en_gbp", False)
-            
-            # Verificar si esta página debe publicarse en GBP
-            if not publicar_en_gbp:
-                logger.info(f"Página {page_id} tiene publicar_en_gbp=False, omitiendo")
-                # Marcar como publicada_gbp=True para no volver a procesar
-                supabase.table("meta_publicaciones_webhook").update({"publicada_gbp": True}).eq("id", pub["id"]).execute()
-                continue
-            
-            logger.info(f"Empresa encontrada: {empresa_id} (publicar_en_gbp=True)")
-            
-            # Obtener locaciones activas de esa empresa (IMPORTANTE: incluir account_name y location_id)
-            locations_response = supabase.table("gbp_locations").select("account_name, location_name, location_id, nombre_nora, title, store_code").eq("empresa_id", empresa_id).eq("activa", True).execute()
-            
-            if not locations_response.data:
-                logger.warning(f"No se encontraron locaciones activas para empresa_id: {empresa_id}")
-                # Marcar como publicada_gbp=True para no volver a intentar
-                supabase.table("meta_publicaciones_webhook").update({"publicada_gbp": True}).eq("id", pub["id"]).execute()
-                continue
-            
-            locaciones = locations_response.data
-            logger.info(f"Locaciones activas encontradas: {len(locaciones)}")
-            
-            # Publicar en cada locación
-            for loc in locaciones:
-                if not isinstance(loc, dict):
-                    logger.warning(f"Locación inválida (no es dict): {loc}")
-                    continue
-                    
-                account_name = loc.get("account_name")
-                location_name = loc.get("location_name")
-                location_id = loc.get("location_id")
-                nombre_nora = loc.get("nombre_nora", "Sistema")
-                title = loc.get("title", "")
-                store_code = loc.get("store_code", "")
-                
-                if not isinstance(nombre_nora, str):
-                    nombre_nora = "Sistema"
-                
-                # Determinar el nombre a mostrar (prioridad: title > store_code > nombre_nora)
-                nombre_display = title if title else (store_code if store_code else nombre_nora)
-                
-                if not location_name or not isinstance(location_name, str):
-                    logger.warning(f"Locación sin location_name válido: {loc}")
-                    continue
-                
-                # Construir el nombre completo usando el helper (evita duplicación)
-                full_location_name = build_full_location_name(
-                    str(account_name) if account_name else None,
-                    str(location_name) if location_name else None,
-                    str(location_id) if location_id else None,
-                )
+            if resultado["ok"]:
+                registrar_exito(supabase, settings, tarea, resultado["post"])
+                total_publicaciones_gbp += 1
                 
-                if not full_location_name:
-                    logger.warning(f"No se pudo construir full_location_name para: {loc}")
-                    continue
-                
-                # LOG para validar que no hay duplicación
-                logger.info(f"📍 account_name={account_name} | location_name={location_name} | full={full_location_name}")
-                
-                # Determinar qué media se usó ANTES de intentar publicar
-                media_usado = video_local or imagen_local or imagen_url
-                
-                try:
-                    logger.info(f"Publicando en {full_location_name}...")
-                    if video_local:
-                        logger.info(f"  Con video: {video_local[:80]}...")
-                    elif imagen_local:
-                        logger.info(f"  Con imagen_local: {imagen_local[:80]}...")
-                    elif imagen_url:
-                        logger.info(f"  Con imagen_url: {imagen_url[:80]}...")
-                    
-                    # Crear post en GBP - usar nombre completo con account
-                    gbp_post = create_local_post(
-                        location_name=full_location_name,
-                        auth_header=auth_header,
-                        summary=mensaje,
-                        video_local=video_local,
-                        imagen_local=imagen_local,
-                        imagen_url=imagen_url
-                    )
-                    
-                    # Registrar en gbp_publicaciones
-                    gbp_post_name = "N/A"
-                    if isinstance(gbp_post, dict):
-                        gbp_post_name = gbp_post.get("name", "N/A")
-                    supabase.table("gbp_publicaciones").insert({
-                        "location_name": full_location_name,
-                        "nombre_nora": nombre_nora,
-                        "tipo": "FROM_FACEBOOK",
-                        "estado": "publicada",
-                        "gbp_post_name": gbp_post_name,
-                        "contenido": mensaje,
-                        "imagen_url": media_usado,
-                        "published_at": datetime.utcnow().isoformat()
-                    }).execute()
-                    
-                    # 🔔 NOTIFICACIÓN TELEGRAM - Publicación exitosa
-                    try:
-                        telegram = TelegramNotifier(bot_nombre="Bot de Notificaciones")
-                        mensaje_corto = mensaje[:50] + "..." if len(mensaje) > 50 else mensaje
-                        
-                        # Detectar tipo de contenido para emoji
-                        contenido_icon = "📝"  # Default
-                        if media_usado:
-                            if video_local:
-                                contenido_icon = "🎥"  # Video
-                            elif any(ext in media_usado.lower() for ext in ['.mp4', '.mov', '.m4v', '.avi', '.webm']):
-                                contenido_icon = "🎥"  # Video
-                            else:
-                                contenido_icon = "🖼️"  # Imagen
-                        
-                        # Mensaje de notificación claro y útil
-                        mensaje_notif = f"""✅ Publicación exitosa en tu ubicación de Google Maps
-
-📍 **{nombre_display}**
-📝 "{mensaje_corto}"
-{contenido_icon} Contenido multimedia incluido
-⏰ {datetime.now().strftime('%H:%M')}"""
-                        
-                        # Intentar enviar con imagen si está disponible y es imagen (no video)
-                        if media_usado and contenido_icon == "🖼️":
-                            try:
-                                # Enviar imagen con caption
-                                telegram.enviar_imagen(media_usado, mensaje_notif)
-                                logger.info(f"📱🖼️ Notificación con imagen enviada para {post_id} en {nombre_display}")
-                            except:
-                                # Si falla enviar imagen, enviar solo texto
-                                telegram.enviar_mensaje(mensaje_notif)
-                                logger.info(f"📱 Notificación (solo texto) enviada para {post_id} en {nombre_display}")
-                        else:
-                            telegram.enviar_mensaje(mensaje_notif)
-                            logger.info(f"📱 Notificación enviada para {post_id} en {nombre_display} ({contenido_icon})")
-                        
-                        # 📱 TAMBIÉN ENVIAR POR WHATSAPP
-                        whatsapp_phone = settings.whatsapp.alert_phone or DEFAULT_WHATSAPP_ALERT_PHONE
-                        if whatsapp_phone:
-                            enviar_alerta_whatsapp(
-                                phone=whatsapp_phone,
-                                title=f"Google Maps - {nombre_display}",
-                                message=mensaje_notif,
-                                settings=settings,
-                            )
-                    except Exception as e:
-                        logger.warning(f"⚠️ Error enviando notificación: {e}")
-                    
-                    total_publicaciones_gbp += 1
-                    
-                    # Actualizar contadores por tipo de contenido
-                    if es_video_post:
-                        videos_procesados += 1
-                        logger.info(f"🎥 Video {videos_procesados}/{MAX_VIDEOS_PER_RUN} procesado exitosamente en {location_name}")
-                        
-                        # DELAY ENTRE VIDEOS - solo si no es el último video
-                        if videos_procesados < MAX_VIDEOS_PER_RUN:
-                            logger.info(f"⏱️  Esperando {VIDEO_DELAY_SECONDS} segundos antes del próximo video...")
-                            time.sleep(VIDEO_DELAY_SECONDS)
-                    else:
-                        imagenes_procesadas += 1
-                        logger.info(f"🖼️  Imagen procesada exitosamente en {location_name}")
-                
-                except Exception as e:
-                    error_msg = str(e)
-                    logger.error(f"Error publicando en {full_location_name}: {error_msg}")
-                    
-                    # Solo marcar como inactiva si:
-                    # 1. El error es 404 Not Found
-                    # 2. El location_name ya es formato completo (accounts/.../locations/...)
-                    # 3. El full_location_name coincide con location_name (no fue construido)
-                    # Esto evita desactivar por errores de construcción del path
-                    if "404" in error_msg and "Not Found" in error_msg:
-                        es_formato_completo = (
-                            isinstance(location_name, str) and 
-                            location_name.startswith("accounts/") and 
-                            "/locations/" in location_name
-                        )
-                        
-                        if es_formato_completo and full_location_name == location_name:
-                            logger.warning(f"⚠️  Ubicación {full_location_name} no existe en GBP (404 confirmado), marcando como inactiva")
-                            supabase.table("gbp_locations").update({"activa": False}).eq("location_name", location_name).execute()
-                        else:
-                            logger.warning(f"⚠️  Error 404 en {full_location_name}, pero no se marca inactiva (posible error de construcción)")
-                            logger.warning(f"   location_name={location_name} | full={full_location_name} | formato_completo={es_formato_completo}")
-                    
-                    # Registrar error en gbp_publicaciones
-                    supabase.table("gbp_publicaciones").insert({
-                        "location_name": full_location_name,
-                        "nombre_nora": nombre_nora,
-                        "tipo": "FROM_FACEBOOK",
-                        "estado": "error",
-                        "contenido": mensaje,
-                        "imagen_url": media_usado,
-                        "error_mensaje": error_msg[:500],
-                        "created_at": datetime.utcnow().isoformat()
-                    }).execute()
-                    
-                    errores += 1
-                    continue
-            
-            # Marcar como publicada en GBP
-            supabase.table("meta_publicaciones_webhook").update({"publicada_gbp": True}).eq("id", pub["id"]).execute()
-            total_procesadas += 1
-            logger.info(f"Publicación {post_id} publicada en GBP completamente")
-        
+                # Actualizar contadores por tipo de contenido
+                if resultado["es_video"]:
+                    videos_procesados += 1
+                    logger.info(f"🎥 Video procesado exitosamente en {tarea['location_name_db']}")
+                else:
+                    imagenes_procesadas += 1
+                    logger.info(f"🖼️  Imagen procesada exitosamente en {tarea['location_name_db']}")
+            else:
+                registrar_error(supabase, tarea, resultado["error"])
+                errores += 1
         except Exception as e:
-            logger.error(f"Error procesando publicación {post_id}: {e}", exc_info=True)
+            logger.error(f"Error registrando resultado de {tarea['post_id']}: {e}", exc_info=True)
             errores += 1
-            continue
+        
+        pub_id = tarea["pub_id"]
+        tareas_por_pub[pub_id] -= 1
+        if tareas_por_pub[pub_id] == 0 and pub_id not in pubs_diferidas:
+            # Marcar como publicada en GBP
+            try:
+                marcar_publicadas_gbp(supabase, [pub_id])
+                total_procesadas += 1
+                logger.info(f"Publicación {tarea['post_id']} publicada en GBP completamente")
+            except Exception as e:
+                logger.error(f"Error marcando publicación {tarea['post_id']}: {e}", exc_info=True)
+                errores += 1
     
     logger.info(f"Job {JOB_NAME} completado.")
     logger.info(f"  📊 Publicaciones procesadas: {total_procesadas}")
     logger.info(f"  📍 Posts creados en GBP: {total_publicaciones_gbp}")
-    logger.info(f"  🎥 Videos procesados: {videos_procesados}/{MAX_VIDEOS_PER_RUN}")
+    logger.info(f"  🎥 Videos procesados: {videos_procesados}")
     logger.info(f"  🖼️  Imágenes procesadas: {imagenes_procesadas}")
     logger.info(f"  ❌ Errores: {errores}")
     
@@ -444,7 +702,7 @@ def run(ctx=None):
             f"✅ Posts Facebook → GBP sincronizados\n\n"
             f"📊 Publicaciones procesadas: {total_procesadas}\n"
             f"📍 Posts creados en GBP: {total_publicaciones_gbp}\n"
-            f"🎥 Videos procesados: {videos_procesados}/{MAX_VIDEOS_PER_RUN}\n"
+            f"🎥 Videos procesados: {videos_procesados}\n"
             f"🖼️  Imágenes procesadas: {imagenes_procesadas}\n"
             f"❌ Errores: {errores}"
         )
@@ -62,6 +62,7 @@ def _register_default_jobs():
             calendar_daily_summary,
             meta_ads_daily_sync,
             meta_ads_weekly_report,
+            meta_ads_daily_archive,
             meta_to_gbp_daily,
             api_health_check
         )
@@ -76,6 +77,7 @@ def _register_default_jobs():
         register_job("calendar.daily.summary", calendar_daily_summary.run)
         register_job("meta_ads.daily.sync", meta_ads_daily_sync.run)
         register_job("meta_ads.weekly.report", meta_ads_weekly_report.run)
+        register_job("meta_ads.daily.archive", meta_ads_daily_archive.run)
         register_job("meta.to_gbp.daily", meta_to_gbp_daily.run)
         register_job("api.health_check", api_health_check.run)
     except ImportError as e:
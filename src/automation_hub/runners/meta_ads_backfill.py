@@ -0,0 +1,161 @@
+"""
+Backfill de meta_ads_anuncios_daily por rango de fechas.
+
+Cada cuenta se consulta con una sola request por ventana (time_increment=1)
+y las filas se reparten por día. Reemplaza al script meta_ads_sync_all.py.
+
+Uso:
+    python -m automation_hub.runners.meta_ads_backfill --desde 2026-01-01 --hasta 2026-01-31
+    python -m automation_hub.runners.meta_ads_backfill --desde 2026-01-01 --cuentas 123,456 --workers 2
+    python -m automation_hub.runners.meta_ads_backfill --desde 2026-01-01 --reanudar
+"""
+import argparse
+import json
+import logging
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from automation_hub.config.logging import setup_logging
+from automation_hub.db.repositories.meta_ads_rollup_repo import fetch_conteo_anuncios_por_cuenta
+from automation_hub.integrations.meta_ads.account_scheduler import AccountScheduler
+from automation_hub.integrations.meta_ads.daily_sync_service import MetaAdsDailySyncService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = Path("reports/meta_ads_backfill_checkpoint.json")
+DEFAULT_VENTANA_DIAS = 31
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    ayer = date.today() - timedelta(days=1)
+
+    parser = argparse.ArgumentParser(description="Backfill de Meta Ads (meta_ads_anuncios_daily) por rango")
+    parser.add_argument("--desde", type=date.fromisoformat, required=True, help="Primer día (YYYY-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, default=ayer, help="Último día (default: ayer)")
+    parser.add_argument("--cuentas", default=None, help="IDs de cuentas separados por coma (default: todas)")
+    parser.add_argument("--nombre-nora", default=None, help="Filtrar cuentas por nombre_nora")
+    parser.add_argument("--workers", type=int, default=None, help="Cuentas en paralelo (default: META_SYNC_MAX_WORKERS)")
+    parser.add_argument(
+        "--ventana-dias", type=int, default=DEFAULT_VENTANA_DIAS,
+        help=f"Días por request a Meta (default: {DEFAULT_VENTANA_DIAS})"
+    )
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT, help="Archivo de checkpoint")
+    parser.add_argument("--reanudar", action="store_true", help="Omitir ventanas ya completadas en el checkpoint")
+    return parser.parse_args(argv)
+
+
+def ventanas(desde: date, hasta: date, dias: int) -> List[Tuple[date, date]]:
+    """Parte [desde, hasta] en ventanas consecutivas de hasta ``dias`` días."""
+    resultado = []
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(hasta, inicio + timedelta(days=max(1, dias) - 1))
+        resultado.append((inicio, fin))
+        inicio = fin + timedelta(days=1)
+    return resultado
+
+
+def _llave(cuenta_id: str, inicio: date, fin: date) -> str:
+    return f"{cuenta_id}|{inicio.isoformat()}|{fin.isoformat()}"
+
+
+def cargar_checkpoint(path: Path) -> Set[str]:
+    if not path.exists():
+        return set()
+    try:
+        return set(json.loads(path.read_text(encoding="utf-8")).get("completados", []))
+    except (ValueError, OSError) as e:
+        logger.warning(f"Checkpoint ilegible ({path}): {e}; se empieza de cero")
+        return set()
+
+
+def guardar_checkpoint(path: Path, completados: Set[str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps({"completados": sorted(completados)}, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Punto de entrada del backfill.
+
+    Returns:
+        Exit code: 0 éxito, 1 alguna ventana falló, 2 argumentos inválidos
+    """
+    setup_logging()
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.hasta < args.desde:
+        logger.error("--hasta debe ser igual o posterior a --desde")
+        return 2
+
+    service = MetaAdsDailySyncService()
+    if args.workers:
+        service.usage_governor.max_workers = max(1, args.workers)
+
+    cuentas = service.get_active_accounts(args.nombre_nora)
+    if args.cuentas:
+        filtro = {service.normalize_account_id(c.strip()) for c in args.cuentas.split(",") if c.strip()}
+        cuentas = [c for c in cuentas if service.normalize_account_id(c["id_cuenta_publicitaria"]) in filtro]
+
+    if not cuentas:
+        logger.error("No hay cuentas que sincronizar")
+        return 2
+
+    completados = cargar_checkpoint(args.checkpoint) if args.reanudar else set()
+    tamanos = fetch_conteo_anuncios_por_cuenta(service.supabase, args.hasta)
+
+    tareas: List[Dict] = []
+    for cuenta in cuentas:
+        for inicio, fin in ventanas(args.desde, args.hasta, args.ventana_dias):
+            llave = _llave(cuenta["id_cuenta_publicitaria"], inicio, fin)
+            if llave in completados:
+                continue
+            tareas.append({"cuenta": cuenta, "desde": inicio, "hasta": fin, "llave": llave})
+
+    logger.info(
+        f"📅 Backfill {args.desde} → {args.hasta}: {len(cuentas)} cuentas, "
+        f"{len(tareas)} ventanas pendientes ({len(completados)} ya completadas)"
+    )
+
+    def _sync(tarea: Dict) -> Dict:
+        cuenta = tarea["cuenta"]
+        try:
+            return service.sync_account_range(
+                account_id=cuenta["id_cuenta_publicitaria"],
+                fecha_inicio=tarea["desde"],
+                fecha_fin=tarea["hasta"],
+                nombre_nora=cuenta.get("nombre_nora"),
+                expected_rows=tamanos.get(cuenta["id_cuenta_publicitaria"])
+            )
+        finally:
+            service.usage_governor.release(service.normalize_account_id(cuenta["id_cuenta_publicitaria"]))
+
+    def _tamano(tarea: Dict) -> int:
+        dias = (tarea["hasta"] - tarea["desde"]).days + 1
+        return tamanos.get(tarea["cuenta"]["id_cuenta_publicitaria"], 0) * dias
+
+    total_filas = 0
+    fallidas = 0
+    for tarea, result, error in AccountScheduler(service.usage_governor).run(tareas, _sync, _tamano):
+        etiqueta = f"{tarea['cuenta'].get('nombre_cliente') or tarea['cuenta']['id_cuenta_publicitaria']} {tarea['desde']}→{tarea['hasta']}"
+        if error is None and result.get("ok"):
+            total_filas += result.get("processed", 0)
+            completados.add(tarea["llave"])
+            guardar_checkpoint(args.checkpoint, completados)
+            logger.info(f"✅ {etiqueta}: {result.get('processed', 0)} filas")
+        else:
+            fallidas += 1
+            logger.error(f"❌ {etiqueta}: {error or result.get('error')}")
+
+    logger.info(f"Backfill terminado: {total_filas} filas, {fallidas} ventanas con error")
+    if fallidas:
+        logger.info(f"Para reintentar solo lo pendiente usa --reanudar (checkpoint: {args.checkpoint})")
+    return 1 if fallidas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Tests para el índice ubicación→cuenta de GBP.
+"""
+import pytest
+
+from automation_hub.integrations.gbp import account_resolver
+from automation_hub.integrations.gbp.account_resolver import GBPAccountResolver
+
+
+class _SupabaseVacio:
+    def table(self, name):
+        return self
+
+    def select(self, *args):
+        return self
+
+    def order(self, *args):
+        return self
+
+    def range(self, *args):
+        return self
+
+    def execute(self):
+        return type("R", (), {"data": []})()
+
+
+CUENTAS = {
+    "Bearer a": {"accounts/A": ["locations/1"]},
+    "Bearer b": {"accounts/B1": ["locations/2"], "accounts/B2": ["locations/3"]},
+}
+
+
+def _resolver(monkeypatch, llamadas):
+    def list_accounts(auth_header):
+        llamadas.append(auth_header["Authorization"])
+        if auth_header["Authorization"] not in CUENTAS:
+            raise RuntimeError("403")
+        return [{"name": n} for n in CUENTAS[auth_header["Authorization"]]]
+
+    def list_locations_all_accounts(auth_header, cuentas):
+        return {
+            cuenta: [{"name": n} for n in ubicaciones]
+            for cuenta, ubicaciones in CUENTAS[auth_header["Authorization"]].items()
+        }
+
+    monkeypatch.setattr(account_resolver, "list_accounts", list_accounts)
+    monkeypatch.setattr(account_resolver, "list_locations_all_accounts", list_locations_all_accounts)
+    return GBPAccountResolver(supabase=_SupabaseVacio())
+
+
+def test_las_cuentas_de_un_tenant_no_resuelven_ubicaciones_de_otro(monkeypatch):
+    resolver = _resolver(monkeypatch, [])
+    a, b = {"Authorization": "Bearer a"}, {"Authorization": "Bearer b"}
+
+    assert resolver.get_account_for_location("locations/1", a) == "accounts/A"
+    assert resolver.get_account_for_location("locations/3", b) == "accounts/B2"
+    # Ubicación desconocida: la credencial B ve dos cuentas, no se adivina
+    with pytest.raises(ValueError):
+        resolver.get_account_for_location("locations/9", b)
+    assert resolver.get_default_account(b) == "accounts/B1"
+
+
+def test_api_caida_no_se_reintenta_en_cada_busqueda(monkeypatch):
+    llamadas = []
+    resolver = _resolver(monkeypatch, llamadas)
+    caida = {"Authorization": "Bearer x"}
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            resolver.get_account_for_location("locations/1", caida)
+
+    assert llamadas == ["Bearer x"]
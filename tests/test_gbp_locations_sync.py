@@ -0,0 +1,76 @@
+"""
+Tests para la detección de cambios en la sincronización de ubicaciones GBP.
+"""
+from automation_hub.integrations.gbp.locations_sync_service import (
+    compute_location_hash,
+    diff_locations,
+)
+
+
+def _ubicacion(name, title="Sucursal", phone="6621234567"):
+    return {
+        "name": name,
+        "title": title,
+        "phoneNumbers": {"primaryPhone": phone},
+        "storefrontAddress": {"locality": "Hermosillo"},
+    }
+
+
+def test_hash_estable_ante_orden_de_llaves():
+    """El hash no debe depender del orden de las llaves del JSON."""
+    a = {"name": "locations/1", "title": "A", "profile": {"x": 1, "y": 2}}
+    b = {"profile": {"y": 2, "x": 1}, "title": "A", "name": "locations/1"}
+    assert compute_location_hash("accounts/1", a) == compute_location_hash("accounts/1", b)
+
+
+def test_hash_cambia_con_la_cuenta():
+    """Mover la ubicación a otra cuenta debe contar como cambio."""
+    loc = _ubicacion("locations/1")
+    assert compute_location_hash("accounts/1", loc) != compute_location_hash("accounts/2", loc)
+
+
+def test_diff_separa_nuevas_cambiadas_y_sin_cambios():
+    """Solo las ubicaciones nuevas o modificadas deben escribirse."""
+    sin_cambio = _ubicacion("locations/1")
+    cambiada = _ubicacion("locations/2", phone="000")
+    nueva = _ubicacion("locations/3", title="Nueva")
+
+    existentes = {
+        "locations/1": {
+            "id": "id-1", "nombre_nora": "aura", "activa": True,
+            "content_hash": compute_location_hash("accounts/1", sin_cambio),
+        },
+        "locations/2": {
+            "id": "id-2", "nombre_nora": "aura", "activa": True,
+            "content_hash": compute_location_hash("accounts/1", _ubicacion("locations/2")),
+        },
+    }
+
+    nuevas, cambiadas, sin_cambios = diff_locations(
+        {"accounts/1": [sin_cambio, cambiada, nueva]}, existentes
+    )
+
+    assert sin_cambios == 1
+    assert [r["location_name"] for r in cambiadas] == ["locations/2"]
+    assert cambiadas[0]["id"] == "id-2"
+    assert cambiadas[0]["nombre_nora"] == "aura"
+    assert [r["location_name"] for r in nuevas] == ["locations/3"]
+    assert nuevas[0]["nombre_nora"] == "Nueva"
+    assert "id" not in nuevas[0]
+
+
+def test_diff_reactiva_ubicacion_inactiva_sin_cambios():
+    """Una ubicación inactiva que la API sigue listando debe reactivarse."""
+    loc = _ubicacion("locations/1")
+    existentes = {
+        "locations/1": {
+            "id": "id-1", "nombre_nora": "aura", "activa": False,
+            "content_hash": compute_location_hash("accounts/1", loc),
+        },
+    }
+
+    nuevas, cambiadas, sin_cambios = diff_locations({"accounts/1": [loc]}, existentes)
+
+    assert nuevas == []
+    assert sin_cambios == 0
+    assert cambiadas[0]["activa"] is True
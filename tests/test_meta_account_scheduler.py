@@ -0,0 +1,51 @@
+"""
+Tests para el planificador de cuentas gobernado por los headers de uso de Meta.
+"""
+from automation_hub.integrations.meta_ads.account_scheduler import (
+    AccountScheduler,
+    MetaUsageGovernor,
+    parse_usage_headers,
+)
+
+
+def test_parse_usage_headers_toma_el_maximo():
+    headers = {
+        "X-Business-Use-Case-Usage": '{"123": [{"type": "ads_insights", "call_count": 28, '
+                                     '"total_cputime": 52, "total_time": 9, '
+                                     '"estimated_time_to_regain_access": 2}]}',
+        "X-Ad-Account-Usage": '{"acc_id_util_pct": 9.6, "reset_time_duration": 0}',
+    }
+    uso, espera = parse_usage_headers(headers)
+    assert uso == 52
+    assert espera == 120
+
+
+def test_concurrencia_baja_con_el_uso():
+    governor = MetaUsageGovernor(max_workers=4, target_usage=75)
+    assert governor.allowed_concurrency() == 4
+    assert governor.delay_for("act_1") == 0
+
+    governor.record("act_1", {"X-Ad-Account-Usage": '{"acc_id_util_pct": 90}'})
+    assert governor.allowed_concurrency() == 1
+    assert governor.delay_for("act_1") > 1
+
+    governor.release("act_1")
+    assert governor.allowed_concurrency() == 4
+
+
+def test_scheduler_despacha_las_mas_grandes_primero():
+    governor = MetaUsageGovernor(max_workers=1)
+    orden = []
+
+    def worker(cuenta):
+        orden.append(cuenta["id"])
+        if cuenta["id"] == "b":
+            raise ValueError("falla")
+        return cuenta["id"]
+
+    cuentas = [{"id": "a", "filas": 10}, {"id": "b", "filas": 500}, {"id": "c", "filas": 50}]
+    resultados = list(AccountScheduler(governor).run(cuentas, worker, lambda c: c["filas"]))
+
+    assert orden == ["b", "c", "a"]
+    errores = [item["id"] for item, _, error in resultados if error is not None]
+    assert errores == ["b"]
@@ -0,0 +1,34 @@
+"""
+Tests para el parser de actions de Meta Ads.
+"""
+from automation_hub.integrations.meta_ads.action_metrics import parse_actions, safe_int
+
+
+def test_una_pasada_produce_engagement_y_mensajes():
+    actions = [
+        {"action_type": "link_click", "value": "5"},
+        {"action_type": "onsite_conversion.link_click", "value": "2"},
+        {"action_type": "onsite_conversion.post_net_like", "value": "4"},
+        {"action_type": "post_reaction", "value": "1"},
+        {"action_type": "onsite_conversion.messaging_conversation_started_7d", "value": "3.5"},
+        {"action_type": "onsite_conversion.messaging_first_reply", "value": "2"},
+        {"action_type": "like", "value": "no-numero"},
+        {"action_type": "lead", "value": "9"},
+    ]
+
+    metrics = parse_actions(actions)
+
+    assert metrics["link_clicks"] == 7
+    assert metrics["post_reactions"] == 5
+    assert metrics["post_likes"] == 4
+    assert metrics["page_likes"] == 0
+    # first_reply cuenta como mensaje y como primera respuesta
+    assert metrics["messages"] == 5
+    assert metrics["first_replies"] == 2
+
+
+def test_safe_int_acepta_strings_y_listas_de_actions():
+    assert safe_int("12.7") == 12
+    assert safe_int([{"value": "3"}, {"value": 4}]) == 7
+    assert safe_int("n/a") == 0
+    assert safe_int(None) == 0
@@ -0,0 +1,51 @@
+"""
+Tests para la detección de cambios en la sincronización diaria de Meta Ads.
+"""
+from automation_hub.integrations.meta_ads.daily_sync_service import (
+    compute_daily_row_hash,
+    diff_daily_rows,
+)
+
+
+def _row(ad_id, spend=10.0, plataforma="facebook", fecha="2026-01-01"):
+    row = {
+        "ad_id": ad_id,
+        "fecha_reporte": fecha,
+        "publisher_platform": plataforma,
+        "importe_gastado": spend,
+        "fecha_sincronizacion": "2026-01-02T03:00:00",
+        "fecha_ultima_actualizacion": "2026-01-02T03:00:00",
+        "activo": True,
+    }
+    row["content_hash"] = compute_daily_row_hash(row)
+    return row
+
+
+def test_hash_ignora_fechas_de_sincronizacion():
+    """Volver a sincronizar la misma fila no debe cambiar su hash."""
+    a = _row("1")
+    b = dict(a, fecha_sincronizacion="2026-01-03T03:00:00", fecha_ultima_actualizacion="2026-01-03T03:00:00")
+    assert compute_daily_row_hash(a) == compute_daily_row_hash(b)
+    assert compute_daily_row_hash(a) != compute_daily_row_hash(_row("1", spend=11.0))
+
+
+def test_diff_escribe_cambiadas_y_desactiva_desaparecidas():
+    """Solo las filas modificadas se reescriben y solo los anuncios ausentes se desactivan."""
+    igual = _row("1")
+    cambiada = _row("2", spend=20.0)
+    reactivada = _row("3")
+    nueva = _row("4")
+
+    existentes = {
+        ("1", "2026-01-01", "facebook"): {"content_hash": igual["content_hash"], "activo": True},
+        ("2", "2026-01-01", "facebook"): {"content_hash": _row("2")["content_hash"], "activo": True},
+        ("3", "2026-01-01", "facebook"): {"content_hash": reactivada["content_hash"], "activo": False},
+        ("5", "2026-01-01", "facebook"): {"content_hash": "x", "activo": True},
+        ("6", "2026-01-01", "facebook"): {"content_hash": "y", "activo": False},
+    }
+
+    cambiadas, desaparecidas, sin_cambios = diff_daily_rows([igual, cambiada, reactivada, nueva], existentes)
+
+    assert {r["ad_id"] for r in cambiadas} == {"2", "3", "4"}
+    assert desaparecidas == [("5", "2026-01-01", "facebook")]
+    assert sin_cambios == 1
@@ -0,0 +1,101 @@
+"""
+Tests para el upsert en lotes de meta_ads_anuncios_daily.
+"""
+import pytest
+
+from automation_hub.db.repositories.meta_ads_daily_repo import actualizar_breakdown_bulk, upsert_anuncios_daily
+
+
+class _FakeTable:
+    def __init__(self, db):
+        self.db = db
+        self.rows = None
+
+    def upsert(self, rows, on_conflict=None):
+        self.rows = rows
+        return self
+
+    def execute(self):
+        self.db.requests += 1
+        if any(row.get("ad_id") == "malo" for row in self.rows):
+            raise Exception("invalid input syntax")
+        self.db.guardadas.extend(self.rows)
+
+
+class _FakeSupabase:
+    def __init__(self):
+        self.requests = 0
+        self.guardadas = []
+
+    def table(self, name):
+        return _FakeTable(self)
+
+
+def _row(ad_id, plataforma="facebook", spend=1.0):
+    return {"ad_id": ad_id, "fecha_reporte": "2026-01-01", "publisher_platform": plataforma, "spend": spend}
+
+
+def test_upsert_en_lotes():
+    """1,000 filas con lotes de 500 deben costar 2 requests."""
+    supabase = _FakeSupabase()
+    rows = [_row(str(i)) for i in range(1000)]
+
+    escritas, errores = upsert_anuncios_daily(supabase, rows, chunk_size=500)
+
+    assert escritas == 1000
+    assert errores == []
+    assert supabase.requests == 2
+
+
+def test_biseccion_aisla_fila_mala():
+    """Una fila inválida solo descarta esa fila, no el lote."""
+    supabase = _FakeSupabase()
+    rows = [_row(str(i)) for i in range(7)] + [_row("malo")]
+
+    escritas, errores = upsert_anuncios_daily(supabase, rows, chunk_size=8)
+
+    assert escritas == 7
+    assert len(errores) == 1
+    assert "malo" in errores[0]
+    assert {r["ad_id"] for r in supabase.guardadas} == {str(i) for i in range(7)}
+
+
+def test_filas_repetidas_gana_la_ultima():
+    """Filas con la misma llave no deben chocar dentro del mismo lote."""
+    supabase = _FakeSupabase()
+    rows = [_row("1", spend=1.0), _row("1", plataforma="instagram"), _row("1", spend=5.0)]
+
+    escritas, _ = upsert_anuncios_daily(supabase, rows)
+
+    assert escritas == 2
+    assert {"facebook": 5.0, "instagram": 1.0} == {r["publisher_platform"]: r["spend"] for r in supabase.guardadas}
+
+
+def test_breakdown_bulk_una_llamada_por_lote():
+    """2,000 anuncios de un breakdown deben escribirse con un solo RPC."""
+    llamadas = []
+
+    class _Rpc:
+        def __init__(self, params):
+            self.params = params
+
+        def execute(self):
+            return type("R", (), {"data": len(self.params["p_ad_ids"])})()
+
+    class _Supabase:
+        def rpc(self, name, params):
+            llamadas.append(params)
+            return _Rpc(params)
+
+    valores = [(str(i), "2026-01-01", "25-34") for i in range(2000)]
+    actualizadas = actualizar_breakdown_bulk(_Supabase(), "act_1", "age", valores)
+
+    assert actualizadas == 2000
+    assert len(llamadas) == 1
+    assert llamadas[0]["p_campo"] == "age"
+    assert len(llamadas[0]["p_ad_ids"]) == len(llamadas[0]["p_fechas"]) == len(llamadas[0]["p_valores"]) == 2000
+
+
+def test_breakdown_bulk_rechaza_campos_no_demograficos():
+    with pytest.raises(ValueError):
+        actualizar_breakdown_bulk(None, "act_1", "importe_gastado", [("1", "2026-01-01", "0")])
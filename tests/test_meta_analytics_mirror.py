@@ -0,0 +1,89 @@
+"""
+Tests para la réplica local de meta_ads_anuncios_daily (motor SQLite).
+"""
+from datetime import date
+
+from automation_hub.integrations.meta_ads.analytics_mirror import AnalyticsMirror
+from automation_hub.integrations.meta_ads.report_aggregator import ReportAggregator
+
+
+class _FakeQuery:
+    def __init__(self, filas, filtros):
+        self.filas = filas
+        self.filtros = filtros
+
+    def select(self, *args):
+        return self
+
+    def order(self, *args):
+        return self
+
+    def gte(self, columna, valor):
+        self.filtros.append((columna, valor))
+        self.filas = [f for f in self.filas if str(f[columna]) >= valor]
+        return self
+
+    def lte(self, *args):
+        return self
+
+    def range(self, start, end):
+        self._pagina = self.filas[start:end + 1]
+        return self
+
+    def execute(self):
+        return type("R", (), {"data": self._pagina})()
+
+
+class _FakeSupabase:
+    def __init__(self, filas):
+        self.filas = filas
+        self.filtros = []
+
+    def table(self, name):
+        if name != "meta_ads_anuncios_daily":
+            # Sin meses archivados (meta_ads_daily_archivo vacía)
+            return _FakeQuery([], [])
+        return _FakeQuery(list(self.filas), self.filtros)
+
+
+def _fila(ad_id, plataforma, gasto, actualizado, activo=True, campana="Camp A"):
+    return {
+        "ad_id": ad_id, "id_cuenta_publicitaria": "act_1", "nombre_nora": "nora",
+        "fecha_reporte": "2026-01-05", "publisher_platform": plataforma,
+        "campana_id": campana, "conjunto_id": "s1", "nombre_campana": campana,
+        "importe_gastado": gasto, "impresiones": 100, "clicks": 3, "alcance": 50,
+        "messaging_conversations_started": 1, "activo": activo,
+        "actions": [{"action_type": "messaging_first_reply", "value": "2"}],
+        "fecha_ultima_actualizacion": actualizado,
+    }
+
+
+def test_sincroniza_solo_el_delta_y_agrega_igual_que_en_python():
+    filas = [
+        _fila("1", "facebook", 1.5, "2026-01-06T01:00:00"),
+        _fila("1", "instagram", 2.0, "2026-01-06T01:00:00"),
+        _fila("2", "facebook", 0.5, "2026-01-06T02:00:00", campana="Camp B"),
+    ]
+    supabase = _FakeSupabase(filas)
+    mirror = AnalyticsMirror(":memory:", supabase, engine="sqlite", overlap_seconds=0)
+
+    assert mirror.sincronizar()["filas"] == 3
+    assert mirror.marca() == "2026-01-06T02:00:00"
+
+    agregado = ReportAggregator.from_sql_rows(
+        mirror.agregados_reporte(["act_1"], date(2026, 1, 1), date(2026, 1, 7))
+    )[("act_1", "nora")]
+    esperado = ReportAggregator.from_rows(filas)
+    assert agregado.total.gasto == esperado.total.gasto
+    assert agregado.total.mensajes_actions == esperado.total.mensajes_actions == 6
+    assert agregado.total.num_anuncios == 2 and agregado.total.num_campanas == 2
+    assert agregado.platform("facebook").clicks == esperado.platform("facebook").clicks
+    assert {c["campana"]: c["anuncios"] for c in agregado.campaign_summary()} == {"Camp A": 2, "Camp B": 1}
+
+    # Segunda pasada: solo baja lo modificado desde la marca (una desactivación)
+    supabase.filas = filas[:2] + [_fila("2", "facebook", 0.5, "2026-01-06T03:00:00", activo=False)]
+    assert mirror.sincronizar()["filas"] == 1
+    assert supabase.filtros[-1] == ("fecha_ultima_actualizacion", "2026-01-06T02:00:00")
+
+    rollup = mirror.rollup(date(2026, 1, 5))
+    assert [(r["publisher_platform"], r["ads"], r["spend"]) for r in rollup] == [("facebook", 1, 1.5), ("instagram", 1, 2.0)]
@@ -0,0 +1,50 @@
+"""
+Tests para la espera compartida de report runs asíncronos.
+"""
+import threading
+
+import pytest
+import requests
+
+from automation_hub.integrations.meta_ads.async_reports import AsyncReportError, AsyncReportPoller
+
+
+def _http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.exceptions.HTTPError(f"{status_code} Client Error", response=response)
+
+
+def _esperar(poller, report_run_id, resultados):
+    try:
+        resultados[report_run_id] = poller.wait(report_run_id)
+    except AsyncReportError as e:
+        resultados[report_run_id] = e
+
+
+def test_id_invalido_no_frena_al_resto_del_lote():
+    poller = AsyncReportPoller("token", "https://graph", poll_initial=0.01, poll_max=0.05, timeout=5)
+
+    def consultar(ids):
+        if "malo" in ids:
+            raise _http_error(400)
+        return {i: {"async_status": "Job Completed", "async_percent_completion": 100} for i in ids}
+
+    poller._consultar = consultar
+    resultados = {}
+    hilos = [threading.Thread(target=_esperar, args=(poller, i, resultados)) for i in ("r1", "malo", "r2")]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(5)
+
+    assert resultados["r1"]["async_status"] == resultados["r2"]["async_status"] == "Job Completed"
+    assert isinstance(resultados["malo"], AsyncReportError)
+
+
+def test_error_inesperado_libera_a_los_que_esperan():
+    poller = AsyncReportPoller("token", "https://graph", poll_initial=0.01, poll_max=0.05, timeout=5)
+    poller._consultar = lambda ids: [][0]
+
+    with pytest.raises(AsyncReportError, match="detenido"):
+        poller.wait("r1")
@@ -0,0 +1,111 @@
+"""
+Test diferencial: la transformación columnar debe producir las mismas filas
+que process_insight_to_daily_row.
+"""
+import random
+from datetime import date
+
+import pytest
+
+from automation_hub.integrations.meta_ads import columnar_transform
+from automation_hub.integrations.meta_ads.columnar_transform import transform_insights_columnar
+from automation_hub.integrations.meta_ads.daily_sync_service import (
+    MetaAdsDailySyncService,
+    compute_daily_row_hash,
+)
+
+SYNC_FIELDS = {"fecha_sincronizacion", "fecha_ultima_actualizacion"}
+ACTION_TYPES = [
+    "link_click", "page_engagement", "post_engagement", "video_view", "onsite_conversion.post_net_like",
+    "comment", "post", "landing_page_view", "like", "outbound_click", "lead",
+    "onsite_conversion.messaging_conversation_started_7d", "onsite_conversion.messaging_first_reply",
+]
+
+
+def _insights(n, semilla=11):
+    rnd = random.Random(semilla)
+    pagina = []
+    for i in range(n):
+        insight = {
+            "ad_id": str(1000 + i),
+            "campaign_id": "c1", "adset_id": "s1", "ad_name": f"Ad {i}",
+            "date_start": "2026-01-01", "date_stop": "2026-01-01",
+            "publisher_platform": rnd.choice(["facebook", "instagram", None]),
+            "impressions": str(rnd.randint(0, 5000)), "reach": rnd.choice(["10", 7, None]),
+            "clicks": str(rnd.randint(0, 50)), "ctr": rnd.choice(["1.5", None, "n/a"]),
+            "link_clicks": rnd.choice(["0", "4", None]),
+            "outbound_clicks": rnd.choice([None, "2", "0"]),
+            "video_p25_watched_actions": [{"action_type": "video_view", "value": str(rnd.randint(0, 9))}],
+            "cost_per_action_type": [{"action_type": "link_click", "value": "0.2"}],
+        }
+        if rnd.random() < 0.9:
+            insight["spend"] = rnd.choice([f"{rnd.uniform(0, 90):.2f}", "0", 12])
+        if rnd.random() < 0.3:
+            insight["messaging_conversations_started"] = str(rnd.randint(0, 20))
+        accion = rnd.random()
+        if accion < 0.1:
+            insight["actions"] = None
+        elif accion < 0.9:
+            insight["actions"] = [
+                {"action_type": t, "value": str(rnd.randint(0, 40))} for t in rnd.sample(ACTION_TYPES, 6)
+            ]
+        pagina.append(insight)
+    pagina.append({"campaign_id": "sin ad_id"})
+    pagina.append({"id": "77", "spend": "bad", "actions": [
+        {"action_type": "onsite_conversion.messaging_conversation_started_7d", "value": "3"}
+    ]})
+    return pagina
+
+
+def _por_fila(service, insights):
+    filas, errores = [], []
+    for insight in insights:
+        try:
+            fila = service.process_insight_to_daily_row(insight, "act_1", date(2026, 1, 1), "nora")
+        except Exception:
+            errores.append(insight.get("ad_id"))
+            continue
+        if fila:
+            filas.append(fila)
+    return filas, errores
+
+
+def _sin_fechas_sync(filas):
+    return [{k: v for k, v in f.items() if k not in SYNC_FIELDS} for f in filas]
+
+
+@pytest.mark.parametrize("backend", ["array", "numpy"])
+def test_columnar_igual_a_fila_por_fila(monkeypatch, backend):
+    if backend == "numpy":
+        monkeypatch.setattr(columnar_transform, "np", pytest.importorskip("numpy"))
+    else:
+        monkeypatch.setattr(columnar_transform, "np", None)
+    monkeypatch.setenv("META_ACCESS_REDACTED_TOKEN", "x")
+    service = MetaAdsDailySyncService(supabase_client=object())
+    insights = _insights(700)
+
+    esperadas, errores_esperados = _por_fila(service, insights)
+
+    filas, errores = [], []
+    for lote, errores_lote in transform_insights_columnar(
+        service, insights, "act_1", date(2026, 1, 1), "nora", chunk_size=256, hash_fn=compute_daily_row_hash
+    ):
+        filas.extend(lote)
+        errores.extend(errores_lote)
+
+    assert _sin_fechas_sync(filas) == _sin_fechas_sync(esperadas)
+    assert len(errores) == len(errores_esperados) == 1
+
+
+def test_lote_con_valor_invalido_cae_a_fila_por_fila(monkeypatch):
+    monkeypatch.setenv("META_ACCESS_REDACTED_TOKEN", "x")
+    service = MetaAdsDailySyncService(supabase_client=object())
+    insights = _insights(20)
+    insights[3]["video_p50_watched_actions"] = [{"value": "no-numero"}]
+
+    esperadas, _ = _por_fila(service, insights)
+    filas = [f for lote, _ in transform_insights_columnar(
+        service, insights, "act_1", date(2026, 1, 1), "nora", hash_fn=compute_daily_row_hash
+    ) for f in lote]
+
+    assert _sin_fechas_sync(filas) == _sin_fechas_sync(esperadas)
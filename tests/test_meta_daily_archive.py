@@ -0,0 +1,185 @@
+"""
+Tests para el archivo en Parquet de meta_ads_anuncios_daily.
+"""
+from datetime import date
+
+import pytest
+
+from automation_hub.integrations.meta_ads import daily_archive
+from automation_hub.integrations.meta_ads.daily_archive import (
+    DailyArchiveReader,
+    DailyArchiver,
+    limite_caliente,
+    meses_entre,
+    ruta_archivo,
+)
+
+
+def test_limite_caliente_y_meses_del_rango():
+    assert limite_caliente(date(2026, 3, 15), 2) == date(2026, 1, 1)
+    assert limite_caliente(date(2026, 1, 31), 1) == date(2025, 12, 1)
+    assert meses_entre(date(2025, 11, 20), date(2026, 1, 2)) == [
+        date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1)
+    ]
+    assert ruta_archivo(date(2025, 11, 1), "act_1") == "meta_ads_anuncios_daily/mes=2025-11/cuenta=act_1.parquet"
+
+
+class _FakeQuery:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.filtros = []
+        self.accion = "select"
+        self.payload = None
+        self.pagina = None
+
+    def select(self, *args):
+        return self
+
+    def order(self, *args):
+        return self
+
+    def limit(self, n):
+        self.pagina = (0, n - 1)
+        return self
+
+    def range(self, start, end):
+        self.pagina = (start, end)
+        return self
+
+    def eq(self, columna, valor):
+        self.filtros.append(lambda f: str(f.get(columna)) == valor)
+        return self
+
+    def in_(self, columna, valores):
+        self.filtros.append(lambda f: f.get(columna) in valores)
+        return self
+
+    def gte(self, columna, valor):
+        self.filtros.append(lambda f: str(f.get(columna)) >= valor)
+        return self
+
+    def lte(self, columna, valor):
+        self.filtros.append(lambda f: str(f.get(columna)) <= valor)
+        return self
+
+    def lt(self, columna, valor):
+        self.filtros.append(lambda f: str(f.get(columna)) < valor)
+        return self
+
+    def delete(self):
+        self.accion = "delete"
+        return self
+
+    def update(self, payload):
+        self.accion, self.payload = "update", payload
+        return self
+
+    def upsert(self, payload, on_conflict=None):
+        self.accion, self.payload = "upsert", payload
+        self.llave = tuple((on_conflict or "").split(","))
+        return self
+
+    def execute(self):
+        tabla = self.db.setdefault(self.name, [])
+        if self.accion == "upsert":
+            mismo = [f for f in tabla if all(f.get(c) == self.payload.get(c) for c in self.llave)]
+            self.db[self.name] = [f for f in tabla if f not in mismo] + [dict(self.payload)]
+            return type("R", (), {"data": [self.payload]})()
+        filas = sorted(
+            (f for f in tabla if all(filtro(f) for filtro in self.filtros)),
+            key=lambda f: str(f.get("fecha_reporte") or f.get("mes"))
+        )
+        if self.accion == "delete":
+            self.db[self.name] = [f for f in tabla if f not in filas]
+        elif self.accion == "update":
+            for fila in filas:
+                fila.update(self.payload)
+        elif self.pagina:
+            filas = filas[self.pagina[0]:self.pagina[1] + 1]
+        return type("R", (), {"data": filas})()
+
+
+class _FakeBucket:
+    def __init__(self, objetos):
+        self.objetos = objetos
+
+    def upload(self, path, file, file_options=None):
+        self.objetos[path] = file
+
+    def download(self, path):
+        return self.objetos[path]
+
+
+class _FakeSupabase:
+    def __init__(self, db):
+        self.db = db
+        self.objetos = {}
+        self.storage = type("S", (), {"from_": lambda _, bucket: _FakeBucket(self.objetos)})()
+
+    def table(self, name):
+        return _FakeQuery(self.db, name)
+
+
+def _fila(ad_id, fecha, gasto, actualizado="2026-01-02T00:00:00"):
+    return {
+        "ad_id": ad_id, "id_cuenta_publicitaria": "act_1", "fecha_reporte": fecha,
+        "publisher_platform": "facebook", "importe_gastado": gasto,
+        "actions": [{"action_type": "link_click", "value": "3"}], "conversions_data": None,
+        "fecha_ultima_actualizacion": actualizado,
+    }
+
+
+def test_archiva_mes_cerrado_poda_y_el_lector_lo_devuelve(monkeypatch):
+    pytest.importorskip("pyarrow")
+    diario = [_fila("1", "2025-11-03", 1.5), _fila("2", "2025-11-20", 2.0), _fila("1", "2026-01-05", 4.0)]
+    supabase = _FakeSupabase({
+        "meta_ads_anuncios_daily": diario,
+        "meta_ads_cuentas": [{"id_cuenta_publicitaria": "act_1"}],
+    })
+
+    resultado = DailyArchiver(supabase, meses_calientes=1).archivar_pendientes(hoy=date(2026, 1, 10))
+
+    assert resultado["meses"] == ["2025-11-01"] and resultado["filas"] == 2 and not resultado["errores"]
+    assert [f["fecha_reporte"] for f in supabase.db["meta_ads_anuncios_daily"]] == ["2026-01-05"]
+    assert supabase.db["meta_ads_daily_archivo"][0]["podado_en"]
+
+    filas = DailyArchiveReader(supabase).leer(date(2025, 11, 15), date(2026, 1, 31))
+    assert sorted((f["fecha_reporte"], f["importe_gastado"]) for f in filas) == [
+        ("2025-11-20", 2.0), ("2026-01-05", 4.0)
+    ]
+    archivada = next(f for f in filas if f["fecha_reporte"] == "2025-11-20")
+    assert archivada["actions"] == [{"action_type": "link_click", "value": "3"}]
+
+
+def test_rearchivar_un_mes_resincronizado_conserva_las_filas_archivadas():
+    pytest.importorskip("pyarrow")
+    supabase = _FakeSupabase({
+        "meta_ads_anuncios_daily": [_fila("1", "2025-11-03", 1.5), _fila("2", "2025-11-20", 2.0)],
+        "meta_ads_cuentas": [{"id_cuenta_publicitaria": "act_1"}],
+    })
+    archiver = DailyArchiver(supabase, meses_calientes=1)
+    archiver.archivar_pendientes(hoy=date(2026, 1, 10))
+
+    # Una resincronización vuelve a escribir un solo día del mes ya podado
+    supabase.db["meta_ads_anuncios_daily"].append(_fila("1", "2025-11-03", 9.0, "2026-01-11T00:00:00"))
+    resultado = archiver.archivar_pendientes(hoy=date(2026, 1, 12))
+
+    assert resultado["filas"] == 1 and not resultado["errores"]
+    assert supabase.db["meta_ads_anuncios_daily"] == []
+    (archivo,) = supabase.db["meta_ads_daily_archivo"]
+    assert archivo["filas"] == 2 and archivo["podado_en"]
+
+    filas = DailyArchiveReader(supabase).leer(date(2025, 11, 1), date(2025, 11, 30))
+    assert sorted((f["ad_id"], f["importe_gastado"]) for f in filas) == [("1", 9.0), ("2", 2.0)]
+
+
+def test_sin_meses_archivados_no_necesita_pyarrow(monkeypatch):
+    monkeypatch.setattr(daily_archive, "pa", None)
+    supabase = _FakeSupabase({"meta_ads_anuncios_daily": [_fila("1", "2026-01-05", 4.0)]})
+
+    filas = DailyArchiveReader(supabase).leer(date(2026, 1, 1), date(2026, 1, 31))
+
+    assert len(filas) == 1
+    with pytest.raises(RuntimeError):
+        DailyArchiver(supabase).archivar_pendientes(hoy=date(2026, 1, 10))
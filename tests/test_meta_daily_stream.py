@@ -0,0 +1,50 @@
+"""
+Tests para la sincronización diaria en streaming (escritura, desactivación y rollup).
+"""
+from datetime import date
+
+from automation_hub.integrations.meta_ads import daily_sync_service
+from automation_hub.integrations.meta_ads.daily_sync_service import MetaAdsDailySyncService
+
+
+def _insight(ad_id, dia):
+    return {"ad_id": ad_id, "date_start": dia, "publisher_platform": "facebook", "spend": "1", "impressions": "10"}
+
+
+def test_rango_escribe_por_lotes_y_refresca_rollup_de_los_dias_vistos(monkeypatch):
+    monkeypatch.setenv("META_ACCESS_REDACTED_TOKEN", "x")
+    service = MetaAdsDailySyncService(supabase_client=object())
+    service.PIPELINE_BATCH_ROWS = 2
+
+    paginas = [
+        [_insight("1", "2026-01-01"), _insight("2", "2026-01-01")],
+        [_insight("1", "2026-01-02")],
+    ]
+    existentes = {
+        ("9", "2026-01-01", "facebook"): {"content_hash": "x", "activo": True},
+        ("9", "2026-01-03", "facebook"): {"content_hash": "x", "activo": True},
+    }
+    escritas, desactivadas, rollups = [], [], []
+
+    monkeypatch.setattr(MetaAdsDailySyncService, "iter_insights", lambda self, *a: iter(paginas))
+    monkeypatch.setattr(daily_sync_service, "fetch_hashes_daily", lambda *a: existentes)
+    monkeypatch.setattr(
+        daily_sync_service, "upsert_anuncios_daily",
+        lambda sb, rows, chunk: (escritas.extend(rows) or len(rows), [])
+    )
+    monkeypatch.setattr(
+        daily_sync_service, "desactivar_filas_daily",
+        lambda sb, cuenta, llaves: desactivadas.extend(llaves) or len(llaves)
+    )
+    monkeypatch.setattr(
+        daily_sync_service, "refrescar_rollup_cuenta",
+        lambda sb, cuenta, fechas: rollups.append(sorted(fechas)) or len(fechas)
+    )
+
+    result = service.sync_account_range("act_1", date(2026, 1, 1), date(2026, 1, 3))
+
+    assert result["ok"] and result["escritas"] == 3
+    assert result["dias"] == {"2026-01-01": 2, "2026-01-02": 1}
+    # El 3 de enero no llegó en la respuesta: no se desactiva ni se recalcula
+    assert desactivadas == [("9", "2026-01-01", "facebook")]
+    assert rollups == [["2026-01-01", "2026-01-02"]]
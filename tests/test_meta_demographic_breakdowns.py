@@ -0,0 +1,26 @@
+"""
+Tests para las filas de meta_ads_breakdowns_daily.
+"""
+from datetime import date
+
+from automation_hub.integrations.meta_ads.demographic_sync_service import MetaAdsDemographicSyncService
+
+
+def test_un_anuncio_con_varios_buckets_conserva_cada_uno(monkeypatch):
+    """Cada bucket de edad debe quedar como fila propia con sus métricas."""
+    monkeypatch.setenv("META_ACCESS_REDACTED_TOKEN", "x")
+    service = MetaAdsDemographicSyncService(supabase_client=object())
+    insights = [
+        {"ad_id": "1", "age": "18-24", "impressions": "100", "reach": "80", "clicks": "3", "spend": "1.5",
+         "actions": [{"action_type": "onsite_conversion.messaging_conversation_started_7d", "value": "2"},
+                     {"action_type": "link_click", "value": "3"}]},
+        {"ad_id": "1", "age": "25-34", "impressions": "300", "reach": "200", "clicks": "9", "spend": "4.5"},
+        {"ad_id": "2", "impressions": "50"},
+    ]
+
+    rows = service.build_breakdown_rows("act_1", date(2026, 1, 1), "age", insights, "nora")
+
+    assert [(r["ad_id"], r["bucket"]) for r in rows] == [("1", "18-24"), ("1", "25-34")]
+    assert rows[0]["messages"] == 2
+    assert rows[1]["impressions"] == 300 and rows[1]["spend"] == 4.5 and rows[1]["messages"] == 0
+    assert all(r["breakdown"] == "age" and r["fecha_reporte"] == "2026-01-01" for r in rows)
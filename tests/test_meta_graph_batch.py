@@ -0,0 +1,66 @@
+"""
+Tests para el cliente de batch requests de Graph API.
+"""
+import json
+import threading
+from unittest import mock
+
+from automation_hub.integrations.meta_ads import graph_batch
+from automation_hub.integrations.meta_ads.graph_batch import GraphBatchClient, GraphMicroBatcher
+
+
+def _respuesta_batch(lote):
+    respuestas = []
+    for sub in lote:
+        ad_id = sub["relative_url"].split("?")[0]
+        if ad_id == "borrado":
+            body = {"error": {"message": "Unsupported get request", "code": 100}}
+            respuestas.append({"code": 400, "body": json.dumps(body)})
+        else:
+            respuestas.append({"code": 200, "body": json.dumps({"id": ad_id, "name": f"Ad {ad_id}"})})
+    return respuestas
+
+
+def _fake_post(llamadas):
+    def post(url, data=None, timeout=None):
+        lote = json.loads(data["batch"])
+        llamadas.append(len(lote))
+        response = mock.Mock()
+        response.raise_for_status = lambda: None
+        response.json = lambda: _respuesta_batch(lote)
+        return response
+    return post
+
+
+def test_execute_parte_en_lotes_de_50_y_aisla_errores():
+    llamadas = []
+    client = GraphBatchClient("token")
+    urls = [f"{i}?fields=name" for i in range(120)] + ["borrado?fields=name"]
+
+    with mock.patch.object(graph_batch.requests, "post", _fake_post(llamadas)):
+        resultados = client.get_many(urls)
+
+    assert llamadas == [50, 50, 21]
+    assert all(r["ok"] for r in resultados[:120])
+    assert resultados[0]["data"]["name"] == "Ad 0"
+    assert resultados[120]["ok"] is False
+    assert resultados[120]["code"] == 100
+
+
+def test_micro_batcher_agrupa_llamadas_concurrentes():
+    llamadas = []
+    batcher = GraphMicroBatcher(GraphBatchClient("token"), window_seconds=0.1)
+    resultados = {}
+
+    def worker(ad_id):
+        resultados[ad_id] = batcher.get(f"{ad_id}?fields=name")
+
+    with mock.patch.object(graph_batch.requests, "post", _fake_post(llamadas)):
+        hilos = [threading.Thread(target=worker, args=(str(i),)) for i in range(10)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join(5)
+
+    assert llamadas == [10]
+    assert resultados["7"]["data"]["id"] == "7"
@@ -0,0 +1,105 @@
+"""
+Tests para la caché compartida de nombres de Meta Ads.
+"""
+from datetime import datetime, timedelta, timezone
+
+from automation_hub.integrations.meta_ads.name_cache import NameCache
+
+
+class _Query:
+    def __init__(self, db, tabla):
+        self.db = db
+        self.tabla = tabla
+        self.filtros = {}
+
+    def select(self, _columnas):
+        return self
+
+    def eq(self, campo, valor):
+        self.filtros[campo] = valor
+        return self
+
+    def in_(self, campo, valores):
+        self.filtros[campo] = set(valores)
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        for row in rows:
+            self.db.filas.setdefault((row["tipo"], row["object_id"]), {}).update(row)
+        self.filas_upsert = rows
+        return self
+
+    def execute(self):
+        if hasattr(self, "filas_upsert"):
+            return type("R", (), {"data": self.filas_upsert})()
+        data = [
+            fila for (tipo, object_id), fila in self.db.filas.items()
+            if tipo == self.filtros["tipo"] and object_id in self.filtros["object_id"]
+        ]
+        self.db.lecturas += 1
+        return type("R", (), {"data": data})()
+
+
+class _SupabaseFalso:
+    def __init__(self):
+        self.filas = {}
+        self.lecturas = 0
+
+    def table(self, tabla):
+        return _Query(self, tabla)
+
+
+def test_lru_expulsa_la_menos_usada():
+    cache = NameCache(max_entries=2, ttl=60)
+    cache.put("1", {"ad_name": "uno"})
+    cache.put("2", {"ad_name": "dos"})
+    assert cache.get("1") == {"ad_name": "uno"}  # "2" queda como la menos usada
+
+    cache.put("3", {"ad_name": "tres"})
+
+    assert cache.get("2") is None
+    assert set(cache.get_many(["1", "3"])) == {"1", "3"}
+
+
+def test_entradas_vencidas_no_se_devuelven():
+    cache = NameCache(ttl=-1)
+    cache.put("1", {"ad_name": "uno"})
+    assert cache.get("1") is None
+    assert len(cache) == 0
+
+
+def test_arranque_en_caliente_desde_supabase():
+    supabase = _SupabaseFalso()
+    NameCache(supabase=supabase).put_many({"1": {"ad_name": "uno", "status": "ACTIVE"}})
+    viejo = (datetime.now(timezone.utc) - timedelta(days=5)).isoformat()
+    supabase.filas[("ad", "2")] = {"tipo": "ad", "object_id": "2", "datos": {"ad_name": "dos"}, "actualizado_en": viejo}
+
+    # Proceso nuevo: memoria vacía, solo la entrada vigente sale de Supabase
+    cache = NameCache(supabase=supabase, ttl=24 * 3600)
+    assert cache.get_many(["1", "2"]) == {"1": {"ad_name": "uno", "status": "ACTIVE"}}
+    assert supabase.filas[("ad", "1")]["nombre"] == "uno"
+
+    lecturas = supabase.lecturas
+    assert cache.get("1") == {"ad_name": "uno", "status": "ACTIVE"}
+    assert supabase.lecturas == lecturas
+
+
+def test_status_vencido_se_refresca_sin_perder_el_nombre():
+    supabase = _SupabaseFalso()
+    hace_dos_dias = (datetime.now(timezone.utc) - timedelta(days=2)).isoformat()
+    supabase.filas[("ad", "1")] = {
+        "tipo": "ad", "object_id": "1", "datos": {"ad_name": "uno", "status": "ACTIVE"},
+        "actualizado_en": hace_dos_dias, "status_actualizado_en": hace_dos_dias,
+    }
+
+    # Corrida siguiente: el nombre sigue vigente (7 días) pero el status (20 h) no
+    cache = NameCache(supabase=supabase)
+    assert cache.get_many(["1"]) == {"1": {"ad_name": "uno", "status": "ACTIVE"}}
+    assert cache.status_vencido(["1"]) == ["1"]
+
+    cache.actualizar_status({"1": {"status": "PAUSED"}})
+
+    assert cache.get("1") == {"ad_name": "uno", "status": "PAUSED"}
+    assert cache.status_vencido(["1"]) == []
+    assert supabase.filas[("ad", "1")]["actualizado_en"] == hace_dos_dias
+    assert supabase.filas[("ad", "1")]["status"] == "PAUSED"
@@ -0,0 +1,50 @@
+"""
+Tests para el pipeline en streaming de insights de Meta Ads.
+"""
+import threading
+
+import pytest
+
+from automation_hub.integrations.meta_ads.pipeline import BoundedWriter, agrupar_paginas, prefetch
+
+
+def test_prefetch_conserva_orden_y_propaga_errores():
+    def paginas():
+        yield [1]
+        yield [2, 3]
+        raise RuntimeError("reduce the amount of data")
+
+    recibidas = []
+    with pytest.raises(RuntimeError):
+        for pagina in prefetch(paginas(), depth=1):
+            recibidas.append(pagina)
+    assert recibidas == [[1], [2, 3]]
+
+
+def test_agrupar_paginas_junta_hasta_el_minimo():
+    lotes = list(agrupar_paginas([[1, 2], [3], [4, 5, 6], [7]], min_filas=3))
+    assert lotes == [[1, 2, 3], [4, 5, 6], [7]]
+
+
+def test_writer_acota_la_cola_y_acumula_resultados():
+    liberar = threading.Event()
+    escritos = []
+
+    def escribir(rows):
+        liberar.wait(timeout=5)
+        escritos.append(list(rows))
+        return len(rows), [f"error {rows[0]}"] if rows[0] == 3 else []
+
+    writer = BoundedWriter(escribir, maxsize=1)
+    writer.submit([1])  # Lo toma el hilo y queda bloqueado escribiendo
+    writer.submit([2])  # Llena la cola
+
+    bloqueado = threading.Thread(target=writer.submit, args=([3],))
+    bloqueado.start()
+    bloqueado.join(timeout=0.2)
+    assert bloqueado.is_alive()
+
+    liberar.set()
+    bloqueado.join(timeout=5)
+    assert writer.close() == (3, ["error 3"])
+    assert escritos == [[1], [2], [3]]
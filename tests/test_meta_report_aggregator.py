@@ -0,0 +1,169 @@
+"""
+Tests para el agregador de una pasada y la generación semanal con insert en bloque.
+"""
+from automation_hub.integrations.meta_ads.report_aggregator import ReportAggregator
+from automation_hub.integrations.meta_ads.reports_service import MetaAdsReportsService
+
+
+def _anuncio(ad_id, plataforma, gasto, clicks, campana="Camp A", conjunto="Set A"):
+    return {
+        "ad_id": ad_id, "campana_id": campana, "conjunto_id": conjunto,
+        "nombre_campana": campana, "nombre_conjunto": conjunto,
+        "publisher_platform": plataforma, "importe_gastado": gasto, "clicks": clicks,
+        "impresiones": 100, "messaging_conversations_started": 0,
+        "actions": [{"action_type": "messaging_first_reply", "value": "2"}],
+    }
+
+
+def test_una_pasada_acumula_totales_plataformas_y_campanas():
+    anuncios = [
+        _anuncio("1", "facebook", "1.5", 10),
+        _anuncio("1", "Instagram", 2, 5),
+        _anuncio("2", "facebook", None, 1, campana="Camp B", conjunto="Set B"),
+    ]
+
+    agregado = ReportAggregator.from_rows(anuncios)
+
+    assert agregado.total.gasto == 3.5 and agregado.total.clicks == 16
+    assert agregado.total.ad_ids == {"1", "2"} and len(agregado.total.campana_ids) == 2
+    assert agregado.platform("facebook").clicks == 11
+    assert agregado.platform("instagram").gasto == 2
+    assert agregado.platform("audience_network").filas == 0
+    assert agregado.total.mensajes_actions == 6
+    assert {c["campana"]: c["anuncios"] for c in agregado.campaign_summary()} == {"Camp A": 2, "Camp B": 1}
+    assert set(agregado.conjuntos) == {"Set A", "Set B"}
+
+
+class _FakeTable:
+    def __init__(self, inserts):
+        self.inserts = inserts
+        self._payload = None
+
+    def select(self, *args):
+        return self
+
+    def neq(self, *args):
+        return self
+
+    def insert(self, payload):
+        self._payload = payload
+        return self
+
+    def execute(self):
+        if self._payload is None:
+            cuentas = [{"id_cuenta_publicitaria": f"act_{i}", "nombre_cliente": f"C{i}"} for i in range(3)]
+            return type("R", (), {"data": cuentas})()
+        if isinstance(self._payload, list) and any(r.get("malo") for r in self._payload):
+            raise RuntimeError("fila inválida")
+        if isinstance(self._payload, dict) and self._payload.get("malo"):
+            raise RuntimeError("fila inválida")
+        self.inserts.append(self._payload)
+        return type("R", (), {"data": []})()
+
+
+def test_reportes_semanales_se_insertan_en_bloque_y_aislan_fallos(monkeypatch):
+    inserts = []
+    supabase = type("SB", (), {"table": lambda self, name: _FakeTable(inserts)})()
+    service = MetaAdsReportsService(supabase_client=supabase)
+
+    def build(nombre_nora, cuenta_id, fecha_inicio, fecha_fin, **kwargs):
+        if cuenta_id == "act_2":
+            return {"ok": False, "msg": "Sin datos"}
+        reporte = {"empresa_id": "e", "id_cuenta_publicitaria": cuenta_id, "public_token": f"tok_{cuenta_id}"}
+        return {"ok": True, "reporte": reporte, "resumen": {"gasto_total": 10.0, "mensajes": 1}}
+
+    archivados = []
+
+    def archivar(empresa_id, cuenta_id, *args, excluir_token=None):
+        # El previo se archiva solo cuando el nuevo ya quedó insertado
+        assert any(r["public_token"] == excluir_token for lote in inserts for r in lote)
+        archivados.append(cuenta_id)
+
+    monkeypatch.setattr(service, "build_report_for_account", build)
+    monkeypatch.setattr(service, "archive_existing_report", archivar)
+    monkeypatch.setattr(service, "get_ads_data_for_period", lambda *a: [])
+
+    result = service.generate_weekly_reports(fecha_inicio="2026-01-01", fecha_fin="2026-01-07")
+
+    assert result["cuentas_procesadas"] == 3 and result["reportes_exitosos"] == 2
+    assert result["total_gasto"] == 20.0
+    assert [r["cuenta_id"] for r in result["reportes_con_errores"]] == ["act_2"]
+    # Un solo INSERT con los dos reportes
+    assert len(inserts) == 1 and sorted(r["id_cuenta_publicitaria"] for r in inserts[0]) == ["act_0", "act_1"]
+    assert sorted(archivados) == ["act_0", "act_1"]
+
+    # Si el bloque falla, se inserta uno por uno y solo el inválido queda con error
+    errores = service.insert_reports_bulk([{"cuenta": "a"}, {"cuenta": "b", "malo": True}])
+    assert errores[0] is None and errores[1].startswith("Error insertando reporte")
+
+
+def test_agregados_sql_arman_el_mismo_reporte_que_las_filas(monkeypatch):
+    anuncios = [
+        _anuncio("1", "facebook", 1.5, 10),
+        _anuncio("1", "instagram", 2, 5),
+        _anuncio("2", "facebook", 0.5, 1, campana="Camp B", conjunto="Set B"),
+    ]
+    base = {"id_cuenta_publicitaria": "act_1", "nombre_nora": "nora", "mensajes": 0, "mensajes_total": 0}
+    filas_sql = [
+        dict(base, nivel="total", filas=3, impresiones=300, clicks=16, gasto=4.0,
+             mensajes_actions=6, campanas=2, conjuntos=2, anuncios=2),
+        dict(base, nivel="plataforma", publisher_platform="facebook", filas=2, impresiones=200,
+             clicks=11, gasto=2.0, mensajes_actions=4, campanas=2, conjuntos=2, anuncios=2),
+        dict(base, nivel="plataforma", publisher_platform="instagram", filas=1, impresiones=100,
+             clicks=5, gasto=2.0, mensajes_actions=2, campanas=1, conjuntos=1, anuncios=1),
+        dict(base, nivel="campana", nombre_campana="Camp A", filas=2, impresiones=200, clicks=15, gasto=3.5),
+        dict(base, nivel="campana", nombre_campana="Camp B", filas=1, impresiones=100, clicks=1, gasto=0.5),
+    ]
+    service = MetaAdsReportsService(supabase_client=object())
+    monkeypatch.setattr(service, "get_empresa_info", lambda *a: {"empresa_id": "e", "empresa_nombre": "E"})
+    monkeypatch.setattr(service, "get_ads_data_for_period", lambda *a: anuncios)
+
+    reportes = []
+    for agregado in (None, ReportAggregator.from_sql_rows(filas_sql)[("act_1", "nora")]):
+        construido = service.build_report_for_account("nora", "act_1", "2026-01-01", "2026-01-07", agregado=agregado)
+        reporte = dict(construido["reporte"])
+        for volatil in ("created_at", "public_token", "insights_json"):
+            reporte.pop(volatil)
+        reportes.append(reporte)
+
+    assert reportes[0] == reportes[1]
+    assert reportes[1]["mensajes"] == 6 and reportes[1]["total_anuncios"] == 2
+
+
+def test_si_fallan_los_agregados_sql_se_agregan_los_anuncios_por_cuenta(monkeypatch):
+    inserts = []
+    supabase = type("SB", (), {"table": lambda self, name: _FakeTable(inserts)})()
+    service = MetaAdsReportsService(supabase_client=supabase)
+    service.AGGREGATE_IN_SQL = True
+    consultas_sql = []
+
+    def agregados_sql(*args):
+        consultas_sql.append(args)
+        raise RuntimeError("RPC no disponible")
+
+    monkeypatch.setattr(service, "get_aggregates_for_accounts", agregados_sql)
+    monkeypatch.setattr(service, "get_ads_data_for_period", lambda *a: [_anuncio("1", "facebook", 1.5, 10)])
+    monkeypatch.setattr(service, "archive_existing_report", lambda *a, **k: None)
+    monkeypatch.setattr(service, "get_empresa_info", lambda *a: {"empresa_id": "e", "empresa_nombre": "E"})
+
+    result = service.generate_weekly_reports(fecha_inicio="2026-01-01", fecha_fin="2026-01-07")
+
+    # Un solo intento SQL para todas las cuentas; después, agregación de filas por cuenta
+    assert len(consultas_sql) == 1
+    assert result["reportes_exitosos"] == 3 and result["total_gasto"] == 4.5
+
+
+def test_replica_que_falla_se_desactiva_y_se_agregan_los_anuncios(monkeypatch):
+    class _ReplicaRota:
+        engine = "sqlite"
+
+        def sincronizar(self, supabase=None):
+            raise OSError("disco lleno")
+
+    service = MetaAdsReportsService(supabase_client=object())
+    service.mirror = _ReplicaRota()
+    monkeypatch.setattr(service, "get_ads_data_for_period", lambda *a: [_anuncio("1", "facebook", 1.5, 10)])
+
+    agregado = service.get_aggregate_for_period("act_1", "2026-01-01", "2026-01-07", "nora")
+
+    assert service.mirror is None and agregado.total.gasto == 1.5
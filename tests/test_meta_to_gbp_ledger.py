@@ -0,0 +1,35 @@
+"""
+Tests para el registro de fallos en el ledger de publicaciones Facebook → GBP.
+"""
+import requests
+
+from automation_hub.jobs import meta_to_gbp_daily
+from automation_hub.jobs.meta_to_gbp_daily import es_fallo_ambiguo, registrar_error
+
+
+def _http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.exceptions.HTTPError(f"{status_code} Error", response=response)
+
+
+def test_solo_los_rechazos_4xx_son_fallos_definitivos():
+    assert es_fallo_ambiguo(requests.exceptions.ReadTimeout("timeout"))
+    assert es_fallo_ambiguo(requests.exceptions.ConnectionError("reset"))
+    assert es_fallo_ambiguo(_http_error(503))
+    assert not es_fallo_ambiguo(_http_error(400))
+    assert not es_fallo_ambiguo(ValueError("payload inválido"))
+
+
+def test_timeout_deja_la_fila_pendiente_para_reconciliar(monkeypatch):
+    filas = []
+    monkeypatch.setattr(meta_to_gbp_daily, "upsert_ledger", lambda supabase, rows: filas.extend(rows))
+    tarea = {
+        "meta_post_id": "m1", "location_name": "accounts/1/locations/2", "location_name_db": "locations/2",
+        "nombre_nora": "nora", "summary": "Hola", "summary_hash": "h", "media_usado": None,
+    }
+
+    registrar_error(None, tarea, requests.exceptions.ReadTimeout("timeout"))
+    registrar_error(None, tarea, _http_error(400))
+
+    assert [f["estado"] for f in filas] == ["pendiente", "error"]
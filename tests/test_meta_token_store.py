@@ -0,0 +1,65 @@
+"""
+Tests para el índice en memoria de tokens de Meta.
+"""
+from automation_hub.integrations.meta_ads.token_resolver import MetaTokenStore, is_token_error
+
+
+class _FakeQuery:
+    """Imita la cadena de consulta de supabase-py sobre meta_tokens."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    @property
+    def not_(self):
+        return self
+
+    def execute(self):
+        return type("Result", (), {"data": self.rows})()
+
+
+class _FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def table(self, name):
+        return _FakeQuery(self.rows)
+
+
+ROWS = [
+    {"nombre_nora": "aura", "token": "page-token", "subject_type": "page", "subject_id": "p1"},
+    {"nombre_nora": "aura", "token": "system-token", "subject_type": "system", "subject_id": "s1"},
+    {"nombre_nora": "aura", "token": "expirado", "subject_type": "system", "expires_at": "2000-01-01T00:00:00Z"},
+    {"nombre_nora": "Sistema", "token": "sistema-token", "subject_type": "user", "subject_id": "u1"},
+]
+
+
+def test_resolve_prefiere_token_system():
+    """El ranking system > user > page se aplica al cargar."""
+    store = MetaTokenStore(_FakeSupabase(ROWS))
+    store.load()
+    token, source = store.resolve("aura", fallback_noras=["Sistema"], allow_env_fallback=False)
+    assert token == "system-token"
+    assert source == "meta_tokens:aura:system:s1"
+
+
+def test_invalidate_salta_al_siguiente_candidato():
+    """Un token rechazado no se vuelve a entregar; se usa el siguiente y luego el fallback."""
+    store = MetaTokenStore(_FakeSupabase(ROWS))
+    store.load()
+
+    store.invalidate("system-token")
+    assert store.resolve("aura", ["Sistema"], allow_env_fallback=False)[0] == "page-token"
+
+    store.invalidate("page-token")
+    assert store.resolve("aura", ["Sistema"], allow_env_fallback=False)[0] == "sistema-token"
+    assert store.noras() == ["Sistema"]
+
+
+def test_is_token_error():
+    assert is_token_error({"error": {"code": 190, "message": "Error validating access token"}})
+    assert not is_token_error({"error": {"code": 17, "message": "User request limit reached"}})
+    assert not is_token_error(None)